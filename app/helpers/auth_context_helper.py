@@ -0,0 +1,155 @@
+"""Local verification of cognito access tokens and a redis cache of the identity resolved by token_required"""
+import json
+import time
+from typing import Optional
+
+from app import COGNITO_CLIENT
+from app import config_data
+from app import logger
+from app import r
+from app.helpers.constants import RedisCacheKeys
+from app.helpers.constants import TimeInSeconds
+import jwt
+
+# signing keys of the user pool are refetched after this many seconds, or on an unknown key id
+JWKS_LIFESPAN = TimeInSeconds.SIXTY_MIN.value
+
+_jwks_client = None
+
+
+def get_auth_context_config() -> dict:
+    """AUTH_CONTEXT config with its defaults"""
+
+    auth_config = config_data.get('AUTH_CONTEXT') or {}
+
+    return {
+        'TTL': int(auth_config.get('TTL', TimeInSeconds.FIVE_MIN.value)),     # type: ignore  # noqa: FKA100
+        'EMAIL_TTL': int(auth_config.get('EMAIL_TTL', TimeInSeconds.TWENTY_FOUR_HOUR.value)),     # type: ignore  # noqa: FKA100
+        'JWKS_LIFESPAN': int(auth_config.get('JWKS_LIFESPAN', JWKS_LIFESPAN))     # type: ignore  # noqa: FKA100
+    }
+
+
+def get_token_issuer() -> str:
+    """Issuer of the access tokens of the user pool"""
+
+    return f"https://cognito-idp.{config_data.get('COGNITO_REGION')}.amazonaws.com/{config_data.get('COGNITO_USER_POOL_ID')}"
+
+
+def get_jwks_client() -> jwt.PyJWKClient:
+    """Process wide client of the user pool JWKS, the key set is cached in memory"""
+    global _jwks_client
+
+    if _jwks_client is None:
+        _jwks_client = jwt.PyJWKClient(f'{get_token_issuer()}/.well-known/jwks.json', cache_jwk_set=True,
+                                       lifespan=get_auth_context_config()['JWKS_LIFESPAN'])
+
+    return _jwks_client
+
+
+def verify_access_token(access_token: str) -> dict:
+    """Verify the signature, expiry, issuer and client id of a cognito access token and return its claims.
+
+    Raises jwt.PyJWTError when the token is not valid for this app client.
+    """
+
+    signing_key = get_jwks_client().get_signing_key_from_jwt(access_token)
+
+    claims = jwt.decode(access_token, key=signing_key.key, algorithms=['RS256'], issuer=get_token_issuer(),     # type: ignore  # noqa: FKA100
+                        options={'require': ['exp', 'iss', 'sub', 'jti']})
+
+    if claims.get('token_use') != 'access' or claims.get('client_id') != config_data.get('COGNITO_APP_CLIENT_ID'):
+        raise jwt.InvalidTokenError('Token is not an access token of this app client')
+
+    return claims
+
+
+def get_token_email(access_token: str, claims: dict) -> str:
+    """Email of the token user. Access tokens do not carry it, so it is read from cognito once per user and cached"""
+
+    email_key = f'{RedisCacheKeys.AUTH_TOKEN_EMAIL.value}_{claims["sub"]}'
+
+    try:
+        email = r.get(email_key)
+        if email:
+            return email.decode('utf-8')
+    except Exception as e:
+        logger.warning(f'Unable to read token email from redis: {e}')
+
+    user_info = COGNITO_CLIENT.get_user(AccessToken=access_token)
+
+    email = [data.get('Value') for data in user_info.get('UserAttributes') if data.get('Name') == 'email'][0]
+
+    try:
+        r.set(name=email_key, value=email, ex=get_auth_context_config()['EMAIL_TTL'])
+    except Exception as e:
+        logger.warning(f'Unable to cache token email in redis: {e}')
+
+    return email
+
+
+def get_auth_context_version_key(account_id: Optional[str]) -> str:
+    """Redis key holding the auth context version of an account"""
+
+    return f'{RedisCacheKeys.AUTH_CONTEXT_VERSION.value}_{account_id or ""}'
+
+
+def get_auth_context_key(jti: str, account_id: Optional[str]) -> str:
+    """Redis key of the identity of a token on an account"""
+
+    return f'{RedisCacheKeys.AUTH_CONTEXT.value}_{account_id or ""}_{jti}'
+
+
+def get_auth_context(jti: str, account_id: Optional[str]):
+    """Cached identity of a token on an account and the current auth context version of the account.
+
+    The context is None when missing, expired or invalidated, the version is None when redis is unavailable.
+    """
+
+    context_key = get_auth_context_key(jti=jti, account_id=account_id)
+
+    try:
+        cached_context, version = r.mget([context_key, get_auth_context_version_key(account_id)])
+    except Exception as e:
+        logger.warning(f'Unable to read auth context from redis: {e}')
+        return None, None
+
+    version = int(version or 0)
+
+    if cached_context is None:
+        return None, version
+
+    context = json.loads(cached_context)
+
+    # a context written before the last invalidation of the account is stale
+    if context.get('version') != version:
+        return None, version
+
+    return context, version
+
+
+def set_auth_context(jti: str, account_id: Optional[str], context: dict, version: int, token_expires_at: int) -> None:
+    """Cache the identity of a token on an account, never beyond the token expiry.
+
+    version is the one read before the identity was resolved, so an invalidation in between is not lost.
+    """
+
+    ttl = min(get_auth_context_config()['TTL'], token_expires_at - int(time.time()))
+
+    if ttl <= 0:
+        return
+
+    context_key = get_auth_context_key(jti=jti, account_id=account_id)
+
+    try:
+        r.set(name=context_key, value=json.dumps({**context, 'version': version}), ex=ttl)
+    except Exception as e:
+        logger.warning(f'Unable to cache auth context in redis: {e}')
+
+
+def invalidate_auth_context(account_id: str) -> None:
+    """Drop every cached identity on an account, called when its membership or subscription changes"""
+
+    try:
+        r.incr(get_auth_context_version_key(account_id))
+    except Exception as e:
+        logger.warning(f'Unable to invalidate auth context in redis: {e}')
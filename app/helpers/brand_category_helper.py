@@ -0,0 +1,60 @@
+"""Per job lookup of category and brand from the item master"""
+from typing import Optional
+
+from app.models.az_item_master import AzItemMaster
+
+
+class BrandCategoryLookup:
+    """Loads an account's sku and asin to (category, brand) maps once and serves them for the rest of the job.
+
+    Exposes the same get_category_brand_by_sku / get_category_brand_by_asin calls as AzItemMaster, so the
+    model write paths can take either. Lookups for another account fall through to AzItemMaster.
+    """
+
+    def __init__(self, account_id: str, asp_id: str):
+        self.account_id = account_id
+        self.asp_id = asp_id
+        self._by_sku: Optional[dict] = None
+        self._by_asin: Optional[dict] = None
+
+    def load(self) -> None:
+        """Read the item master of the account with a single query"""
+        items = AzItemMaster.query.with_entities(AzItemMaster.seller_sku, AzItemMaster.asin, AzItemMaster.category, AzItemMaster.brand).filter(  # type: ignore  # noqa: FKA100
+            AzItemMaster.account_id == self.account_id, AzItemMaster.selling_partner_id == self.asp_id).order_by(AzItemMaster.id).all()
+
+        self._by_sku = {}
+        self._by_asin = {}
+        for item in items:
+            if item.seller_sku:
+                self._by_sku.setdefault(item.seller_sku, (item.category, item.brand))     # type: ignore  # noqa: FKA100
+            if item.asin:
+                self._by_asin.setdefault(item.asin, (item.category, item.brand))     # type: ignore  # noqa: FKA100
+
+    def clear(self) -> None:
+        """Drop the loaded maps so the next lookup reads the item master again"""
+        self._by_sku = None
+        self._by_asin = None
+
+    def _is_own_account(self, account_id: str, asp_id: str) -> bool:
+        """Lookups of another account go to the item master instead of the loaded maps"""
+        return account_id == self.account_id and asp_id == self.asp_id
+
+    def get_category_brand_by_sku(self, account_id: str, asp_id: str, seller_sku: str):
+        """category and brand by sku"""
+        if not self._is_own_account(account_id=account_id, asp_id=asp_id):
+            return AzItemMaster.get_category_brand_by_sku(account_id=account_id, asp_id=asp_id, seller_sku=seller_sku)
+
+        if self._by_sku is None:
+            self.load()
+
+        return self._by_sku.get(seller_sku, (None, None))     # type: ignore  # noqa: FKA100
+
+    def get_category_brand_by_asin(self, account_id: str, asp_id: str, asin: str):
+        """category and brand by asin"""
+        if not self._is_own_account(account_id=account_id, asp_id=asp_id):
+            return AzItemMaster.get_category_brand_by_asin(account_id=account_id, asp_id=asp_id, asin=asin)
+
+        if self._by_asin is None:
+            self.load()
+
+        return self._by_asin.get(asin, (None, None))     # type: ignore  # noqa: FKA100
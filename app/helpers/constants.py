@@ -9,6 +9,9 @@ PAGE_DEFAULT = 1
 PAGE_LIMIT = 10
 PRODUCT_RANK_LIMIT = 20
 
+# hourly sales intervals are labelled and bucketed by day in this time zone, as on the sales api payload
+SALES_API_TIME_ZONE = 'Asia/Kolkata'
+
 EXCEL_ALLOWED_EXTENSIONS = ['xls', 'xlsx']
 
 FBA_RETURNS_MAX_REFUND_CLAIM_DAYS = 75
@@ -125,6 +128,7 @@ class ResponseMessageKeys(enum.Enum):
     PAYMENT_SIGNATURE_INVALID = 'Payment signature invalid'
     INFO_SAVED = 'Details saved sucessfully'
     INVALID_BRAND = 'Brand selected is invalid for this request'
+    INVALID_CURSOR = 'Cursor is invalid or expired, request the first page again'
     ACCOUNT_DEACTIVATED = 'Account deactivated successfully'
     ACCOUNT_ACTIVATED = 'Account activated successfully'
     ACCOUNT_ALREADY_EXISTS = 'Account already exists'
@@ -476,6 +480,15 @@ class RedisCacheKeys(EnumBase):
     """Enum for storing redis keys for caching."""
     AMAZON_ACCESS_TOKEN = 'AMAZON_ACCESS_TOKEN'
     ADS_PERFORMANCE_BY_ZONE = 'ADS_PERFORMANCE_BY_ZONE'
+    SP_API_STS_CREDENTIALS = 'SP_API_STS_CREDENTIALS'
+    SP_API_STS_CREDENTIALS_LOCK = 'SP_API_STS_CREDENTIALS_LOCK'
+    SP_API_RATE_LIMIT = 'SP_API_RATE_LIMIT'
+    RESPONSE_CACHE = 'RESPONSE_CACHE'
+    RESPONSE_CACHE_VERSION = 'RESPONSE_CACHE_VERSION'
+    SALES_API_REFRESH_LOCK = 'SALES_API_REFRESH_LOCK'
+    AUTH_CONTEXT = 'AUTH_CONTEXT'
+    AUTH_CONTEXT_VERSION = 'AUTH_CONTEXT_VERSION'
+    AUTH_TOKEN_EMAIL = 'AUTH_TOKEN_EMAIL'
 
 
 class TimeInSeconds(EnumBase):
@@ -894,6 +907,24 @@ class ASpURL(enum.Enum):
             return 'N/A'
 
 
+class ASpApiOperation(EnumBase):
+    """Enum for Amazon Seller Partner API operations, used to key rate limit buckets"""
+
+    CREATE_REPORT = 'createReport'
+    GET_REPORT = 'getReport'
+    GET_REPORTS = 'getReports'
+    GET_REPORT_DOCUMENT = 'getReportDocument'
+    CREATE_RESTRICTED_DATA_TOKEN = 'createRestrictedDataToken'
+    GET_ORDERS = 'getOrders'
+    GET_ORDER_ITEMS = 'getOrderItems'
+    GET_ORDER_METRICS = 'getOrderMetrics'
+    GET_INVENTORY_SUMMARIES = 'getInventorySummaries'
+    GET_MY_FEES_ESTIMATE_FOR_SKU = 'getMyFeesEstimateForSKU'
+    GET_MY_FEES_ESTIMATE_FOR_ASIN = 'getMyFeesEstimateForASIN'
+    LIST_FINANCIAL_EVENTS = 'listFinancialEvents'
+    SEARCH_CATALOG_ITEMS = 'searchCatalogItems'
+
+
 class FulfillmentChannel(EnumBase):
     """Enum for fullfillment channel."""
     AMAZON_IN = 'AMAZON_IN'
@@ -5,12 +5,19 @@ from functools import wraps
 import time
 from typing import Callable
 
-from app import COGNITO_CLIENT
 from app import config_data
+from app import db
 from app import logger
+from app.helpers.auth_context_helper import get_auth_context
+from app.helpers.auth_context_helper import get_token_email
+from app.helpers.auth_context_helper import set_auth_context
+from app.helpers.auth_context_helper import verify_access_token
 from app.helpers.constants import HttpStatusCode
 from app.helpers.constants import ResponseMessageKeys
 from app.helpers.constants import SubscriptionOpenUrl
+from app.helpers.response_cache_helper import get_cached_response
+from app.helpers.response_cache_helper import get_response_cache_key
+from app.helpers.response_cache_helper import set_cached_response
 from app.helpers.utility import get_date_and_time_from_timestamp
 from app.helpers.utility import send_json_response
 from app.models.account import Account
@@ -18,7 +25,9 @@ from app.models.subscription import Subscription
 from app.models.user import User
 from app.models.user_account import UserAccount
 from flask import g
+from flask import make_response
 from flask import request
+from flask import Response
 
 # def token_required(f: Callable) -> Callable:  # type: ignore  # noqa: C901
 #     """To check request contains valid token."""
@@ -84,27 +93,42 @@ def token_required(f: Callable) -> Callable:  # type: ignore  # noqa: C901
 
         try:
 
-            user_info = COGNITO_CLIENT.get_user(
-                AccessToken=request.headers.get('x-authorization')  # authtoken
-            )
+            # signature, expiry and client id are checked against the cached user pool keys, no cognito round trip
+            claims = verify_access_token(access_token=access_token)
 
-            user_email = [data.get('Value') for data in user_info.get(
-                'UserAttributes') if data.get('Name') == 'email'][0]
+            x_account = request.headers.get('x-account') if x_account_value else None
+            subscription_end_at = None
 
-            user_object = User.get_by_email(user_email)
+            auth_context, auth_context_version = get_auth_context(jti=claims['jti'], account_id=x_account)
+
+            if auth_context is not None:
+                # the cached context was resolved and checked for this token, only the rows are read again
+                if auth_context['account_id'] is not None:
+                    user_object, account_object = db.session.query(User, Account).filter(User.id == auth_context['user_id'],     # type: ignore  # noqa: FKA100
+                                                                                         Account.id == auth_context['account_id']).first() or (None, None)
+                else:
+                    user_object = User.get_by_id(auth_context['user_id'])
+
+                subscription_end_at = auth_context['subscription_end_at']
+
+                if user_object is None:
+                    auth_context = None
+
+            if auth_context is None:
+                user_object = User.get_by_email(get_token_email(access_token=access_token, claims=claims))
 
             if user_object is None:
                 return send_json_response(http_status=401, response_status=False, message_key=ResponseMessageKeys.USER_DETAILS_NOT_FOUND.value, data=None, error=None)
 
             if x_account_value:
-                x_account = request.headers.get('x-account')
                 if not x_account:
                     return send_json_response(http_status=HttpStatusCode.UNAUTHORIZED.value, response_status=False,
                                               message_key=ResponseMessageKeys.INVALID_ACCOUNT.value,
                                               data=None,
                                               error=None)
 
-                account_object = Account.get_by_uuid(x_account)
+                if auth_context is None:
+                    account_object = Account.get_by_uuid(x_account)
 
                 kwargs = {}
 
@@ -113,8 +137,11 @@ def token_required(f: Callable) -> Callable:  # type: ignore  # noqa: C901
                                               message_key=ResponseMessageKeys.ASP_TOKEN_EXPIRED.value,
                                               data=None, error=None)
 
-                is_subscription_active = Subscription.get_status_by_account_id(
-                    account_id=x_account)
+                if auth_context is None:
+                    subscription = Subscription.get_by_account_id(account_id=x_account)
+                    subscription_end_at = int(subscription.end_date.timestamp()) if subscription else None
+
+                is_subscription_active = subscription_end_at is not None and int(time.time()) <= subscription_end_at
 
                 if account_object.asp_id is not None and account_object.asp_id_connected_at is not None:
                     asp_id_connected_at_datetime = get_date_and_time_from_timestamp(
@@ -134,17 +161,25 @@ def token_required(f: Callable) -> Callable:  # type: ignore  # noqa: C901
                                               message_key=ResponseMessageKeys.SUBSCRIPTION_INACTIVE.value,
                                               data=None, error=None)
 
-                # check if user-account is deactivated
-                user_account_object = UserAccount.is_user_account_exists(
-                    user_id=user_object.id, account_id=account_object.id)
+                if auth_context is None:
+                    # check if user-account is deactivated
+                    user_account_object = UserAccount.is_user_account_exists(
+                        user_id=user_object.id, account_id=account_object.id)
 
-                if user_account_object is None:
-                    return send_json_response(http_status=401, response_status=False, message_key=ResponseMessageKeys.USER_ACCOUNT_NOT_LINKED.value, data=None, error=None)
+                    if user_account_object is None:
+                        return send_json_response(http_status=401, response_status=False, message_key=ResponseMessageKeys.USER_ACCOUNT_NOT_LINKED.value, data=None, error=None)
 
-                if user_account_object.deactivated_at:
-                    return send_json_response(http_status=401, response_status=False,
-                                              message_key=ResponseMessageKeys.INACTIVE_USER_ACCOUNT.value,
-                                              data=None, error=None)
+                    if user_account_object.deactivated_at:
+                        return send_json_response(http_status=401, response_status=False,
+                                                  message_key=ResponseMessageKeys.INACTIVE_USER_ACCOUNT.value,
+                                                  data=None, error=None)
+
+            if auth_context is None and auth_context_version is not None:
+                set_auth_context(jti=claims['jti'], account_id=x_account, version=auth_context_version, token_expires_at=claims['exp'], context={
+                    'user_id': user_object.id,
+                    'account_id': account_object.id if account_object is not None else None,
+                    'subscription_end_at': subscription_end_at
+                })
 
             # setattr(request, 'user', user_object)
             # setattr(request, 'account', account_object)
@@ -187,6 +222,37 @@ def brand_filter(f: Callable) -> Callable:
     return decorated
 
 
+def cached_response(f: Callable) -> Callable:
+    """
+    A decorator to serve GET responses from the redis response cache.
+
+    Goes below token_required and brand_filter. Successful responses are cached per
+    account, seller, endpoint, query params and allowed brands, and are invalidated
+    when the workers bump the account data version.
+
+    :param f: The function to be decorated.
+    :return: The decorated function.
+    """
+    @wraps(f)
+    def decorated(user_object, account_object, *args, **kwargs):
+        allowed_brands = args[0] if args else None
+        cache_key = get_response_cache_key(
+            user_object=user_object, account_object=account_object, allowed_brands=allowed_brands)
+
+        if cache_key is not None:
+            body = get_cached_response(cache_key)
+            if body is not None:
+                return Response(body, status=200, mimetype='application/json')
+
+        response = make_response(f(user_object, account_object, *args, **kwargs))  # type: ignore  # noqa: FKA100
+
+        if cache_key is not None and response.status_code == 200 and response.is_json:
+            set_cached_response(cache_key=cache_key, body=response.get_data())
+
+        return response
+    return decorated
+
+
 def api_time_logger(method: Callable) -> Callable:
     """To return total request time.
     1. takes time at start
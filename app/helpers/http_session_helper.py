@@ -0,0 +1,84 @@
+"""Pooled, keep-alive HTTP session helper for Amazon SP-API and Ads API calls"""
+import os
+import threading
+from typing import Optional
+
+from app import config_data
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 20
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+_session_lock = threading.Lock()
+
+
+def get_http_session_config() -> dict:
+    """Returns pool and retry settings from config, falling back to defaults"""
+
+    session_config = config_data.get('HTTP_SESSION') or {}
+
+    return {
+        'pool_connections': int(session_config.get('POOL_CONNECTIONS', DEFAULT_POOL_CONNECTIONS)),     # type: ignore  # noqa: FKA100
+        'pool_maxsize': int(session_config.get('POOL_MAXSIZE', DEFAULT_POOL_MAXSIZE)),     # type: ignore  # noqa: FKA100
+        'max_retries': int(session_config.get('MAX_RETRIES', DEFAULT_MAX_RETRIES)),     # type: ignore  # noqa: FKA100
+        'backoff_factor': float(session_config.get('BACKOFF_FACTOR', DEFAULT_BACKOFF_FACTOR)),     # type: ignore  # noqa: FKA100
+    }
+
+
+def create_http_session(pool_connections: int, pool_maxsize: int, max_retries: int, backoff_factor: float) -> requests.Session:
+    """Creates a requests session with a connection pool and retries on connection errors.
+
+    Only connection errors are retried: the request never reached the server, so
+    retrying is safe for POST as well. Read errors and HTTP status codes (429, 5xx)
+    are returned to the caller unchanged.
+    """
+
+    retry = Retry(total=max_retries, connect=max_retries, read=0, redirect=0, status=0,
+                  backoff_factor=backoff_factor, raise_on_status=False)
+
+    adapter = HTTPAdapter(pool_connections=pool_connections,
+                          pool_maxsize=pool_maxsize, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('https://', adapter)      # type: ignore  # noqa: FKA100
+    session.mount('http://', adapter)       # type: ignore  # noqa: FKA100
+
+    return session
+
+
+def get_http_session() -> requests.Session:
+    """Returns the per-process shared session, creating it on first use.
+
+    rq forks a work horse per job, so a session inherited from the parent process
+    is discarded and rebuilt to avoid sharing sockets across processes.
+    """
+    global _session, _session_pid
+
+    pid = os.getpid()
+
+    if _session is not None and _session_pid == pid:
+        return _session
+
+    with _session_lock:
+        if _session is None or _session_pid != pid:
+            _session = create_http_session(**get_http_session_config())
+            _session_pid = pid
+
+    return _session
+
+
+def close_http_session() -> None:
+    """Closes the shared session and its pooled connections"""
+    global _session, _session_pid
+
+    with _session_lock:
+        if _session is not None and _session_pid == os.getpid():
+            _session.close()
+        _session = None
+        _session_pid = None
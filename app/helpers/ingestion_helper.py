@@ -0,0 +1,34 @@
+"""Batching and throughput reporting of the bulk report ingestion jobs"""
+import time
+from typing import Iterable
+from typing import Iterator
+
+from app import logger
+
+
+def iter_unique_batches(rows: Iterable[dict], key_columns: tuple, batch_size: int) -> Iterator[list]:
+    """Group a stream of rows into batches of at most batch_size rows, unique on key_columns.
+
+    An upsert statement may touch a row only once, so a later row of a key replaces the earlier one
+    of the same batch. Only the current batch is held in memory.
+    """
+
+    batch: dict = {}
+
+    for row in rows:
+        batch[tuple(row[column] for column in key_columns)] = row
+
+        if len(batch) >= batch_size:
+            yield list(batch.values())
+            batch = {}
+
+    if batch:
+        yield list(batch.values())
+
+
+def log_ingestion_throughput(job_name: str, account_id: str, row_count: int, started_at: float) -> None:
+    """Log the rows written by an ingestion job and its rate, started_at is a time.perf_counter() reading"""
+
+    elapsed = max(time.perf_counter() - started_at, 1e-6)
+
+    logger.info(f'{job_name} ingested {row_count} rows for account {account_id} in {elapsed:.2f}s ({row_count / elapsed:.0f} rows/s)')
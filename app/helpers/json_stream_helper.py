@@ -0,0 +1,141 @@
+"""Incremental reading of large JSON documents, records are decoded one at a time from a stream of byte chunks"""
+import codecs
+import json
+from typing import Any
+from typing import Iterable
+from typing import Iterator
+from typing import Tuple
+
+_json_decoder = json.JSONDecoder()
+
+_WHITESPACE = ' \t\n\r'
+# characters that may follow a complete value in a valid document
+_VALUE_DELIMITERS = _WHITESPACE + ',:]}'
+
+
+class JsonChunkReader:
+    """Reads JSON values from byte chunks, holding only the undecoded tail of the document in memory"""
+
+    def __init__(self, chunks: Iterable[bytes], encoding: str = 'utf-8'):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def read_more(self) -> bool:
+        """Append the next chunk to the buffer, dropping the consumed part. Returns False at the end of the document"""
+
+        if self.eof:
+            return False
+
+        self.buffer = self.buffer[self.position:]
+        self.position = 0
+
+        for chunk in self.chunks:
+            text = self.decoder.decode(chunk)
+            if text:
+                self.buffer += text
+                return True
+
+        self.buffer += self.decoder.decode(b'', final=True)
+        self.eof = True
+
+        return True
+
+    def peek(self) -> str:
+        """Next non whitespace character, an empty string at the end of the document"""
+
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in _WHITESPACE:
+                self.position += 1
+
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+
+            if not self.read_more():
+                return ''
+
+    def expect(self, token: str) -> None:
+        """Consume the next non whitespace character, which must be token"""
+
+        character = self.peek()
+
+        if character != token:
+            raise ValueError(f'Expected {token!r} in JSON document, found {character or "end of document"!r}')
+
+        self.position += 1
+
+    def read_value(self) -> Any:
+        """Decode the next complete JSON value, reading more chunks until it is complete"""
+
+        self.peek()
+
+        while True:
+            try:
+                value, end = _json_decoder.raw_decode(s=self.buffer, idx=self.position)
+            except json.JSONDecodeError:
+                if not self.read_more():
+                    raise
+                continue
+
+            # a number or literal cut by the end of the buffer may continue in the next chunk
+            if not self.eof and (end == len(self.buffer) or self.buffer[end] not in _VALUE_DELIMITERS):
+                self.read_more()
+                continue
+
+            self.position = end
+
+            return value
+
+    def iter_array(self) -> Iterator[Any]:
+        """Yield the items of the JSON array starting at the current position"""
+
+        self.expect('[')
+
+        if self.peek() == ']':
+            self.position += 1
+            return
+
+        while True:
+            yield self.read_value()
+
+            if self.peek() == ']':
+                self.position += 1
+                return
+
+            self.expect(',')
+
+
+def iter_json_array_items(chunks: Iterable[bytes], encoding: str = 'utf-8') -> Iterator[Any]:
+    """Yield the items of a document holding a top level JSON array"""
+
+    yield from JsonChunkReader(chunks=chunks, encoding=encoding).iter_array()
+
+
+def iter_json_object_members(chunks: Iterable[bytes], array_keys: tuple, encoding: str = 'utf-8') -> Iterator[Tuple[str, Any]]:
+    """Yield (key, value) for the members of a document holding a top level JSON object.
+
+    The arrays under array_keys are not decoded as a whole, a (key, item) pair is yielded for each of their items.
+    """
+
+    reader = JsonChunkReader(chunks=chunks, encoding=encoding)
+    reader.expect('{')
+
+    if reader.peek() == '}':
+        return
+
+    while True:
+        key = reader.read_value()
+        reader.expect(':')
+
+        if key in array_keys and reader.peek() == '[':
+            for item in reader.iter_array():
+                yield key, item
+        else:
+            yield key, reader.read_value()
+
+        if reader.peek() == '}':
+            return
+
+        reader.expect(',')
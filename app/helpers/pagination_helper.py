@@ -0,0 +1,151 @@
+"""Keyset pagination of the large listings, pages are fetched after an opaque cursor instead of an offset
+
+A listing is in cursor mode when the request carries a cursor param, an empty cursor asks for the
+first page. The cursor holds the sort of the listing and the sort key values of the last row sent,
+the next page is read with a range condition on those values so deep pages cost the same as the
+first one. A cursor is only accepted by a request sorted the same way.
+"""
+import base64
+import json
+from typing import Any
+from typing import Optional
+
+from app.helpers.constants import SortingOrder
+from flask import request
+from sqlalchemy import and_
+from sqlalchemy import or_
+
+
+def get_cursor_sort(key_columns: tuple, sort_order: Any) -> str:
+    """Sort a cursor belongs to, the key columns of the listing and their direction"""
+
+    direction = 'asc' if sort_order == SortingOrder.ASC.value else 'desc'
+
+    return f'{",".join(key_columns)} {direction}'
+
+
+def encode_cursor(values: list, key_columns: tuple, sort_order: Any) -> str:
+    """Opaque token of the sort and the sort key values of the last row on a page"""
+
+    payload = json.dumps({'sort': get_cursor_sort(key_columns=key_columns, sort_order=sort_order), 'values': values},
+                         default=str, separators=(',', ':'))
+
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str], key_columns: tuple, sort_order: Any) -> Optional[list]:
+    """Sort key values of a cursor token, an empty list for the first page and None for a token that does not fit the listing.
+
+    A token is only accepted for the same sort, with one scalar value per key column of which only the sort value may be null.
+    """
+
+    if not cursor:
+        return []
+
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+
+    if not isinstance(payload, dict) or payload.get('sort') != get_cursor_sort(key_columns=key_columns, sort_order=sort_order):
+        return None
+
+    values = payload.get('values')
+
+    if not isinstance(values, list) or len(values) != len(key_columns) or values[-1] is None:
+        return None
+
+    if not all(value is None or (isinstance(value, (str, int, float)) and not isinstance(value, bool)) for value in values):
+        return None
+
+    return values
+
+
+def get_request_cursor(key_columns: tuple, sort_order: Any) -> dict:
+    """Cursor args of the request for a listing ordered on key_columns in sort_order. cursor is None in page mode,
+    with_total asks for an exact count in cursor mode"""
+
+    if 'cursor' not in request.args:
+        return {'is_error': False, 'cursor': None, 'with_total': True}
+
+    cursor = decode_cursor(cursor=request.args.get('cursor'), key_columns=key_columns, sort_order=sort_order)
+
+    return {
+        'is_error': cursor is None,
+        'cursor': cursor,
+        'with_total': request.args.get(key='with_total', default='false').lower() == 'true'
+    }
+
+
+def get_cursor_page(rows: list, size: int, key_columns: tuple, sort_order: Any):
+    """Split the size + 1 rows read in cursor mode into the page and the cursor of the next page"""
+
+    if len(rows) <= size:
+        return rows, None
+
+    rows = rows[:size]
+    last_row = rows[-1]
+
+    return rows, encode_cursor(values=[getattr(last_row, key_column) for key_column in key_columns], key_columns=key_columns, sort_order=sort_order)
+
+
+def get_keyset_query(raw_query: str, sort_column: Optional[str], tie_column: str, sort_order: Any, cursor: list, size: int):
+    """Wrap a raw listing query into a page of size + 1 rows after the cursor.
+
+    Rows are ordered on the sort column with NULLs last, then on the unique tie column, both
+    in the requested direction. Returns the query and the cursor bind params.
+    """
+    direction = 'ASC' if sort_order == SortingOrder.ASC.value else 'DESC'
+    operator = '>' if direction == 'ASC' else '<'
+    params: dict = {}
+    condition = ''
+
+    if cursor:
+        params['cursor_tie_value'] = cursor[-1]
+        condition = f'{tie_column} {operator} :cursor_tie_value'
+
+        if sort_column:
+            if cursor[0] is None:
+                condition = f'{sort_column} IS NULL AND {condition}'
+            else:
+                params['cursor_sort_value'] = cursor[0]
+                condition = f'''{sort_column} {operator} :cursor_sort_value OR ({sort_column} = :cursor_sort_value AND {condition})
+                                OR {sort_column} IS NULL'''
+
+        condition = f'WHERE {condition}'
+
+    order_by = f'{sort_column} {direction} NULLS LAST, {tie_column} {direction}' if sort_column else f'{tie_column} {direction}'
+
+    keyset_query = f'''
+                    SELECT * FROM ({raw_query}) AS keyset_page
+                    {condition}
+                    ORDER BY {order_by}
+                    LIMIT {int(size) + 1}
+                    '''
+
+    return keyset_query, params
+
+
+def get_keyset_filter(sort_column: Any, tie_column: Any, descending: bool, cursor: list):
+    """ORM condition selecting the rows after the cursor, for listings ordered on a non null column then a unique one"""
+
+    if not cursor:
+        return True
+
+    sort_value, tie_value = cursor
+
+    if descending:
+        return or_(sort_column < sort_value, and_(sort_column == sort_value, tie_column < tie_value))     # type: ignore  # noqa: FKA100
+
+    return or_(sort_column > sort_value, and_(sort_column == sort_value, tie_column > tie_value))     # type: ignore  # noqa: FKA100
+
+
+def get_cursor_pagination_meta(page_size: int, next_cursor: Optional[str], total_items: Optional[int] = None) -> dict:
+    """Pagination metadata of a cursor mode page, total_items is only counted on request"""
+
+    return {
+        'page_size': page_size,
+        'total_items': total_items,
+        'has_next_page': next_cursor is not None,
+        'next_cursor': next_cursor
+    }
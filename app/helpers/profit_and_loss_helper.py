@@ -0,0 +1,313 @@
+"""Single pass profit and loss: both periods, fees, reimbursements, ads spend and graph in one query"""
+from typing import Optional
+
+from app import db
+from app.helpers.utility import calculate_percentage_growth
+from app.helpers.utility import convert_to_numeric
+from app.helpers.utility import get_prior_to_from_date
+from sqlalchemy import text
+
+# service fee types reported as other fee, in response order
+OTHER_FEE_TYPES = ('FBARemovalFee', 'FBAInboundTransportationFee', 'MFNPostageFee',
+                   'Storage Fee', 'StorageRenewalBilling', 'Order Cancellation Charge')
+
+REIMBURSEMENT_FINANCE_TYPES = ('REVERSAL_REIMBURSEMENT', 'CS_ERROR_ITEMS', 'WAREHOUSE_DAMAGE', 'FREE_REPLACEMENT_REFUND_ITEMS',
+                               'INCORRECT_FEES_NON_ITEMIZED', 'INCORRECT_FEES_ITEMS', 'PAYMENT_RETRACTION_ITEMS')
+
+# breakdown keys summed per period from the json breakdowns of the daily rollup, kept for keys seen in the current period
+BREAKDOWN_QUERY = '''
+    SELECT b.key,
+        COALESCE(SUM(CAST(CAST(b.value AS TEXT) AS NUMERIC)) FILTER (WHERE p.is_current), 0) AS current_value,
+        COALESCE(SUM(CAST(CAST(b.value AS TEXT) AS NUMERIC)) FILTER (WHERE p.is_prior), 0) AS prior_value
+    FROM performance AS p
+    CROSS JOIN LATERAL jsonb_each(p.{column}) AS b
+    WHERE p.is_sale
+    GROUP BY b.key
+    HAVING COUNT(*) FILTER (WHERE p.is_current) > 0
+'''
+
+# financial events of both periods, the posted date is only stored as a string and event_json holds the event wrapped in a list
+FINANCIAL_EVENT_QUERY = '''
+    SELECT fe.*, TO_DATE(SUBSTRING(fe.posted_date, 1, 10), 'YYYY-MM-DD') BETWEEN :from_date AND :to_date AS is_current
+    FROM az_financial_event AS fe
+    LEFT JOIN az_item_master AS i
+    ON fe.seller_sku = i.seller_sku AND i.account_id = :account_id AND i.selling_partner_id = :asp_id
+    WHERE fe.account_id = :account_id AND fe.asp_id = :asp_id AND
+    TO_DATE(SUBSTRING(fe.posted_date, 1, 10), 'YYYY-MM-DD') BETWEEN :prior_from_date AND :to_date AND
+    fe.az_order_id IS NULL AND fe.seller_sku IS NOT NULL AND fe.finance_type IS NOT NULL AND
+    fe.event_type = '{event_type}'
+    {condition}
+'''
+
+PROFIT_AND_LOSS_QUERY = '''
+    WITH performance AS (
+        SELECT f.day, f.gross_sales, -f.market_place_fee AS market_place_fee, -f.refunds AS refund, f.units_sold,
+            COALESCE((f.units_sold - f.units_returned) * i.cogs, 0) AS total_cogs,
+            f.sponsored_product_spend, f.sponsored_display_spend, f.market_place_fee_breakdown, f.gross_sales_breakdown,
+            f.day BETWEEN :from_date AND :to_date AS is_current,
+            f.day BETWEEN :prior_from_date AND :prior_to_date AS is_prior,
+            (f.order_count > 0 OR f.units_returned > 0 OR f.gross_sales != 0) AS is_sale
+        FROM az_product_performance_daily AS f
+        LEFT JOIN az_item_master AS i
+        ON f.seller_sku = i.seller_sku AND i.account_id = :account_id AND i.selling_partner_id = :asp_id
+        WHERE f.account_id = :account_id AND f.asp_id = :asp_id AND f.day BETWEEN :prior_from_date AND :to_date
+        {condition}
+    ),
+    totals AS (
+        SELECT COUNT(*) FILTER (WHERE is_current AND is_sale) AS current_rows,
+            COALESCE(SUM(gross_sales) FILTER (WHERE is_current AND is_sale), 0) AS current_gross_sales,
+            COALESCE(SUM(gross_sales) FILTER (WHERE is_prior AND is_sale), 0) AS prior_gross_sales,
+            COALESCE(SUM(refund) FILTER (WHERE is_current AND is_sale), 0) AS current_refund,
+            COALESCE(SUM(refund) FILTER (WHERE is_prior AND is_sale), 0) AS prior_refund,
+            COALESCE(SUM(market_place_fee) FILTER (WHERE is_current AND is_sale), 0) AS current_market_place_fee,
+            COALESCE(SUM(market_place_fee) FILTER (WHERE is_prior AND is_sale), 0) AS prior_market_place_fee,
+            COALESCE(SUM(total_cogs) FILTER (WHERE is_current AND is_sale), 0) AS current_total_cogs,
+            COALESCE(SUM(total_cogs) FILTER (WHERE is_prior AND is_sale), 0) AS prior_total_cogs,
+            COALESCE(SUM(sponsored_display_spend) FILTER (WHERE is_current), 0) AS current_sponsored_display_cost,
+            COALESCE(SUM(sponsored_display_spend) FILTER (WHERE is_prior), 0) AS prior_sponsored_display_cost,
+            COALESCE(SUM(sponsored_product_spend) FILTER (WHERE is_current), 0) AS current_sponsored_product_cost,
+            COALESCE(SUM(sponsored_product_spend) FILTER (WHERE is_prior), 0) AS prior_sponsored_product_cost
+        FROM performance
+    ),
+    graph AS (
+        SELECT day, SUM(gross_sales) AS gross_sales, SUM(market_place_fee) AS market_place_fee, SUM(refund) AS refund,
+            SUM(units_sold) AS units_sold, SUM(total_cogs) AS total_cogs
+        FROM performance
+        WHERE is_current AND is_sale
+        GROUP BY day
+    ),
+    market_place_fee_breakdown AS ({market_place_fee_breakdown_query}),
+    gross_sales_breakdown AS ({gross_sales_breakdown_query}),
+    reimbursements AS (
+        SELECT fe.finance_type, COUNT(*) FILTER (WHERE fe.is_current) AS current_rows,
+            COALESCE(SUM(CAST(fe.finance_value AS NUMERIC)) FILTER (WHERE fe.is_current), 0) AS current_value,
+            COALESCE(SUM(CAST(fe.finance_value AS NUMERIC)) FILTER (WHERE NOT fe.is_current), 0) AS prior_value
+        FROM ({reimbursement_query}) AS fe
+        WHERE fe.finance_type IN :reimbursement_finance_types
+        GROUP BY fe.finance_type
+    ),
+    other_fees AS (
+        SELECT fee ->> 'FeeType' AS fee_type,
+            COALESCE(SUM(ABS(CAST(fee -> 'FeeAmount' ->> 'CurrencyAmount' AS NUMERIC))) FILTER (WHERE fe.is_current), 0) AS current_value,
+            COALESCE(SUM(ABS(CAST(fee -> 'FeeAmount' ->> 'CurrencyAmount' AS NUMERIC))) FILTER (WHERE NOT fe.is_current), 0) AS prior_value
+        FROM ({other_fee_query}) AS fe
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(CAST(fe.event_json AS JSONB)) = 'array' THEN CAST(fe.event_json AS JSONB) END) AS event
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(event -> 'FeeList') = 'array' THEN event -> 'FeeList' END) AS fee
+        WHERE fee ->> 'FeeType' IN :other_fee_types
+        GROUP BY fee ->> 'FeeType'
+    ),
+    sponsored_brand AS ({sponsored_brand_query})
+    SELECT t.*, sb.current_cost AS current_sponsored_brand_cost, sb.prior_cost AS prior_sponsored_brand_cost,
+        (SELECT jsonb_object_agg(key, jsonb_build_array(current_value, prior_value)) FROM market_place_fee_breakdown) AS market_place_fee_breakdown,
+        (SELECT jsonb_object_agg(key, jsonb_build_array(current_value, prior_value)) FROM gross_sales_breakdown) AS gross_sales_breakdown,
+        (SELECT jsonb_object_agg(fee_type, jsonb_build_array(current_value, prior_value)) FROM other_fees) AS other_fees,
+        (SELECT jsonb_object_agg(finance_type, current_value) FILTER (WHERE current_rows > 0) FROM reimbursements) AS reimbursement_breakdown,
+        (SELECT jsonb_object_agg(finance_type, prior_value) FROM reimbursements) AS prior_reimbursement_breakdown,
+        (SELECT jsonb_agg(jsonb_build_object('date', day, 'gross_sales', gross_sales, 'market_place_fee', market_place_fee, 'refund', refund,
+            'units_sold', units_sold, 'total_cogs', total_cogs) ORDER BY day) FROM graph) AS graph
+    FROM totals AS t
+    CROSS JOIN sponsored_brand AS sb
+'''
+
+SPONSORED_BRAND_QUERY = '''
+    SELECT COALESCE(SUM(cost * clicks) FILTER (WHERE payload_date BETWEEN :from_date AND :to_date), 0) AS current_cost,
+        COALESCE(SUM(cost * clicks) FILTER (WHERE payload_date BETWEEN :prior_from_date AND :prior_to_date), 0) AS prior_cost
+    FROM az_sponsored_brand
+    WHERE account_id = :account_id AND asp_id = :asp_id AND payload_date BETWEEN :prior_from_date AND :to_date
+    {condition}
+'''
+
+
+def get_profit_and_loss_metrics(account_id: str, selling_partner_id: str, from_date: str, to_date: str, product: Optional[tuple], brand: Optional[tuple],
+                                category: Optional[tuple]):
+    """Run the profit and loss query for the given period and the prior period of the same length"""
+
+    prior_from_date, prior_to_date = get_prior_to_from_date(
+        from_date=from_date, to_date=to_date)
+
+    condition_a = ''
+
+    if category:
+        condition_a += ' AND i.category IN :category'
+
+    if brand:
+        condition_a += ' AND i.brand IN :brand'
+
+    if product:
+        condition_a += ' AND i.asin IN :product'
+
+    # sponsored brand campaigns are not tied to a sku, they are matched on the campaign name and skipped for category or product filters
+    if category or product:
+        sponsored_brand_query = 'SELECT 0 AS current_cost, 0 AS prior_cost'
+    else:
+        sponsored_brand_query = SPONSORED_BRAND_QUERY.format(
+            condition='AND campaign_name ILIKE ANY(:brand_patterns)' if brand else '')
+
+    raw_query = PROFIT_AND_LOSS_QUERY.format(
+        condition=condition_a,
+        market_place_fee_breakdown_query=BREAKDOWN_QUERY.format(column='market_place_fee_breakdown'),
+        gross_sales_breakdown_query=BREAKDOWN_QUERY.format(column='gross_sales_breakdown'),
+        reimbursement_query=FINANCIAL_EVENT_QUERY.format(event_type='AdjustmentEventList', condition=condition_a),
+        other_fee_query=FINANCIAL_EVENT_QUERY.format(event_type='ServiceFeeEventList', condition=condition_a),
+        sponsored_brand_query=sponsored_brand_query)
+
+    return db.session.execute(text(raw_query), {                 # type: ignore  # noqa: FKA100
+        'from_date': from_date,
+        'to_date': to_date,
+        'prior_from_date': prior_from_date,
+        'prior_to_date': prior_to_date,
+        'account_id': account_id,
+        'asp_id': selling_partner_id,
+        'category': category,
+        'brand': brand,
+        'product': product,
+        'brand_patterns': [f'%{brand_data}%' for brand_data in brand or ()],
+        'other_fee_types': OTHER_FEE_TYPES,
+        'reimbursement_finance_types': REIMBURSEMENT_FINANCE_TYPES
+    }).fetchone()
+
+
+def get_breakdown_comp(breakdown: Optional[dict]) -> dict:
+    """Current value and growth of every breakdown key"""
+
+    breakdown_comp = {}
+
+    for key, (current_value, prior_value) in (breakdown or {}).items():
+        breakdown_comp[key] = {
+            f'current_{key}': current_value,
+            f'{key}_growth_percentage': calculate_percentage_growth(current_value=abs(current_value), prior_value=abs(prior_value))
+        }
+
+    return breakdown_comp
+
+
+def calculate_profit_and_loss(account_id: str, selling_partner_id: str, from_date: str, to_date: str, product: Optional[tuple], brand: Optional[tuple],     # type: ignore  # noqa: C901
+                              category: Optional[tuple]):
+    """Returns the profit and loss section and its graph, or None when the period has no sales"""
+
+    metrics = get_profit_and_loss_metrics(account_id=account_id, selling_partner_id=selling_partner_id, from_date=from_date, to_date=to_date,
+                                          product=product, brand=brand, category=category)
+
+    if not metrics or not metrics.current_rows:
+        return None
+
+    current_gross_sales = convert_to_numeric(metrics.current_gross_sales)
+    prior_gross_sales = convert_to_numeric(metrics.prior_gross_sales)
+
+    current_refund = convert_to_numeric(metrics.current_refund)
+    prior_refund = convert_to_numeric(metrics.prior_refund)
+
+    current_net_sales = convert_to_numeric(metrics.current_gross_sales - metrics.current_refund)
+    prior_net_sales = convert_to_numeric(metrics.prior_gross_sales - metrics.prior_refund)
+
+    current_total_cogs = convert_to_numeric(metrics.current_total_cogs)
+    prior_total_cogs = convert_to_numeric(metrics.prior_total_cogs)
+
+    current_market_place_fee = convert_to_numeric(metrics.current_market_place_fee)
+    prior_market_place_fee = convert_to_numeric(metrics.prior_market_place_fee)
+
+    other_fees = metrics.other_fees or {}
+    current_other_fee_breakdown = {fee_type: other_fees.get(fee_type, (0, 0))[0] for fee_type in OTHER_FEE_TYPES}     # type: ignore  # noqa: FKA100
+    current_other_fee = sum(current_other_fee_breakdown.values())
+    prior_other_fee = sum(other_fees.get(fee_type, (0, 0))[1] for fee_type in OTHER_FEE_TYPES)     # type: ignore  # noqa: FKA100
+
+    current_reimbursement_breakdown = {finance_type: convert_to_numeric(value)
+                                       for finance_type, value in (metrics.reimbursement_breakdown or {}).items()}
+    current_reimbursement_value = sum(current_reimbursement_breakdown.values())
+    prior_reimbursement_value = sum(convert_to_numeric(value) for value in (metrics.prior_reimbursement_breakdown or {}).values())
+
+    current_sponsored_brand_cost = metrics.current_sponsored_brand_cost
+    prior_sponsored_brand_cost = metrics.prior_sponsored_brand_cost
+    current_sponsored_display_cost = metrics.current_sponsored_display_cost
+    prior_sponsored_display_cost = metrics.prior_sponsored_display_cost
+    current_sponsored_product_cost = metrics.current_sponsored_product_cost
+    prior_sponsored_product_cost = metrics.prior_sponsored_product_cost
+
+    current_total_ads_spend = current_sponsored_brand_cost + current_sponsored_display_cost + current_sponsored_product_cost
+    prior_total_ads_spend = prior_sponsored_brand_cost + prior_sponsored_display_cost + prior_sponsored_product_cost
+
+    total_ads_spend_percentage_growth = calculate_percentage_growth(
+        current_value=current_total_ads_spend, prior_value=prior_total_ads_spend)
+
+    # Net Profit = Net Sales - Marketplace Fee - Other fee - Cogs - Ad Spends + Reimbursements
+    current_net_profit = current_net_sales - abs(current_market_place_fee) - abs(convert_to_numeric(current_other_fee)) - abs(current_total_cogs) - \
+        abs(convert_to_numeric(current_total_ads_spend)) + convert_to_numeric(current_reimbursement_value)
+    prior_net_profit = prior_net_sales - abs(prior_market_place_fee) - abs(convert_to_numeric(prior_other_fee)) - abs(prior_total_cogs) - \
+        abs(convert_to_numeric(prior_total_ads_spend)) + convert_to_numeric(prior_reimbursement_value)
+
+    profit_and_loss = {
+        'gross_sales': {
+            'current_gross_sales': current_gross_sales,
+            'gross_sales_percentage_growth': calculate_percentage_growth(current_value=current_gross_sales, prior_value=prior_gross_sales)
+        },
+        'gross_sales_breakdown': get_breakdown_comp(metrics.gross_sales_breakdown),
+        'other_fee': {
+            'current_other_fee': -abs(current_other_fee),
+            'other_fee_percentage_growth': calculate_percentage_growth(current_value=current_other_fee, prior_value=prior_other_fee)
+        },
+        'other_fee_breakdown': current_other_fee_breakdown,
+        'refund': {
+            'current_refund': -abs(current_refund),
+            'refund_percentage_growth': calculate_percentage_growth(current_value=current_refund, prior_value=prior_refund)
+        },
+        'net_sales': {
+            'current_net_sales': current_net_sales,
+            'net_sales_percentage_growth': calculate_percentage_growth(current_value=current_net_sales, prior_value=prior_net_sales)
+        },
+        'marketplace_fee_breakdown': get_breakdown_comp(metrics.market_place_fee_breakdown),
+        'total_cogs': {
+            'current_total_cogs': -abs(current_total_cogs),
+            'total_cogs_percentage_growth': calculate_percentage_growth(current_value=current_total_cogs, prior_value=prior_total_cogs)
+        },
+        'net_profit': {
+            'current_net_profit': current_net_profit,
+            'net_profit_percentage_growth': calculate_percentage_growth(current_value=current_net_profit, prior_value=prior_net_profit)
+        },
+        'market_place_fee': {
+            'current_market_place_fee': -abs(current_market_place_fee),
+            'market_place_fee_percentage_growth': calculate_percentage_growth(current_value=current_market_place_fee, prior_value=prior_market_place_fee)
+        },
+        'reimbursement': {
+            'current_reimbursement': current_reimbursement_value,
+            'reimbursement_percentage_growth': calculate_percentage_growth(current_value=current_reimbursement_value, prior_value=prior_reimbursement_value)
+        },
+        'reimbursement_breakdown': current_reimbursement_breakdown,
+        'ads_spend': {
+            'total_ads_spend': -abs(convert_to_numeric(current_total_ads_spend)),
+            'total_ads_spend_percentage_growth': convert_to_numeric(total_ads_spend_percentage_growth)
+        },
+        'ads_spend_breakdown': {
+            'sponsored_brand': {
+                'current_sponsored_brand_cost': convert_to_numeric(current_sponsored_brand_cost),
+                'sponsored_brand_percentage_growth': convert_to_numeric(calculate_percentage_growth(
+                    current_value=current_sponsored_brand_cost, prior_value=prior_sponsored_brand_cost))
+            },
+            'sponsored_display': {
+                'current_sponsored_display_cost': convert_to_numeric(current_sponsored_display_cost),
+                'sponsored_display_percentage_growth': convert_to_numeric(calculate_percentage_growth(
+                    current_value=current_sponsored_display_cost, prior_value=prior_sponsored_display_cost))
+            },
+            'sponsored_product': {
+                'sponsored_product_percentage_growth': convert_to_numeric(calculate_percentage_growth(
+                    current_value=current_sponsored_product_cost, prior_value=prior_sponsored_product_cost)),
+                'current_sponsored_product_cost': convert_to_numeric(current_sponsored_product_cost)
+            }
+        }
+    }
+
+    graph_metrics_list = []
+
+    for graph_metrics in metrics.graph or []:
+        expense = float(graph_metrics['market_place_fee']) + float(graph_metrics['total_cogs'])
+        net_profit = float(graph_metrics['gross_sales']) - float(graph_metrics['refund']) - float(expense)
+
+        graph_metrics_list.append({'gross_sales': convert_to_numeric(graph_metrics['gross_sales']),
+                                   'units_sold': convert_to_numeric(graph_metrics['units_sold']),
+                                   'date': graph_metrics['date'],
+                                   'expense': -abs(expense),
+                                   'net_profit': net_profit
+                                   })
+
+    return profit_and_loss, graph_metrics_list
@@ -0,0 +1,224 @@
+"""Before and after query plans of the hot dashboard queries on a generated dataset"""
+from datetime import date
+from datetime import timedelta
+import json
+from typing import Optional
+
+from app import db
+from sqlalchemy import text
+
+BENCHMARK_SCHEMA = 'query_plan_benchmark'
+BENCHMARK_ACCOUNTS = 20
+BENCHMARK_DAYS = 365
+BENCHMARK_START = date(year=2023, month=1, day=1)
+
+# indexes added for these queries, copied from the migrated public schema into the benchmark schema
+BENCHMARK_INDEXES = (
+    'ix_az_product_performance_account_id_asp_id_shipment_on',
+    'ix_az_product_performance_account_id_asp_id_refund_on',
+    'ix_az_product_performance_account_id_asp_id_az_order_id',
+    'ix_az_order_report_account_id_selling_partner_id_purchase_on',
+    'ix_az_sales_traffic_asin_account_id_asp_id_payload_date',
+    'ix_az_ledger_summary_account_id_asp_id_disposition_date',
+    'ix_az_financial_event_account_id_asp_id_adjustment',
+    'ix_az_sponsored_product_account_id_asp_id_payload_date',
+    'ix_az_item_master_account_id_selling_partner_id_asin',
+)
+
+# rows are spread over BENCHMARK_ACCOUNTS accounts and BENCHMARK_DAYS days, g is the generate_series value
+DATASET = {
+    'az_product_performance': '''
+        INSERT INTO az_product_performance (id, account_id, asp_id, az_order_id, seller_sku, gross_sales, units_sold, units_returned,
+            market_place_fee, returns, shipment_date, shipment_on, refund_date, refund_on, created_at)
+        SELECT g, 'account-' || g % :accounts, 'asp-' || g % :accounts, 'order-' || g / 2, 'SKU-' || g % 500,
+            (g % 1000) + 99, 1 + g % 3, CASE WHEN g % 10 = 0 THEN 1 ELSE 0 END, (g % 100) + 10,
+            CASE WHEN g % 10 = 0 THEN (g % 1000) + 99 END,
+            TO_CHAR(:start + g % :days, 'YYYY-MM-DD'), :start + g % :days,
+            CASE WHEN g % 10 = 0 THEN TO_CHAR(:start + (g + 7) % :days, 'YYYY-MM-DD') END,
+            CASE WHEN g % 10 = 0 THEN :start + (g + 7) % :days END, 0
+        FROM generate_series(1, :rows) AS g
+    ''',
+    'az_order_report': '''
+        INSERT INTO az_order_report (id, account_id, asp_id, selling_partner_id, amazon_order_id, purchase_date, purchase_on, purchase_at,
+            order_status, sku, asin, quantity, item_price, created_at)
+        SELECT g, 'account-' || g % :accounts, 'asp-' || g % :accounts, 'asp-' || g % :accounts, 'order-' || g,
+            TO_CHAR(:start + g % :days, 'YYYY-MM-DD'), :start + g % :days, (:start + g % :days) + (g % 86400) * INTERVAL '1 second',
+            'Shipped', 'SKU-' || g % 500, 'ASIN-' || g % 500, 1 + g % 3, CASE WHEN g % 20 = 0 THEN NULL ELSE (g % 1000) + 99 END, 0
+        FROM generate_series(1, :rows) AS g
+    ''',
+    'az_sales_traffic_asin': '''
+        INSERT INTO az_sales_traffic_asin (id, account_id, asp_id, child_asin, payload_date, units_ordered, page_views, created_at)
+        SELECT g, 'account-' || g % :accounts, 'asp-' || g % :accounts, 'ASIN-' || g % 500, :start + g % :days, g % 7, g % 50, 0
+        FROM generate_series(1, :rows) AS g
+    ''',
+    'az_ledger_summary': '''
+        INSERT INTO az_ledger_summary (id, account_id, asp_id, date, fnsku, asin, msku, disposition, starting_warehouse_balance,
+            in_transit_btw_warehouse, receipts, customer_shipments, customer_returns, vendor_returns, warehouse_transfer, found, lost,
+            damaged, disposed, other_events, ending_warehouse_balance, unknown_events, location)
+        SELECT g, 'account-' || g % :accounts, 'asp-' || g % :accounts, :start + g % :days, 'FNSKU-' || g % 500, 'ASIN-' || g % 500,
+            'SKU-' || g % 500, CASE WHEN g % 4 = 0 THEN 'DEFECTIVE' ELSE 'SELLABLE' END, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, g % 40, 0,
+            'IN'
+        FROM generate_series(1, :rows) AS g
+    ''',
+    'az_financial_event': '''
+        INSERT INTO az_financial_event (id, account_id, asp_id, az_order_id, seller_sku, posted_date, event_type, finance_type,
+            finance_value, created_at)
+        SELECT g, 'account-' || g % :accounts, 'asp-' || g % :accounts, CASE WHEN g % 8 = 0 THEN NULL ELSE 'order-' || g / 2 END,
+            'SKU-' || g % 500, TO_CHAR(:start + g % :days, 'YYYY-MM-DD'),
+            CASE WHEN g % 8 = 0 THEN 'AdjustmentEventList' ELSE 'ShipmentEventList' END,
+            CASE WHEN g % 16 = 0 THEN 'REVERSAL_REIMBURSEMENT' ELSE 'WAREHOUSE_DAMAGE' END, (g % 500)::text, 0
+        FROM generate_series(1, :rows) AS g
+    ''',
+    'az_sponsored_product': '''
+        INSERT INTO az_sponsored_product (id, account_id, asp_id, payload_date, advertised_sku, advertised_asin, spend, sales_7d,
+            impressions, clicks, created_at)
+        SELECT g, 'account-' || g % :accounts, 'asp-' || g % :accounts, :start + g % :days, 'SKU-' || g % 500, 'ASIN-' || g % 500,
+            g % 30, g % 200, g % 1000, g % 40, 0
+        FROM generate_series(1, :rows) AS g
+    ''',
+    'az_item_master': '''
+        INSERT INTO az_item_master (id, account_id, asp_id, selling_partner_id, seller_sku, asin, brand, category, created_at)
+        SELECT g, 'account-' || g % :accounts, 'asp-' || g % :accounts, 'asp-' || g % :accounts, 'SKU-' || g % 500,
+            'ASIN-' || g % 500, 'Brand ' || g % 10, 'Category ' || g % 12, 0
+        FROM generate_series(1, LEAST(:rows, :accounts * 500)) AS g
+    ''',
+}
+
+# the filters of DashboardView, ProductPerformanceView.get_performance and the item level inventory query
+QUERIES = {
+    'dashboard_sales': '''
+        SELECT SUM(gross_sales), SUM(units_sold), COUNT(DISTINCT az_order_id)
+        FROM az_product_performance
+        WHERE account_id = :account_id AND asp_id = :asp_id AND units_sold != 0 AND shipment_on BETWEEN :from_date AND :to_date
+    ''',
+    'dashboard_refunds': '''
+        SELECT SUM(returns), SUM(units_returned)
+        FROM az_product_performance
+        WHERE account_id = :account_id AND asp_id = :asp_id AND refund_on BETWEEN :from_date AND :to_date
+    ''',
+    'get_performance': '''
+        SELECT pp.seller_sku, SUM(pp.gross_sales) AS gross_sales, SUM(pp.units_sold) AS units_sold,
+            SUM(pp.market_place_fee) AS market_place_fee, MAX(im.brand) AS brand, MAX(im.category) AS category
+        FROM az_product_performance AS pp
+        LEFT JOIN az_item_master AS im
+            ON im.account_id = pp.account_id AND im.selling_partner_id = pp.asp_id AND im.seller_sku = pp.seller_sku
+        WHERE pp.account_id = :account_id AND pp.asp_id = :asp_id AND pp.shipment_on BETWEEN :from_date AND :to_date
+        GROUP BY pp.seller_sku
+        ORDER BY gross_sales DESC
+        LIMIT 10
+    ''',
+    'purchased_date_orders': '''
+        SELECT amazon_order_id, sku, asin, quantity, item_price
+        FROM az_order_report
+        WHERE account_id = :account_id AND selling_partner_id = :asp_id AND purchase_on BETWEEN :from_date AND :to_date
+        AND item_price IS NOT NULL
+        ORDER BY purchase_at DESC
+        LIMIT 10
+    ''',
+    'sales_traffic_by_day': '''
+        SELECT payload_date, SUM(units_ordered), SUM(page_views)
+        FROM az_sales_traffic_asin
+        WHERE account_id = :account_id AND asp_id = :asp_id AND payload_date BETWEEN :from_date AND :to_date
+        GROUP BY payload_date
+    ''',
+    'get_item_level': '''
+        SELECT ls.asin, ls.msku, SUM(ls.ending_warehouse_balance) AS sellable, MAX(im.brand) AS brand
+        FROM az_ledger_summary AS ls
+        LEFT JOIN az_item_master AS im
+            ON im.account_id = ls.account_id AND im.selling_partner_id = ls.asp_id AND im.asin = ls.asin
+        WHERE ls.account_id = :account_id AND ls.asp_id = :asp_id AND ls.disposition = 'SELLABLE'
+        AND ls.date BETWEEN :from_date AND :to_date
+        GROUP BY ls.asin, ls.msku
+    ''',
+    'pnl_reimbursements': '''
+        SELECT finance_type, SUM(CAST(finance_value AS NUMERIC))
+        FROM az_financial_event
+        WHERE account_id = :account_id AND asp_id = :asp_id AND event_type = 'AdjustmentEventList' AND az_order_id IS NULL
+        GROUP BY finance_type
+    ''',
+    'marketing_spend': '''
+        SELECT SUM(spend), SUM(sales_7d), SUM(clicks)
+        FROM az_sponsored_product
+        WHERE account_id = :account_id AND asp_id = :asp_id AND payload_date BETWEEN :from_date AND :to_date
+    ''',
+}
+
+
+def _explain(connection, query: str, params: dict) -> dict:
+    """EXPLAIN ANALYZE a query and return its plan tree and execution time"""
+    result = connection.execute(text(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}'), params).scalar()      # type: ignore  # noqa: FKA100
+    plan = (json.loads(result) if isinstance(result, str) else result)[0]
+    return {'execution_time': plan['Execution Time'], 'plan': plan['Plan']}
+
+
+def _plan_nodes(plan: dict, depth: int = 0) -> list:
+    """Flatten a plan tree into indented node descriptions"""
+    node = plan['Node Type']
+    if plan.get('Index Name'):
+        node = f"{node} using {plan['Index Name']}"
+    if plan.get('Relation Name'):
+        node = f"{node} on {plan['Relation Name']}"
+
+    lines = [f"{'  ' * depth}{node} (rows={plan.get('Actual Rows')}, shared hit={plan.get('Shared Hit Blocks')} read={plan.get('Shared Read Blocks')})"]
+    for child in plan.get('Plans') or []:
+        lines.extend(_plan_nodes(plan=child, depth=depth + 1))
+    return lines
+
+
+def _run_queries(connection, params: dict) -> dict:
+    """Run every benchmark query once to warm the cache, then EXPLAIN ANALYZE it"""
+    plans = {}
+    for name, query in QUERIES.items():
+        connection.execute(text(query), params)     # type: ignore  # noqa: FKA100
+        plans[name] = _explain(connection=connection, query=query, params=params)
+    return plans
+
+
+def run_query_plan_benchmark(rows: int = 200000, account_id: Optional[str] = None, days: int = 30) -> list:
+    """Generate a dataset in a scratch schema and compare the query plans without and with the dashboard indexes.
+
+    The tables are created LIKE the public ones, so the migrations have to be applied first. The schema is dropped afterwards.
+    """
+    account_id = account_id or 'account-7'
+    to_date = BENCHMARK_START + timedelta(days=BENCHMARK_DAYS - 1)
+    params = {'account_id': account_id, 'asp_id': account_id.replace('account-', 'asp-'),  # type: ignore  # noqa: FKA100
+              'from_date': to_date - timedelta(days=days - 1), 'to_date': to_date}
+
+    connection = db.engine.connect()
+    try:
+        index_definitions = connection.execute(text('SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = :schema AND indexname = ANY(:names)'),      # type: ignore  # noqa: FKA100
+                                               {'schema': 'public', 'names': list(BENCHMARK_INDEXES)}).all()
+        missing = set(BENCHMARK_INDEXES) - {index.indexname for index in index_definitions}
+        if missing:
+            raise RuntimeError(f'indexes missing from the public schema, apply the migrations first: {", ".join(sorted(missing))}')
+
+        connection.execute(text(f'DROP SCHEMA IF EXISTS {BENCHMARK_SCHEMA} CASCADE'))
+        connection.execute(text(f'CREATE SCHEMA {BENCHMARK_SCHEMA}'))
+        connection.execute(text(f'SET search_path TO {BENCHMARK_SCHEMA}'))
+
+        for table, insert in DATASET.items():
+            # no INCLUDING DEFAULTS, the id defaults would draw from the public sequences
+            connection.execute(text(f'CREATE TABLE {table} (LIKE public.{table} INCLUDING CONSTRAINTS)'))
+            connection.execute(text(insert), {'rows': rows, 'accounts': BENCHMARK_ACCOUNTS,      # type: ignore  # noqa: FKA100
+                                              'days': BENCHMARK_DAYS, 'start': BENCHMARK_START})
+            connection.execute(text(f'ALTER TABLE {table} ADD PRIMARY KEY (id)'))
+        connection.execute(text(f'ANALYZE {", ".join(DATASET)}'))
+
+        before = _run_queries(connection=connection, params=params)
+
+        for index in index_definitions:
+            connection.execute(text(index.indexdef.replace(' ON public.', f' ON {BENCHMARK_SCHEMA}.')))  # type: ignore  # noqa: FKA100
+        connection.execute(text(f'ANALYZE {", ".join(DATASET)}'))
+
+        after = _run_queries(connection=connection, params=params)
+
+        return [{'query': name,
+                 'before_ms': before[name]['execution_time'],
+                 'after_ms': after[name]['execution_time'],
+                 'before_plan': _plan_nodes(plan=before[name]['plan']),
+                 'after_plan': _plan_nodes(plan=after[name]['plan'])} for name in QUERIES]
+
+    finally:
+        connection.execute(text(f'DROP SCHEMA IF EXISTS {BENCHMARK_SCHEMA} CASCADE'))
+        connection.execute(text('SET search_path TO public'))
+        connection.close()
@@ -0,0 +1,201 @@
+"""Redis backed token bucket that paces SP-API calls per selling partner and operation"""
+import threading
+import time
+from typing import Optional
+
+from app import logger
+from app import r
+from app.helpers.constants import ASpApiOperation
+from app.helpers.constants import RedisCacheKeys
+from app.helpers.constants import TimeInSeconds
+
+# Documented SP-API usage plans as (requests per second, burst).
+SP_API_USAGE_PLANS = {
+    ASpApiOperation.CREATE_REPORT.value: (0.0167, 15),
+    ASpApiOperation.GET_REPORT.value: (2.0, 15),
+    ASpApiOperation.GET_REPORTS.value: (0.0222, 10),
+    ASpApiOperation.GET_REPORT_DOCUMENT.value: (0.0167, 15),
+    ASpApiOperation.CREATE_RESTRICTED_DATA_TOKEN.value: (1.0, 10),
+    ASpApiOperation.GET_ORDERS.value: (0.0167, 20),
+    ASpApiOperation.GET_ORDER_ITEMS.value: (0.5, 30),
+    ASpApiOperation.GET_ORDER_METRICS.value: (0.5, 15),
+    ASpApiOperation.GET_INVENTORY_SUMMARIES.value: (2.0, 2),
+    ASpApiOperation.GET_MY_FEES_ESTIMATE_FOR_SKU.value: (1.0, 2),
+    ASpApiOperation.GET_MY_FEES_ESTIMATE_FOR_ASIN.value: (1.0, 2),
+    ASpApiOperation.LIST_FINANCIAL_EVENTS.value: (0.5, 30),
+    ASpApiOperation.SEARCH_CATALOG_ITEMS.value: (2.0, 2),
+}
+
+# Used for operations that have no documented plan above.
+DEFAULT_USAGE_PLAN = (0.5, 1)
+
+# Refills the bucket from redis server time and reserves the requested tokens.
+# The bucket may go negative: the caller then waits until its reservation is
+# covered, so concurrent callers are queued in order instead of polling.
+# A rate learned from the x-amzn-RateLimit-Limit header overrides the default one.
+ACQUIRE_SCRIPT = """
+local key = KEYS[1]
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local ttl = tonumber(ARGV[4])
+
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local bucket = redis.call('HMGET', key, 'tokens', 'updated_at', 'rate')
+local tokens = tonumber(bucket[1])
+local updated_at = tonumber(bucket[2])
+if bucket[3] then
+    rate = tonumber(bucket[3])
+end
+if tokens == nil or updated_at == nil then
+    tokens = burst
+    updated_at = now
+end
+
+tokens = math.min(burst, tokens + math.max(0, now - updated_at) * rate) - requested
+
+local wait = 0
+if tokens < 0 then
+    wait = -tokens / rate
+end
+
+redis.call('HSET', key, 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', key, ttl)
+
+return tostring(wait)
+"""
+
+# Empties the bucket after a 429 so every caller backs off until it refills.
+DRAIN_SCRIPT = """
+local key = KEYS[1]
+local ttl = tonumber(ARGV[1])
+
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local tokens = tonumber(redis.call('HGET', key, 'tokens'))
+if tokens == nil or tokens > 0 then
+    tokens = 0
+end
+
+redis.call('HSET', key, 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', key, ttl)
+
+return 1
+"""
+
+
+class SpApiThrottlingException(Exception):
+    """Raised when the SP-API answers 429, so the caller can back off instead of blocking"""
+
+    def __init__(self, selling_partner_id: str, operation: str, retry_after: Optional[float] = None):
+        self.selling_partner_id = selling_partner_id
+        self.operation = operation
+        self.retry_after = retry_after
+        super().__init__(f'SP-API throttled {operation} for selling partner {selling_partner_id}')
+
+
+class SpApiRateLimiter:
+    """Distributed token bucket shared by every worker calling the SP-API.
+
+    Buckets are keyed by (selling_partner_id, operation) and seeded from the
+    documented usage plan. Amazon returns the rate actually applied to the
+    selling partner in the x-amzn-RateLimit-Limit header; it replaces the seeded
+    rate so callers run exactly as fast as Amazon allows.
+    """
+
+    def __init__(self, usage_plans: dict, ttl: int = TimeInSeconds.SIXTY_MIN.value):
+        self.usage_plans = usage_plans
+        self.ttl = ttl
+        self._acquire_script = None
+        self._drain_script = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(selling_partner_id: str, operation: str) -> str:
+        """Redis key of the bucket for a selling partner and operation"""
+        return f'{RedisCacheKeys.SP_API_RATE_LIMIT.value}_{selling_partner_id}_{operation}'
+
+    def get_usage_plan(self, operation: str) -> tuple:
+        """Documented (rate, burst) for an operation"""
+        return self.usage_plans.get(operation) or DEFAULT_USAGE_PLAN
+
+    def _register_scripts(self):
+        """Register lua scripts once per process"""
+        if self._acquire_script is None:
+            with self._lock:
+                if self._acquire_script is None:
+                    self._drain_script = r.register_script(DRAIN_SCRIPT)
+                    self._acquire_script = r.register_script(ACQUIRE_SCRIPT)
+
+    def reserve(self, selling_partner_id: str, operation: str, tokens: int = 1) -> float:
+        """Take tokens from the bucket and return the seconds to wait before sending the request"""
+        rate, burst = self.get_usage_plan(operation)
+
+        try:
+            self._register_scripts()
+            wait = self._acquire_script(keys=[self.get_key(selling_partner_id, operation)],     # type: ignore  # noqa: FKA100
+                                        args=[rate, burst, tokens, self.ttl])
+            return float(wait)
+        except Exception as e:
+            # Fail open: losing redis must not stop workers, Amazon still enforces its own limit.
+            logger.warning(f'Unable to reserve SP-API rate limit token for {operation}: {e}')
+            return 0
+
+    def acquire(self, selling_partner_id: str, operation: str, tokens: int = 1) -> float:
+        """Block until the selling partner may call the operation, returns the seconds waited"""
+        wait = self.reserve(selling_partner_id=selling_partner_id, operation=operation, tokens=tokens)
+
+        if wait > 0:
+            logger.info(f'SP-API rate limit: waiting {wait:.2f}s for {operation} ({selling_partner_id})')
+            time.sleep(wait)
+
+        return wait
+
+    def update_rate(self, selling_partner_id: str, operation: str, rate: float) -> None:
+        """Store the rate Amazon reported for the selling partner and operation"""
+        if rate <= 0:
+            return
+
+        key = self.get_key(selling_partner_id=selling_partner_id, operation=operation)
+
+        try:
+            pipeline = r.pipeline()
+            pipeline.hset(key, 'rate', rate)      # type: ignore  # noqa: FKA100
+            pipeline.expire(key, self.ttl)      # type: ignore  # noqa: FKA100
+            pipeline.execute()
+        except Exception as e:
+            logger.warning(f'Unable to update SP-API rate limit for {operation}: {e}')
+
+    def drain(self, selling_partner_id: str, operation: str) -> None:
+        """Empty the bucket after Amazon throttled the selling partner"""
+        try:
+            self._register_scripts()
+            self._drain_script(keys=[self.get_key(selling_partner_id, operation)], args=[self.ttl])     # type: ignore  # noqa: FKA100
+        except Exception as e:
+            logger.warning(f'Unable to drain SP-API rate limit bucket for {operation}: {e}')
+
+    def observe(self, selling_partner_id: str, operation: str, response) -> None:
+        """Adapt the bucket to the rate limit header and status of an SP-API response"""
+        rate_limit = parse_rate_limit(response.headers.get('x-amzn-RateLimit-Limit'))
+        if rate_limit is not None:
+            self.update_rate(selling_partner_id=selling_partner_id, operation=operation, rate=rate_limit)
+
+        if response.status_code == 429:
+            self.drain(selling_partner_id=selling_partner_id, operation=operation)
+
+
+def parse_rate_limit(value) -> Optional[float]:
+    """Parse the x-amzn-RateLimit-Limit header, returns None when missing or invalid"""
+    if value is None:
+        return None
+
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+sp_api_rate_limiter = SpApiRateLimiter(usage_plans=SP_API_USAGE_PLANS)
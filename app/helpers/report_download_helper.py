@@ -0,0 +1,155 @@
+"""Streaming download of SP-API report documents with bounded memory"""
+from contextlib import contextmanager
+import tempfile
+from typing import Any
+from typing import IO
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+from typing import Tuple
+import zlib
+
+from app import config_data
+from app.helpers.http_session_helper import get_http_session
+from app.helpers.json_stream_helper import iter_json_array_items
+from app.helpers.json_stream_helper import iter_json_object_members
+import pandas as pd
+
+# Size of each network read.
+REPORT_DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+# Decompressed reports stay in memory up to this size and are spilled to a temp file beyond it.
+REPORT_SPOOL_MAX_BYTES = 32 * 1024 * 1024
+# Rows per DataFrame chunk handed to the ingestion loops.
+REPORT_CHUNK_ROWS = 1000
+# (connect, read) timeout for the report document url.
+REPORT_DOWNLOAD_TIMEOUT = (10, 300)
+
+
+def get_report_download_config() -> dict:
+    """Returns spool and chunk sizes from config, falling back to defaults"""
+
+    download_config = config_data.get('REPORT_DOWNLOAD') or {}
+
+    return {
+        'spool_max_bytes': int(download_config.get('SPOOL_MAX_BYTES', REPORT_SPOOL_MAX_BYTES)),     # type: ignore  # noqa: FKA100
+        'chunk_rows': int(download_config.get('CHUNK_ROWS', REPORT_CHUNK_ROWS)),     # type: ignore  # noqa: FKA100
+    }
+
+
+def gunzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Incrementally decompress a gzip byte stream, including multi member files"""
+
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    for chunk in chunks:
+        while chunk:
+            data = decompressor.decompress(chunk)
+            if data:
+                yield data
+
+            # A finished member may be followed by another one in the same chunk.
+            chunk = decompressor.unused_data
+            if chunk:
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    data = decompressor.flush()
+    if data:
+        yield data
+
+
+def iter_report_document_chunks(report_document: dict) -> Iterator[bytes]:
+    """Yield the decompressed bytes of a report document as they arrive, gzip is decompressed on the fly.
+
+    report_document may carry the headers the document url requires.
+    """
+
+    with get_http_session().get(report_document['url'], headers=report_document.get('headers'), stream=True,
+                                timeout=REPORT_DOWNLOAD_TIMEOUT) as response:
+        response.raise_for_status()
+
+        chunks = response.iter_content(chunk_size=REPORT_DOWNLOAD_CHUNK_BYTES)
+        if report_document.get('compressionAlgorithm') == 'GZIP':
+            chunks = gunzip_chunks(chunks)
+
+        yield from chunks
+
+
+def download_report_document(report_document: dict, spool_max_bytes: Optional[int] = None) -> tuple:
+    """Download a report document into a spooled temp file, decompressing gzip on the fly.
+
+    Only one network chunk is held at a time. Returns the spool positioned at the
+    start and the charset announced by the response, if any.
+    """
+
+    if spool_max_bytes is None:
+        spool_max_bytes = get_report_download_config()['spool_max_bytes']
+
+    spool = tempfile.SpooledTemporaryFile(max_size=spool_max_bytes, mode='w+b')
+
+    try:
+        with get_http_session().get(report_document['url'], headers=report_document.get('headers'), stream=True,
+                                    timeout=REPORT_DOWNLOAD_TIMEOUT) as response:
+            response.raise_for_status()
+
+            chunks = response.iter_content(chunk_size=REPORT_DOWNLOAD_CHUNK_BYTES)
+            if report_document.get('compressionAlgorithm') == 'GZIP':
+                chunks = gunzip_chunks(chunks)
+
+            for chunk in chunks:
+                spool.write(chunk)
+
+            charset = response.encoding
+    except Exception:
+        spool.close()
+        raise
+
+    spool.seek(0)
+
+    return spool, charset
+
+
+@contextmanager
+def open_report_document(report_document: dict) -> Iterator[IO[bytes]]:
+    """Context manager yielding the decompressed report document as a binary file"""
+
+    spool, _ = download_report_document(report_document)
+
+    with spool:
+        yield spool
+
+
+def iter_report_chunks(report_document: dict, encoding: Optional[str] = 'utf-8', chunksize: Optional[int] = None, **read_csv_kwargs) -> Iterator[pd.DataFrame]:
+    """Yield DataFrame chunks of a delimited report document, keeping one chunk in memory at a time.
+
+    Pass encoding=None to use the charset announced by the document url, falling back to utf-8.
+    An empty document yields no chunks.
+    """
+
+    if chunksize is None:
+        chunksize = get_report_download_config()['chunk_rows']
+
+    spool, charset = download_report_document(report_document)
+
+    with spool:
+        try:
+            reader = pd.read_csv(spool, encoding=encoding or charset or 'utf-8', chunksize=chunksize, **read_csv_kwargs)
+        except pd.errors.EmptyDataError:
+            return
+
+        with reader:
+            yield from reader
+
+
+def iter_report_json_items(report_document: dict) -> Iterator[Any]:
+    """Yield the records of a report document holding a JSON array, one record in memory at a time"""
+
+    yield from iter_json_array_items(chunks=iter_report_document_chunks(report_document))
+
+
+def iter_report_json_members(report_document: dict, array_keys: tuple) -> Iterator[Tuple[str, Any]]:
+    """Yield the (key, value) members of a report document holding a JSON object.
+
+    The records of the arrays under array_keys are yielded one by one as (key, record) pairs.
+    """
+
+    yield from iter_json_object_members(chunks=iter_report_document_chunks(report_document), array_keys=array_keys)
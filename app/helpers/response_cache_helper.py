@@ -0,0 +1,95 @@
+"""Redis cache of dashboard responses, invalidated through a per account data version"""
+from datetime import date
+import hashlib
+import json
+from typing import Optional
+
+from app import config_data
+from app import logger
+from app import r
+from app.helpers.constants import RedisCacheKeys
+from app.helpers.constants import TimeInSeconds
+from flask import request
+
+
+def get_response_cache_ttl() -> int:
+    """Returns the cache entry lifetime, a safety net as entries are invalidated by the data version"""
+
+    cache_config = config_data.get('RESPONSE_CACHE') or {}
+
+    return int(cache_config.get('TTL', TimeInSeconds.TWENTY_FOUR_HOUR.value))     # type: ignore  # noqa: FKA100
+
+
+def get_data_version_key(account_id: str) -> str:
+    """Redis key holding the data version of an account"""
+
+    return f'{RedisCacheKeys.RESPONSE_CACHE_VERSION.value}_{account_id}'
+
+
+def get_data_version(account_id: str) -> Optional[int]:
+    """Returns the current data version of an account, None when redis is unavailable"""
+
+    try:
+        return int(r.get(get_data_version_key(account_id)) or 0)
+    except Exception as e:
+        logger.warning(f'Unable to read response cache version from redis: {e}')
+        return None
+
+
+def bump_data_version(account_id: str) -> None:
+    """Invalidate every cached response of an account, called once new data is committed"""
+
+    try:
+        r.incr(get_data_version_key(account_id))
+    except Exception as e:
+        logger.warning(f'Unable to bump response cache version in redis: {e}')
+
+
+def get_response_cache_key(user_object, account_object, allowed_brands) -> Optional[str]:
+    """Cache key of the current request.
+
+    Built from the account, seller, data version, endpoint, normalized query params and
+    the brands the user may see. Returns None when the version cannot be read, the
+    response is then neither read from nor written to the cache.
+    """
+
+    version = get_data_version(account_object.uuid)
+
+    if version is None:
+        return None
+
+    params = {key: sorted(request.args.getlist(key)) for key in sorted(request.args.keys())}
+
+    fingerprint = json.dumps({
+        'endpoint': request.endpoint or request.path,
+        'params': params,
+        'view_args': request.view_args or {},
+        'allowed_brands': sorted(allowed_brands) if allowed_brands else allowed_brands,
+        # primary users are not restricted to their allowed brands
+        'is_primary_user': account_object.primary_user_id == user_object.id,
+        # endpoints default their date range to today
+        'today': date.today().isoformat(),
+    }, sort_keys=True, default=str)
+
+    digest = hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()
+
+    return f'{RedisCacheKeys.RESPONSE_CACHE.value}_{account_object.uuid}_{account_object.asp_id}_{version}_{digest}'
+
+
+def get_cached_response(cache_key: str) -> Optional[bytes]:
+    """Returns the cached response body"""
+
+    try:
+        return r.get(cache_key)
+    except Exception as e:
+        logger.warning(f'Unable to read cached response from redis: {e}')
+        return None
+
+
+def set_cached_response(cache_key: str, body: bytes) -> None:
+    """Store a response body"""
+
+    try:
+        r.set(name=cache_key, value=body, ex=get_response_cache_ttl())
+    except Exception as e:
+        logger.warning(f'Unable to write cached response to redis: {e}')
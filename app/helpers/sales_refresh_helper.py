@@ -0,0 +1,83 @@
+"""Background refresh of the stored sales api data served by the hourly sales endpoint"""
+import time
+from typing import Optional
+from typing import Tuple
+
+from app import config_data
+from app import logger
+from app import r
+from app import sales_order_metrics_q
+from app.helpers.constants import RedisCacheKeys
+from app.helpers.constants import TimeInSeconds
+
+# Stored hourly sales older than this are served but refreshed in the background.
+SALES_REFRESH_MAX_AGE_SECONDS = TimeInSeconds.FIVE_MIN.value
+
+
+def get_sales_refresh_max_age() -> int:
+    """Returns the age after which stored hourly sales are refreshed"""
+
+    refresh_config = config_data.get('SALES_API_REFRESH') or {}
+
+    return int(refresh_config.get('MAX_AGE_SECONDS', SALES_REFRESH_MAX_AGE_SECONDS))     # type: ignore  # noqa: FKA100
+
+
+def is_sales_data_stale(refreshed_at: Optional[int]) -> bool:
+    """Stored sales data is stale when it was never refreshed or is older than the max age"""
+
+    return refreshed_at is None or time.time() - refreshed_at > get_sales_refresh_max_age()
+
+
+def enqueue_sales_refresh(account_id: str, asp_id: str, from_date: str, to_date: str) -> bool:
+    """Enqueue a sales api refresh of the date range unless one was enqueued within the max age.
+
+    The redis key is held for the max age and never released early, so a failing or
+    throttled refresh is retried at most once per max age instead of on every request.
+    """
+    from workers.sales_order_metrics_worker import SalesOrderMetricsWorker
+
+    lock_key = f'{RedisCacheKeys.SALES_API_REFRESH_LOCK.value}_{account_id}_{asp_id}_{from_date}_{to_date}'
+
+    try:
+        if not r.set(name=lock_key, value=int(time.time()), nx=True, ex=get_sales_refresh_max_age()):
+            return False
+    except Exception as e:
+        logger.warning(f'Unable to acquire sales refresh lock: {e}')
+        return False
+
+    data = {
+        'account_id': account_id,
+        'asp_id': asp_id,
+        'from_date': from_date,
+        'to_date': to_date
+    }
+
+    sales_order_metrics_q.enqueue(SalesOrderMetricsWorker.refresh_sales_api, data=data, job_timeout=config_data.get('RQ_JOB_TIMEOUT'))  # type: ignore  # noqa: FKA100
+
+    return True
+
+
+def get_stored_hourly_sales(account_id: str, asp_id: str, from_date: str, to_date: str) -> Tuple[Optional[list], Optional[int], bool]:
+    """Stored hourly sales of the date range as graph rows, with when they were refreshed and whether they are stale.
+
+    The rows are None when the range was never stored, a stale range is refreshed in the background.
+    """
+    from app.models.az_sales_traffic_summary import AzSalesTrafficSummary
+
+    sales_data = AzSalesTrafficSummary.get_hourly_sales_by_single_date(account_id=account_id, asp_id=asp_id, from_date=from_date, to_date=to_date)
+    refreshed_at = sales_data.updated_at if sales_data else None
+    is_stale = is_sales_data_stale(refreshed_at=refreshed_at)
+
+    if is_stale:
+        enqueue_sales_refresh(account_id=account_id, asp_id=asp_id, from_date=from_date, to_date=to_date)
+
+    if not sales_data:
+        return None, refreshed_at, is_stale
+
+    hourly_sales = [{
+        'time_interval': sales_by_hour.get('formatted_interval_range'),
+        'gross_sales': float(sales_by_hour.get('totalSales').get('amount')) if sales_by_hour.get('totalSales').get('amount') is not None else 0.0,
+        'units_ordered': int(sales_by_hour.get('unitCount')) if sales_by_hour.get('unitCount') is not None else 0,
+    } for sales_by_hour in sales_data.hourly_sales.get('result').get('payload') or []]
+
+    return hourly_sales, refreshed_at, is_stale
@@ -0,0 +1,166 @@
+"""Cached STS assume-role credentials used to sign SP-API requests"""
+import json
+import threading
+import time
+from typing import Optional
+import uuid
+
+from app import config_data
+from app import logger
+from app import r
+from app.helpers.constants import RedisCacheKeys
+import boto3
+
+# Refresh this many seconds before the credentials actually expire.
+STS_REFRESH_MARGIN_SECONDS = 300
+# Credentials closer than this to expiry are never handed out.
+STS_MIN_VALIDITY_SECONDS = 30
+# How long a single caller may hold the refresh lock.
+STS_REFRESH_LOCK_TIMEOUT_SECONDS = 30
+STS_REFRESH_WAIT_SECONDS = 5
+
+# Deletes the refresh lock only while it still holds the caller's token, so a caller whose
+# lock expired mid refresh cannot release the lock another caller took over.
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class AssumedRoleCredentialProvider:
+    """Assumes the seller app role and caches the credentials in process and in redis.
+
+    Credentials are reused until they are within STS_REFRESH_MARGIN_SECONDS of
+    expiry. Only the caller holding the redis refresh lock calls STS; the others keep
+    using the still valid credentials or wait briefly for the refreshed ones.
+    """
+
+    def __init__(self, role_arn: str, role_session_name: str, refresh_margin: int = STS_REFRESH_MARGIN_SECONDS):
+        self.role_arn = role_arn
+        self.role_session_name = role_session_name
+        self.refresh_margin = refresh_margin
+        self.cache_key = f'{RedisCacheKeys.SP_API_STS_CREDENTIALS.value}_{role_session_name}'
+        self.lock_key = f'{RedisCacheKeys.SP_API_STS_CREDENTIALS_LOCK.value}_{role_session_name}'
+        self._credentials: Optional[dict] = None
+        self._lock = threading.Lock()
+        self._release_script = None
+
+    @staticmethod
+    def _seconds_left(credentials: Optional[dict]) -> float:
+        """Seconds until the given credentials expire"""
+        if not credentials:
+            return 0
+        return credentials['expiration'] - time.time()
+
+    def _is_fresh(self, credentials: Optional[dict]) -> bool:
+        """Credentials are fresh when they do not need a proactive refresh yet"""
+        return self._seconds_left(credentials) > self.refresh_margin
+
+    def _is_usable(self, credentials: Optional[dict]) -> bool:
+        """Credentials are usable while they are not about to expire"""
+        return self._seconds_left(credentials) > STS_MIN_VALIDITY_SECONDS
+
+    def _read_cache(self) -> Optional[dict]:
+        """Read shared credentials from redis"""
+        try:
+            cached_object = r.get(self.cache_key)
+            if cached_object:
+                return json.loads(cached_object)
+        except Exception as e:
+            logger.warning(f'Unable to read STS credentials from redis: {e}')
+        return None
+
+    def _write_cache(self, credentials: dict) -> None:
+        """Store credentials in redis until they expire"""
+        ttl = int(self._seconds_left(credentials))
+        if ttl <= 0:
+            return
+        try:
+            r.set(name=self.cache_key, value=json.dumps(credentials), ex=ttl)
+        except Exception as e:
+            logger.warning(f'Unable to write STS credentials to redis: {e}')
+
+    def _assume_role(self) -> dict:
+        """Call STS and return the credentials with an epoch expiration"""
+        sts_client = boto3.client('sts')
+
+        res = sts_client.assume_role(
+            RoleArn=self.role_arn,
+            RoleSessionName=self.role_session_name
+        )
+
+        credentials = res['Credentials']
+
+        return {
+            'access_key_id': credentials['AccessKeyId'],
+            'secret_access_key': credentials['SecretAccessKey'],
+            'session_token': credentials['SessionToken'],
+            'expiration': credentials['Expiration'].timestamp()
+        }
+
+    def _acquire_refresh_lock(self) -> Optional[str]:
+        """Take the redis refresh lock, returns the token it holds or None when another caller has it"""
+        token = uuid.uuid4().hex
+        try:
+            if r.set(name=self.lock_key, value=token, nx=True, ex=STS_REFRESH_LOCK_TIMEOUT_SECONDS):
+                return token
+        except Exception as e:
+            logger.warning(f'Unable to acquire STS refresh lock: {e}')
+        return None
+
+    def _release_refresh_lock(self, token: str) -> None:
+        """Release the redis refresh lock if it still holds the token"""
+        try:
+            if self._release_script is None:
+                self._release_script = r.register_script(RELEASE_LOCK_SCRIPT)
+            self._release_script(keys=[self.lock_key], args=[token])      # type: ignore
+        except Exception as e:
+            logger.warning(f'Unable to release STS refresh lock: {e}')
+
+    def _refresh(self) -> dict:
+        """Refresh credentials, letting only the lock holder call STS"""
+        cached = self._read_cache()
+        if self._is_fresh(cached):
+            return cached      # type: ignore
+
+        token = self._acquire_refresh_lock()
+
+        if token is None:
+            # Another caller is refreshing, keep serving what we have if it is still valid.
+            for candidate in (cached, self._credentials):
+                if self._is_usable(candidate):
+                    return candidate      # type: ignore
+
+            deadline = time.time() + STS_REFRESH_WAIT_SECONDS
+            while time.time() < deadline:
+                time.sleep(0.2)
+                cached = self._read_cache()
+                if self._is_usable(cached):
+                    return cached      # type: ignore
+
+        try:
+            credentials = self._assume_role()
+            self._write_cache(credentials)
+            return credentials
+        finally:
+            if token is not None:
+                self._release_refresh_lock(token=token)
+
+    def get_credentials(self) -> dict:
+        """Return valid assumed-role credentials, refreshing them when close to expiry"""
+        if self._is_fresh(self._credentials):
+            return self._credentials      # type: ignore
+
+        with self._lock:
+            if not self._is_fresh(self._credentials):
+                self._credentials = self._refresh()
+
+        return self._credentials      # type: ignore
+
+
+seller_api_credential_provider = AssumedRoleCredentialProvider(
+    role_arn=config_data.get('SP_ROLE_ARN'),
+    role_session_name=config_data.get('SP_ROLE_SESSION_NAME')
+)
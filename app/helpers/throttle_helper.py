@@ -0,0 +1,102 @@
+"""Reschedules rq jobs throttled by the SP-API instead of blocking the worker, and answers throttled API requests"""
+from datetime import timedelta
+import math
+import random
+from typing import Any
+from typing import Optional
+
+from app import config_data
+from app import logger
+from app import r
+from app.helpers.constants import HttpStatusCode
+from app.helpers.constants import QueueTaskStatus
+from app.helpers.constants import ResponseMessageKeys
+from app.helpers.rate_limit_helper import SpApiThrottlingException
+from app.helpers.utility import send_json_response
+from providers.mail import send_error_notification
+from rq import get_current_job
+from rq_scheduler import Scheduler
+
+DEFAULT_BACKOFF_BASE_SECONDS = 60
+DEFAULT_BACKOFF_MAX_SECONDS = 1800
+DEFAULT_MAX_ATTEMPTS = 8
+# Retry-After sent to API clients when the SP-API did not announce its rate
+DEFAULT_RETRY_AFTER_SECONDS = 60
+
+
+def get_throttle_config() -> dict:
+    """Returns backoff settings from config, falling back to defaults"""
+
+    throttle_config = config_data.get('SP_API_THROTTLE') or {}
+
+    return {
+        'base': int(throttle_config.get('BACKOFF_BASE_SECONDS', DEFAULT_BACKOFF_BASE_SECONDS)),     # type: ignore  # noqa: FKA100
+        'cap': int(throttle_config.get('BACKOFF_MAX_SECONDS', DEFAULT_BACKOFF_MAX_SECONDS)),     # type: ignore  # noqa: FKA100
+        'max_attempts': int(throttle_config.get('MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)),     # type: ignore  # noqa: FKA100
+    }
+
+
+def get_backoff_seconds(attempt: int, base: int, cap: int, retry_after: Optional[float] = None) -> float:
+    """Exponential backoff with equal jitter, never shorter than the rate limit asks for"""
+
+    delay = min(cap, base * 2 ** (attempt - 1))
+    delay = delay / 2 + random.uniform(0, delay / 2)       # type: ignore  # noqa: FKA100
+
+    if retry_after:
+        delay = max(delay, retry_after)     # type: ignore  # noqa: FKA100
+
+    return delay
+
+
+def reschedule_throttled_job(data: dict, exception: SpApiThrottlingException, queue_task: Any = None) -> bool:
+    """Re-enqueue the current rq job through rq-scheduler with backoff, keeping its data.
+
+    The job's data is passed on unchanged apart from the attempt counter, so workers
+    that store their progress in data resume where they were throttled. Returns False
+    and marks the queue task as failed once the attempts are used up.
+    """
+
+    throttle_config = get_throttle_config()
+    attempt = int(data.get('throttle_attempt') or 0) + 1
+    job = get_current_job()
+
+    if job is None or attempt > throttle_config['max_attempts']:
+        error_message = f'{exception}, giving up after {attempt - 1} attempts'
+        logger.error(error_message)
+        if queue_task:
+            queue_task.status = QueueTaskStatus.ERROR.value
+            queue_task.save()
+        send_error_notification(email_to=config_data.get('SLACK').get('NOTIFICATION_EMAIL'), subject='SP-API throttling, job not rescheduled',
+                                template='emails/slack_email.html', data={}, error_message=error_message, traceback_info=None)
+        return False
+
+    delay = get_backoff_seconds(attempt=attempt, base=throttle_config['base'],
+                                cap=throttle_config['cap'], retry_after=exception.retry_after)
+
+    retry_data = dict(data)
+    retry_data['throttle_attempt'] = attempt
+
+    scheduler = Scheduler(queue_name=job.origin, connection=r)
+    scheduler.enqueue_in(timedelta(seconds=delay), job.func, data=retry_data, timeout=job.timeout)     # type: ignore  # noqa: FKA100
+
+    if queue_task:
+        queue_task.status = QueueTaskStatus.NEW.value
+        queue_task.save()
+
+    logger.warning(f'{exception}, rescheduled {job.func_name} on {job.origin} in {delay:.0f}s (attempt {attempt})')
+
+    return True
+
+
+def send_throttled_response(exception: SpApiThrottlingException) -> tuple:
+    """429 response for an API request throttled by the SP-API, Retry-After tells the client when to try again"""
+
+    retry_after = math.ceil(exception.retry_after) if exception.retry_after else DEFAULT_RETRY_AFTER_SECONDS
+
+    logger.warning(f'{exception}, asking the client to retry in {retry_after}s')
+
+    response, http_status = send_json_response(http_status=HttpStatusCode.TOO_MANY_REQUESTS.value, response_status=False,
+                                               message_key=ResponseMessageKeys.PLEASE_TRY_AFTER_SECONDS.value.format(f' {retry_after}'))
+    response.headers['Retry-After'] = str(retry_after)
+
+    return response, http_status
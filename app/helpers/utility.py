@@ -30,7 +30,7 @@ from app.helpers.constants import TimeFormats
 from app.helpers.constants import TimePeriod
 from app.helpers.constants import ValidationMessages
 from app.helpers.sign_helper import AWSV4Auth
-import boto3
+from app.helpers.sts_credentials_helper import seller_api_credential_provider
 from dateutil import parser
 from dateutil.relativedelta import relativedelta
 from flask import jsonify
@@ -756,6 +756,49 @@ def convert_string_to_datetime(input_string):
         return None
 
 
+def parse_report_date(value: Any) -> Optional[date]:
+    """Date part of a report date string as written, the same day CAST(value AS DATE) gives.
+
+    Returns None for empty or unparseable values.
+    """
+    if isinstance(value, datetime):
+        return value.date()
+
+    if isinstance(value, date):
+        return value
+
+    timestamp = _parse_report_datetime(value)
+
+    return timestamp.date() if timestamp is not None else None
+
+
+def parse_report_timestamp(value: Any) -> Optional[datetime]:
+    """Timezone aware datetime of a report date string, naive values are taken as UTC.
+
+    Returns None for empty or unparseable values.
+    """
+    timestamp = value if isinstance(value, datetime) else _parse_report_datetime(value)
+
+    if timestamp is not None and timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+
+    return timestamp
+
+
+def _parse_report_datetime(value: Any) -> Optional[datetime]:
+    """Datetime of an iso or free form report date string, None when it does not parse"""
+    if not isinstance(value, str) or not value.strip():
+        return None
+
+    try:
+        return parser.isoparse(value.strip())
+    except ValueError:
+        try:
+            return parser.parse(value)
+        except (ValueError, OverflowError):
+            return None
+
+
 def get_current_datetime():
     """
     Returns the current date and time as a formatted string.
@@ -1025,21 +1068,12 @@ def is_valid_numeric_value(value):
 
 
 def generate_seller_api_awssigv4():
-    """Returns AWS Signature Version 4 for Seller API"""
-
-    amw_client = boto3.client(
-        'sts'
-    )
-
-    res = amw_client.assume_role(
-        RoleArn=config_data.get('SP_ROLE_ARN'),
-        RoleSessionName=config_data.get('SP_ROLE_SESSION_NAME')
-    )
+    """Returns AWS Signature Version 4 for Seller API, signed with cached assumed-role credentials"""
 
-    credentials = res['Credentials']
-    access_key_id = credentials['AccessKeyId']
-    secret_access_key = credentials['SecretAccessKey']
-    session_token = credentials['SessionToken']
+    credentials = seller_api_credential_provider.get_credentials()
+    access_key_id = credentials['access_key_id']
+    secret_access_key = credentials['secret_access_key']
+    session_token = credentials['session_token']
 
     return AWSSigV4('execute-api',
                     aws_access_key_id=access_key_id,
@@ -2,11 +2,17 @@
     Database model for storing Fba Customer Shipment Sales Report in database is written in this File along with its methods.
 """
 import time
+from typing import Any
+from typing import Optional
 
 from app import db
+from app.helpers.brand_category_helper import BrandCategoryLookup
 from app.helpers.constants import DbAnomalies
+from app.helpers.utility import parse_report_date
 from app.models.az_item_master import AzItemMaster
 from app.models.base import Base
+from sqlalchemy import Index
+from sqlalchemy.orm import validates
 
 
 class AzFbaCustomerShipmentSales(Base):
@@ -21,6 +27,7 @@ class AzFbaCustomerShipmentSales(Base):
     brand = db.Column(db.String(250), nullable=True)
     category = db.Column(db.String(250), nullable=True)
     shipment_date = db.Column(db.String(255))
+    shipment_on = db.Column(db.Date, nullable=True)
     sku = db.Column(db.String(255))
     fnsku = db.Column(db.String(255))
     asin = db.Column(db.String(255))
@@ -37,6 +44,14 @@ class AzFbaCustomerShipmentSales(Base):
     created_at = db.Column(db.BigInteger)
     updated_at = db.Column(db.BigInteger)
 
+    __table_args__ = (Index('ix_az_fba_customer_shipment_sales_account_id_shipment_on', 'account_id', 'shipment_on'),)  # type: ignore  # noqa: FKA100
+
+    @validates('shipment_date')
+    def validate_report_date(self, key: str, value: Any) -> Any:
+        """Keep the typed date column in step with the report date string"""
+        self.shipment_on = parse_report_date(value)
+        return value
+
     @classmethod
     def get_by_order_id(cls, order_id: str):
         """Filter records by Order Id."""
@@ -57,14 +72,15 @@ class AzFbaCustomerShipmentSales(Base):
                       gift_wrap_price: float,
                       ship_city: str,
                       ship_state: str,
-                      ship_postal_code: str
+                      ship_postal_code: str,
+                      brand_category_lookup: Optional[BrandCategoryLookup] = None,
                       ):
         """Insert or update a FBA Customer Shipment Sales Report"""
 
         category, brand = None, None
 
         if sku:
-            category, brand = AzItemMaster.get_category_brand_by_sku(
+            category, brand = (brand_category_lookup or AzItemMaster).get_category_brand_by_sku(
                 account_id=account_id, asp_id=asp_id, seller_sku=sku)
 
         fba_customer_shipment_sales = db.session.query(cls).filter(
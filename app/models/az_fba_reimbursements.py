@@ -2,11 +2,17 @@
     Database model for storing Fba Reimbursements Report in database is written in this File along with its methods.
 """
 import time
+from typing import Any
+from typing import Optional
 
 from app import db
+from app.helpers.brand_category_helper import BrandCategoryLookup
 from app.helpers.constants import DbAnomalies
+from app.helpers.utility import parse_report_date
 from app.models.az_item_master import AzItemMaster
 from app.models.base import Base
+from sqlalchemy import Index
+from sqlalchemy.orm import validates
 
 
 class AzFbaReimbursements(Base):
@@ -21,6 +27,7 @@ class AzFbaReimbursements(Base):
     category = db.Column(db.String(250), nullable=True)
     brand = db.Column(db.String(250), nullable=True)
     approval_date = db.Column(db.String(255))
+    approval_on = db.Column(db.Date, nullable=True)
     reimbursement_id = db.Column(db.BigInteger)
     case_id = db.Column(db.String(255))
     az_order_id = db.Column(db.String(255))
@@ -41,6 +48,14 @@ class AzFbaReimbursements(Base):
     created_at = db.Column(db.BigInteger)
     updated_at = db.Column(db.BigInteger)
 
+    __table_args__ = (Index('ix_az_fba_reimbursements_account_id_approval_on', 'account_id', 'approval_on'),)  # type: ignore  # noqa: FKA100
+
+    @validates('approval_date')
+    def validate_report_date(self, key: str, value: Any) -> Any:
+        """Keep the typed date column in step with the report date string"""
+        self.approval_on = parse_report_date(value)
+        return value
+
     @classmethod
     def get_by_order_id(cls, order_id: str):
         """Filter records by Order Id."""
@@ -65,13 +80,14 @@ class AzFbaReimbursements(Base):
                       quantity_reimbursed_inventory: int,
                       quantity_reimbursed_total: int,
                       original_reimbursement_id: int,
-                      original_reimbursement_type: str
+                      original_reimbursement_type: str,
+                      brand_category_lookup: Optional[BrandCategoryLookup] = None,
                       ):
         """Insert or update a FBA Reimbursements report"""
         category, brand = None, None
 
         if sku:
-            category, brand = AzItemMaster.get_category_brand_by_sku(
+            category, brand = (brand_category_lookup or AzItemMaster).get_category_brand_by_sku(
                 account_id=account_id, asp_id=asp_id, seller_sku=sku)
 
         fba_reimbursements_report = db.session.query(cls).filter(cls.account_id == account_id, cls.asp_id == asp_id,
@@ -2,11 +2,17 @@
     Database model for storing Fba Returns Report in database is written in this File along with its methods.
 """
 import time
+from typing import Any
+from typing import Optional
 
 from app import db
+from app.helpers.brand_category_helper import BrandCategoryLookup
 from app.helpers.constants import DbAnomalies
+from app.helpers.utility import parse_report_date
 from app.models.az_item_master import AzItemMaster
 from app.models.base import Base
+from sqlalchemy import Index
+from sqlalchemy.orm import validates
 
 
 class AzFbaReturns(Base):
@@ -21,6 +27,7 @@ class AzFbaReturns(Base):
     category = db.Column(db.String(250), nullable=True)
     brand = db.Column(db.String(250), nullable=True)
     return_date = db.Column(db.String(255))
+    return_on = db.Column(db.Date, nullable=True)
     order_id = db.Column(db.String(255))
     sku = db.Column(db.String(255))
     asin = db.Column(db.String(255))
@@ -35,6 +42,14 @@ class AzFbaReturns(Base):
     created_at = db.Column(db.BigInteger)
     updated_at = db.Column(db.BigInteger)
 
+    __table_args__ = (Index('ix_az_fba_returns_account_id_return_on', 'account_id', 'return_on'),)  # type: ignore  # noqa: FKA100
+
+    @validates('return_date')
+    def validate_report_date(self, key: str, value: Any) -> Any:
+        """Keep the typed date column in step with the report date string"""
+        self.return_on = parse_report_date(value)
+        return value
+
     @classmethod
     def get_by_order_id(cls, order_id: str):
         """Filter records by Order Id."""
@@ -42,13 +57,13 @@ class AzFbaReturns(Base):
 
     @classmethod
     def add_or_update(cls, account_id: str, asp_id: str, return_date: str, order_id: str, sku: str, asin: str, fnsku: str,
-                      product_name: str, quantity: int, fulfillment_center_id: str, detailed_disposition: str, reason: str, license_plate_number: str, customer_comments: str):
+                      product_name: str, quantity: int, fulfillment_center_id: str, detailed_disposition: str, reason: str, license_plate_number: str, customer_comments: str, brand_category_lookup: Optional[BrandCategoryLookup] = None):
         """Insert or update a FBA Return report"""
 
         category, brand = None, None
 
         if sku:
-            category, brand = AzItemMaster.get_category_brand_by_sku(
+            category, brand = (brand_category_lookup or AzItemMaster).get_category_brand_by_sku(
                 account_id=account_id, asp_id=asp_id, seller_sku=sku)
 
         fba_returns_report = db.session.query(cls).filter(cls.account_id == account_id, cls.asp_id == asp_id, cls.return_date == return_date,
@@ -1,10 +1,13 @@
 """
     Database model for storing Financial Events in database is written in this File along with its methods.
 """
+import time
 from typing import Any
 
 from app import db
 from app.models.base import Base
+from sqlalchemy import Index
+from sqlalchemy import text
 
 
 class AzFinancialEvent(Base):
@@ -31,8 +34,64 @@ class AzFinancialEvent(Base):
     updated_at = db.Column(db.BigInteger, nullable=True)
     deactivated_at = db.Column(db.BigInteger, nullable=True)
 
+    __table_args__ = (Index('ix_az_financial_event_account_id_asp_id_az_order_id', 'account_id', 'asp_id', 'az_order_id'),  # type: ignore  # noqa: FKA100
+                      Index('ix_az_financial_event_account_id_asp_id_adjustment', 'account_id', 'asp_id', 'finance_type',  # type: ignore  # noqa: FKA100
+                            postgresql_where=text("event_type = 'AdjustmentEventList' AND az_order_id IS NULL")),)
+
     @classmethod
     def get_by_az_order_id(cls, account_id: str, asp_id: str, az_order_id: str) -> Any:
         """Filter record by Amazon order id"""
         return db.session.query(cls).filter(cls.account_id == account_id, cls.asp_id == asp_id,
                                             cls.az_order_id == az_order_id).order_by(cls.posted_date.asc()).all()
+
+    @classmethod
+    def get_by_az_order_ids(cls, account_id: str, asp_id: str, az_order_ids: set) -> Any:
+        """Filter records by many Amazon order ids"""
+        return db.session.query(cls).filter(cls.account_id == account_id, cls.asp_id == asp_id,  # type: ignore  # noqa: FKA100
+                                            cls.az_order_id.in_(az_order_ids)).order_by(cls.posted_date.asc(), cls.id.asc()).all()
+
+    @classmethod
+    def bulk_add_update(cls, account_id: str, asp_id: str, events: list) -> None:
+        """Insert or update many finance events with one lookup and a single commit.
+
+        Events are matched on (az_order_id, event_type, posted_date, seller_sku).
+        """
+
+        if not events:
+            return
+
+        posted_dates = {event['posted_date'] for event in events}
+        event_types = {event['event_type'] for event in events}
+
+        existing_events = db.session.query(cls).filter(cls.account_id == account_id, cls.asp_id == asp_id, cls.event_type.in_(event_types),
+                                                       cls.posted_date.in_(posted_dates)).order_by(cls.id.asc()).all()
+
+        finance_event_map: dict = {}
+        for finance_event in existing_events:
+            finance_event_map.setdefault((finance_event.az_order_id, finance_event.event_type, finance_event.posted_date, finance_event.seller_sku), finance_event)  # type: ignore  # noqa: FKA100
+
+        current_time = int(time.time())
+
+        for event in events:
+            key = (event['az_order_id'], event['event_type'], event['posted_date'], event.get('seller_sku'))
+            finance_event = finance_event_map.get(key)
+
+            if finance_event is None:
+                finance_event = cls(account_id=account_id, asp_id=asp_id, az_order_id=event['az_order_id'],
+                                    event_type=event['event_type'], created_at=current_time)
+                db.session.add(finance_event)
+                finance_event_map[key] = finance_event
+            else:
+                finance_event.updated_at = current_time
+
+            finance_event.category = event.get('category')
+            finance_event.brand = event.get('brand')
+            finance_event.seller_order_id = event.get('seller_order_id')
+            finance_event.seller_sku = event.get('seller_sku')
+            finance_event.market_place = event.get('market_place')
+            finance_event.posted_date = event['posted_date']
+            finance_event.event_json = [event.get('event_json')]
+            finance_event.finance_type = event.get('finance_type')
+            finance_event.finance_value = event.get('finance_value')
+
+        db.session.commit()
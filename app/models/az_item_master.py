@@ -11,6 +11,7 @@ from app import logger
 from app.helpers.constants import FulfillmentChannel
 from app.helpers.constants import ItemMasterStatus
 from app.helpers.constants import SortingOrder
+from app.helpers.pagination_helper import get_keyset_query
 from app.helpers.utility import get_prior_to_from_date
 from app.models.base import Base
 from sqlalchemy import func
@@ -58,7 +59,8 @@ class AzItemMaster(Base):
     updated_at = db.Column(db.BigInteger, nullable=True)
     deleted_at = db.Column(db.BigInteger, nullable=True)
 
-    __table_args__ = (UniqueConstraint('account_id', 'selling_partner_id', 'seller_sku', name='uq_account_selling_partner_id_seller_sku'), Index('ix_unique_combination', 'account_id', 'selling_partner_id', 'seller_sku'))  # type: ignore  # noqa: FKA100
+    __table_args__ = (UniqueConstraint('account_id', 'selling_partner_id', 'seller_sku', name='uq_account_selling_partner_id_seller_sku'), Index('ix_unique_combination', 'account_id', 'selling_partner_id', 'seller_sku'),  # type: ignore  # noqa: FKA100
+                      Index('ix_az_item_master_account_id_selling_partner_id_asin', 'account_id', 'selling_partner_id', 'asin'))  # type: ignore  # noqa: FKA100
 
     @classmethod
     def get_total_records(cls, account_id: str, asp_id: str) -> int:
@@ -116,6 +118,18 @@ class AzItemMaster(Base):
             return brand_category.category, brand_category.brand
         return None, None
 
+    @classmethod
+    def get_category_brand_by_skus(cls, account_id: str, asp_id: str, seller_skus: set) -> dict:
+        """fetch category and brand of many skus at once, keyed by sku"""
+
+        if not seller_skus:
+            return {}
+
+        brand_categories = db.session.query(cls.seller_sku, cls.category, cls.brand).filter(  # type: ignore  # noqa: FKA100
+            cls.account_id == account_id, cls.selling_partner_id == asp_id, cls.seller_sku.in_(seller_skus)).all()
+
+        return {brand_category.seller_sku: (brand_category.category, brand_category.brand) for brand_category in brand_categories}
+
     @classmethod
     def get_category_brand_by_asin(cls, account_id: str, asp_id: str, asin: str):
         """fetch category and brand by asin"""
@@ -289,8 +303,13 @@ class AzItemMaster(Base):
         return item
 
     @classmethod
-    def get_item_level(cls, account_id: str, asp_id: str, from_date=None, to_date=None, product: Optional[tuple] = None, brand: Optional[tuple] = None, category: Optional[tuple] = None, fba_inventory: Optional[bool] = False, sort_by: Any = None, sort_order: Any = None, page: Any = None, size: Any = None, fulfillment_channel: Optional[str] = None, status: Optional[str] = None):
-        """ Get Inventory level data"""
+    def get_item_level(cls, account_id: str, asp_id: str, from_date=None, to_date=None, product: Optional[tuple] = None, brand: Optional[tuple] = None, category: Optional[tuple] = None, fba_inventory: Optional[bool] = False, sort_by: Any = None, sort_order: Any = None, page: Any = None, size: Any = None, fulfillment_channel: Optional[str] = None, status: Optional[str] = None,
+                       cursor: Optional[list] = None, with_total: Optional[bool] = True):
+        """ Get Inventory level data.
+
+        With a cursor the page after it is read by keyset on (sort_by, seller_sku) as size + 1 rows,
+        and the total is only counted when with_total is set.
+        """
 
         prior_from_date, prior_to_date = get_prior_to_from_date(
             from_date=from_date, to_date=to_date)
@@ -494,8 +513,18 @@ class AzItemMaster(Base):
         if status:
             raw_query += ' AND im.status = :status'
 
-        count_query = f'SELECT COUNT(*) FROM ({raw_query}) AS total_count_query'
-        total_count_result = db.session.execute(text(count_query), params).scalar()  # type: ignore  # noqa: FKA100
+        total_count_result = None
+
+        if cursor is None or with_total:
+            count_query = f'SELECT COUNT(*) FROM ({raw_query}) AS total_count_query'
+            total_count_result = db.session.execute(text(count_query), params).scalar()  # type: ignore  # noqa: FKA100
+
+        if cursor is not None:
+            raw_query, cursor_params = get_keyset_query(raw_query=raw_query, sort_column=sort_by, tie_column='seller_sku', sort_order=sort_order,
+                                                        cursor=cursor, size=size)
+            results = db.session.execute(text(raw_query + ';'), {**params, **cursor_params}).fetchall()  # type: ignore  # noqa: FKA100
+
+            return results, len(results), total_count_result
 
         if sort_by is not None and sort_order is not None:
             if sort_order == SortingOrder.ASC.value:
@@ -730,15 +759,15 @@ class AzItemMaster(Base):
                     AND im.selling_partner_id = ls.asp_id
                     LEFT JOIN (
                         SELECT sum(app.units_sold) as units_sold,
-                        cast(app.shipment_date as DATE) as shipped_date,
+                        app.shipment_on as shipped_date,
                         app.seller_sku,
                         app.account_id as app_account_id,
                         app.asp_id as app_asp_id
                         from
                         az_product_performance as app
                         left join az_item_master as im on app.seller_sku=im.seller_sku
-                        WHERE cast(app.shipment_date as DATE) >= ({':from_date' if from_date is not None else 'CURRENT_DATE'} - INTERVAL '30 days')
-                        {f" AND cast(app.shipment_date as DATE) <= :from_date" if from_date is not None else ""}
+                        WHERE app.shipment_on >= ({':from_date' if from_date is not None else 'CURRENT_DATE'} - INTERVAL '30 days')
+                        {f" AND app.shipment_on <= :from_date" if from_date is not None else ""}
                         {f" AND im.category IN :category" if category else ""}
                         {f" AND im.brand IN :brand" if brand else ""}
                         {f" AND im.asin IN :product" if product else ""}
@@ -849,3 +878,47 @@ class AzItemMaster(Base):
         except IntegrityError as e:
             db.session.rollback()
             logger.info(f'IntegrityError while using upsert: {e}')
+
+    @classmethod
+    def upsert_items(cls, records: list) -> int:
+        """Insert or update item master listings in one statement, returns the number of listings written"""
+
+        if not records:
+            return 0
+
+        # Define the insert statement
+        insert_stmt = insert(AzItemMaster).values(records)
+
+        # Specify the conflict target and update values
+        conflict_target = ['account_id',
+                           'selling_partner_id', 'seller_sku']
+        update_values = {field: insert_stmt.excluded[field] for field in ('item_name', 'item_description', 'listing_id', 'price', 'asin',
+                                                                          'product_id', 'fulfillment_channel', 'status', 'max_retail_price')}
+        update_values['updated_at'] = int(time.time())
+
+        # Create the upsert statement
+        upsert_stmt = insert_stmt.on_conflict_do_update(
+            index_elements=conflict_target,
+            set_=update_values
+        )
+
+        db.session.execute(upsert_stmt)
+
+        db.session.commit()
+
+        return len(records)
+
+    @classmethod
+    def deactivate_missing_items(cls, account_id: str, selling_partner_id: str, seller_skus: set) -> int:
+        """Mark listings of the seller that are not in seller_skus as inactive, returns the number of listings updated"""
+
+        if not seller_skus:
+            return 0
+
+        result = db.session.query(cls).filter(cls.account_id == account_id, cls.selling_partner_id == selling_partner_id,
+                                              cls.seller_sku.not_in(seller_skus), cls.status.is_distinct_from(ItemMasterStatus.INACTIVE.name)).update(
+            {cls.status: ItemMasterStatus.INACTIVE.name, cls.updated_at: int(time.time())}, synchronize_session=False)  # type: ignore  # noqa: FKA100
+
+        db.session.commit()
+
+        return result
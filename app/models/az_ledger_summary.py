@@ -2,12 +2,25 @@
     Database model for storing ledger summary data in database
 """
 import time
+from typing import Optional
 
 from app import db
+from app.helpers.brand_category_helper import BrandCategoryLookup
 from app.helpers.constants import DbAnomalies
 from app.models.az_item_master import AzItemMaster
 from app.models.base import Base
 from sqlalchemy import func
+from sqlalchemy import Index
+from sqlalchemy.dialects.postgresql import insert
+
+# columns written from a ledger summary report row, the natural key columns included
+LEDGER_SUMMARY_REPORT_COLUMNS = ('date', 'fnsku', 'asin', 'msku', 'title', 'disposition', 'starting_warehouse_balance',
+                                 'in_transit_btw_warehouse', 'receipts', 'customer_shipments', 'customer_returns', 'vendor_returns',
+                                 'warehouse_transfer', 'found', 'lost', 'damaged', 'disposed', 'other_events',
+                                 'ending_warehouse_balance', 'unknown_events', 'location')
+
+# columns of the natural key of a ledger summary row besides account_id and asp_id
+LEDGER_SUMMARY_KEY_COLUMNS = ('date', 'fnsku', 'disposition', 'location')
 
 
 class AzLedgerSummary(Base):
@@ -45,21 +58,26 @@ class AzLedgerSummary(Base):
     created_at = db.Column(db.BigInteger)
     updated_at = db.Column(db.BigInteger)
 
+    __table_args__ = (db.UniqueConstraint('account_id', 'asp_id', 'date', 'fnsku', 'disposition', 'location',  # type: ignore  # noqa: FKA100
+                                          name='uq_az_ledger_summary_account_id_asp_id_date_fnsku_disp_loc'),
+                      Index('ix_az_ledger_summary_account_id_asp_id_disposition_date', 'account_id', 'asp_id', 'disposition', 'date',  # type: ignore  # noqa: FKA100
+                            postgresql_include=['msku', 'asin', 'ending_warehouse_balance']),)
+
     @classmethod
     def add_update(cls, account_id: str, asp_id: str, date: str, fnsku: str, asin: str,
                    msku: str, title: str, disposition: str, starting_warehouse_balance: int,
                    in_transit_btw_warehouse: int, receipts: int, customer_shipments: int, customer_returns: int, vendor_returns: int, warehouse_transfer: int,
-                   found: int, lost: int, damaged: int, disposed: int, other_events: int, ending_warehouse_balance: int, unknown_events: int, location: str):
+                   found: int, lost: int, damaged: int, disposed: int, other_events: int, ending_warehouse_balance: int, unknown_events: int, location: str, brand_category_lookup: Optional[BrandCategoryLookup] = None):
         """Insert if new ledger record according to date or update it."""
 
         category, brand = None, None
 
         if msku:
-            category, brand = AzItemMaster.get_category_brand_by_sku(
+            category, brand = (brand_category_lookup or AzItemMaster).get_category_brand_by_sku(
                 account_id=account_id, asp_id=asp_id, seller_sku=msku)
 
         ledger_summary = db.session.query(cls).filter(
-            cls.account_id == account_id, cls.asp_id == asp_id, cls.date == date, cls.asin == asin, cls.disposition == disposition, cls.location == location).first()
+            cls.account_id == account_id, cls.asp_id == asp_id, cls.date == date, cls.fnsku == fnsku, cls.disposition == disposition, cls.location == location).first()
 
         current_time = int(time.time())
         record = DbAnomalies.UPDATE.value
@@ -67,11 +85,11 @@ class AzLedgerSummary(Base):
         if ledger_summary == None:
             record = DbAnomalies.INSERTION.value
             ledger_summary = cls(account_id=account_id, asp_id=asp_id,
-                                 date=date, asin=asin, disposition=disposition, created_at=current_time)
+                                 date=date, fnsku=fnsku, disposition=disposition, created_at=current_time)
 
         ledger_summary.category = category
         ledger_summary.brand = brand
-        ledger_summary.fnsku = fnsku
+        ledger_summary.asin = asin
         ledger_summary.msku = msku
         ledger_summary.title = title
         ledger_summary.starting_warehouse_balance = starting_warehouse_balance
@@ -98,6 +116,54 @@ class AzLedgerSummary(Base):
 
         return ledger_summary
 
+    @classmethod
+    def bulk_upsert(cls, account_id: str, asp_id: str, ledger_rows: list, brand_category_lookup: Optional[BrandCategoryLookup] = None) -> int:
+        """Insert or update a chunk of ledger report rows keyed on (date, fnsku, disposition, location) in one transaction.
+
+        Returns the number of rows written.
+        """
+
+        # a statement may touch a row only once, the last report row of a key wins
+        staged_rows = {tuple(row[column] for column in LEDGER_SUMMARY_KEY_COLUMNS): row for row in ledger_rows}
+
+        if not staged_rows:
+            return 0
+
+        current_time = int(time.time())
+        rows = []
+
+        for row in staged_rows.values():
+            category, brand = None, None
+
+            if row['msku']:
+                category, brand = (brand_category_lookup or AzItemMaster).get_category_brand_by_sku(
+                    account_id=account_id, asp_id=asp_id, seller_sku=row['msku'])
+
+            rows.append({
+                **{column: row[column] for column in LEDGER_SUMMARY_REPORT_COLUMNS},
+                'account_id': account_id,
+                'asp_id': asp_id,
+                'category': category,
+                'brand': brand,
+                'created_at': current_time,
+                'updated_at': current_time
+            })
+
+        insert_stmt = insert(cls).values(rows)
+        upsert_stmt = insert_stmt.on_conflict_do_update(
+            constraint='uq_az_ledger_summary_account_id_asp_id_date_fnsku_disp_loc',
+            set_={
+                **{column: insert_stmt.excluded[column] for column in LEDGER_SUMMARY_REPORT_COLUMNS if column not in LEDGER_SUMMARY_KEY_COLUMNS},
+                'category': insert_stmt.excluded.category,
+                'brand': insert_stmt.excluded.brand,
+                'updated_at': current_time
+            }
+        )
+        db.session.execute(upsert_stmt)
+        db.session.commit()
+
+        return len(rows)
+
     @classmethod
     def get_inventory_by_location(cls, account_id: str, asp_id: str):
         """get inventory by location , groupyby and count from ledger table"""
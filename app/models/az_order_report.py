@@ -6,14 +6,35 @@ from typing import Any
 from typing import Optional
 
 from app import db
+from app.helpers.brand_category_helper import BrandCategoryLookup
 from app.helpers.constants import SortingOrder
+from app.helpers.pagination_helper import get_keyset_filter
+from app.helpers.utility import parse_report_date
+from app.helpers.utility import parse_report_timestamp
 from app.models.az_item_master import AzItemMaster
 from app.models.base import Base
+from sqlalchemy import and_
 from sqlalchemy import cast
-from sqlalchemy import Date
+from sqlalchemy import column
 from sqlalchemy import desc
 from sqlalchemy import func
+from sqlalchemy import Index
+from sqlalchemy import literal
+from sqlalchemy import select
+from sqlalchemy import text
+from sqlalchemy import UniqueConstraint
+from sqlalchemy import values
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import aliased
+from sqlalchemy.orm import validates
+
+# Order report fields written by the bulk upsert, in report order.
+ORDER_REPORT_FIELDS = ('amazon_order_id', 'merchant_order_id', 'purchase_date', 'last_updated_date', 'order_status', 'fulfillment_channel', 'sales_channel',
+                       'ship_service_level', 'product_name', 'sku', 'asin', 'item_status', 'quantity', 'currency', 'item_price', 'item_tax',
+                       'shipping_price', 'shipping_tax', 'gift_wrap_price', 'gift_wrap_tax', 'item_promotion_discount', 'ship_promotion_discount',
+                       'ship_city', 'ship_state', 'ship_postal_code', 'ship_country')
+# Typed columns derived from purchase_date and last_updated_date.
+ORDER_REPORT_DATE_FIELDS = ('purchase_on', 'purchase_at', 'last_updated_at')
 
 
 class AzOrderReport(Base):
@@ -31,7 +52,10 @@ class AzOrderReport(Base):
     amazon_order_id = db.Column(db.String(255))
     merchant_order_id = db.Column(db.String(255))
     purchase_date = db.Column(db.String(255))
+    purchase_on = db.Column(db.Date, nullable=True)
+    purchase_at = db.Column(db.DateTime(timezone=True), nullable=True)
     last_updated_date = db.Column(db.String(255))
+    last_updated_at = db.Column(db.DateTime(timezone=True), nullable=True)
     order_status = db.Column(db.String(255))
     fulfillment_channel = db.Column(db.String(255))
     sales_channel = db.Column(db.String(255))
@@ -57,6 +81,20 @@ class AzOrderReport(Base):
     created_at = db.Column(db.BigInteger)
     updated_at = db.Column(db.BigInteger)
 
+    __table_args__ = (UniqueConstraint('account_id', 'amazon_order_id', 'sku', name='uq_az_order_report_account_id_amazon_order_id_sku'),  # type: ignore  # noqa: FKA100
+                      Index('ix_az_order_report_account_id_selling_partner_id_purchase_on', 'account_id', 'selling_partner_id', 'purchase_on',  # type: ignore  # noqa: FKA100
+                            postgresql_include=['asin', 'sku', 'quantity', 'item_price'], postgresql_where=text('item_price IS NOT NULL')),)
+
+    @validates('purchase_date', 'last_updated_date')     # type: ignore  # noqa: FKA100
+    def validate_report_date(self, key: str, value: Any) -> Any:
+        """Keep the typed date columns in step with the report date strings"""
+        if key == 'purchase_date':
+            self.purchase_on = parse_report_date(value)
+            self.purchase_at = parse_report_timestamp(value)
+        elif key == 'last_updated_date':
+            self.last_updated_at = parse_report_timestamp(value)
+        return value
+
     @classmethod
     def add(cls, account_id: str, selling_partner_id: str, amazon_order_id: str, merchant_order_id: str, purchase_date: str, last_updated_date: str,
             order_status: str, fulfillment_channel: str, sales_channel: str,
@@ -64,12 +102,12 @@ class AzOrderReport(Base):
             quantity: int, currency: str, item_price: float, item_tax: float, shipping_price: float,
             shipping_tax: float, gift_wrap_price: float, gift_wrap_tax: float, item_promotion_discount: float,
             ship_promotion_discount: float, ship_city: str, ship_state: str, ship_postal_code: str,
-            ship_country: str):
+            ship_country: str, brand_category_lookup: Optional[BrandCategoryLookup] = None):
         """Create a new Order"""
 
         category, brand = None, None
         if sku:
-            category, brand = AzItemMaster.get_category_brand_by_sku(
+            category, brand = (brand_category_lookup or AzItemMaster).get_category_brand_by_sku(
                 account_id=account_id, asp_id=selling_partner_id, seller_sku=sku)
 
         order = cls()
@@ -121,22 +159,31 @@ class AzOrderReport(Base):
         return item
 
     @classmethod
-    def get_purchased_date_orders(cls, account_id: str, asp_id: str, from_date: str, to_date: str, page: Any = None, size: Any = None, category: Optional[tuple] = None, brand: Optional[tuple] = None, product: Optional[tuple] = None):
-        """Get all orders by date"""
+    def get_purchased_date_orders(cls, account_id: str, asp_id: str, from_date: str, to_date: str, page: Any = None, size: Any = None, category: Optional[tuple] = None, brand: Optional[tuple] = None, product: Optional[tuple] = None,
+                                  cursor: Optional[list] = None, with_total: Optional[bool] = True):
+        """Get all orders by date.
+
+        With a cursor the page after it is read by keyset on (purchase_at, id) as size + 1 rows,
+        and the total is only counted when with_total is set.
+        """
 
         total_count = None
 
         im_alias = aliased(AzItemMaster)
 
-        purchase_date_cast = cast(cls.purchase_date, Date)
-
-        result_query = db.session.query(cls, cls.item_price, cls.sku, cls.quantity, cls.purchase_date, cls.product_name, cls.asin, im_alias.face_image)  # type: ignore  # noqa: FKA100
+        result_query = db.session.query(cls, cls.item_price, cls.sku, cls.quantity, cls.purchase_date, cls.product_name, cls.asin, im_alias.face_image, cls.purchase_at, cls.id)  # type: ignore  # noqa: FKA100
         result_query = result_query.join(im_alias, cls.sku == im_alias.seller_sku, isouter=True)  # type: ignore  # noqa: FKA100
-        result_query = result_query.filter(cls.account_id == account_id, cls.selling_partner_id == asp_id, purchase_date_cast.between(from_date, to_date), cls.item_price != None, cls.category.in_(category) if category else True, cls.brand.in_(brand) if brand else True, cls.asin.in_(product) if product else True).order_by(cls.purchase_date.desc())  # type: ignore  # noqa: FKA100
+        result_query = result_query.filter(cls.account_id == account_id, cls.selling_partner_id == asp_id, cls.purchase_on.between(from_date, to_date), cls.item_price != None, cls.category.in_(category) if category else True, cls.brand.in_(brand) if brand else True, cls.asin.in_(product) if product else True)  # type: ignore  # noqa: FKA100
 
-        if total_count is None:
+        if cursor is None or with_total:
             total_count = result_query.count()
 
+        if cursor is not None:
+            result_query = result_query.filter(cls.purchase_at != None, get_keyset_filter(sort_column=cls.purchase_at, tie_column=cls.id, descending=True, cursor=cursor))  # type: ignore  # noqa: FKA100
+            return result_query.order_by(cls.purchase_at.desc(), cls.id.desc()).limit(int(size) + 1).all(), total_count  # type: ignore  # noqa: FKA100
+
+        result_query = result_query.order_by(cls.purchase_at.desc())
+
         if page and size:
             page = int(page) - 1
             size = int(size)
@@ -153,8 +200,6 @@ class AzOrderReport(Base):
 
         im_alias = aliased(AzItemMaster)
 
-        purchase_date_cast = cast(cls.purchase_date, Date)
-
         result_query = db.session.query(cls.asin, func.sum(cls.item_price).label('gross_sales'),        # type: ignore  # noqa: FKA100
                                         func.max(cls.sku).label('sku'),
                                         func.sum(cls.quantity).label(
@@ -163,7 +208,7 @@ class AzOrderReport(Base):
                                             'product_name'),
                                         func.max(im_alias.face_image).label('product_image'))  # type: ignore  # noqa: FKA100
         result_query = result_query.join(im_alias, cls.sku == im_alias.seller_sku, isouter=True)  # type: ignore  # noqa: FKA100
-        result_query = result_query.filter(cls.account_id == account_id, cls.selling_partner_id == asp_id, purchase_date_cast.between(from_date, to_date), cls.item_price != None, cls.category.in_(category) if category else True, cls.brand.in_(brand) if brand else True, cls.asin.in_(product) if product else True).group_by(cls.asin)  # type: ignore  # noqa: FKA100
+        result_query = result_query.filter(cls.account_id == account_id, cls.selling_partner_id == asp_id, cls.purchase_on.between(from_date, to_date), cls.item_price != None, cls.category.in_(category) if category else True, cls.brand.in_(brand) if brand else True, cls.asin.in_(product) if product else True).group_by(cls.asin)  # type: ignore  # noqa: FKA100
 
         if sort_order == SortingOrder.ASC.value:
             result_query = result_query.group_by(
@@ -183,13 +228,13 @@ class AzOrderReport(Base):
                       quantity: int, currency: str, item_price: float, item_tax: float, shipping_price: float,
                       shipping_tax: float, gift_wrap_price: float, gift_wrap_tax: float, item_promotion_discount: float,
                       ship_promotion_discount: float, ship_city: str, ship_state: str, ship_postal_code: str,
-                      ship_country: str):
+                      ship_country: str, brand_category_lookup: Optional[BrandCategoryLookup] = None):
         """update orders according to amazon id from orders table"""
 
         category, brand = None, None
 
         if sku:
-            category, brand = AzItemMaster.get_category_brand_by_sku(
+            category, brand = (brand_category_lookup or AzItemMaster).get_category_brand_by_sku(
                 account_id=account_id, asp_id=selling_partner_id, seller_sku=sku)
 
         order = db.session.query(cls).filter(
@@ -238,3 +283,51 @@ class AzOrderReport(Base):
 
         return db.session.query(cls).filter(
             cls.selling_partner_id == selling_partner_id, cls.amazon_order_id == amazon_order_id, cls.sku == sku).first()
+
+    @classmethod
+    def bulk_upsert_orders(cls, account_id: str, selling_partner_id: str, orders: list) -> int:
+        """Insert or update a chunk of order report rows in a single statement.
+
+        Rows are matched on (account_id, amazon_order_id, sku); category and brand are
+        resolved by joining the item master on sku. Returns the number of rows written.
+        """
+
+        # a statement may touch a row only once, the last line for an order item wins as before
+        staged_orders = {(order.get('amazon_order_id'), order.get('sku')): order for order in orders}
+
+        if not staged_orders:
+            return 0
+
+        # text fields are sent as str so a VALUES column never mixes numeric and text literals
+        text_fields = {field for field in ORDER_REPORT_FIELDS if isinstance(cls.__table__.c[field].type, db.String)}
+        # the typed date columns are parsed here as the bulk insert bypasses the model validator
+        rows = [tuple(str(order.get(field)) if field in text_fields and order.get(field) is not None else order.get(field) for field in ORDER_REPORT_FIELDS)
+                + (parse_report_date(order.get('purchase_date')), parse_report_timestamp(order.get('purchase_date')), parse_report_timestamp(order.get('last_updated_date')))
+                for order in staged_orders.values()]
+        fields = (*ORDER_REPORT_FIELDS, *ORDER_REPORT_DATE_FIELDS)
+
+        staged = values(*[column(field, cls.__table__.c[field].type) for field in fields], name='staged_orders').data(rows)  # type: ignore  # noqa: FKA100
+
+        im_alias = aliased(AzItemMaster)
+        current_time = int(time.time())
+
+        select_stmt = select(literal(account_id).label('account_id'), literal(selling_partner_id).label('selling_partner_id'),  # type: ignore  # noqa: FKA100
+                             im_alias.category, im_alias.brand, *[cast(staged.c[field], cls.__table__.c[field].type).label(field) for field in fields],
+                             literal(current_time).label('created_at'))
+        select_stmt = select_stmt.select_from(staged).join(im_alias, and_(im_alias.account_id == account_id, im_alias.selling_partner_id == selling_partner_id,  # type: ignore  # noqa: FKA100
+                                                                          im_alias.seller_sku == staged.c.sku), isouter=True)
+
+        insert_stmt = insert(cls).from_select(['account_id', 'selling_partner_id', 'category', 'brand', *fields, 'created_at'], select_stmt)  # type: ignore  # noqa: FKA100
+
+        update_values = {field: insert_stmt.excluded[field] for field in ('selling_partner_id', 'category', 'brand', *fields) if field not in ('amazon_order_id', 'sku')}
+        update_values['updated_at'] = current_time
+
+        upsert_stmt = insert_stmt.on_conflict_do_update(
+            constraint='uq_az_order_report_account_id_amazon_order_id_sku',
+            set_=update_values
+        )
+
+        db.session.execute(upsert_stmt)
+        db.session.commit()
+
+        return len(staged_orders)
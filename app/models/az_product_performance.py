@@ -7,12 +7,17 @@ from typing import Any
 from typing import Optional
 
 from app import db
+from app.helpers.brand_category_helper import BrandCategoryLookup
 from app.helpers.constants import AzFbaReturnsReportType
 from app.helpers.constants import SortingOrder
+from app.helpers.pagination_helper import get_keyset_query
 from app.helpers.utility import get_prior_to_from_date
+from app.helpers.utility import parse_report_date
 from app.models.az_item_master import AzItemMaster
 from app.models.base import Base
+from sqlalchemy import Index
 from sqlalchemy import text
+from sqlalchemy.orm import validates
 
 
 class AzProductPerformance(Base):
@@ -38,22 +43,38 @@ class AzProductPerformance(Base):
     reverse_fba_fee = db.Column(db.Numeric, nullable=True)
     returns = db.Column(db.Numeric, nullable=True)
     shipment_date = db.Column(db.String(255))
+    shipment_on = db.Column(db.Date, nullable=True)
     refund_date = db.Column(db.String(255))
+    refund_on = db.Column(db.Date, nullable=True)
     summary_analysis = db.Column(db.JSON, nullable=True)
     created_at = db.Column(db.BigInteger)
     updated_at = db.Column(db.BigInteger, nullable=True)
     deactivated_at = db.Column(db.BigInteger, nullable=True)
 
+    __table_args__ = (Index('ix_az_product_performance_account_id_asp_id_shipment_on', 'account_id', 'asp_id', 'shipment_on',  # type: ignore  # noqa: FKA100
+                            postgresql_include=['seller_sku', 'az_order_id', 'units_sold', 'gross_sales', 'market_place_fee', 'refund_on', 'units_returned', 'returns']),
+                      Index('ix_az_product_performance_account_id_asp_id_refund_on', 'account_id', 'asp_id', 'refund_on', postgresql_where=text('refund_on IS NOT NULL')),  # type: ignore  # noqa: FKA100
+                      Index('ix_az_product_performance_account_id_asp_id_az_order_id', 'account_id', 'asp_id', 'az_order_id'),)  # type: ignore  # noqa: FKA100
+
+    @validates('shipment_date', 'refund_date')     # type: ignore  # noqa: FKA100
+    def validate_report_date(self, key: str, value: Any) -> Any:
+        """Keep the typed date columns in step with the report date strings"""
+        if key == 'shipment_date':
+            self.shipment_on = parse_report_date(value)
+        elif key == 'refund_date':
+            self.refund_on = parse_report_date(value)
+        return value
+
     @staticmethod
     def create(account_id: str, az_order_id: str, asp_id: str, seller_order_id=None, seller_sku=None, gross_sales=None,
                expenses=None, units_sold=None, units_returned=None, market_place_fee=None, forward_fba_fee=None,
-               reverse_fba_fee=None, returns=None, shipment_date=None, refund_date=None, summary_analysis=None):
+               reverse_fba_fee=None, returns=None, shipment_date=None, refund_date=None, summary_analysis=None, brand_category_lookup: Optional[BrandCategoryLookup] = None):
         """ Create a new product with its performance calculations"""
 
         category, brand = None, None
 
         if seller_sku:
-            category, brand = AzItemMaster.get_category_brand_by_sku(
+            category, brand = (brand_category_lookup or AzItemMaster).get_category_brand_by_sku(
                 account_id=account_id, asp_id=asp_id, seller_sku=seller_sku)
 
         product = AzProductPerformance(
@@ -83,13 +104,13 @@ class AzProductPerformance(Base):
 
     @classmethod
     def update(cls, account_id: str, az_order_id: str, asp_id: str, seller_sku: str, seller_order_id=None, gross_sales=None, expenses=None,
-               units_sold=None, units_returned=None, market_place_fee=None, forward_fba_fee=None, reverse_fba_fee=None, returns=None, shipment_date=None, refund_date=None, summary_analysis=None):
+               units_sold=None, units_returned=None, market_place_fee=None, forward_fba_fee=None, reverse_fba_fee=None, returns=None, shipment_date=None, refund_date=None, summary_analysis=None, brand_category_lookup: Optional[BrandCategoryLookup] = None):
         """ Update product performance """
 
         category, brand = None, None
 
         if seller_sku:
-            category, brand = AzItemMaster.get_category_brand_by_sku(
+            category, brand = (brand_category_lookup or AzItemMaster).get_category_brand_by_sku(
                 account_id=account_id, asp_id=asp_id, seller_sku=seller_sku)
 
         product = db.session.query(cls).filter(
@@ -144,6 +165,54 @@ class AzProductPerformance(Base):
 
         return product
 
+    @classmethod
+    def bulk_add_update(cls, account_id: str, asp_id: str, performances: list) -> set:
+        """Create or update product performance of many orders with one lookup and a single commit.
+
+        Rows are matched on (az_order_id, seller_sku); like update(), values that are None
+        do not overwrite what is stored. Returns the shipment and refund days touched, before and after the change.
+        """
+
+        if not performances:
+            return set()
+
+        az_order_ids = {performance['az_order_id'] for performance in performances}
+
+        existing_products = db.session.query(cls).filter(cls.account_id == account_id, cls.asp_id == asp_id,
+                                                         cls.az_order_id.in_(az_order_ids)).order_by(cls.id.asc()).all()
+
+        product_map: dict = {}
+        for product in existing_products:
+            product_map.setdefault((product.az_order_id, product.seller_sku), product)  # type: ignore  # noqa: FKA100
+
+        current_time = int(time.time())
+        days = set()
+
+        for performance in performances:
+            key = (performance['az_order_id'], performance['seller_sku'])
+            product = product_map.get(key)
+
+            if product is None:
+                product = cls(account_id=account_id, asp_id=asp_id, created_at=current_time, **performance)
+                db.session.add(product)
+                product_map[key] = product
+                days.update((product.shipment_on, product.refund_on))
+                continue
+
+            days.update((product.shipment_on, product.refund_on))
+
+            for field, value in performance.items():
+                if value is not None:
+                    setattr(product, field, value)     # type: ignore  # noqa: FKA100
+
+            product.updated_at = current_time
+            days.update((product.shipment_on, product.refund_on))
+
+        db.session.commit()
+
+        days.discard(None)
+        return days
+
     @classmethod
     def get_by_az_order_id(cls, account_id: str, asp_id: str, az_order_id: str, seller_sku: Optional[str] = None) -> Any:
         """Filter record by Amazon order id"""
@@ -158,8 +227,13 @@ class AzProductPerformance(Base):
 
     @classmethod
     def get_performance(cls, account_id: str, asp_id: str, from_date: str, to_date: str, category: Optional[tuple] = None, brand: Optional[tuple] = None,
-                        product: Optional[tuple] = None, sort_by: Any = None, sort_order: Any = None, page: Any = None, size: Any = None, calculate_total: Optional[bool] = False):
-        """Get Product Performance - sales, refund, market place fee, etc"""
+                        product: Optional[tuple] = None, sort_by: Any = None, sort_order: Any = None, page: Any = None, size: Any = None, calculate_total: Optional[bool] = False,
+                        cursor: Optional[list] = None, with_total: Optional[bool] = True):
+        """Get Product Performance - sales, refund, market place fee, etc, from the daily rollup.
+
+        With a cursor the page after it is read by keyset on (sort_by, seller_sku) as size + 1 rows,
+        and the total is only counted when with_total is set.
+        """
 
         prior_from_date, prior_to_date = get_prior_to_from_date(
             from_date=from_date, to_date=to_date)
@@ -197,24 +271,20 @@ class AzProductPerformance(Base):
                         (c.total_units_sold - c.total_units_returned) * ac.product_cost AS cogs
                         FROM (
                         SELECT
-                            pp.seller_sku,
-                            SUM(pp.gross_sales) AS total_gross_sales,
-                            SUM(pp.units_sold) AS total_units_sold,
-                            count(pp.az_order_id) AS order_count,
-                            SUM(CASE WHEN CAST(pp.refund_date AS DATE) BETWEEN :from_date AND :to_date THEN pp.returns ELSE 0 END) AS total_refunds,
-                            SUM(CASE WHEN CAST(pp.refund_date AS DATE) BETWEEN :from_date AND :to_date THEN pp.units_returned ELSE 0 END) AS total_units_returned,
-                            SUM(CASE
-                                WHEN (CAST(pp.shipment_date AS DATE) BETWEEN :from_date AND :to_date) OR
-                                    (CAST(pp.refund_date AS DATE) BETWEEN :from_date AND :to_date) THEN pp.market_place_fee
-                                ELSE 0
-                            END) AS market_place_fee
-                            FROM az_product_performance AS pp
+                            d.seller_sku,
+                            SUM(d.gross_sales) AS total_gross_sales,
+                            SUM(d.units_sold) AS total_units_sold,
+                            CAST(SUM(d.order_count) AS BIGINT) AS order_count,
+                            SUM(d.refunds) AS total_refunds,
+                            SUM(d.units_returned) AS total_units_returned,
+                            SUM(d.market_place_fee) AS market_place_fee
+                            FROM az_product_performance_daily AS d
                             WHERE
-                            pp.account_id = :account_id
-                            AND pp.asp_id = :asp_id
-                            AND pp.units_sold != 0
-                            AND CAST(pp.shipment_date AS DATE) BETWEEN :from_date AND :to_date
-                            GROUP BY pp.seller_sku
+                            d.account_id = :account_id
+                            AND d.asp_id = :asp_id
+                            AND d.day BETWEEN :from_date AND :to_date
+                            GROUP BY d.seller_sku
+                            HAVING SUM(d.order_count) > 0
                         ) c
                         LEFT JOIN az_item_master AS im ON c.seller_sku = im.seller_sku
                         INNER JOIN (
@@ -346,44 +416,36 @@ class AzProductPerformance(Base):
                         END AS profit_percentage_growth
                         FROM (
                         SELECT
-                            pp.seller_sku,
-                            SUM(pp.gross_sales) AS total_gross_sales,
-                            SUM(pp.units_sold) AS total_units_sold,
-                            count(pp.az_order_id) AS order_count,
-                            SUM(CASE WHEN CAST(pp.refund_date AS DATE) BETWEEN :from_date AND :to_date THEN pp.returns ELSE 0 END) AS total_refunds,
-                            SUM(CASE WHEN CAST(pp.refund_date AS DATE) BETWEEN :from_date AND :to_date THEN pp.units_returned ELSE 0 END) AS total_units_returned,
-                            SUM(CASE
-                                WHEN (CAST(pp.shipment_date AS DATE) BETWEEN :from_date AND :to_date) OR
-                                    (CAST(pp.refund_date AS DATE) BETWEEN :from_date AND :to_date) THEN pp.market_place_fee
-                                ELSE 0
-                            END) AS market_place_fee
-                            FROM az_product_performance AS pp
+                            d.seller_sku,
+                            SUM(d.gross_sales) AS total_gross_sales,
+                            SUM(d.units_sold) AS total_units_sold,
+                            CAST(SUM(d.order_count) AS BIGINT) AS order_count,
+                            SUM(d.refunds) AS total_refunds,
+                            SUM(d.units_returned) AS total_units_returned,
+                            SUM(d.market_place_fee) AS market_place_fee
+                            FROM az_product_performance_daily AS d
                             WHERE
-                            pp.account_id = :account_id
-                            AND pp.asp_id = :asp_id
-                            AND pp.units_sold != 0
-                            AND CAST(pp.shipment_date AS DATE) BETWEEN :from_date AND :to_date
-                            GROUP BY pp.seller_sku
+                            d.account_id = :account_id
+                            AND d.asp_id = :asp_id
+                            AND d.day BETWEEN :from_date AND :to_date
+                            GROUP BY d.seller_sku
+                            HAVING SUM(d.order_count) > 0
                         ) c
                         LEFT JOIN (
                         SELECT
-                            pp.seller_sku,
-                            SUM(pp.gross_sales) AS _previous_gross_sales,
-                            SUM(pp.units_sold) AS _previous_units_sold,
-                            count(pp.az_order_id) AS _previous_order_count,
-                            SUM(CASE WHEN CAST(pp.refund_date AS DATE) BETWEEN :prior_from_date AND :prior_to_date THEN pp.returns ELSE 0 END) AS _previous_refunds,
-                            SUM(CASE WHEN CAST(pp.refund_date AS DATE) BETWEEN :prior_from_date AND :prior_to_date THEN pp.units_returned ELSE 0 END) AS _previous_units_returned,
-                            SUM(CASE
-                                WHEN (CAST(pp.shipment_date AS DATE) BETWEEN :prior_from_date AND :prior_to_date) OR
-                                    (CAST(pp.refund_date AS DATE) BETWEEN :prior_from_date AND :prior_to_date) THEN pp.market_place_fee
-                                ELSE 0
-                            END) AS _previous_market_place_fee
-                        FROM az_product_performance AS pp
-                        WHERE pp.account_id = :account_id
-                        AND pp.asp_id = :asp_id
-                        AND pp.units_sold != 0
-                        AND CAST(pp.shipment_date AS DATE) BETWEEN :prior_from_date AND :prior_to_date
-                        GROUP BY pp.seller_sku
+                            d.seller_sku,
+                            SUM(d.gross_sales) AS _previous_gross_sales,
+                            SUM(d.units_sold) AS _previous_units_sold,
+                            CAST(SUM(d.order_count) AS BIGINT) AS _previous_order_count,
+                            SUM(d.refunds) AS _previous_refunds,
+                            SUM(d.units_returned) AS _previous_units_returned,
+                            SUM(d.market_place_fee) AS _previous_market_place_fee
+                        FROM az_product_performance_daily AS d
+                        WHERE d.account_id = :account_id
+                        AND d.asp_id = :asp_id
+                        AND d.day BETWEEN :prior_from_date AND :prior_to_date
+                        GROUP BY d.seller_sku
+                        HAVING SUM(d.order_count) > 0
                         ) _p ON c.seller_sku = _p.seller_sku
                         LEFT JOIN az_item_master AS im ON c.seller_sku = im.seller_sku
                         INNER JOIN (
@@ -410,9 +472,19 @@ class AzProductPerformance(Base):
 
         if not calculate_total:
 
-            count_query = f'SELECT COUNT(*) FROM ({raw_query}) AS total_count_query'
+            total_count_result = None
+
+            if cursor is None or with_total:
+                count_query = f'SELECT COUNT(*) FROM ({raw_query}) AS total_count_query'
+
+                total_count_result = db.session.execute(text(count_query), params).scalar()  # type: ignore  # noqa: FKA100
 
-            total_count_result = db.session.execute(text(count_query), params).scalar()  # type: ignore  # noqa: FKA100
+            if cursor is not None:
+                raw_query, cursor_params = get_keyset_query(raw_query=raw_query, sort_column=sort_by, tie_column='seller_sku', sort_order=sort_order,
+                                                            cursor=cursor, size=size)
+                results = db.session.execute(text(raw_query + ';'), {**params, **cursor_params}).fetchall()  # type: ignore  # noqa: FKA100
+
+                return results, len(results), total_count_result
 
             if sort_by is not None and sort_order is not None:
                 if sort_order == SortingOrder.ASC.value:
@@ -457,7 +529,7 @@ class AzProductPerformance(Base):
                         SUM(units_returned)::int as total_units_returned,
                         SUM(returns)::numeric(10,2) as total_refunds,
                         (SUM(gross_sales)/NULLIF(SUM(units_sold),0))::numeric(10,2) as average_selling_price,
-                        CAST(shipment_date as DATE) as shipped_date
+                        shipment_on as shipped_date
                     FROM az_product_performance
                         WHERE
                         account_id = :account_id
@@ -466,7 +538,7 @@ class AzProductPerformance(Base):
                         AND
                         seller_sku = :seller_sku
                         AND
-                        CAST(shipment_date as DATE) BETWEEN :from_date and :to_date
+                        shipment_on BETWEEN :from_date and :to_date
                         AND
                         shipment_date is not null
                     group by
@@ -523,19 +595,19 @@ class AzProductPerformance(Base):
 
         raw_query = f'''
                     SELECT
-                        SUM(CASE WHEN cast(app.shipment_date as DATE) BETWEEN :from_date AND :to_date THEN app.units_sold ELSE 0 END)::INT AS total_units_sold,
-                        SUM(CASE WHEN cast(app.shipment_date as DATE) BETWEEN :from_date AND :to_date THEN app.gross_sales ELSE 0 END)::NUMERIC(10, 2) AS total_gross_sales,
-                        SUM(CASE WHEN cast(app.refund_date as DATE) BETWEEN :from_date AND :to_date THEN app.units_returned ELSE 0 END)::INT AS total_units_returned,
-                        SUM(CASE WHEN cast(app.refund_date as DATE) BETWEEN :from_date AND :to_date THEN app.returns ELSE 0 END)::NUMERIC(10, 2) AS total_refunds,
-                        SUM(CASE WHEN CAST(app.refund_date AS DATE) BETWEEN :from_date AND :to_date THEN app.market_place_fee ELSE 0 END)::NUMERIC(10, 2) AS market_place_fee,
-                        SUM((CASE WHEN cast(app.shipment_date as DATE) BETWEEN :from_date AND :to_date THEN app.units_sold ELSE 0 END - CASE WHEN cast(app.refund_date as DATE) BETWEEN :from_date AND :to_date THEN app.units_returned ELSE 0 END) * im.cogs) AS cogs,
-
-                        SUM(CASE WHEN cast(app.shipment_date as DATE) BETWEEN :prior_from_date AND :prior_to_date THEN app.units_sold ELSE 0 END)::INT AS prior_total_units_sold,
-                        SUM(CASE WHEN cast(app.shipment_date as DATE) BETWEEN :prior_from_date AND :prior_to_date THEN app.gross_sales ELSE 0 END)::NUMERIC(10, 2) AS prior_total_gross_sales,
-                        SUM(CASE WHEN cast(app.refund_date as DATE) BETWEEN :prior_from_date AND :prior_to_date THEN app.units_returned ELSE 0 END)::INT AS prior_total_units_returned,
-                        SUM(CASE WHEN cast(app.refund_date as DATE) BETWEEN :prior_from_date AND :prior_to_date THEN app.returns ELSE 0 END)::NUMERIC(10, 2) AS prior_total_refunds,
-                        SUM(CASE WHEN CAST(app.refund_date AS DATE) BETWEEN :prior_from_date AND :prior_to_date THEN app.market_place_fee ELSE 0 END)::NUMERIC(10, 2) AS prior_market_place_fee,
-                        SUM((CASE WHEN cast(app.shipment_date as DATE) BETWEEN :prior_from_date AND :prior_to_date THEN app.units_sold ELSE 0 END - CASE WHEN cast(app.refund_date as DATE) BETWEEN :prior_from_date AND :prior_to_date THEN app.units_returned ELSE 0 END) * im.cogs) AS prior_cogs,
+                        SUM(CASE WHEN app.shipment_on BETWEEN :from_date AND :to_date THEN app.units_sold ELSE 0 END)::INT AS total_units_sold,
+                        SUM(CASE WHEN app.shipment_on BETWEEN :from_date AND :to_date THEN app.gross_sales ELSE 0 END)::NUMERIC(10, 2) AS total_gross_sales,
+                        SUM(CASE WHEN app.refund_on BETWEEN :from_date AND :to_date THEN app.units_returned ELSE 0 END)::INT AS total_units_returned,
+                        SUM(CASE WHEN app.refund_on BETWEEN :from_date AND :to_date THEN app.returns ELSE 0 END)::NUMERIC(10, 2) AS total_refunds,
+                        SUM(CASE WHEN app.refund_on BETWEEN :from_date AND :to_date THEN app.market_place_fee ELSE 0 END)::NUMERIC(10, 2) AS market_place_fee,
+                        SUM((CASE WHEN app.shipment_on BETWEEN :from_date AND :to_date THEN app.units_sold ELSE 0 END - CASE WHEN app.refund_on BETWEEN :from_date AND :to_date THEN app.units_returned ELSE 0 END) * im.cogs) AS cogs,
+
+                        SUM(CASE WHEN app.shipment_on BETWEEN :prior_from_date AND :prior_to_date THEN app.units_sold ELSE 0 END)::INT AS prior_total_units_sold,
+                        SUM(CASE WHEN app.shipment_on BETWEEN :prior_from_date AND :prior_to_date THEN app.gross_sales ELSE 0 END)::NUMERIC(10, 2) AS prior_total_gross_sales,
+                        SUM(CASE WHEN app.refund_on BETWEEN :prior_from_date AND :prior_to_date THEN app.units_returned ELSE 0 END)::INT AS prior_total_units_returned,
+                        SUM(CASE WHEN app.refund_on BETWEEN :prior_from_date AND :prior_to_date THEN app.returns ELSE 0 END)::NUMERIC(10, 2) AS prior_total_refunds,
+                        SUM(CASE WHEN app.refund_on BETWEEN :prior_from_date AND :prior_to_date THEN app.market_place_fee ELSE 0 END)::NUMERIC(10, 2) AS prior_market_place_fee,
+                        SUM((CASE WHEN app.shipment_on BETWEEN :prior_from_date AND :prior_to_date THEN app.units_sold ELSE 0 END - CASE WHEN app.refund_on BETWEEN :prior_from_date AND :prior_to_date THEN app.units_returned ELSE 0 END) * im.cogs) AS prior_cogs,
 
                         {f" INITCAP(pcm.state_name) as state," if not zone else ""}
                         INITCAP(pcm.zone) as zone
@@ -548,8 +620,8 @@ class AzProductPerformance(Base):
                     LEFT JOIN
                         postal_code_master AS pcm ON CAST(CAST(aor.ship_postal_code AS NUMERIC) AS BIGINT) = pcm.pincode
                     WHERE
-                        (cast(app.shipment_date as DATE) BETWEEN :prior_from_date AND :to_date
-                        OR cast(app.refund_date as DATE) BETWEEN :prior_from_date AND :to_date)
+                        (app.shipment_on BETWEEN :prior_from_date AND :to_date
+                        OR app.refund_on BETWEEN :prior_from_date AND :to_date)
                         AND app.account_id = :account_id
                         AND app.asp_id = :asp_id
                         AND app.seller_sku IS NOT NULL
@@ -593,10 +665,10 @@ class AzProductPerformance(Base):
 
         raw_query = f'''
                     SELECT
-                        SUM(CASE WHEN cast(app.shipment_date as DATE) BETWEEN :from_date AND :to_date THEN app.units_sold ELSE 0 END)::INT AS total_units_sold,
-                        SUM(CASE WHEN cast(app.shipment_date as DATE) BETWEEN :from_date AND :to_date THEN app.gross_sales ELSE 0 END)::NUMERIC(10, 2) AS total_gross_sales,
-                        SUM(CASE WHEN cast(app.refund_date as DATE) BETWEEN :from_date AND :to_date THEN app.units_returned ELSE 0 END)::INT AS total_units_returned,
-                        SUM(CASE WHEN cast(app.refund_date as DATE) BETWEEN :from_date AND :to_date THEN app.returns ELSE 0 END)::NUMERIC(10, 2) AS total_refunds,
+                        SUM(CASE WHEN app.shipment_on BETWEEN :from_date AND :to_date THEN app.units_sold ELSE 0 END)::INT AS total_units_sold,
+                        SUM(CASE WHEN app.shipment_on BETWEEN :from_date AND :to_date THEN app.gross_sales ELSE 0 END)::NUMERIC(10, 2) AS total_gross_sales,
+                        SUM(CASE WHEN app.refund_on BETWEEN :from_date AND :to_date THEN app.units_returned ELSE 0 END)::INT AS total_units_returned,
+                        SUM(CASE WHEN app.refund_on BETWEEN :from_date AND :to_date THEN app.returns ELSE 0 END)::NUMERIC(10, 2) AS total_refunds,
                         {f" INITCAP(pcm.state_name) as state," if not zone else ""}
                         INITCAP(pcm.zone) as zone
                     FROM
@@ -608,8 +680,8 @@ class AzProductPerformance(Base):
                     LEFT JOIN
                         postal_code_master AS pcm ON CAST(CAST(aor.ship_postal_code AS NUMERIC) AS BIGINT) = pcm.pincode
                     WHERE
-                        (cast(app.shipment_date as DATE) BETWEEN :from_date AND :to_date
-                        OR cast(app.refund_date as DATE) BETWEEN :from_date AND :to_date)
+                        (app.shipment_on BETWEEN :from_date AND :to_date
+                        OR app.refund_on BETWEEN :from_date AND :to_date)
                         AND app.account_id = :account_id
                         AND app.asp_id = :asp_id
                         AND im.seller_sku = :sku
@@ -660,7 +732,7 @@ class AzProductPerformance(Base):
                         app.account_id = :account_id
                         AND app.asp_id = :asp_id
                         AND app.units_sold !=0
-                        AND CAST(app.shipment_date AS DATE) BETWEEN :from_date AND :to_date
+                        AND app.shipment_on BETWEEN :from_date AND :to_date
                         {f" AND im.category IN :category" if category else ""}
                         {f" AND im.brand IN :brand" if brand else ""}
                         {f" AND im.asin IN :product" if product else ""}
@@ -696,6 +768,36 @@ class AzProductPerformance(Base):
             'product': product
         }
 
+        # category, brand and product filters keep the skus of the item master that match them
+        item_filter = ''
+        if category or brand or product:
+            item_filter = f'''
+                            AND EXISTS (
+                                SELECT 1 FROM az_item_master AS im
+                                WHERE im.account_id = d.account_id AND im.selling_partner_id = d.asp_id AND im.seller_sku = d.seller_sku
+                                {" AND im.category IN :category" if category else ""}
+                                {" AND im.brand IN :brand" if brand else ""}
+                                {" AND im.asin IN :product" if product else ""}
+                            )'''
+
+        zone_sales_query = '''
+                        SELECT
+                        z.key AS {zone},
+                        SUM(CAST(z.value ->> 'gross_sales' AS NUMERIC))::NUMERIC(10, 2) AS {gross_sales},
+                        ABS(SUM(CAST(z.value ->> 'refunds' AS NUMERIC)))::NUMERIC(10, 2) AS {refunds}
+                        FROM
+                            az_product_performance_daily AS d
+                        CROSS JOIN LATERAL
+                            jsonb_each(d.zone_sales) AS z
+                        WHERE
+                            d.account_id = :account_id
+                            AND d.asp_id = :asp_id
+                            AND d.day BETWEEN {from_date} AND {to_date}
+                            {item_filter}
+                        GROUP BY
+                        z.key
+        '''
+
         raw_query = f'''
                     SELECT
                         zone,
@@ -710,54 +812,12 @@ class AzProductPerformance(Base):
                             WHEN _p._p_total_refunds > 0 THEN ABS(CAST((c.total_refunds - _p._p_total_refunds) / _p._p_total_refunds * 100 AS NUMERIC(10, 2)))
                             ELSE 0.00
                         END AS total_refunds_percentage
-                    FROM (
-                        SELECT
-                        pcm.zone,
-                        SUM(app.gross_sales)::NUMERIC(10, 2) AS total_gross_sales,
-                        ABS(SUM(CASE WHEN CAST(app.refund_date AS DATE) BETWEEN :from_date AND :to_date THEN app.returns ELSE 0 END))::NUMERIC(10, 2) AS total_refunds
-                        FROM
-                            az_product_performance AS app
-                        JOIN
-                            az_order_report AS aor ON app.az_order_id = aor.amazon_order_id
-                        JOIN
-                            postal_code_master AS pcm ON CAST(CAST(aor.ship_postal_code AS NUMERIC) AS BIGINT) = pcm.pincode
-                        JOIN
-                            az_item_master AS im ON aor.sku = im.seller_sku
-                        WHERE
-                            app.units_sold != 0
-                            AND app.account_id = :account_id
-                            AND app.asp_id = :asp_id
-                            AND CAST(app.shipment_date AS DATE) BETWEEN :from_date AND :to_date
-                            {f" AND im.category IN :category" if category else ""}
-                            {f" AND im.brand IN :brand" if brand else ""}
-                            {f" AND im.asin IN :product" if product else ""}
-                        GROUP BY
-                        pcm.zone
+                    FROM ({zone_sales_query.format(zone='zone', gross_sales='total_gross_sales', refunds='total_refunds',
+                                                   from_date=':from_date', to_date=':to_date', item_filter=item_filter)}
                     ) AS c
                     LEFT JOIN
-                    (
-                        SELECT
-                        pcm.zone as _p_zone,
-                        SUM(app.gross_sales)::NUMERIC(10, 2) AS _p_total_gross_sales,
-                        ABS(SUM(CASE WHEN CAST(app.refund_date AS DATE) BETWEEN :prior_from_date AND :prior_to_date THEN app.returns ELSE 0 END))::NUMERIC(10, 2) AS _p_total_refunds
-                        FROM
-                            az_product_performance AS app
-                        JOIN
-                            az_order_report AS aor ON app.az_order_id = aor.amazon_order_id
-                        JOIN
-                            postal_code_master AS pcm ON CAST(CAST(aor.ship_postal_code AS NUMERIC) AS BIGINT) = pcm.pincode
-                        JOIN
-                            az_item_master AS im ON aor.sku = im.seller_sku
-                        WHERE
-                            app.units_sold != 0
-                            AND app.account_id = :account_id
-                            AND app.asp_id = :asp_id
-                            AND CAST(app.shipment_date AS DATE) BETWEEN :prior_from_date AND :prior_to_date
-                            {f" AND im.category IN :category" if category else ""}
-                            {f" AND im.brand IN :brand" if brand else ""}
-                            {f" AND im.asin IN :product" if product else ""}
-                        GROUP BY
-                        pcm.zone
+                    ({zone_sales_query.format(zone='_p_zone', gross_sales='_p_total_gross_sales', refunds='_p_total_refunds',
+                                              from_date=':prior_from_date', to_date=':prior_to_date', item_filter=item_filter)}
                     ) AS _p on c.zone=_p._p_zone
         '''
 
@@ -822,7 +882,7 @@ class AzProductPerformance(Base):
                         WHERE
                         app.account_id = :account_id
                         AND app.asp_id = :asp_id
-                        AND CAST(app.shipment_date AS DATE) BETWEEN :from_date AND :to_date
+                        AND app.shipment_on BETWEEN :from_date AND :to_date
                         and app.seller_sku is not null
                         group by
                         app.seller_sku
@@ -878,7 +938,7 @@ class AzProductPerformance(Base):
                         GROUP BY child_asin
                     ) as sub_query_az_sales_traffic_asin
                     on im.asin=sub_query_az_sales_traffic_asin.asin
-                    WHERE im.seller_sku in (select seller_sku from az_product_performance where CAST(shipment_date AS DATE) BETWEEN :from_date AND :to_date group by seller_sku)
+                    WHERE im.seller_sku in (select seller_sku from az_product_performance where shipment_on BETWEEN :from_date AND :to_date group by seller_sku)
                     AND im.account_id = :account_id
                     AND im.selling_partner_id = :asp_id
         '''
@@ -962,7 +1022,7 @@ class AzProductPerformance(Base):
                         WHERE
                         app.account_id = :account_id
                         AND app.asp_id = :asp_id
-                        AND CAST(app.shipment_date AS DATE) BETWEEN :from_date AND :to_date
+                        AND app.shipment_on BETWEEN :from_date AND :to_date
                         and app.seller_sku is not null
                         group by
                         app.seller_sku
@@ -1063,7 +1123,7 @@ class AzProductPerformance(Base):
                     sum(total_units_sold) as total_units_sold
                     from(
                     SELECT
-                    cast(app.shipment_date as DATE),
+                    app.shipment_on AS shipment_date,
                     sum(app.gross_sales)::numeric(10,2) as gross_sales,
                     max(sts.page_views) as page_views,
                     sum(app.units_sold) as total_units_sold
@@ -1079,15 +1139,15 @@ class AzProductPerformance(Base):
                         AND az_sales_traffic_asin.account_id = :account_id
                         AND az_sales_traffic_asin.asp_id = :asp_id
                         group by child_asin, payload_date
-                    ) as sts on im.asin=sts.child_asin and cast(app.shipment_date as DATE)=sts.payload_date
+                    ) as sts on im.asin=sts.child_asin and app.shipment_on=sts.payload_date
                     where
-                    cast(app.shipment_date as DATE) between :from_date and :to_date
+                    app.shipment_on between :from_date and :to_date
                     {f" AND im.category IN :category" if category else ""}
                     {f" AND im.brand IN :brand" if brand else ""}
                     {f" AND im.asin IN :product" if product else ""}
                     AND app.account_id = :account_id
                     AND app.asp_id = :asp_id
-                    group by cast(app.shipment_date as DATE), asin
+                    group by app.shipment_on, asin
                     ) as subquery
                     group by shipment_date
                     '''
@@ -1145,7 +1205,7 @@ class AzProductPerformance(Base):
                             {f" AND app.brand IN :brand" if brand else ""}
                             {f" AND COALESCE(fba_returns.detailed_disposition, '{AzFbaReturnsReportType.LOST.value}') = :report_type"  if report_type is not None else ""}
                             AND app.refund_date IS NOT NULL
-                            AND cast(app.refund_date as DATE) BETWEEN CURRENT_TIMESTAMP - INTERVAL '75 DAY' AND CURRENT_TIMESTAMP - INTERVAL '45 DAY'
+                            AND app.refund_on BETWEEN CURRENT_TIMESTAMP - INTERVAL '75 DAY' AND CURRENT_TIMESTAMP - INTERVAL '45 DAY'
                             AND (fba_returns.detailed_disposition != 'SELLABLE'
                             OR (fba_returns.order_id is null and fba_reimbursements.az_order_id is null))
                             ORDER BY app.refund_date asc
@@ -1170,7 +1230,7 @@ class AzProductPerformance(Base):
                             AND
                             app.shipment_date IS NOT NULL
                             AND app.refund_date IS NOT NULL
-                            AND cast(app.refund_date as DATE) BETWEEN CURRENT_TIMESTAMP - INTERVAL '75 DAY' AND CURRENT_TIMESTAMP - INTERVAL '45 DAY'
+                            AND app.refund_on BETWEEN CURRENT_TIMESTAMP - INTERVAL '75 DAY' AND CURRENT_TIMESTAMP - INTERVAL '45 DAY'
                             AND (fba_returns.detailed_disposition != 'SELLABLE'
                             OR (fba_returns.order_id is null and fba_reimbursements.az_order_id is null))
                             group by COALESCE(fba_returns.detailed_disposition, 'LOST'), app.asp_id
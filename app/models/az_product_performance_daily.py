@@ -0,0 +1,210 @@
+"""
+    Daily product performance rollup, kept in step with az_product_performance and the sponsored ads tables.
+"""
+from datetime import date
+import time
+from typing import Iterable
+
+from app import db
+from app.models.base import Base
+from app.models.base import report_transaction
+from sqlalchemy import Index
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import JSONB
+
+# days recomputed per statement when a whole account is rebuilt
+REBUILD_BATCH_DAYS = 31
+
+# jsonb_each over a breakdown of summary_analysis, anything but an object of numbers is skipped
+BREAKDOWN_QUERY = '''
+    SELECT seller_sku, day, jsonb_object_agg(key, value) AS breakdown
+    FROM (
+        SELECT f.seller_sku, f.day, b.key, SUM(CAST(CAST(b.value AS TEXT) AS NUMERIC)) AS value
+        FROM facts AS f
+        CROSS JOIN LATERAL jsonb_each(CASE WHEN jsonb_typeof(f.summary_analysis -> '{key}') = 'object' THEN f.summary_analysis -> '{key}' END) AS b
+        WHERE jsonb_typeof(b.value) = 'number'
+        GROUP BY f.seller_sku, f.day, b.key
+    ) AS breakdown_by_key
+    GROUP BY seller_sku, day
+'''
+
+REFRESH_QUERY = f'''
+    WITH shipped AS (
+        SELECT pp.az_order_id, COALESCE(pp.seller_sku, '') AS seller_sku, pp.shipment_on AS day,
+            COALESCE(pp.gross_sales, 0) AS gross_sales,
+            CASE WHEN pp.units_sold > 0 THEN pp.units_sold ELSE 0 END AS units_sold,
+            CASE WHEN pp.units_sold != 0 AND pp.az_order_id IS NOT NULL THEN 1 ELSE 0 END AS order_count,
+            CASE WHEN pp.units_sold > 0 THEN COALESCE(pp.market_place_fee, 0) ELSE 0 END AS market_place_fee,
+            COALESCE(pp.forward_fba_fee, 0) AS forward_fba_fee,
+            COALESCE(pp.reverse_fba_fee, 0) AS reverse_fba_fee,
+            CAST(pp.summary_analysis AS JSONB) AS summary_analysis
+        FROM az_product_performance AS pp
+        WHERE pp.account_id = :account_id AND pp.asp_id = :asp_id AND pp.shipment_on = ANY(:days)
+    ),
+    refunded AS (
+        SELECT pp.az_order_id, COALESCE(pp.seller_sku, '') AS seller_sku, pp.refund_on AS day,
+            COALESCE(pp.returns, 0) AS refunds, pp.units_returned
+        FROM az_product_performance AS pp
+        WHERE pp.account_id = :account_id AND pp.asp_id = :asp_id AND pp.refund_on = ANY(:days) AND pp.units_returned > 0
+    ),
+    order_zones AS (
+        SELECT DISTINCT ON (aor.amazon_order_id) aor.amazon_order_id, pcm.zone
+        FROM az_order_report AS aor
+        JOIN postal_code_master AS pcm
+            ON pcm.pincode = CASE WHEN aor.ship_postal_code ~ '^[0-9]+(\\.0*)?$' THEN CAST(CAST(aor.ship_postal_code AS NUMERIC) AS BIGINT) END
+        WHERE aor.account_id = :account_id AND aor.selling_partner_id = :asp_id
+        AND aor.amazon_order_id IN (SELECT az_order_id FROM shipped UNION SELECT az_order_id FROM refunded)
+        ORDER BY aor.amazon_order_id, aor.id
+    ),
+    facts AS (
+        SELECT s.seller_sku, s.day, s.gross_sales, s.units_sold, s.order_count, 0 AS refunds, 0 AS units_returned,
+            s.market_place_fee, s.forward_fba_fee, s.reverse_fba_fee, 0 AS sponsored_product_spend, 0 AS sponsored_display_spend,
+            z.zone, s.summary_analysis
+        FROM shipped AS s
+        LEFT JOIN order_zones AS z ON z.amazon_order_id = s.az_order_id
+        UNION ALL
+        SELECT r.seller_sku, r.day, 0, 0, 0, r.refunds, r.units_returned, 0, 0, 0, 0, 0, z.zone, NULL
+        FROM refunded AS r
+        LEFT JOIN order_zones AS z ON z.amazon_order_id = r.az_order_id
+        UNION ALL
+        SELECT COALESCE(sp.advertised_sku, ''), sp.payload_date, 0, 0, 0, 0, 0, 0, 0, 0, COALESCE(sp.spend, 0), 0, NULL, NULL
+        FROM az_sponsored_product AS sp
+        WHERE sp.account_id = :account_id AND sp.asp_id = :asp_id AND sp.payload_date = ANY(:days)
+        UNION ALL
+        SELECT COALESCE(sd.sku, ''), sd.payload_date, 0, 0, 0, 0, 0, 0, 0, 0, 0, COALESCE(sd.cost * sd.clicks, 0), NULL, NULL
+        FROM az_sponsored_display AS sd
+        WHERE sd.account_id = :account_id AND sd.asp_id = :asp_id AND sd.payload_date = ANY(:days)
+    ),
+    totals AS (
+        SELECT seller_sku, day, SUM(gross_sales) AS gross_sales, SUM(units_sold) AS units_sold, SUM(order_count) AS order_count,
+            SUM(refunds) AS refunds, SUM(units_returned) AS units_returned, SUM(market_place_fee) AS market_place_fee,
+            SUM(forward_fba_fee) AS forward_fba_fee, SUM(reverse_fba_fee) AS reverse_fba_fee,
+            SUM(sponsored_product_spend) AS sponsored_product_spend, SUM(sponsored_display_spend) AS sponsored_display_spend
+        FROM facts
+        GROUP BY seller_sku, day
+    ),
+    zone_sales AS (
+        SELECT seller_sku, day, jsonb_object_agg(zone, jsonb_build_object('gross_sales', gross_sales, 'refunds', refunds)) AS zone_sales
+        FROM (
+            SELECT seller_sku, day, zone, SUM(gross_sales) AS gross_sales, SUM(refunds) AS refunds
+            FROM facts
+            WHERE zone IS NOT NULL
+            GROUP BY seller_sku, day, zone
+        ) AS sales_by_zone
+        GROUP BY seller_sku, day
+    ),
+    market_place_fee_breakdown AS ({BREAKDOWN_QUERY.format(key='_market_place_fee_breakdown')}),
+    gross_sales_breakdown AS ({BREAKDOWN_QUERY.format(key='_gross_sales_breakdown')})
+    INSERT INTO az_product_performance_daily (account_id, asp_id, seller_sku, day, gross_sales, units_sold, order_count, refunds,
+        units_returned, market_place_fee, forward_fba_fee, reverse_fba_fee, sponsored_product_spend, sponsored_display_spend,
+        market_place_fee_breakdown, gross_sales_breakdown, zone_sales, created_at)
+    SELECT :account_id, :asp_id, t.seller_sku, t.day, t.gross_sales, t.units_sold, t.order_count, t.refunds,
+        t.units_returned, t.market_place_fee, t.forward_fba_fee, t.reverse_fba_fee, t.sponsored_product_spend, t.sponsored_display_spend,
+        mfb.breakdown, gsb.breakdown, zs.zone_sales, :current_time
+    FROM totals AS t
+    LEFT JOIN market_place_fee_breakdown AS mfb ON mfb.seller_sku = t.seller_sku AND mfb.day = t.day
+    LEFT JOIN gross_sales_breakdown AS gsb ON gsb.seller_sku = t.seller_sku AND gsb.day = t.day
+    LEFT JOIN zone_sales AS zs ON zs.seller_sku = t.seller_sku AND zs.day = t.day
+    ON CONFLICT ON CONSTRAINT uq_az_product_performance_daily_account_id_asp_id_sku_day DO UPDATE SET
+        gross_sales = EXCLUDED.gross_sales, units_sold = EXCLUDED.units_sold, order_count = EXCLUDED.order_count,
+        refunds = EXCLUDED.refunds, units_returned = EXCLUDED.units_returned, market_place_fee = EXCLUDED.market_place_fee,
+        forward_fba_fee = EXCLUDED.forward_fba_fee, reverse_fba_fee = EXCLUDED.reverse_fba_fee,
+        sponsored_product_spend = EXCLUDED.sponsored_product_spend, sponsored_display_spend = EXCLUDED.sponsored_display_spend,
+        market_place_fee_breakdown = EXCLUDED.market_place_fee_breakdown, gross_sales_breakdown = EXCLUDED.gross_sales_breakdown,
+        zone_sales = EXCLUDED.zone_sales, updated_at = :current_time
+    RETURNING id
+'''
+
+
+class AzProductPerformanceDaily(Base):
+    """
+        Product performance per sku and day. Sales, units, orders and fees are counted on the shipment day,
+        refunds on the refund day and ads spend on the report day.
+    """
+    __tablename__ = 'az_product_performance_daily'
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    account_id = db.Column(db.String(36), nullable=False)
+    asp_id = db.Column(db.String(255), nullable=False)
+    seller_sku = db.Column(db.String(255), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    gross_sales = db.Column(db.Numeric, nullable=False, server_default='0')
+    units_sold = db.Column(db.BigInteger, nullable=False, server_default='0')
+    order_count = db.Column(db.BigInteger, nullable=False, server_default='0')
+    refunds = db.Column(db.Numeric, nullable=False, server_default='0')
+    units_returned = db.Column(db.BigInteger, nullable=False, server_default='0')
+    market_place_fee = db.Column(db.Numeric, nullable=False, server_default='0')
+    forward_fba_fee = db.Column(db.Numeric, nullable=False, server_default='0')
+    reverse_fba_fee = db.Column(db.Numeric, nullable=False, server_default='0')
+    sponsored_product_spend = db.Column(db.Numeric, nullable=False, server_default='0')
+    sponsored_display_spend = db.Column(db.Numeric, nullable=False, server_default='0')
+    market_place_fee_breakdown = db.Column(JSONB, nullable=True)
+    gross_sales_breakdown = db.Column(JSONB, nullable=True)
+    zone_sales = db.Column(JSONB, nullable=True)
+    created_at = db.Column(db.BigInteger)
+    updated_at = db.Column(db.BigInteger, nullable=True)
+
+    __table_args__ = (db.UniqueConstraint('account_id', 'asp_id', 'seller_sku', 'day', name='uq_az_product_performance_daily_account_id_asp_id_sku_day'),  # type: ignore  # noqa: FKA100
+                      Index('ix_az_product_performance_daily_account_id_asp_id_day', 'account_id', 'asp_id', 'day'),)  # type: ignore  # noqa: FKA100
+
+    @classmethod
+    def refresh_days(cls, account_id: str, asp_id: str, days: Iterable[date]) -> int:
+        """Recompute the rollup of the given days from the raw tables in a single transaction. Returns the rows written."""
+
+        days = sorted({day for day in days if day is not None})
+
+        if not days:
+            return 0
+
+        params = {'account_id': account_id, 'asp_id': asp_id, 'days': days, 'current_time': int(time.time())}
+
+        with report_transaction() as connection:
+            written = connection.execute(text(REFRESH_QUERY), params).scalars().all()  # type: ignore  # noqa: FKA100
+
+            # skus of those days that no longer have any activity
+            connection.execute(text('''
+                DELETE FROM az_product_performance_daily
+                WHERE account_id = :account_id AND asp_id = :asp_id AND day = ANY(:days) AND id != ALL(CAST(:written AS BIGINT[]))
+            '''), {**params, 'written': written})  # type: ignore  # noqa: FKA100
+
+        return len(written)
+
+    @classmethod
+    def refresh_orders(cls, account_id: str, asp_id: str, az_order_ids: Iterable[str]) -> int:
+        """Recompute the days on which the given orders shipped or were refunded"""
+
+        az_order_ids = list({az_order_id for az_order_id in az_order_ids if az_order_id})
+
+        if not az_order_ids:
+            return 0
+
+        days = db.session.execute(text('''
+            SELECT shipment_on AS day FROM az_product_performance
+            WHERE account_id = :account_id AND asp_id = :asp_id AND az_order_id = ANY(:az_order_ids) AND shipment_on IS NOT NULL
+            UNION
+            SELECT refund_on FROM az_product_performance
+            WHERE account_id = :account_id AND asp_id = :asp_id AND az_order_id = ANY(:az_order_ids) AND refund_on IS NOT NULL
+        '''), {'account_id': account_id, 'asp_id': asp_id, 'az_order_ids': az_order_ids}).scalars().all()  # type: ignore  # noqa: FKA100
+
+        return cls.refresh_days(account_id=account_id, asp_id=asp_id, days=days)
+
+    @classmethod
+    def rebuild(cls, account_id: str, asp_id: str) -> int:
+        """Recompute every day of an account that has product performance or ads spend"""
+
+        days = db.session.execute(text('''
+            SELECT shipment_on AS day FROM az_product_performance WHERE account_id = :account_id AND asp_id = :asp_id AND shipment_on IS NOT NULL
+            UNION
+            SELECT refund_on FROM az_product_performance WHERE account_id = :account_id AND asp_id = :asp_id AND refund_on IS NOT NULL
+            UNION
+            SELECT payload_date FROM az_sponsored_product WHERE account_id = :account_id AND asp_id = :asp_id AND payload_date IS NOT NULL
+            UNION
+            SELECT payload_date FROM az_sponsored_display WHERE account_id = :account_id AND asp_id = :asp_id AND payload_date IS NOT NULL
+            ORDER BY day
+        '''), {'account_id': account_id, 'asp_id': asp_id}).scalars().all()  # type: ignore  # noqa: FKA100
+
+        written = 0
+        for start in range(0, len(days), REBUILD_BATCH_DAYS):
+            written += cls.refresh_days(account_id=account_id, asp_id=asp_id, days=days[start:start + REBUILD_BATCH_DAYS])
+
+        return written
@@ -0,0 +1,76 @@
+"""
+    Hourly sales per asin as returned by the sales api, one row per asin and hour.
+"""
+import time
+
+from app import db
+from app.models.base import Base
+from sqlalchemy import Index
+from sqlalchemy.dialects.postgresql import insert
+
+# rows written per insert statement, hourly rows are narrow so even a full batch renders to well under a MB of SQL
+UPSERT_CHUNK_SIZE = 5000
+
+
+class AzSalesHourly(Base):
+    """
+        Sales fact per asin and hour. hour_ts is the start of the sales api interval.
+    """
+    __tablename__ = 'az_sales_hourly'
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    account_id = db.Column(db.String(36), nullable=False)
+    asp_id = db.Column(db.String(255), nullable=False)
+    asin = db.Column(db.String(255), nullable=False)
+    hour_ts = db.Column(db.DateTime(timezone=True), nullable=False)
+    units_ordered = db.Column(db.Integer, nullable=False, server_default='0')
+    order_count = db.Column(db.Integer, nullable=False, server_default='0')
+    sales_amount = db.Column(db.Numeric, nullable=False, server_default='0')
+    currency_code = db.Column(db.String(50), nullable=True)
+    created_at = db.Column(db.BigInteger)
+    updated_at = db.Column(db.BigInteger, nullable=True)
+
+    __table_args__ = (db.UniqueConstraint('account_id', 'asp_id', 'asin', 'hour_ts', name='uq_az_sales_hourly_account_id_asp_id_asin_hour_ts'),  # type: ignore  # noqa: FKA100
+                      Index('ix_az_sales_hourly_account_id_asp_id_hour_ts', 'account_id', 'asp_id', 'hour_ts',  # type: ignore  # noqa: FKA100
+                            postgresql_include=['asin', 'units_ordered', 'sales_amount']),)
+
+    @classmethod
+    def bulk_upsert(cls, account_id: str, asp_id: str, hourly_sales: list) -> int:
+        """Insert or update hourly sales rows keyed on (asin, hour_ts). Returns the number of rows written."""
+
+        # a statement may touch a row only once, the last interval returned for an asin and hour wins
+        staged_rows = {(row['asin'], row['hour_ts']): row for row in hourly_sales}
+
+        if not staged_rows:
+            return 0
+
+        current_time = int(time.time())
+        rows = [{
+            'account_id': account_id,
+            'asp_id': asp_id,
+            'asin': row['asin'],
+            'hour_ts': row['hour_ts'],
+            'units_ordered': row.get('units_ordered') or 0,
+            'order_count': row.get('order_count') or 0,
+            'sales_amount': row.get('sales_amount') or 0,
+            'currency_code': row.get('currency_code'),
+            'created_at': current_time
+        } for row in staged_rows.values()]
+
+        for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            insert_stmt = insert(cls).values(rows[start:start + UPSERT_CHUNK_SIZE])
+            upsert_stmt = insert_stmt.on_conflict_do_update(
+                constraint='uq_az_sales_hourly_account_id_asp_id_asin_hour_ts',
+                set_={
+                    'units_ordered': insert_stmt.excluded.units_ordered,
+                    'order_count': insert_stmt.excluded.order_count,
+                    'sales_amount': insert_stmt.excluded.sales_amount,
+                    'currency_code': insert_stmt.excluded.currency_code,
+                    'updated_at': current_time
+                }
+            )
+            db.session.execute(upsert_stmt)
+
+        db.session.commit()
+
+        return len(rows)
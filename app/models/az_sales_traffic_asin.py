@@ -7,12 +7,58 @@ from typing import Any
 from typing import Optional
 
 from app import db
+from app.helpers.brand_category_helper import BrandCategoryLookup
 from app.helpers.constants import DbAnomalies
 from app.models.az_item_master import AzItemMaster
 from app.models.base import Base
+from sqlalchemy import Index
 from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
 # from datetime import timedelta
 
+# rows written per insert statement, asin rows carry some forty columns so this caps each statement at a few MB of SQL
+UPSERT_CHUNK_SIZE = 1000
+
+# column of every metric of a flattened salesAndTrafficByAsin record
+SALES_TRAFFIC_BY_ASIN_FIELDS = {
+    'units_ordered': 'salesByAsin_unitsOrdered',
+    'units_ordered_b2b': 'salesByAsin_unitsOrderedB2B',
+    'ordered_product_sales_amount': 'salesByAsin_orderedProductSales_amount',
+    'ordered_product_sales_amount_b2b': 'salesByAsin_orderedProductSalesB2B_amount',
+    'ordered_product_sales_currency_code': 'salesByAsin_orderedProductSales_currencyCode',
+    'ordered_product_sales_currency_code_b2b': 'salesByAsin_orderedProductSalesB2B_currencyCode',
+    'total_order_items': 'salesByAsin_totalOrderItems',
+    'total_order_items_b2b': 'salesByAsin_totalOrderItemsB2B',
+    'browser_sessions': 'trafficByAsin_browserSessions',
+    'browser_sessions_b2b': 'trafficByAsin_browserSessionsB2B',
+    'mobile_app_sessions': 'trafficByAsin_mobileAppSessions',
+    'mobile_app_sessions_b2b': 'trafficByAsin_mobileAppSessionsB2B',
+    'sessions': 'trafficByAsin_sessions',
+    'sessions_b2b': 'trafficByAsin_sessionsB2B',
+    'browser_session_percentage': 'trafficByAsin_browserSessionPercentage',
+    'browser_session_percentage_b2b': 'trafficByAsin_browserSessionPercentageB2B',
+    'mobile_app_session_percentage': 'trafficByAsin_mobileAppSessionPercentage',
+    'mobile_app_session_percentage_b2b': 'trafficByAsin_mobileAppSessionPercentageB2B',
+    'session_percentage': 'trafficByAsin_sessionPercentage',
+    'session_percentage_b2b': 'trafficByAsin_sessionPercentageB2B',
+    'browser_page_views': 'trafficByAsin_browserPageViews',
+    'browser_page_views_b2b': 'trafficByAsin_browserPageViewsB2B',
+    'mobile_app_page_views': 'trafficByAsin_mobileAppPageViews',
+    'mobile_app_page_views_b2b': 'trafficByAsin_mobileAppPageViewsB2B',
+    'page_views': 'trafficByAsin_pageViews',
+    'page_views_b2b': 'trafficByAsin_pageViewsB2B',
+    'browser_page_views_percentage': 'trafficByAsin_browserPageViewsPercentage',
+    'browser_page_views_percentage_b2b': 'trafficByAsin_browserPageViewsPercentageB2B',
+    'mobile_app_page_views_percentage': 'trafficByAsin_mobileAppPageViewsPercentage',
+    'mobile_app_page_views_percentage_b2b': 'trafficByAsin_mobileAppPageViewsPercentageB2B',
+    'page_views_percentage': 'trafficByAsin_pageViewsPercentage',
+    'page_views_percentage_b2b': 'trafficByAsin_pageViewsPercentageB2B',
+    'buy_box_percentage': 'trafficByAsin_buyBoxPercentage',
+    'buy_box_percentage_b2b': 'trafficByAsin_buyBoxPercentageB2B',
+    'unit_session_percentage': 'trafficByAsin_unitSessionPercentage',
+    'unit_session_percentage_b2b': 'trafficByAsin_unitSessionPercentageB2B'
+}
+
 
 class AzSalesTrafficAsin(Base):
     """
@@ -69,6 +115,11 @@ class AzSalesTrafficAsin(Base):
     created_at = db.Column(db.BigInteger)
     updated_at = db.Column(db.BigInteger)
 
+    __table_args__ = (db.UniqueConstraint('account_id', 'asp_id', 'parent_asin', 'child_asin', 'payload_date',  # type: ignore  # noqa: FKA100
+                                          name='uq_az_sales_traffic_asin_account_id_asp_id_parent_child_date'),
+                      Index('ix_az_sales_traffic_asin_account_id_asp_id_payload_date', 'account_id', 'asp_id', 'payload_date',  # type: ignore  # noqa: FKA100
+                            postgresql_include=['child_asin', 'units_ordered', 'page_views']),)
+
     @classmethod
     def add(cls, account_id: str, asp_id: str, parent_asin: str, child_asin: str, payload_date: str, units_ordered: int,
             units_ordered_b2b: int, ordered_product_sales_amount: float, ordered_product_sales_amount_b2b: float,
@@ -81,13 +132,13 @@ class AzSalesTrafficAsin(Base):
             browser_page_views_percentage: float, browser_page_views_percentage_b2b: float, mobile_app_page_views_percentage: float,
             mobile_app_page_views_percentage_b2b: float, page_views_percentage: float, page_views_percentage_b2b: float,
             buy_box_percentage: float, buy_box_percentage_b2b: float, unit_session_percentage: float, unit_session_percentage_b2b: float,
-            asin_granularity: str):
+            asin_granularity: str, brand_category_lookup: Optional[BrandCategoryLookup] = None):
         """Create a new sales traffic asin entry"""
 
         category, brand = None, None
 
         if child_asin:
-            category, brand = AzItemMaster.get_category_brand_by_asin(
+            category, brand = (brand_category_lookup or AzItemMaster).get_category_brand_by_asin(
                 account_id=account_id, asp_id=asp_id, asin=child_asin)
 
         sales_traffic_asin = cls()
@@ -152,13 +203,13 @@ class AzSalesTrafficAsin(Base):
                          browser_page_views_percentage: float, browser_page_views_percentage_b2b: float, mobile_app_page_views_percentage: float,
                          mobile_app_page_views_percentage_b2b: float, page_views_percentage: float, page_views_percentage_b2b: float,
                          buy_box_percentage: float, buy_box_percentage_b2b: float, unit_session_percentage: float, unit_session_percentage_b2b: float,
-                         asin_granularity: str):
+                         asin_granularity: str, brand_category_lookup: Optional[BrandCategoryLookup] = None):
         """insert or update a new sales traffic asin entry"""
 
         category, brand = None, None
 
         if child_asin:
-            category, brand = AzItemMaster.get_category_brand_by_asin(
+            category, brand = (brand_category_lookup or AzItemMaster).get_category_brand_by_asin(
                 account_id=account_id, asp_id=asp_id, asin=child_asin)
 
         sales_traffic = db.session.query(cls).filter(cls.account_id == account_id,
@@ -220,6 +271,60 @@ class AzSalesTrafficAsin(Base):
 
         return sales_traffic
 
+    @classmethod
+    def bulk_upsert_report(cls, account_id: str, asp_id: str, payload_date: str, report_items: list, asin_granularity: str,
+                           brand_category_lookup: Optional[BrandCategoryLookup] = None) -> int:
+        """Insert or update the flattened salesAndTrafficByAsin records of a report keyed on (parent_asin, child_asin).
+
+        Hourly sales of existing rows are kept. Returns the number of rows written.
+        """
+
+        current_time = int(time.time())
+        staged_rows = {}
+
+        for item_flat in report_items:
+            parent_asin, child_asin = item_flat.get('parentAsin'), item_flat.get('childAsin')
+            category, brand = None, None
+
+            if child_asin:
+                category, brand = (brand_category_lookup or AzItemMaster).get_category_brand_by_asin(
+                    account_id=account_id, asp_id=asp_id, asin=child_asin)
+
+            # a statement may touch a row only once, the last record of an asin wins
+            staged_rows[(parent_asin, child_asin)] = {
+                **{column: item_flat.get(field) for column, field in SALES_TRAFFIC_BY_ASIN_FIELDS.items()},
+                'account_id': account_id,
+                'asp_id': asp_id,
+                'parent_asin': parent_asin,
+                'child_asin': child_asin,
+                'payload_date': payload_date,
+                'category': category,
+                'brand': brand,
+                'asin_granularity': asin_granularity,
+                'created_at': current_time,
+                'updated_at': current_time
+            }
+
+        rows = list(staged_rows.values())
+
+        for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            insert_stmt = insert(cls).values(rows[start:start + UPSERT_CHUNK_SIZE])
+            upsert_stmt = insert_stmt.on_conflict_do_update(
+                constraint='uq_az_sales_traffic_asin_account_id_asp_id_parent_child_date',
+                set_={
+                    **{column: insert_stmt.excluded[column] for column in SALES_TRAFFIC_BY_ASIN_FIELDS},
+                    'category': insert_stmt.excluded.category,
+                    'brand': insert_stmt.excluded.brand,
+                    'asin_granularity': insert_stmt.excluded.asin_granularity,
+                    'updated_at': current_time
+                }
+            )
+            db.session.execute(upsert_stmt)
+
+        db.session.commit()
+
+        return len(rows)
+
     @classmethod
     def get_glance_summary(cls, account_id: str, asp_id: str, from_date: Optional[str] = None, to_date: Optional[str] = None, category: Optional[tuple] = None, brand: Optional[tuple] = None,
                            product: Optional[tuple] = None, sort_by: Any = None, sort_order: Any = None):
@@ -361,3 +466,38 @@ class AzSalesTrafficAsin(Base):
             db.session.commit()
 
         return sales_traffic_asin
+
+    @classmethod
+    def bulk_insert_or_update_sales_data(cls, account_id: str, asp_id: str, sales_data: list):
+        """insert or update sales api data for many asin and dates with a single commit"""
+
+        if not sales_data:
+            return
+
+        dates = {row['date'] for row in sales_data}
+        asins = {row['asin'] for row in sales_data}
+
+        existing_records = db.session.query(cls).filter(cls.account_id == account_id, cls.asp_id == asp_id,
+                                                        cls.payload_date.in_(dates), cls.child_asin.in_(asins)).all()
+
+        sales_traffic_asin_map = {(record.payload_date.strftime('%Y-%m-%d'), record.child_asin): record for record in existing_records}
+
+        current_time = int(time.time())
+
+        for row in sales_data:
+            sales_traffic_asin = sales_traffic_asin_map.get((row['date'], row['asin']))
+
+            if sales_traffic_asin is None:
+                sales_traffic_asin = cls(account_id=account_id, asp_id=asp_id, payload_date=row['date'], parent_asin=row['asin'],
+                                         child_asin=row['asin'], created_at=current_time)
+                db.session.add(sales_traffic_asin)
+                sales_traffic_asin_map[(row['date'], row['asin'])] = sales_traffic_asin
+
+            sales_traffic_asin.ordered_product_sales_amount = row.get('total_sales')
+            sales_traffic_asin.units_ordered = row.get('unit_count')
+            sales_traffic_asin.hourly_sales = row.get('hourly_sales')
+            sales_traffic_asin.category = row.get('category')
+            sales_traffic_asin.brand = row.get('brand')
+            sales_traffic_asin.updated_at = current_time
+
+        db.session.commit()
@@ -8,7 +8,66 @@ from typing import Optional
 
 from app import db
 from app.helpers.constants import DbAnomalies
+from app.helpers.utility import get_date_from_string
 from app.models.base import Base
+from sqlalchemy.dialects.postgresql import insert
+
+# rows written per insert statement, the report has one row per day so a whole report almost always fits in one statement
+UPSERT_CHUNK_SIZE = 1000
+
+# column of every field of a flattened salesAndTrafficByDate record
+SALES_TRAFFIC_BY_DATE_FIELDS = {
+    'ordered_product_sales_amount': 'salesByDate_orderedProductSales_amount',
+    'ordered_product_sales_currency_code': 'salesByDate_orderedProductSales_currencyCode',
+    'ordered_product_sales_amount_b2b': 'salesByDate_orderedProductSalesB2B_amount',
+    'ordered_product_sales_currency_code_b2b': 'salesByDate_orderedProductSalesB2B_currencyCode',
+    'units_ordered': 'salesByDate_unitsOrdered',
+    'units_ordered_b2b': 'salesByDate_unitsOrderedB2B',
+    'total_order_items': 'salesByDate_totalOrderItems',
+    'total_order_items_b2b': 'salesByDate_totalOrderItemsB2B',
+    'average_sales_per_order_item_amount': 'salesByDate_averageSalesPerOrderItem_amount',
+    'average_sales_per_order_item_currency_code': 'salesByDate_averageSalesPerOrderItem_currencyCode',
+    'average_sales_per_order_item_amount_b2b': 'salesByDate_averageSalesPerOrderItemB2B_amount',
+    'average_sales_per_order_item_currency_code_b2b': 'salesByDate_averageSalesPerOrderItemB2B_currencyCode',
+    'average_units_per_order_item': 'salesByDate_averageUnitsPerOrderItem',
+    'average_units_per_order_item_b2b': 'salesByDate_averageUnitsPerOrderItemB2B',
+    'average_selling_price_amount': 'salesByDate_averageSellingPrice_amount',
+    'average_selling_price_currency_code': 'salesByDate_averageSellingPrice_currencyCode',
+    'average_selling_price_amount_b2b': 'salesByDate_averageSellingPriceB2B_amount',
+    'average_selling_price_currency_code_b2b': 'salesByDate_averageSellingPriceB2B_currencyCode',
+    'units_refunded': 'salesByDate_unitsRefunded',
+    'refund_rate': 'salesByDate_refundRate',
+    'claims_granted': 'salesByDate_claimsGranted',
+    'claims_amount_amount': 'salesByDate_claimsAmount_amount',
+    'claims_amount_currency_code': 'salesByDate_claimsAmount_currencyCode',
+    'shipped_product_sales_amount': 'salesByDate_shippedProductSales_amount',
+    'shipped_product_sales_currency_code': 'salesByDate_shippedProductSales_currencyCode',
+    'units_shipped': 'salesByDate_unitsShipped',
+    'orders_shipped': 'salesByDate_ordersShipped',
+    'browser_page_views': 'trafficByDate_browserPageViews',
+    'browser_page_views_b2b': 'trafficByDate_browserPageViewsB2B',
+    'mobile_app_page_views': 'trafficByDate_mobileAppPageViews',
+    'mobile_app_page_views_b2b': 'trafficByDate_mobileAppPageViewsB2B',
+    'page_views': 'trafficByDate_pageViews',
+    'page_views_b2b': 'trafficByDate_pageViewsB2B',
+    'browser_sessions': 'trafficByDate_browserSessions',
+    'browser_sessions_b2b': 'trafficByDate_browserSessionsB2B',
+    'mobile_app_sessions': 'trafficByDate_mobileAppSessions',
+    'mobile_app_sessions_b2b': 'trafficByDate_mobileAppSessionsB2B',
+    'sessions': 'trafficByDate_sessions',
+    'sessions_b2b': 'trafficByDate_sessionsB2B',
+    'buy_box_percentage': 'trafficByDate_buyBoxPercentage',
+    'buy_box_percentage_b2b': 'trafficByDate_buyBoxPercentageB2B',
+    'order_item_session_percentage': 'trafficByDate_orderItemSessionPercentage',
+    'order_item_session_percentage_b2b': 'trafficByDate_orderItemSessionPercentageB2B',
+    'unit_session_percentage': 'trafficByDate_unitSessionPercentage',
+    'unit_session_percentage_b2b': 'trafficByDate_unitSessionPercentageB2B',
+    'average_offer_count': 'trafficByDate_averageOfferCount',
+    'average_parent_items': 'trafficByDate_averageParentItems',
+    'feedback_received': 'trafficByDate_feedbackReceived',
+    'negative_feedback_received': 'trafficByDate_negativeFeedbackReceived',
+    'received_negative_feedback_rate': 'trafficByDate_receivedNegativeFeedbackRate'
+}
 
 
 class AzSalesTrafficSummary(Base):
@@ -78,6 +137,8 @@ class AzSalesTrafficSummary(Base):
     created_at = db.Column(db.BigInteger)
     updated_at = db.Column(db.BigInteger)
 
+    __table_args__ = (db.UniqueConstraint('account_id', 'asp_id', 'date', name='uq_az_sales_traffic_summary_account_id_asp_id_date'),)  # type: ignore  # noqa: FKA100
+
     @classmethod
     def add(cls, account_id: str, asp_id: str, date: str, ordered_product_sales_amount: float, ordered_product_sales_currency_code: str, units_ordered: int,
             ordered_product_sales_amount_b2b: float, ordered_product_sales_currency_code_b2b: str, units_ordered_b2b: int, total_order_items: int,
@@ -240,6 +301,51 @@ class AzSalesTrafficSummary(Base):
 
         return sales_traffic_summary
 
+    @classmethod
+    def bulk_upsert_report(cls, account_id: str, asp_id: str, report_items: list, date_granularity: str) -> int:
+        """Insert or update the flattened salesAndTrafficByDate records of a report keyed on date.
+
+        Hourly sales, category and brand of existing rows are kept. Returns the number of rows written.
+        """
+
+        current_time = int(time.time())
+        staged_rows = {}
+
+        for item_flat in report_items:
+            date = get_date_from_string(date_string=item_flat.get('date'))
+
+            if date is None:
+                continue
+
+            # a statement may touch a row only once, the last record of a date wins
+            staged_rows[date] = {
+                **{column: item_flat.get(field) for column, field in SALES_TRAFFIC_BY_DATE_FIELDS.items()},
+                'account_id': account_id,
+                'asp_id': asp_id,
+                'date': date,
+                'date_granularity': date_granularity,
+                'created_at': current_time,
+                'updated_at': current_time
+            }
+
+        rows = list(staged_rows.values())
+
+        for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            insert_stmt = insert(cls).values(rows[start:start + UPSERT_CHUNK_SIZE])
+            upsert_stmt = insert_stmt.on_conflict_do_update(
+                constraint='uq_az_sales_traffic_summary_account_id_asp_id_date',
+                set_={
+                    **{column: insert_stmt.excluded[column] for column in SALES_TRAFFIC_BY_DATE_FIELDS},
+                    'date_granularity': insert_stmt.excluded.date_granularity,
+                    'updated_at': current_time
+                }
+            )
+            db.session.execute(upsert_stmt)
+
+        db.session.commit()
+
+        return len(rows)
+
     @classmethod
     def get_by_date(cls, account_id: str, asp_id: str, from_date: str, to_date: str):
         """get by sales traffic summary by date"""
@@ -283,6 +389,39 @@ class AzSalesTrafficSummary(Base):
 
         return sales_traffic_summary
 
+    @classmethod
+    def bulk_insert_or_update_sales_data(cls, account_id: str, asp_id: str, sales_data: list):
+        """insert or update sales api data for many dates with a single commit"""
+
+        if not sales_data:
+            return
+
+        dates = {row['date'] for row in sales_data}
+
+        existing_records = db.session.query(cls).filter(cls.account_id == account_id, cls.asp_id == asp_id, cls.date.in_(dates)).all()
+
+        sales_traffic_summary_map = {record.date.strftime('%Y-%m-%d'): record for record in existing_records}
+
+        current_time = int(time.time())
+
+        for row in sales_data:
+            sales_traffic_summary = sales_traffic_summary_map.get(row['date'])
+
+            if sales_traffic_summary is None:
+                sales_traffic_summary = cls(account_id=account_id, asp_id=asp_id, date=row['date'], created_at=current_time)
+                db.session.add(sales_traffic_summary)
+                sales_traffic_summary_map[row['date']] = sales_traffic_summary
+
+            sales_traffic_summary.ordered_product_sales_amount = row.get('total_sales')
+            sales_traffic_summary.units_ordered = row.get('unit_count')
+
+            if row.get('hourly_sales'):
+                sales_traffic_summary.hourly_sales = row.get('hourly_sales')
+
+            sales_traffic_summary.updated_at = current_time
+
+        db.session.commit()
+
     @classmethod
     def get_recent_sales_data(cls, account_id: str, asp_id: str):
         """method to retrieve sales data from sales traffic summary for last 3 days"""
@@ -294,6 +433,6 @@ class AzSalesTrafficSummary(Base):
 
     @classmethod
     def get_hourly_sales_by_single_date(cls, account_id: str, asp_id: str, from_date: str, to_date: str):
-        """method to retrieve hourly_sales json by date"""
+        """method to retrieve hourly_sales json by date, updated_at tells when it was last refreshed"""
 
-        return db.session.query(cls.hourly_sales).filter(cls.account_id == account_id, cls.asp_id == asp_id, cls.date.between(from_date, to_date), cls.hourly_sales != None).first()        # noqa: FKA100
+        return db.session.query(cls.hourly_sales, cls.updated_at).filter(cls.account_id == account_id, cls.asp_id == asp_id, cls.date.between(from_date, to_date), cls.hourly_sales != None).first()        # noqa: FKA100
@@ -2,10 +2,30 @@
     Database model for storing Settlement Report v2 in database is written in this File along with its methods.
 """
 from datetime import datetime
+import io
 import time
+from typing import Iterable
+from typing import Optional
 
 from app import db
 from app.models.base import Base
+from app.models.base import report_transaction
+import pandas as pd
+from sqlalchemy import text
+
+# column names of the settlement report flat file v2, the header line is replaced by these
+SETTLEMENT_REPORT_COLUMNS = (
+    'settlement_id', 'settlement_start_date', 'settlement_end_date', 'deposit_date', 'total_amount', 'currency',
+    'transaction_type', 'order_id', 'merchant_order_id', 'adjustment_id', 'shipment_id', 'marketplace_name',
+    'amount_type', 'amount_description', 'amount', 'fulfillment_id', 'posted_date', 'posted_date_time',
+    'order_item_code', 'merchant_order_item_id', 'merchant_adjustment_item_id', 'sku', 'quantity_purchased',
+    'promotion_id'
+)
+# columns identifying a settlement line, the amount lines sharing them are stored as one row
+SETTLEMENT_LINE_KEY_COLUMNS = ('transaction_type', 'order_id', 'adjustment_id', 'shipment_id', 'order_item_code',
+                               'merchant_adjustment_item_id', 'sku', 'posted_date_time')
+SETTLEMENT_DATE_FORMAT = '%d.%m.%Y'
+SETTLEMENT_DATE_TIME_FORMAT = '%d.%m.%Y %H:%M:%S UTC'
 
 
 class AzSettlementV2(Base):
@@ -21,6 +41,7 @@ class AzSettlementV2(Base):
     category = db.Column(db.String(250), nullable=True)
     brand = db.Column(db.String(250), nullable=True)
     settlement_id = db.Column(db.String(255), nullable=False)
+    line_key = db.Column(db.String(32), nullable=True)
     settlement_start_date = db.Column(db.DateTime, nullable=True)
     settlement_end_date = db.Column(db.DateTime, nullable=True)
     deposit_date = db.Column(db.DateTime, nullable=True)
@@ -45,6 +66,8 @@ class AzSettlementV2(Base):
     created_at = db.Column(db.BigInteger)
     updated_at = db.Column(db.BigInteger)
 
+    __table_args__ = (db.UniqueConstraint('settlement_id', 'line_key', name='uq_az_settlement_v2_settlement_id_line_key'),)  # type: ignore  # noqa: FKA100
+
     def __repr__(self) -> str:
         """
             Object Representation Method for custom object representation on console or log
@@ -139,3 +162,93 @@ class AzSettlementV2(Base):
         db.session.commit()
 
         return settlement
+
+    @classmethod
+    def get_staging_frame(cls, settlement_df: pd.DataFrame, first_line_number: int) -> pd.DataFrame:
+        """Coerce a chunk of settlement report lines read as text to the staging table types, in staging column order"""
+
+        staging_df = settlement_df.reindex(columns=list(SETTLEMENT_REPORT_COLUMNS))
+        staging_df.insert(loc=0, column='line_number', value=range(first_line_number, first_line_number + len(staging_df)))
+
+        for column in ('settlement_start_date', 'settlement_end_date', 'deposit_date', 'posted_date_time'):
+            staging_df[column] = pd.to_datetime(staging_df[column], format=SETTLEMENT_DATE_TIME_FORMAT, errors='coerce').dt.strftime('%Y-%m-%d %H:%M:%S')
+
+        staging_df['posted_date'] = pd.to_datetime(staging_df['posted_date'], format=SETTLEMENT_DATE_FORMAT, errors='coerce').dt.strftime('%Y-%m-%d')
+
+        for column in ('total_amount', 'amount'):
+            staging_df[column] = pd.to_numeric(staging_df[column], errors='coerce')
+
+        staging_df['quantity_purchased'] = pd.to_numeric(staging_df['quantity_purchased'], errors='coerce').astype('Int64')
+
+        return staging_df
+
+    @classmethod
+    def bulk_upsert_report(cls, account_id: Optional[str], asp_id: Optional[str], selling_partner_id: str, report_chunks: Iterable[pd.DataFrame]) -> int:
+        """Ingest a settlement report flat file v2 read as text chunks.
+
+        The amount lines are COPYed into a staging table and merged into az_settlement_v2 with one row per
+        (settlement_id, line_key), so ingesting a settlement again rewrites the same rows. Returns the number of rows written.
+        """
+
+        current_time = int(time.time())
+        line_number = 0
+        line_identity = ', '.join(f"COALESCE({column}::text, '')" for column in SETTLEMENT_LINE_KEY_COLUMNS)
+        line_columns = ('settlement_start_date', 'settlement_end_date', 'deposit_date', 'total_amount', 'currency', 'transaction_type',
+                        'order_id', 'merchant_order_id', 'adjustment_id', 'shipment_id', 'marketplace_name', 'fulfillment_id',
+                        'posted_date', 'posted_date_time', 'order_item_code', 'merchant_order_item_id', 'merchant_adjustment_item_id',
+                        'sku', 'quantity_purchased', 'promotion_id')
+        update_columns = ('selling_partner_id', 'amount_details') + line_columns
+
+        with report_transaction() as connection:
+            connection.execute(text('''
+                CREATE TEMPORARY TABLE az_settlement_v2_staging (
+                    line_number BIGINT, settlement_id TEXT, settlement_start_date TIMESTAMP, settlement_end_date TIMESTAMP,
+                    deposit_date TIMESTAMP, total_amount NUMERIC(10, 2), currency TEXT, transaction_type TEXT, order_id TEXT,
+                    merchant_order_id TEXT, adjustment_id TEXT, shipment_id TEXT, marketplace_name TEXT, amount_type TEXT,
+                    amount_description TEXT, amount NUMERIC, fulfillment_id TEXT, posted_date DATE, posted_date_time TIMESTAMP,
+                    order_item_code TEXT, merchant_order_item_id TEXT, merchant_adjustment_item_id TEXT, sku TEXT,
+                    quantity_purchased INTEGER, promotion_id TEXT
+                ) ON COMMIT DROP
+            '''))
+
+            # COPY goes through the DBAPI cursor of the same connection
+            with connection.connection.cursor() as cursor:
+                for settlement_df in report_chunks:
+                    staging_df = cls.get_staging_frame(settlement_df=settlement_df, first_line_number=line_number)
+                    line_number += len(staging_df)
+
+                    buffer = io.StringIO()
+                    staging_df.to_csv(buffer, header=False, index=False)
+                    buffer.seek(0)
+
+                    cursor.copy_expert(sql=f'COPY az_settlement_v2_staging ({", ".join(staging_df.columns)}) FROM STDIN WITH (FORMAT csv)', file=buffer)
+
+            # rows of these settlements stored before lines were keyed cannot be matched, the report replaces them
+            connection.execute(text('''
+                DELETE FROM az_settlement_v2
+                WHERE line_key IS NULL AND settlement_id IN (SELECT DISTINCT settlement_id FROM az_settlement_v2_staging)
+            '''))
+
+            # a row already tied to an account keeps it when the settlement is ingested without one
+            result = connection.execute(text(f'''
+                INSERT INTO az_settlement_v2 (account_id, asp_id, selling_partner_id, settlement_id, line_key, amount_details,
+                                              {", ".join(line_columns)}, created_at, updated_at)
+                SELECT :account_id, :asp_id, :selling_partner_id, settlement_id, line_key,
+                       json_build_object('amount_details', json_agg(json_strip_nulls(json_build_object(
+                           'amount_type', amount_type, 'amount_description', amount_description, 'amount', amount)) ORDER BY line_number)),
+                       {", ".join(f"MAX({column})" for column in line_columns)},
+                       :current_time, :current_time
+                FROM (
+                    SELECT *, md5(concat_ws(chr(31), {line_identity})) AS line_key
+                    FROM az_settlement_v2_staging
+                    WHERE settlement_id IS NOT NULL
+                ) AS settlement_lines
+                GROUP BY settlement_id, line_key
+                ON CONFLICT ON CONSTRAINT uq_az_settlement_v2_settlement_id_line_key DO UPDATE SET
+                    account_id = COALESCE(EXCLUDED.account_id, az_settlement_v2.account_id),
+                    asp_id = COALESCE(EXCLUDED.asp_id, az_settlement_v2.asp_id),
+                    {", ".join(f"{column} = EXCLUDED.{column}" for column in update_columns)},
+                    updated_at = EXCLUDED.updated_at
+            '''), {'account_id': account_id, 'asp_id': asp_id, 'selling_partner_id': selling_partner_id, 'current_time': current_time})  # type: ignore  # noqa: FKA100
+
+        return result.rowcount
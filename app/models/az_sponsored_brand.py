@@ -2,12 +2,70 @@
 
 from datetime import datetime
 import time
+from typing import Iterable
 from typing import Optional
 
 from app import db
 from app.helpers.constants import DbAnomalies
+from app.helpers.ingestion_helper import iter_unique_batches
 from app.models.base import Base
+from app.models.base import report_transaction
+from sqlalchemy import Index
 from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+
+# keyword records buffered from the report stream per insert statement, only one batch is held in memory at a time
+UPSERT_CHUNK_SIZE = 500
+
+# column of every field of a sponsored brands keyword report record
+SPONSORED_BRAND_REPORT_FIELDS = {
+    'ad_group_name': 'adGroupName',
+    'attributed_conversions_14d': 'attributedConversions14d',
+    'attributed_conversions_14d_same_sku': 'attributedConversions14dSameSKU',
+    'attributed_sales_14d': 'attributedSales14d',
+    'attributed_sales_14d_same_sku': 'attributedSales14dSameSKU',
+    'campaign_budget': 'campaignBudget',
+    'campaign_budget_type': 'campaignBudgetType',
+    'campaign_id': 'campaignId',
+    'campaign_name': 'campaignName',
+    'campaign_status': 'campaignStatus',
+    'clicks': 'clicks',
+    'cost': 'cost',
+    'impressions': 'impressions',
+    'keyword_bid': 'keywordBid',
+    'keyword_id': 'keywordId',
+    'keyword_status': 'keywordStatus',
+    'keyword_text': 'keywordText',
+    'match_type': 'matchType',
+    'sbv_vctr': 'vctr',
+    'sbv_video_5_second_view_rate': 'video5SecondViewRate',
+    'sbv_video_5_second_views': 'video5SecondViews',
+    'sbv_video_complete_views': 'videoCompleteViews',
+    'sbv_video_first_quartile_views': 'videoFirstQuartileViews',
+    'sbv_video_midpoint_views': 'videoMidpointViews',
+    'sbv_video_third_quartile_views': 'videoThirdQuartileViews',
+    'sbv_video_unmutes': 'videoUnmutes',
+    'sbv_viewable_impressions': 'viewableImpressions',
+    'sbv_vtr': 'vtr',
+    'dpv_14d': 'dpv14d',
+    'attributed_detail_page_views_clicks_14d': 'attributedDetailPageViewsClicks14d',
+    'attributed_order_rate_new_to_brand_14d': 'attributedOrderRateNewToBrand14d',
+    'attributed_orders_new_to_brand_14d': 'attributedOrdersNewToBrand14d',
+    'attributed_orders_new_to_brand_percentage_14d': 'attributedOrdersNewToBrandPercentage14d',
+    'attributed_sales_new_to_brand_14d': 'attributedSalesNewToBrand14d',
+    'attributed_sales_new_to_brand_percentage_14d': 'attributedSalesNewToBrandPercentage14d',
+    'attributed_units_ordered_new_to_brand_14d': 'attributedUnitsOrderedNewToBrand14d',
+    'attributed_units_ordered_new_to_brand_percentage_14d': 'attributedUnitsOrderedNewToBrandPercentage14d',
+    'attributed_branded_searches_14d': 'attributedBrandedSearches14d',
+    'sbv_currency': 'currency',
+    'top_of_search_impression_share': 'topOfSearchImpressionShare',
+    'sbb_applicable_budget_rule_id': 'applicableBudgetRuleId',
+    'sbb_applicable_budget_rule_name': 'applicableBudgetRuleName',
+    'sbb_campaign_rule_based_budget': 'campaignRuleBasedBudget',
+    'sbb_search_term_impression_rank': 'searchTermImpressionRank',
+    'sbb_search_term_impression_share': 'searchTermImpressionShare',
+    'sbb_units_sold_14d': 'unitsSold14d'
+}
 
 
 class AzSponsoredBrand(Base):
@@ -76,6 +134,10 @@ class AzSponsoredBrand(Base):
     created_at = db.Column(db.BigInteger)
     updated_at = db.Column(db.BigInteger)
 
+    __table_args__ = (db.UniqueConstraint('account_id', 'asp_id', 'az_ads_profile_id', 'payload_date', 'sb_type', 'keyword_id', 'campaign_id',  # type: ignore  # noqa: FKA100
+                                          name='uq_az_sponsored_brand_account_profile_date_type_kw_campaign'),
+                      Index('ix_az_sponsored_brand_account_id_asp_id_payload_date', 'account_id', 'asp_id', 'payload_date'),)  # type: ignore  # noqa: FKA100
+
     @classmethod
     def add(cls, asp_id: str, account_id: str, payload_date: str, sb_type: str, ad_group_name: str, attributed_conversions_14d: int, attributed_conversions_14d_same_sku: int, attributed_sales_14d: int,
             attributed_sales_14d_same_sku: int, campaign_budget: float, campaign_budget_type: str, campaign_id: int, campaign_name: str, campaign_status: str,
@@ -223,6 +285,55 @@ class AzSponsoredBrand(Base):
 
         return az_sponsored_brand
 
+    @classmethod
+    def get_report_row(cls, account_id: str, asp_id: str, az_ads_profile_id: str, payload_date: str, sb_type: str, item: dict) -> dict:
+        """Row of a sponsored brands keyword report record"""
+
+        current_time = int(time.time())
+        row = {column: item.get(field) for column, field in SPONSORED_BRAND_REPORT_FIELDS.items()}
+
+        return {
+            **row,
+            'account_id': account_id,
+            'asp_id': asp_id,
+            'az_ads_profile_id': az_ads_profile_id,
+            'payload_date': payload_date,
+            'sb_type': sb_type,
+            'created_at': current_time,
+            'updated_at': current_time
+        }
+
+    @classmethod
+    def bulk_upsert_report(cls, account_id: str, asp_id: str, az_ads_profile_id: str, payload_date: str, sb_type: str, report_items: Iterable[dict]) -> int:
+        """Insert or update the records of a sponsored brands keyword report keyed on (sb_type, keyword_id, campaign_id).
+
+        report_items may be a stream, records are written in batches of UPSERT_CHUNK_SIZE as they arrive and the
+        whole report is committed at once.
+        Returns the number of rows written.
+        """
+
+        current_time = int(time.time())
+        update_columns = [column for column in SPONSORED_BRAND_REPORT_FIELDS if column not in ('keyword_id', 'campaign_id')]
+        row_count = 0
+
+        rows = (cls.get_report_row(account_id=account_id, asp_id=asp_id, az_ads_profile_id=az_ads_profile_id, payload_date=payload_date, sb_type=sb_type,
+                                   item=item) for item in report_items)
+
+        with report_transaction() as connection:
+            for batch in iter_unique_batches(rows=rows, key_columns=('keyword_id', 'campaign_id'), batch_size=UPSERT_CHUNK_SIZE):
+                insert_stmt = insert(cls).values(batch)
+                upsert_stmt = insert_stmt.on_conflict_do_update(
+                    constraint='uq_az_sponsored_brand_account_profile_date_type_kw_campaign',
+                    set_={
+                        **{column: insert_stmt.excluded[column] for column in update_columns},
+                        'updated_at': current_time
+                    }
+                )
+                connection.execute(upsert_stmt)
+                row_count += len(batch)
+
+        return row_count
+
     @classmethod
     def get_ad_stats(cls, account_id: str, asp_id: str, from_date: str, to_date: str, category: Optional[tuple] = None, brand: Optional[tuple] = None,
                      product: Optional[tuple] = None):
@@ -2,13 +2,80 @@
 
 from datetime import datetime
 import time
+from typing import Iterable
 from typing import Optional
 
 from app import db
+from app.helpers.brand_category_helper import BrandCategoryLookup
 from app.helpers.constants import DbAnomalies
+from app.helpers.ingestion_helper import iter_unique_batches
 from app.models.az_item_master import AzItemMaster
 from app.models.base import Base
+from app.models.base import report_transaction
+from sqlalchemy import Index
 from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+
+# rows per insert statement, a display report is streamed so this is also the number of records kept in memory
+UPSERT_CHUNK_SIZE = 500
+
+# column of every field of a sponsored display product ad report record
+SPONSORED_DISPLAY_REPORT_FIELDS = {
+    'ad_group_id': 'adGroupId',
+    'ad_group_name': 'adGroupName',
+    'ad_id': 'adId',
+    'asin': 'asin',
+    'attributed_conversions_14d': 'attributedConversions14d',
+    'attributed_conversions_14d_same_sku': 'attributedConversions14dSameSKU',
+    'attributed_conversions_1d': 'attributedConversions1d',
+    'attributed_conversions_1d_same_sku': 'attributedConversions1dSameSKU',
+    'attributed_conversions_30d': 'attributedConversions30d',
+    'attributed_conversions_30d_same_sku': 'attributedConversions30dSameSKU',
+    'attributed_conversions_7d': 'attributedConversions7d',
+    'attributed_conversions_7d_same_sku': 'attributedConversions7dSameSKU',
+    'attributed_detail_page_view_14d': 'attributedDetailPageView14d',
+    'attributed_orders_new_to_brand_14d': 'attributedOrdersNewToBrand14d',
+    'attributed_sales_14d': 'attributedSales14d',
+    'attributed_sales_14d_same_sku': 'attributedSales14dSameSKU',
+    'attributed_sales_1d': 'attributedSales1d',
+    'attributed_sales_1d_same_sku': 'attributedSales1dSameSKU',
+    'attributed_sales_30d': 'attributedSales30d',
+    'attributed_sales_30d_same_sku': 'attributedSales30dSameSKU',
+    'attributed_sales_7d': 'attributedSales7d',
+    'attributed_sales_7d_same_sku': 'attributedSales7dSameSKU',
+    'attributed_sales_new_to_brand_14d': 'attributedSalesNewToBrand14d',
+    'attributed_units_ordered_14d': 'attributedUnitsOrdered14d',
+    'attributed_units_ordered_1d': 'attributedUnitsOrdered1d',
+    'attributed_units_ordered_30d': 'attributedUnitsOrdered30d',
+    'attributed_units_ordered_7d': 'attributedUnitsOrdered7d',
+    'attributed_units_ordered_new_to_brand_14d': 'attributedUnitsOrderedNewToBrand14d',
+    'campaign_id': 'campaignId',
+    'campaign_name': 'campaignName',
+    'clicks': 'clicks',
+    'cost': 'cost',
+    'currency': 'currency',
+    'impressions': 'impressions',
+    'sku': 'sku',
+    'view_attributed_conversions_14d': 'viewAttributedConversions14d',
+    'view_impressions': 'viewImpressions',
+    'view_attributed_detail_page_view_14d': 'viewAttributedDetailPageView14d',
+    'view_attributed_sales_14d': 'viewAttributedSales14d',
+    'view_attributed_units_ordered_14d': 'viewAttributedUnitsOrdered14d',
+    'view_attributed_orders_new_to_brand_14d': 'viewAttributedOrdersNewToBrand14d',
+    'view_attributed_sales_new_to_brand_14d': 'viewAttributedSalesNewToBrand14d',
+    'view_attributed_units_ordered_new_to_brand_14d': 'viewAttributedUnitsOrderedNewToBrand14d',
+    'attributed_branded_searches_14d': 'attributedBrandedSearches14d',
+    'view_attributed_branded_searches_14d': 'viewAttributedBrandedSearches14d',
+    'video_complete_views': 'videoCompleteViews',
+    'video_first_quartile_views': 'videoFirstQuartileViews',
+    'video_midpoint_views': 'videoMidpointViews',
+    'video_third_quartile_views': 'videoThirdQuartileViews',
+    'video_unmutes': 'videoUnmutes',
+    'vtr': 'vtr',
+    'vctr': 'vctr',
+    'avg_impressions_frequency': 'avgImpressionsFrequency',
+    'cumulative_reach': 'cumulativeReach'
+}
 
 
 class AzSponsoredDisplay(Base):
@@ -81,6 +148,10 @@ class AzSponsoredDisplay(Base):
     created_at = db.Column(db.BigInteger)
     updated_at = db.Column(db.BigInteger)
 
+    __table_args__ = (db.UniqueConstraint('account_id', 'asp_id', 'az_ads_profile_id', 'payload_date', 'ad_id', 'asin', 'campaign_id',  # type: ignore  # noqa: FKA100
+                                          name='uq_az_sponsored_display_account_profile_date_ad_asin_campaign'),
+                      Index('ix_az_sponsored_display_account_id_asp_id_payload_date', 'account_id', 'asp_id', 'payload_date'),)  # type: ignore  # noqa: FKA100
+
     @classmethod
     def add(cls, asp_id: str, account_id: str, payload_date: str, ad_group_id: int, ad_group_name: str, ad_id: int, asin: str, attributed_conversions_14d: int,
             attributed_conversions_14d_same_sku: int, attributed_conversions_1d: int, attributed_conversions_1d_same_sku: int, attributed_conversions_30d: int,
@@ -93,13 +164,13 @@ class AzSponsoredDisplay(Base):
             view_attributed_sales_14d: int, view_attributed_units_ordered_14d: int, view_attributed_orders_new_to_brand_14d: int, view_attributed_sales_new_to_brand_14d: int,
             view_attributed_units_ordered_new_to_brand_14d: int, attributed_branded_searches_14d: int, view_attributed_branded_searches_14d: int, video_complete_views: int,
             video_first_quartile_views: int, video_midpoint_views: int, video_third_quartile_views: int, video_unmutes: int, vtr: float,
-            vctr: float, avg_impressions_frequency: float, cumulative_reach: int):
+            vctr: float, avg_impressions_frequency: float, cumulative_reach: int, brand_category_lookup: Optional[BrandCategoryLookup] = None):
         """method to add sponsored dispay data in az_sponsored_display table"""
 
         category, brand = None, None
 
         if sku:
-            category, brand = AzItemMaster.get_category_brand_by_sku(
+            category, brand = (brand_category_lookup or AzItemMaster).get_category_brand_by_sku(
                 account_id=account_id, asp_id=asp_id, seller_sku=sku)
 
         az_sponsored_display = cls()
@@ -180,13 +251,13 @@ class AzSponsoredDisplay(Base):
                    view_attributed_sales_14d: int, view_attributed_units_ordered_14d: int, view_attributed_orders_new_to_brand_14d: int, view_attributed_sales_new_to_brand_14d: int,
                    view_attributed_units_ordered_new_to_brand_14d: int, attributed_branded_searches_14d: int, view_attributed_branded_searches_14d: int, video_complete_views: int,
                    video_first_quartile_views: int, video_midpoint_views: int, video_third_quartile_views: int, video_unmutes: int, vtr: float,
-                   vctr: float, avg_impressions_frequency: float, cumulative_reach: int):
+                   vctr: float, avg_impressions_frequency: float, cumulative_reach: int, brand_category_lookup: Optional[BrandCategoryLookup] = None):
         """Insert if new sponsored display record according to date or update it."""
 
         category, brand = None, None
 
         if sku:
-            category, brand = AzItemMaster.get_category_brand_by_sku(
+            category, brand = (brand_category_lookup or AzItemMaster).get_category_brand_by_sku(
                 account_id=account_id, asp_id=asp_id, seller_sku=sku)
 
         az_sponsored_display = db.session.query(cls).filter(
@@ -262,6 +333,59 @@ class AzSponsoredDisplay(Base):
 
         return az_sponsored_display
 
+    @classmethod
+    def get_report_row(cls, account_id: str, asp_id: str, az_ads_profile_id: str, payload_date: str, item: dict, brand_category_lookup: Optional[BrandCategoryLookup] = None) -> dict:
+        """Row of a sponsored display product ad report record"""
+
+        current_time = int(time.time())
+        row = {column: item.get(field) for column, field in SPONSORED_DISPLAY_REPORT_FIELDS.items()}
+        row['category'], row['brand'] = None, None
+
+        if row['sku']:
+            row['category'], row['brand'] = (brand_category_lookup or AzItemMaster).get_category_brand_by_sku(
+                account_id=account_id, asp_id=asp_id, seller_sku=row['sku'])
+
+        return {
+            **row,
+            'account_id': account_id,
+            'asp_id': asp_id,
+            'az_ads_profile_id': az_ads_profile_id,
+            'payload_date': payload_date,
+            'created_at': current_time,
+            'updated_at': current_time
+        }
+
+    @classmethod
+    def bulk_upsert_report(cls, account_id: str, asp_id: str, az_ads_profile_id: str, payload_date: str, report_items: Iterable[dict], brand_category_lookup: Optional[BrandCategoryLookup] = None) -> int:
+        """Insert or update the records of a sponsored display product ad report keyed on (ad_id, asin, campaign_id).
+
+        report_items may be a stream, records are written in batches of UPSERT_CHUNK_SIZE as they arrive and the
+        whole report is committed at once.
+        Returns the number of rows written.
+        """
+
+        current_time = int(time.time())
+        update_columns = [column for column in SPONSORED_DISPLAY_REPORT_FIELDS if column not in ('ad_id', 'asin', 'campaign_id')] + ['category', 'brand']
+        row_count = 0
+
+        rows = (cls.get_report_row(account_id=account_id, asp_id=asp_id, az_ads_profile_id=az_ads_profile_id, payload_date=payload_date,
+                                   item=item, brand_category_lookup=brand_category_lookup) for item in report_items)
+
+        with report_transaction() as connection:
+            for batch in iter_unique_batches(rows=rows, key_columns=('ad_id', 'asin', 'campaign_id'), batch_size=UPSERT_CHUNK_SIZE):
+                insert_stmt = insert(cls).values(batch)
+                upsert_stmt = insert_stmt.on_conflict_do_update(
+                    constraint='uq_az_sponsored_display_account_profile_date_ad_asin_campaign',
+                    set_={
+                        **{column: insert_stmt.excluded[column] for column in update_columns},
+                        'updated_at': current_time
+                    }
+                )
+                connection.execute(upsert_stmt)
+                row_count += len(batch)
+
+        return row_count
+
     @classmethod
     def get_ad_stats(cls, account_id: str, asp_id: str, from_date: str, to_date: str, category: Optional[tuple] = None, brand: Optional[tuple] = None,
                      product: Optional[tuple] = None):
@@ -2,13 +2,78 @@
 
 from datetime import datetime
 import time
+from typing import Iterable
 from typing import Optional
 
 from app import db
+from app.helpers.brand_category_helper import BrandCategoryLookup
 from app.helpers.constants import DbAnomalies
+from app.helpers.ingestion_helper import iter_unique_batches
 from app.models.az_item_master import AzItemMaster
 from app.models.base import Base
+from app.models.base import report_transaction
+from sqlalchemy import Index
 from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+
+# advertised product records written per insert statement while the report streams in, bounds the memory of a batch
+UPSERT_CHUNK_SIZE = 500
+
+# column of every field of a sponsored products advertised product report record
+SPONSORED_PRODUCT_REPORT_FIELDS = {
+    'attributed_sales_same_sku_1d': 'attributedSalesSameSku1d',
+    'roas_clicks_14d': 'roasClicks14d',
+    'end_date': 'endDate',
+    'units_sold_clicks_1d': 'unitsSoldClicks1d',
+    'attributed_sales_same_sku_14d': 'attributedSalesSameSku14d',
+    'sales_7d': 'sales7d',
+    'attributed_sales_same_sku_30d': 'attributedSalesSameSku30d',
+    'kindle_edition_normalized_pages_royalties_14d': 'kindleEditionNormalizedPagesRoyalties14d',
+    'units_sold_same_sku_1d': 'unitsSoldSameSku1d',
+    'campaign_status': 'campaignStatus',
+    'advertised_sku': 'advertisedSku',
+    'sales_other_sku_7d': 'salesOtherSku7d',
+    'purchases_same_sku_7d': 'purchasesSameSku7d',
+    'campaign_budget_amount': 'campaignBudgetAmount',
+    'purchases_7d': 'purchases7d',
+    'units_sold_same_sku_30d': 'unitsSoldSameSku30d',
+    'cost_per_click': 'costPerClick',
+    'units_sold_clicks_14d': 'unitsSoldClicks14d',
+    'ad_group_name': 'adGroupName',
+    'campaign_id': 'campaignId',
+    'click_through_rate': 'clickThroughRate',
+    'kindle_edition_normalized_pages_read_14d': 'kindleEditionNormalizedPagesRead14d',
+    'acos_clicks_14d': 'acosClicks14d',
+    'units_sold_clicks_30d': 'unitsSoldClicks30d',
+    'portfolio_id': 'portfolioId',
+    'ad_id': 'adId',
+    'campaign_budget_currency_code': 'campaignBudgetCurrencyCode',
+    'start_date': 'startDate',
+    'roas_clicks_7d': 'roasClicks7d',
+    'units_sold_same_sku_14d': 'unitsSoldSameSku14d',
+    'units_sold_clicks_7d': 'unitsSoldClicks7d',
+    'attributed_sales_same_sku_7d': 'attributedSalesSameSku7d',
+    'sales_1d': 'sales1d',
+    'ad_group_id': 'adGroupId',
+    'purchases_same_sku_14d': 'purchasesSameSku14d',
+    'units_sold_other_sku_7d': 'unitsSoldOtherSku7d',
+    'spend': 'spend',
+    'purchases_same_sku_1d': 'purchasesSameSku1d',
+    'campaign_budget_type': 'campaignBudgetType',
+    'advertised_asin': 'advertisedAsin',
+    'purchases_1d': 'purchases1d',
+    'units_sold_same_sku_7d': 'unitsSoldSameSku7d',
+    'cost': 'cost',
+    'sales_14d': 'sales14d',
+    'acos_clicks_7d': 'acosClicks7d',
+    'sales_30d': 'sales30d',
+    'impressions': 'impressions',
+    'purchases_same_sku_30d': 'purchasesSameSku30d',
+    'purchases_14d': 'purchases14d',
+    'purchases_30d': 'purchases30d',
+    'clicks': 'clicks',
+    'campaign_name': 'campaignName'
+}
 
 
 class AzSponsoredProduct(Base):
@@ -79,6 +144,10 @@ class AzSponsoredProduct(Base):
     created_at = db.Column(db.BigInteger)
     updated_at = db.Column(db.BigInteger)
 
+    __table_args__ = (db.UniqueConstraint('account_id', 'asp_id', 'az_ads_profile_id', 'payload_date', 'ad_id', 'advertised_asin', 'advertised_sku',  # type: ignore  # noqa: FKA100
+                                          name='uq_az_sponsored_product_account_profile_date_ad_asin_sku'),
+                      Index('ix_az_sponsored_product_account_id_asp_id_payload_date', 'account_id', 'asp_id', 'payload_date'),)  # type: ignore  # noqa: FKA100
+
     @classmethod
     def add(cls, asp_id: str, account_id: str, payload_date: str, attributed_sales_same_sku_1d: float, roas_clicks_14d: float,
             end_date: str, units_sold_clicks_1d: int, attributed_sales_same_sku_14d: float, sales_7d: float,
@@ -93,13 +162,13 @@ class AzSponsoredProduct(Base):
             units_sold_other_sku_7d: int, spend: float, purchases_same_sku_1d: int, campaign_budget_type: str,
             advertised_asin: str, purchases_1d: int, units_sold_same_sku_7d: int, cost: float, sales_14d: float,
             acos_clicks_7d: float, sales_30d: float, impressions: int, purchases_same_sku_30d: int, purchases_14d: int,
-            purchases_30d: int, clicks: int, campaign_name: str):
+            purchases_30d: int, clicks: int, campaign_name: str, brand_category_lookup: Optional[BrandCategoryLookup] = None):
         """insert into az_sponsored_product table"""
 
         category, brand = None, None
 
         if advertised_sku:
-            category, brand = AzItemMaster.get_category_brand_by_sku(
+            category, brand = (brand_category_lookup or AzItemMaster).get_category_brand_by_sku(
                 account_id=account_id, asp_id=asp_id, seller_sku=advertised_sku)
 
         az_sponsored_product = cls()
@@ -180,13 +249,13 @@ class AzSponsoredProduct(Base):
                    units_sold_other_sku_7d: int, spend: float, purchases_same_sku_1d: int, campaign_budget_type: str,
                    advertised_asin: str, purchases_1d: int, units_sold_same_sku_7d: int, cost: float, sales_14d: float,
                    acos_clicks_7d: float, sales_30d: float, impressions: int, purchases_same_sku_30d: int, purchases_14d: int,
-                   purchases_30d: int, clicks: int, campaign_name: str):
+                   purchases_30d: int, clicks: int, campaign_name: str, brand_category_lookup: Optional[BrandCategoryLookup] = None):
         """Insert if new sponsored product record according to date or update it."""
 
         category, brand = None, None
 
         if advertised_sku:
-            category, brand = AzItemMaster.get_category_brand_by_sku(
+            category, brand = (brand_category_lookup or AzItemMaster).get_category_brand_by_sku(
                 account_id=account_id, asp_id=asp_id, seller_sku=advertised_sku)
 
         az_sponsored_product = db.session.query(cls).filter(
@@ -260,6 +329,59 @@ class AzSponsoredProduct(Base):
 
         return az_sponsored_product
 
+    @classmethod
+    def get_report_row(cls, account_id: str, asp_id: str, az_ads_profile_id: str, payload_date: str, item: dict, brand_category_lookup: Optional[BrandCategoryLookup] = None) -> dict:
+        """Row of a sponsored products advertised product report record"""
+
+        current_time = int(time.time())
+        row = {column: item.get(field) for column, field in SPONSORED_PRODUCT_REPORT_FIELDS.items()}
+        row['category'], row['brand'] = None, None
+
+        if row['advertised_sku']:
+            row['category'], row['brand'] = (brand_category_lookup or AzItemMaster).get_category_brand_by_sku(
+                account_id=account_id, asp_id=asp_id, seller_sku=row['advertised_sku'])
+
+        return {
+            **row,
+            'account_id': account_id,
+            'asp_id': asp_id,
+            'az_ads_profile_id': az_ads_profile_id,
+            'payload_date': payload_date,
+            'created_at': current_time,
+            'updated_at': current_time
+        }
+
+    @classmethod
+    def bulk_upsert_report(cls, account_id: str, asp_id: str, az_ads_profile_id: str, payload_date: str, report_items: Iterable[dict], brand_category_lookup: Optional[BrandCategoryLookup] = None) -> int:
+        """Insert or update the records of a sponsored products advertised product report keyed on (ad_id, advertised_asin, advertised_sku).
+
+        report_items may be a stream, records are written in batches of UPSERT_CHUNK_SIZE as they arrive and the
+        whole report is committed at once.
+        Returns the number of rows written.
+        """
+
+        current_time = int(time.time())
+        update_columns = [column for column in SPONSORED_PRODUCT_REPORT_FIELDS if column not in ('ad_id', 'advertised_asin', 'advertised_sku')] + ['category', 'brand']
+        row_count = 0
+
+        rows = (cls.get_report_row(account_id=account_id, asp_id=asp_id, az_ads_profile_id=az_ads_profile_id, payload_date=payload_date,
+                                   item=item, brand_category_lookup=brand_category_lookup) for item in report_items)
+
+        with report_transaction() as connection:
+            for batch in iter_unique_batches(rows=rows, key_columns=('ad_id', 'advertised_asin', 'advertised_sku'), batch_size=UPSERT_CHUNK_SIZE):
+                insert_stmt = insert(cls).values(batch)
+                upsert_stmt = insert_stmt.on_conflict_do_update(
+                    constraint='uq_az_sponsored_product_account_profile_date_ad_asin_sku',
+                    set_={
+                        **{column: insert_stmt.excluded[column] for column in update_columns},
+                        'updated_at': current_time
+                    }
+                )
+                connection.execute(upsert_stmt)
+                row_count += len(batch)
+
+        return row_count
+
     @classmethod
     def get_ad_stats(cls, account_id: str, asp_id: str, from_date: str, to_date: str, category: Optional[tuple] = None, brand: Optional[tuple] = None,
                      product: Optional[tuple] = None):
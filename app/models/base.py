@@ -1,13 +1,36 @@
 """Contains some basic definitions that can be extended by other models."""
 
+from contextlib import contextmanager
 from typing import Any
+from typing import Iterator
 from typing import Optional
 from uuid import uuid4
 
 from app import db
 from app import logger
 from sqlalchemy import and_
+from sqlalchemy import column
+from sqlalchemy import func
+from sqlalchemy import String
+from sqlalchemy import tuple_
 from sqlalchemy import update
+from sqlalchemy import values
+from sqlalchemy.engine import Connection
+
+SKU_ATTRIBUTES = ('seller_sku', 'sku', 'msku', 'advertised_sku')
+ASIN_ATTRIBUTES = ('asin', 'child_asin')
+
+
+@contextmanager
+def report_transaction() -> Iterator[Connection]:
+    """Connection with an open transaction, committed on exit and rolled back on error.
+
+    The engine runs in autocommit, bulk writes use this so readers never see a report half written.
+    """
+    with db.engine.connect() as connection:
+        connection.execution_options(isolation_level='READ COMMITTED')
+        with connection.begin():
+            yield connection
 
 
 class Base(db.Model):
@@ -78,9 +101,7 @@ class Base(db.Model):
         logger.info(f'Category: {category}')
         logger.info(f'Brand: {brand}')
 
-        sku_attributes = ['seller_sku', 'sku', 'msku', 'advertised_sku']
-
-        for sku_attr in sku_attributes:
+        for sku_attr in SKU_ATTRIBUTES:
             if hasattr(cls, sku_attr):
                 logger.info('Base Model line 119 -> %s', sku_attr)
 
@@ -110,9 +131,7 @@ class Base(db.Model):
         logger.info(f'Category: {category}')
         logger.info(f'Brand: {brand}')
 
-        asin_attributes = ['asin', 'child_asin']
-
-        for asin_attr in asin_attributes:
+        for asin_attr in ASIN_ATTRIBUTES:
             if hasattr(cls, asin_attr):
                 logger.info('Base Model line 119 -> %s', asin_attr)
 
@@ -132,3 +151,36 @@ class Base(db.Model):
                 return None
 
         return None
+
+    @classmethod
+    def store_brand_category_bulk(cls, connection: Connection, account_id: str, brand_categories: dict, by_asin: bool = False) -> int:
+        """Set brand and category for many skus (or asins) with one UPDATE ... FROM (VALUES ...).
+
+        brand_categories maps sku (or asin) to a (brand, category) tuple, a None keeps the stored value.
+        Rows that already match are left untouched. Returns the number of updated rows.
+        """
+        key_attr = next((attr for attr in (ASIN_ATTRIBUTES if by_asin else SKU_ATTRIBUTES) if hasattr(cls, attr)), None)  # type: ignore  # noqa: FKA100
+
+        if key_attr is None or not brand_categories:
+            return 0
+
+        mapping = values(column('key', String), column('brand', String), column('category', String), name='brand_category').data(  # type: ignore  # noqa: FKA100
+            [(key, brand, category) for key, (brand, category) in brand_categories.items()])
+
+        brand = func.coalesce(mapping.c.brand, cls.brand)     # type: ignore  # noqa: FKA100
+        category = func.coalesce(mapping.c.category, cls.category)     # type: ignore  # noqa: FKA100
+
+        stmt = (
+            update(cls.__table__)     # type: ignore  # noqa: FKA100
+            .where(
+                cls.account_id == account_id,
+                getattr(cls, key_attr) == mapping.c.key,
+                tuple_(cls.brand, cls.category).is_distinct_from(tuple_(brand, category))     # type: ignore  # noqa: FKA100
+            )
+            .values(brand=brand, category=category)
+        )
+
+        result = connection.execute(stmt)
+        logger.info('Updated brand and category of %s rows in %s', result.rowcount, cls.__table__.name)     # type: ignore  # noqa: FKA100
+
+        return result.rowcount
@@ -6,6 +6,7 @@ from typing import Any
 
 from app import db
 from app import logger
+from app.helpers.auth_context_helper import invalidate_auth_context
 from app.helpers.constants import DbAnomalies
 from app.helpers.constants import SubscriptionStates
 from app.models.base import Base
@@ -54,6 +55,7 @@ class Subscription(Base):
         subscription.created_at = int(time.time())
 
         subscription.save()
+        invalidate_auth_context(account_id=account_id)
 
         return subscription
 
@@ -88,6 +90,8 @@ class Subscription(Base):
         else:
             db.session.commit()
 
+        invalidate_auth_context(account_id=account_id)
+
         return subscription
 
     @classmethod
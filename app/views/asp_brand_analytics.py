@@ -7,6 +7,8 @@ from app.helpers.constants import HttpStatusCode
 from app.helpers.constants import ResponseMessageKeys
 from app.helpers.decorators import api_time_logger
 from app.helpers.decorators import token_required
+from app.helpers.rate_limit_helper import SpApiThrottlingException
+from app.helpers.throttle_helper import send_throttled_response
 from app.helpers.utility import get_asp_market_place_ids
 from app.helpers.utility import send_json_response
 from app.models.az_report import AzReport
@@ -53,6 +55,9 @@ class BrandAnalyticsReports:
 
             return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=response['reportId'], error=None)
 
+        except SpApiThrottlingException as exception_error:
+            return send_throttled_response(exception=exception_error)
+
         except Exception as exception_error:
             logger.error(
                 f'Exception occured while creating item master report: {exception_error}')
@@ -83,6 +88,9 @@ class BrandAnalyticsReports:
 
             return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=report_status, error=None)
 
+        except SpApiThrottlingException as exception_error:
+            return send_throttled_response(exception=exception_error)
+
         except Exception as exception_error:
             logger.error(
                 f'Exception occured while verifying item master report: {exception_error}')
@@ -162,6 +170,9 @@ class BrandAnalyticsReports:
 
             return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=None, error=None)
 
+        except SpApiThrottlingException as exception_error:
+            return send_throttled_response(exception=exception_error)
+
         except Exception as exception_error:
             logger.error(
                 f'Exception occured while verifying item master report: {exception_error}')
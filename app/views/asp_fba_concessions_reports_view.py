@@ -8,6 +8,8 @@ from app.helpers.constants import HttpStatusCode
 from app.helpers.constants import ResponseMessageKeys
 from app.helpers.decorators import api_time_logger
 from app.helpers.decorators import token_required
+from app.helpers.rate_limit_helper import SpApiThrottlingException
+from app.helpers.throttle_helper import send_throttled_response
 from app.helpers.utility import get_asp_market_place_ids
 from app.helpers.utility import send_json_response
 from app.models.az_fba_returns import AzFbaReturns
@@ -51,6 +53,9 @@ class FbaConcessionsReports:
 
             return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=response['reportId'], error=None)
 
+        except SpApiThrottlingException as exception_error:
+            return send_throttled_response(exception=exception_error)
+
         except Exception as exception_error:
             """ Exception in creating FBA Returns Report """
             logger.error(
@@ -91,6 +96,9 @@ class FbaConcessionsReports:
 
             return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=report_status, error=None)
 
+        except SpApiThrottlingException as exception_error:
+            return send_throttled_response(exception=exception_error)
+
         except Exception as exception_error:
             """ Exception in verifying FBA Returns Report Id """
             logger.error(
@@ -179,6 +187,9 @@ class FbaConcessionsReports:
 
             return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=retrive_report, error=None)
 
+        except SpApiThrottlingException as exception_error:
+            return send_throttled_response(exception=exception_error)
+
         except Exception as exception_error:
             """ Exception in retriving FBA Returns Report """
             logger.error(
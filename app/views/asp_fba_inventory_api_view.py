@@ -7,6 +7,8 @@ from app.helpers.constants import HttpStatusCode
 from app.helpers.constants import ResponseMessageKeys
 from app.helpers.decorators import api_time_logger
 from app.helpers.decorators import token_required
+from app.helpers.rate_limit_helper import SpApiThrottlingException
+from app.helpers.throttle_helper import send_throttled_response
 from app.helpers.utility import get_asp_market_place_ids
 from app.helpers.utility import send_json_response
 from app.models.az_item_master import AzItemMaster
@@ -65,9 +67,6 @@ class AspFbaInventoryApiView:
                     if not params['nextToken']:
                         break
 
-                    # Add sleep time to ensure 2 requests per second
-                    time.sleep(0.5)
-
                 prepare_fba_json = []
                 for inventory in all_inventory_summaries:
                     # fba_inventory_json = json.dumps(inventory)
@@ -89,6 +88,9 @@ class AspFbaInventoryApiView:
 
             return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.UPDATED.value, error=None)
 
+        except SpApiThrottlingException as exception_error:
+            return send_throttled_response(exception=exception_error)
+
         except Exception as exception_error:
             """ Exception while fetching FBA Inventory API """
             logger.error(
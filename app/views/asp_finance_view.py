@@ -20,6 +20,7 @@ from app.helpers.utility import send_json_response
 from app.models.az_financial_event import AzFinancialEvent
 from app.models.az_item_master import AzItemMaster
 from app.models.az_product_performance import AzProductPerformance
+from app.models.az_product_performance_daily import AzProductPerformanceDaily
 from flask import request
 from werkzeug.exceptions import BadRequest
 
@@ -262,13 +263,19 @@ class AspFinanceView():
             )
 
     @staticmethod
-    def get_price_action(account_id, asp_id, az_order_id):  # type: ignore  # noqa: C901
+    def get_price_action(account_id, asp_id, az_order_id):
         """ Calculate Total Expense, Sales and it's Price break"""
 
         # Get the financial event data from the database.
         finance_data_event = AzFinancialEvent.get_by_az_order_id(
             account_id=account_id, asp_id=asp_id, az_order_id=az_order_id)
 
+        return AspFinanceView.calculate_price_action(finance_data_event=finance_data_event)
+
+    @staticmethod
+    def calculate_price_action(finance_data_event: list):  # type: ignore  # noqa: C901
+        """ Calculate Total Expense, Sales and it's Price break from the finance events of an order, ordered by posted date"""
+
         _az_order_id_dict = {}
         _refund_event_az_order_id_dict = []
 
@@ -488,141 +495,141 @@ class AspFinanceView():
         return data
 
     @staticmethod
-    def add_finance_events(account_id: str, asp_id: str, event_type: str, event_list: list, service_event_list=None):  # type: ignore  # noqa: C901
-        """ Add event to database """
+    def add_finance_event_page(account_id: str, asp_id: str, finance_data: dict):  # type: ignore  # noqa: C901
+        """ Add a page of finance events to database and refresh product performance of its orders in bulk """
 
-        all_az_order_id = []
+        # events are keyed like the stored rows, the last event of a key wins
+        events = {}
+        # orders whose product performance is refreshed, in the order they were first seen
+        price_action_az_order_ids = {}
+        refund_posted_dates = {}
 
-        refund_event_orders = []
+        for event_type in (AspFinanceEventList.SHIPMENT.value, AspFinanceEventList.REFUND.value):
+            for obj in finance_data.get(event_type) or []:
+                az_order_id = obj.get('AmazonOrderId')
+                posted_date = obj.get('PostedDate')
 
-        for obj in event_list:
+                price_action_az_order_ids[az_order_id] = None
 
-            az_order_id = None
-            seller_order_id = None
-            seller_sku = None
-            finance_type = None
-            finance_value = None
-            posted_date = None
-            marketplace_name = None
+                if event_type == AspFinanceEventList.REFUND.value:
+                    refund_posted_dates.setdefault(az_order_id, []).append(posted_date)  # type: ignore  # noqa: FKA100
 
-            if event_type == AspFinanceEventList.SHIPMENT.value:
+                events[(az_order_id, event_type, posted_date, None)] = {
+                    'az_order_id': az_order_id,
+                    'seller_order_id': obj.get('SellerOrderId'),
+                    'market_place': obj.get('MarketplaceName'),
+                    'posted_date': posted_date,
+                    'event_type': event_type,
+                    'event_json': obj
+                }
 
-                az_order_id = obj.get('AmazonOrderId')
-                marketplace_name = obj.get('MarketplaceName')
-                posted_date = obj.get('PostedDate')
-                seller_order_id = obj.get('SellerOrderId')
+        # service fees are stored against the posted date of the refund of the same order
+        service_event_list = finance_data.get(AspFinanceEventList.SERVICE_FEE.value)
+        if refund_posted_dates and service_event_list:
+            unmatched_posted_dates = {az_order_id: list(posted_dates) for az_order_id, posted_dates in refund_posted_dates.items()}
+            service_fees = []
 
-                if az_order_id not in all_az_order_id:
-                    all_az_order_id.append(az_order_id)
+            for service_event_ob in service_event_list:
+                az_order_id = service_event_ob.get('AmazonOrderId')
+                posted_date = unmatched_posted_dates[az_order_id].pop(0) if unmatched_posted_dates.get(az_order_id) else None
+                service_fees.append((az_order_id, posted_date, service_event_ob))
 
-                AspFinanceView.add_update(account_id=account_id, asp_id=asp_id, az_order_id=az_order_id, seller_order_id=seller_order_id, market_place=marketplace_name,
-                                          posted_date=posted_date, event_type=event_type, event_json=obj, finance_type=finance_type, finance_value=finance_value)
+            missing_az_order_ids = {az_order_id for az_order_id, posted_date, _ in service_fees if posted_date is None and az_order_id not in refund_posted_dates}
+            stored_refund_posted_dates = {}
+            if missing_az_order_ids:
+                for finance_event in AzFinancialEvent.get_by_az_order_ids(account_id=account_id, asp_id=asp_id, az_order_ids=missing_az_order_ids):
+                    if finance_event.event_type == AspFinanceEventList.REFUND.value:
+                        stored_refund_posted_dates.setdefault(finance_event.az_order_id, finance_event.posted_date)  # type: ignore  # noqa: FKA100
 
-            elif event_type == AspFinanceEventList.REFUND.value:
+            for az_order_id, posted_date, service_event_ob in service_fees:
+                if posted_date is None:
+                    posted_date = refund_posted_dates[az_order_id][0] if az_order_id in refund_posted_dates else stored_refund_posted_dates.get(az_order_id)
 
-                az_order_id = obj.get('AmazonOrderId')
-                marketplace_name = obj.get('MarketplaceName')
-                posted_date = obj.get('PostedDate')
-                seller_order_id = obj.get('SellerOrderId')
+                if posted_date is not None:
+                    events[(az_order_id, AspFinanceEventList.SERVICE_FEE.value, posted_date, None)] = {
+                        'az_order_id': az_order_id,
+                        'posted_date': posted_date,
+                        'event_type': AspFinanceEventList.SERVICE_FEE.value,
+                        'event_json': service_event_ob
+                    }
 
-                if az_order_id not in all_az_order_id:
-                    all_az_order_id.append(az_order_id)
+        for obj in finance_data.get(AspFinanceEventList.PRODUCT_ADS_PAYMENT.value) or []:
+            finance_type, finance_value, posted_date = AspFinanceView.product_ads_payment_event_list(
+                obj)
+            events[(None, AspFinanceEventList.PRODUCT_ADS_PAYMENT.value, posted_date, None)] = {
+                'az_order_id': None,
+                'posted_date': posted_date,
+                'event_type': AspFinanceEventList.PRODUCT_ADS_PAYMENT.value,
+                'event_json': obj,
+                'finance_type': finance_type,
+                'finance_value': finance_value
+            }
 
-                refund_event = {
-                    'az_order_id': az_order_id,
-                    'posted_date': posted_date
+        for obj in finance_data.get(AspFinanceEventList.ADJUSTMENT.value) or []:
+            adjustment_event_dict = AspFinanceView.adjustment_event_list(
+                obj)
+
+            for adjustment_event_sku, adjustment_event_value in adjustment_event_dict.items():
+                posted_date = adjustment_event_value.get('posted_date')
+                events[(None, AspFinanceEventList.ADJUSTMENT.value, posted_date, adjustment_event_sku)] = {
+                    'az_order_id': None,
+                    'posted_date': posted_date,
+                    'event_type': AspFinanceEventList.ADJUSTMENT.value,
+                    'event_json': obj,
+                    'finance_type': adjustment_event_value.get('finance_type'),
+                    'finance_value': adjustment_event_value.get('finance_value'),
+                    'seller_sku': adjustment_event_sku
                 }
 
-                refund_event_orders.append(refund_event)
-
-                AspFinanceView.add_update(account_id=account_id, asp_id=asp_id, az_order_id=az_order_id, seller_order_id=seller_order_id, market_place=marketplace_name,
-                                          posted_date=posted_date, event_type=event_type, event_json=obj, finance_type=finance_type, finance_value=finance_value)
-
-            elif event_type == AspFinanceEventList.ADJUSTMENT.value:
+        event_skus = {event['seller_sku'] for event in events.values() if event.get('seller_sku')}
+        brand_categories = AzItemMaster.get_category_brand_by_skus(account_id=account_id, asp_id=asp_id, seller_skus=event_skus)
+
+        for event in events.values():
+            if event.get('seller_sku'):
+                event['category'], event['brand'] = brand_categories.get(event['seller_sku'], (None, None))  # type: ignore  # noqa: FKA100
+
+        AzFinancialEvent.bulk_add_update(account_id=account_id, asp_id=asp_id, events=list(events.values()))
+
+        if not price_action_az_order_ids:
+            return
+
+        # price action of every order is computed from its stored events, fetched in one query
+        finance_events_by_order = {}
+        for finance_event in AzFinancialEvent.get_by_az_order_ids(account_id=account_id, asp_id=asp_id, az_order_ids=set(price_action_az_order_ids)):
+            finance_events_by_order.setdefault(finance_event.az_order_id, []).append(finance_event)  # type: ignore  # noqa: FKA100
+
+        performances = []
+        for _az_order_id in price_action_az_order_ids:
+            _data = AspFinanceView.calculate_price_action(
+                finance_data_event=finance_events_by_order.get(_az_order_id) or [])
+
+            for _data_seller_sku, _data_value in _data.items():
+                performances.append({
+                    'az_order_id': _az_order_id,
+                    'seller_sku': _data_seller_sku,
+                    'seller_order_id': _data_value.get('_seller_order_id'),
+                    'gross_sales': _data_value.get('_gross_sales', 0.0),   # type: ignore  # noqa: FKA100
+                    'market_place_fee': _data_value.get('_market_place_fee', 0.0),  # type: ignore  # noqa: FKA100
+                    'forward_fba_fee': _data_value.get('_fba_fee_forward', 0.0),   # type: ignore  # noqa: FKA100
+                    'reverse_fba_fee': _data_value.get('_fba_fee_reverse', 0.0),  # type: ignore  # noqa: FKA100
+                    'units_sold': _data_value.get('_units_sold', 0),  # type: ignore  # noqa: FKA100
+                    'units_returned': _data_value.get('_units_returned', 0),  # type: ignore  # noqa: FKA100
+                    'returns': _data_value.get('_refunds', 0),  # type: ignore  # noqa: FKA100
+                    'shipment_date': _data_value.get('shipment_date'),  # type: ignore  # noqa: FKA100
+                    'refund_date': _data_value.get('refund_date'),  # type: ignore  # noqa: FKA100
+                    'summary_analysis': _data_value
+                })
 
-                adjustment_event_dict = AspFinanceView.adjustment_event_list(
-                    obj)
+        performance_skus = {performance['seller_sku'] for performance in performances if performance['seller_sku']}
+        brand_categories = AzItemMaster.get_category_brand_by_skus(account_id=account_id, asp_id=asp_id, seller_skus=performance_skus)
 
-                for adjustment_event_sku, adjustment_event_value in adjustment_event_dict.items():
-                    AspFinanceView.add_update(account_id=account_id, asp_id=asp_id, az_order_id=az_order_id,
-                                              posted_date=adjustment_event_value.get('posted_date'), event_type=event_type, event_json=obj, finance_type=adjustment_event_value.get('finance_type'), finance_value=adjustment_event_value.get('finance_value'), seller_sku=adjustment_event_sku)
+        for performance in performances:
+            performance['category'], performance['brand'] = brand_categories.get(performance['seller_sku'], (None, None))  # type: ignore  # noqa: FKA100
 
-            elif event_type == AspFinanceEventList.PRODUCT_ADS_PAYMENT.value:
-                finance_type, finance_value, posted_date = AspFinanceView.product_ads_payment_event_list(
-                    obj)
-                AspFinanceView.add_update(account_id=account_id, asp_id=asp_id, az_order_id=az_order_id, seller_order_id=seller_order_id, market_place=marketplace_name,
-                                          posted_date=posted_date, event_type=AspFinanceEventList.PRODUCT_ADS_PAYMENT.value, event_json=obj, finance_type=finance_type, finance_value=finance_value, seller_sku=seller_sku)
+        days = AzProductPerformance.bulk_add_update(account_id=account_id, asp_id=asp_id, performances=performances)
 
-        serivce_fee_list = []
-        if event_type == AspFinanceEventList.REFUND.value and service_event_list is not None:
-            if refund_event_orders:
-                for service_event_ob in service_event_list:
-                    az_order_id = service_event_ob.get('AmazonOrderId')
-                    serivce_fee = {
-                        'az_order_id': az_order_id,
-                        'service_event_ob': service_event_ob
-                    }
-                    serivce_fee_list.append(serivce_fee)
-
-                posted_date_dict = {}
-                for item in refund_event_orders:
-                    az_order_id = item['az_order_id']
-                    posted_date = item['posted_date']
-                    posted_date_dict.setdefault(az_order_id, []).append(posted_date)  # type: ignore  # noqa: FKA100
-
-                for item in serivce_fee_list:
-                    az_order_id = item['az_order_id']
-                    if az_order_id in posted_date_dict and posted_date_dict[az_order_id]:
-                        item['posted_date'] = posted_date_dict[az_order_id].pop(
-                            0)
-
-        if serivce_fee_list:
-            for fees in serivce_fee_list:
-                az_order_id = fees.get('az_order_id')
-                posted_date = fees.get('posted_date')
-                service_ob = fees.get('service_event_ob')
-                if posted_date is not None:
-                    AspFinanceView.add_update(account_id=account_id, asp_id=asp_id, az_order_id=az_order_id,
-                                              posted_date=posted_date, event_type=AspFinanceEventList.SERVICE_FEE.value, event_json=service_ob)
-                else:
-                    refund_az_order_id = AspFinanceView.get_by_az_order_id(
-                        account_id=account_id, asp_id=asp_id, az_order_id=az_order_id, event_type=AspFinanceEventList.REFUND.value)
-                    if refund_az_order_id:
-                        AspFinanceView.add_update(account_id=account_id, asp_id=asp_id, az_order_id=az_order_id,
-                                                  posted_date=refund_az_order_id.posted_date, event_type=AspFinanceEventList.SERVICE_FEE.value, event_json=service_ob)
-
-        all_event_types = [
-            AspFinanceEventList.PRODUCT_ADS_PAYMENT.value, AspFinanceEventList.ADJUSTMENT.value]
-
-        if event_type not in all_event_types:
-            for _az_order_id in all_az_order_id:
-                _data = AspFinanceView.get_price_action(
-                    account_id=account_id, asp_id=asp_id, az_order_id=_az_order_id)
-
-                for _data_seller_sku, _data_value in _data.items():
-                    product = AzProductPerformance.get_by_az_order_id(
-                        account_id=account_id, asp_id=asp_id, az_order_id=_az_order_id, seller_sku=_data_seller_sku)
-                    _gross_sales = _data_value.get('_gross_sales', 0.0)   # type: ignore  # noqa: FKA100
-                    _market_place_fee = _data_value.get('_market_place_fee', 0.0)  # type: ignore  # noqa: FKA100
-                    _forward_fba_fee = _data_value.get('_fba_fee_forward', 0.0)   # type: ignore  # noqa: FKA100
-                    _reverse_fba_fee = _data_value.get('_fba_fee_reverse', 0.0)  # type: ignore  # noqa: FKA100
-                    _units_sold = _data_value.get('_units_sold', 0)  # type: ignore  # noqa: FKA100
-                    _units_returned = _data_value.get('_units_returned', 0)  # type: ignore  # noqa: FKA100
-                    _returns = _data_value.get('_refunds', 0)  # type: ignore  # noqa: FKA100
-                    _shipment_date = _data_value.get('shipment_date')  # type: ignore  # noqa: FKA100
-                    _refund_date = _data_value.get('refund_date')  # type: ignore  # noqa: FKA100
-                    _calculate_total_expense = _data_value
-                    _seller_order_id = _data_value.get('_seller_order_id')  # type: ignore  # noqa: FKA100
-
-                    if product:
-                        product.update(account_id=account_id, asp_id=asp_id, az_order_id=_az_order_id, seller_sku=_data_seller_sku, gross_sales=_gross_sales, market_place_fee=_market_place_fee,
-                                       forward_fba_fee=_forward_fba_fee, reverse_fba_fee=_reverse_fba_fee, units_sold=_units_sold, units_returned=_units_returned, returns=_returns, shipment_date=_shipment_date, refund_date=_refund_date,
-                                       summary_analysis=_calculate_total_expense)
-                    else:
-                        AzProductPerformance.create(account_id=account_id, asp_id=asp_id, az_order_id=_az_order_id, seller_sku=_data_seller_sku, gross_sales=_gross_sales,
-                                                    seller_order_id=_seller_order_id, market_place_fee=_market_place_fee, forward_fba_fee=_forward_fba_fee, reverse_fba_fee=_reverse_fba_fee,
-                                                    units_sold=_units_sold, units_returned=_units_returned, returns=_returns, shipment_date=_shipment_date, refund_date=_refund_date,
-                                                    summary_analysis=_calculate_total_expense)
+        # the daily rollup is recomputed for the shipment and refund days of this page only
+        AzProductPerformanceDaily.refresh_days(account_id=account_id, asp_id=asp_id, days=days)
 
     @staticmethod
     def shipment_event_list(obj_item):
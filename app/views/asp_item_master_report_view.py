@@ -32,6 +32,11 @@ from app.helpers.constants import ResponseMessageKeys
 from app.helpers.decorators import api_time_logger
 from app.helpers.decorators import brand_filter
 from app.helpers.decorators import token_required
+from app.helpers.pagination_helper import get_cursor_page
+from app.helpers.pagination_helper import get_cursor_pagination_meta
+from app.helpers.pagination_helper import get_request_cursor
+from app.helpers.rate_limit_helper import SpApiThrottlingException
+from app.helpers.throttle_helper import send_throttled_response
 from app.helpers.utility import enum_validator
 from app.helpers.utility import field_type_validator
 from app.helpers.utility import generate_paapi_awssigv4
@@ -116,6 +121,9 @@ class AspItemMasterReport:
 
             return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=response['reportId'], error=None)
 
+        except SpApiThrottlingException as exception_error:
+            return send_throttled_response(exception=exception_error)
+
         except Exception as exception_error:
             logger.error(
                 f'Exception occured while creating item master report: {exception_error}')
@@ -164,6 +172,9 @@ class AspItemMasterReport:
 
             return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=report_status, error=None)
 
+        except SpApiThrottlingException as exception_error:
+            return send_throttled_response(exception=exception_error)
+
         except Exception as exception_error:
             logger.error(
                 f'Exception occured while verifying item master report: {exception_error}')
@@ -287,6 +298,9 @@ class AspItemMasterReport:
 
             return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=get_report, error=None)
 
+        except SpApiThrottlingException as exception_error:
+            return send_throttled_response(exception=exception_error)
+
         except Exception as exception_error:
             logger.error(
                 f'Exception occured while retrieving item master report: {exception_error}')
@@ -740,8 +754,23 @@ class AspItemMasterReport:
 
             result = []
 
+            sort_column = AzInventoryLevelColumn.get_column(sort_by)
+            key_columns = (sort_column, 'seller_sku') if sort_column else ('seller_sku',)
+            request_cursor = get_request_cursor(key_columns=key_columns, sort_order=sort_order)
+
+            if request_cursor['is_error']:
+                return send_json_response(http_status=HttpStatusCode.BAD_REQUEST.value, response_status=False,
+                                          message_key=ResponseMessageKeys.INVALID_CURSOR.value, data=None,
+                                          error=ResponseMessageKeys.ENTER_CORRECT_INPUT.value)
+
+            cursor = request_cursor['cursor']
+
             inventory, total_count, total_request_count = AzItemMaster.get_item_level(
-                account_id=account_id, asp_id=asp_id, from_date=from_date, to_date=to_date, category=tuple(category), brand=tuple(brand), product=tuple(product), sort_order=sort_order, sort_by=AzInventoryLevelColumn.get_column(sort_by), page=page, size=size, fulfillment_channel=fullfillment_channel, status=status)
+                account_id=account_id, asp_id=asp_id, from_date=from_date, to_date=to_date, category=tuple(category), brand=tuple(brand), product=tuple(product), sort_order=sort_order, sort_by=sort_column, page=page, size=size, fulfillment_channel=fullfillment_channel, status=status,
+                cursor=cursor, with_total=request_cursor['with_total'])
+
+            if cursor is not None:
+                inventory, next_cursor = get_cursor_page(rows=inventory, size=int(size), key_columns=key_columns, sort_order=sort_order)
 
             if inventory:
 
@@ -843,7 +872,8 @@ class AspItemMasterReport:
                 objects = {
                     'from_date': to_date,
                     'stock_and_units_info': get_stock_and_units_info_data,
-                    'pagination_metadata': get_pagination_meta(current_page=1 if page is None else int(page), page_size=int(size), total_items=total_request_count)
+                    'pagination_metadata': get_pagination_meta(current_page=1 if page is None else int(page), page_size=int(size), total_items=total_request_count) if cursor is None
+                    else get_cursor_pagination_meta(page_size=int(size), next_cursor=next_cursor, total_items=total_request_count)
                 }
 
                 data = {
@@ -1408,6 +1438,9 @@ class AspItemMasterReport:
 
             return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.UPDATED.value, error=None)
 
+        except SpApiThrottlingException as exception_error:
+            return send_throttled_response(exception=exception_error)
+
         except Exception as exception_error:
             logger.error(
                 f'Exception occured while AspCatalogView Item: {exception_error}')
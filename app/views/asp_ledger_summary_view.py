@@ -11,6 +11,8 @@ from app.helpers.constants import ResponseMessageKeys
 from app.helpers.decorators import api_time_logger
 from app.helpers.decorators import brand_filter
 from app.helpers.decorators import token_required
+from app.helpers.rate_limit_helper import SpApiThrottlingException
+from app.helpers.throttle_helper import send_throttled_response
 from app.helpers.utility import field_type_validator
 from app.helpers.utility import get_asp_market_place_ids
 from app.helpers.utility import get_created_since
@@ -85,6 +87,9 @@ def create_ledger_summary_report(user_object, account_object, allowed_brands):
 
         return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=response['reportId'], error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         logger.error(
             f'Exception occured while creating ledger summary report: {exception_error}')
@@ -131,6 +136,9 @@ def verify_ledger_summary_report(user_object, account_object, allowed_brands):
 
         return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=report_status, error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         logger.error(
             f'Exception occured while verifying ledger summary report: {exception_error}')
@@ -232,6 +240,9 @@ def get_ledger_summary_report(user_object, account_object, allowed_brands):
 
         return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=None, error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         logger.error(
             f'Exception occured during retrieving ledger summary report: {exception_error}')
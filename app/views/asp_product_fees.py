@@ -4,6 +4,8 @@ from app.helpers.constants import HttpStatusCode
 from app.helpers.constants import ResponseMessageKeys
 from app.helpers.decorators import api_time_logger
 from app.helpers.decorators import token_required
+from app.helpers.rate_limit_helper import SpApiThrottlingException
+from app.helpers.throttle_helper import send_throttled_response
 from app.helpers.utility import ASpMarketplaceId
 from app.helpers.utility import field_type_validator
 from app.helpers.utility import required_validator
@@ -99,6 +101,9 @@ class AspProductFees:
                 message_key=ResponseMessageKeys.ENTER_CORRECT_INPUT.value,
             )
 
+        except SpApiThrottlingException as exception_error:
+            return send_throttled_response(exception=exception_error)
+
         except Exception as exception_error:
             """Exception while getting fees estimate by Asin"""
             logger.error(
@@ -216,6 +221,9 @@ class AspProductFees:
                 message_key=ResponseMessageKeys.ENTER_CORRECT_INPUT.value,
             )
 
+        except SpApiThrottlingException as exception_error:
+            return send_throttled_response(exception=exception_error)
+
         except Exception as exception_error:
             """Exception while getting fees estimate by SKU"""
             logger.error(
@@ -20,7 +20,11 @@ from app.helpers.constants import QueueTaskStatus
 from app.helpers.constants import ResponseMessageKeys
 from app.helpers.decorators import api_time_logger
 from app.helpers.decorators import brand_filter
+from app.helpers.decorators import cached_response
 from app.helpers.decorators import token_required
+from app.helpers.pagination_helper import get_cursor_page
+from app.helpers.pagination_helper import get_cursor_pagination_meta
+from app.helpers.pagination_helper import get_request_cursor
 from app.helpers.utility import convert_to_numeric
 from app.helpers.utility import enum_validator
 from app.helpers.utility import field_type_validator
@@ -45,6 +49,7 @@ class AspProductPerformanceView:
     @api_time_logger
     @token_required
     @brand_filter
+    @cached_response
     def get_product_performance(user_object, account_object, allowed_brands):  # type: ignore  # noqa: C901
         """Endpoint for getting product performance details"""
         try:
@@ -126,9 +131,23 @@ class AspProductPerformanceView:
                                           message_key=ResponseMessageKeys.ENTER_CORRECT_INPUT.value, data=None,
                                           error=is_valid['data'])
 
+            sort_column = AzProductPerformanceColumn.get_column(sort_by)
+            key_columns = (sort_column, 'seller_sku') if sort_column else ('seller_sku',)
+            request_cursor = get_request_cursor(key_columns=key_columns, sort_order=sort_order)
+
+            if request_cursor['is_error']:
+                return send_json_response(http_status=HttpStatusCode.BAD_REQUEST.value, response_status=False,
+                                          message_key=ResponseMessageKeys.INVALID_CURSOR.value, data=None,
+                                          error=ResponseMessageKeys.ENTER_CORRECT_INPUT.value)
+
+            cursor = request_cursor['cursor']
+
             items, total_count, total_request_count = AzProductPerformance.get_performance(
                 account_id=account_id, asp_id=asp_id, from_date=from_date, to_date=to_date, category=tuple(category), brand=tuple(brand), product=tuple(product),
-                sort_order=sort_order, sort_by=AzProductPerformanceColumn.get_column(sort_by), page=page, size=size)
+                sort_order=sort_order, sort_by=sort_column, page=page, size=size, cursor=cursor, with_total=request_cursor['with_total'])
+
+            if cursor is not None:
+                items, next_cursor = get_cursor_page(rows=items, size=int(size), key_columns=key_columns, sort_order=sort_order)
 
             data = {}
 
@@ -305,7 +324,8 @@ class AspProductPerformanceView:
 
                 objects = {
                     'totals': format_float_values(total_performance_dict['totals']),
-                    'pagination_metadata': get_pagination_meta(current_page=1 if page is None else int(page), page_size=int(size), total_items=total_request_count)
+                    'pagination_metadata': get_pagination_meta(current_page=1 if page is None else int(page), page_size=int(size), total_items=total_request_count) if cursor is None
+                    else get_cursor_pagination_meta(page_size=int(size), next_cursor=next_cursor, total_items=total_request_count)
                 }
 
                 data = {
@@ -334,6 +354,7 @@ class AspProductPerformanceView:
     @staticmethod
     @api_time_logger
     @token_required
+    @cached_response
     def get_product_performance_day_graph(user_object, account_object):
         """Endpoint for getting product performance details graph data day wise"""
         try:
@@ -417,6 +438,7 @@ class AspProductPerformanceView:
     @staticmethod
     @api_time_logger
     @token_required
+    @cached_response
     def get_product_performance_heatmap(user_object, account_object):
         """Endpoint for getting product performance heatmap"""
 
@@ -525,6 +547,7 @@ class AspProductPerformanceView:
     @api_time_logger
     @token_required
     @brand_filter
+    @cached_response
     def get_product_sales_by_region(user_object, account_object, allowed_brands):  # type: ignore  # noqa: C901
         """Endpoint for getting various metrics for product performance section"""
 
@@ -964,6 +987,7 @@ class AspProductPerformanceView:
     @api_time_logger
     @token_required
     @brand_filter
+    @cached_response
     def get_refund_insights(user_object, account_object, allowed_brands):   # type: ignore  # noqa: C901
         """Endpoint for getting Refund Insights"""
         try:
@@ -1,12 +1,13 @@
 """Contains Amazon Seller Returns Report related API definitions."""
-import gzip
-
 from app import logger
 from app.helpers.constants import ASpReportType
 from app.helpers.constants import HttpStatusCode
 from app.helpers.constants import ResponseMessageKeys
 from app.helpers.decorators import api_time_logger
 from app.helpers.decorators import asp_credentials_required
+from app.helpers.rate_limit_helper import SpApiThrottlingException
+from app.helpers.report_download_helper import open_report_document
+from app.helpers.throttle_helper import send_throttled_response
 from app.helpers.utility import get_asp_market_place_ids
 from app.helpers.utility import send_json_response
 from app.models.az_report import AzReport
@@ -38,6 +39,9 @@ def create_returns_report(credentials):
 
         return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=response['reportId'], error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         """ Exception in getting returns report"""
         logger.error(
@@ -73,6 +77,9 @@ def verify_returns_report(credentials, report_id: int):
 
         return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=report_status, error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         """ Exception in returns report """
         logger.error(
@@ -105,39 +112,19 @@ def get_returns_report(credentials, report_id: int):
         # using retrieve_report function of report object to get report
         get_report = report.retrieve_report(report_document_id)
 
-        # get url
-        file_url = get_report['url']
-
-        # get file data by accessing the url
-        file_data = requests.get(file_url)
-
-        if file_data.status_code != 200:
-            logger.error(
-                'Exception occured while retrieving returns report')
-            return send_json_response(
-                http_status=500,
-                response_status=False,
-                message_key=ResponseMessageKeys.FAILED.value
-            )
-
-        # decompressing the data
-        content = file_data.content
-
-        if get_report['compressionAlgorithm'] == 'GZIP':
-            content = gzip.decompress(content)
-
-        content = content.decode('utf-8')
+        # stream and decompress the report document without holding it in memory
+        with open_report_document(report_document=get_report) as report_file:
+            logger.info('Returns report {} downloaded: {} bytes'.format(report_document_id, report_file.seek(0, 2)))  # type: ignore  # noqa: FKA100
 
-        # df_stream = pd.read_csv(io.StringIO(
-        #     content), delimiter='\t', header=0, iterator=True, chunksize=1000)
-
-        # data_frame = pd.concat(df_stream, ignore_index=True)
-
-        # data_frame.to_csv(config_data.get('UPLOAD_FOLDER') + ASpReportType.RETURN_REPORT_RETURN_DATE.value.lower()
-        #                   + '/{}.csv'.format(report_document_id), index=False)
+        # for index, data_frame in enumerate(iter_report_chunks(report_document=get_report, delimiter='\t', header=0)):
+        #     data_frame.to_csv(config_data.get('UPLOAD_FOLDER') + ASpReportType.RETURN_REPORT_RETURN_DATE.value.lower()
+        #                       + '/{}.csv'.format(report_document_id), index=False, header=index == 0, mode='w' if index == 0 else 'a')
 
         return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=None, error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         logger.error(
             f'Exception occured during retrieving returns report: {exception_error}')
@@ -170,6 +157,9 @@ def create_returns_csv_prime_report(credentials):
 
         return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=response['reportId'], error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         """ Exception in creating CSV Prime Returns Report """
         logger.error(
@@ -205,6 +195,9 @@ def verify_returns_csv_prime_report(credentials, report_id: int):
 
         return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=report_status, error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         """ Exception in returns report """
         logger.error(
@@ -238,6 +231,9 @@ def create_returns_flat_file_attributes(credentials):
 
         return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=response['reportId'], error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         """ Exception in creating returns flat file attributes Report """
         logger.error(
@@ -288,6 +284,9 @@ def get_returns_report_flat_file_attributes(credentials, report_id: int):
 
         return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=content, error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         logger.error(
             f'Exception occured during retrieving returns report: {exception_error}')
@@ -11,6 +11,8 @@ from app.helpers.decorators import api_time_logger
 from app.helpers.decorators import brand_filter
 from app.helpers.decorators import token_required
 from app.helpers.queue_helper import add_queue_task_and_enqueue
+from app.helpers.rate_limit_helper import SpApiThrottlingException
+from app.helpers.throttle_helper import send_throttled_response
 from app.helpers.utility import enum_validator
 from app.helpers.utility import field_type_validator
 from app.helpers.utility import flatten_json
@@ -117,6 +119,9 @@ class SalesTrafficReport:
 
             return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=report_status, error=None)
 
+        except SpApiThrottlingException as exception_error:
+            return send_throttled_response(exception=exception_error)
+
         except Exception as exception_error:
             logger.error(
                 f'Exception occured while verifying sales and traffic report: {exception_error}')
@@ -425,6 +430,9 @@ class SalesTrafficReport:
 
             return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=None, error=None)
 
+        except SpApiThrottlingException as exception_error:
+            return send_throttled_response(exception=exception_error)
+
         except Exception as exception_error:
             logger.error(
                 f'Exception occured during retrieving sales and traffic report: {exception_error}')
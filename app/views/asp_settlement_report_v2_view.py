@@ -1,6 +1,5 @@
 """Contains Amazon Seller Settlement Report v2 related API definitions."""
 from datetime import timedelta
-import io
 
 from app import config_data
 from app import export_csv_q
@@ -13,19 +12,19 @@ from app.helpers.constants import QueueName
 from app.helpers.constants import QueueTaskStatus
 from app.helpers.constants import ResponseMessageKeys
 from app.helpers.decorators import api_time_logger
-from app.helpers.utility import amount_details_to_json
+from app.helpers.rate_limit_helper import SpApiThrottlingException
+from app.helpers.report_download_helper import iter_report_chunks
+from app.helpers.throttle_helper import send_throttled_response
 from app.helpers.utility import field_type_validator
 from app.helpers.utility import get_asp_market_place_ids
 from app.helpers.utility import required_validator
 from app.helpers.utility import send_json_response
 from app.models.az_report import AzReport
 from app.models.az_settlement_v2 import AzSettlementV2
+from app.models.az_settlement_v2 import SETTLEMENT_REPORT_COLUMNS
 from app.models.queue_task import QueueTask
 from flask import request
-import numpy as np
-import pandas as pd
 from providers.amazon_sp_client import AmazonReportEU
-import requests
 from workers.settlement_report_v2_worker import SettlementReportV2Worker
 
 
@@ -57,6 +56,9 @@ def request_settlement_report_v2():
 
         return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=response, error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         """ Exception in creating Settlement Report v2 """
         logger.error(
@@ -93,104 +95,18 @@ def get_settlement_report_v2(reference_id: int):
 
         retrive_report = report.retrieve_report(document_id)
 
-        streamed_url_response = requests.get(retrive_report['url'])
-
-        # Decode the content as UTF-8
-        content = streamed_url_response.content.decode('utf-8')
-
-        # Create a streaming pandas DataFrame
-        df_stream = pd.read_csv(io.StringIO(
-            content), delimiter='\t', header=None, skiprows=1, iterator=True, chunksize=1000)
-        settlement_df = pd.concat(df_stream, ignore_index=True)
-
-        settlement_df.columns = [
-            'settlement_id', 'settlement_start_date', 'settlement_end_date', 'deposit_date', 'total_amount', 'currency',
-            'transaction_type', 'order_id', 'merchant_order_id', 'adjustment_id', 'shipment_id', 'marketplace_name',
-            'amount_type', 'amount_description', 'amount', 'fulfillment_id', 'posted_date', 'posted_date_time',
-            'order_item_code', 'merchant_order_item_id', 'merchant_adjustment_item_id', 'sku', 'quantity_purchased',
-            'promotion_id'
-        ]
-
-        settlement_df['posted_date'] = pd.to_datetime(
-            settlement_df['posted_date'], format='%d.%m.%Y').dt.date
-        settlement_df['posted_date_time'] = pd.to_datetime(
-            settlement_df['posted_date_time'], format='%d.%m.%Y %H:%M:%S UTC')
-
-        # transformation
-        settlement_df = settlement_df.fillna(np.nan).replace([np.nan], [None])   # type: ignore  # noqa: FKA100
-
-        # store amount details as json
-        previous_order_id = None
-        first_row = True
-        amount_details_dict = {'amount_details': []}
-        for row in settlement_df.iloc[1:].itertuples(index=False):
-            current_order_id = row.order_id
-
-            if current_order_id == previous_order_id or first_row is True:
-                amount_details_dict = amount_details_to_json(
-                    amount_details_dict=amount_details_dict, row=row)
-
-                selling_partner_id = config_data['SELLER_ID']
-                settlement_id = row.settlement_id
-                settlement_start_date = row.settlement_start_date
-                settlement_end_date = row.settlement_end_date
-                deposit_date = row.deposit_date
-                total_amount = row.total_amount
-                currency = row.currency
-                transaction_type = row.transaction_type
-                order_id = row.order_id
-                merchant_order_id = row.merchant_order_id
-                adjustment_id = row.adjustment_id
-                shipment_id = row.shipment_id
-                marketplace_name = row.marketplace_name
-                fulfillment_id = row.fulfillment_id
-                posted_date = row.posted_date
-                posted_date_time = row.posted_date_time
-                order_item_code = row.order_item_code
-                merchant_order_item_id = row.merchant_order_item_id
-                merchant_adjustment_item_id = row.merchant_adjustment_item_id
-                sku = row.sku
-                quantity_purchased = row.quantity_purchased
-                promotion_id = row.promotion_id
-
-                first_row = False
-            else:
-                if not first_row:
-                    AzSettlementV2.add(
-                        selling_partner_id=selling_partner_id,
-                        settlement_id=settlement_id,
-                        settlement_start_date=settlement_start_date,
-                        settlement_end_date=settlement_end_date,
-                        deposit_date=deposit_date,
-                        total_amount=total_amount,
-                        currency=currency,
-                        transaction_type=transaction_type,
-                        order_id=order_id,
-                        merchant_order_id=merchant_order_id,
-                        adjustment_id=adjustment_id,
-                        shipment_id=shipment_id,
-                        marketplace_name=marketplace_name,
-                        fulfillment_id=fulfillment_id,
-                        posted_date=posted_date,
-                        posted_date_time=posted_date_time,
-                        order_item_code=order_item_code,
-                        merchant_order_item_id=merchant_order_item_id,
-                        merchant_adjustment_item_id=merchant_adjustment_item_id,
-                        sku=sku,
-                        quantity_purchased=quantity_purchased,
-                        promotion_id=promotion_id,
-                        amount_details=amount_details_dict
-                    )
-
-                    amount_details_dict = {'amount_details': []}
-
-                    amount_details_dict = amount_details_to_json(
-                        amount_details_dict=amount_details_dict, row=row)
-
-            previous_order_id = current_order_id
+        # the second line holds the settlement totals and is skipped
+        report_chunks = iter_report_chunks(report_document=retrive_report, delimiter='\t', header=None, skiprows=2,
+                                           names=list(SETTLEMENT_REPORT_COLUMNS), dtype=str)
+
+        AzSettlementV2.bulk_upsert_report(account_id=None, asp_id=None, selling_partner_id=config_data['SELLER_ID'],
+                                          report_chunks=report_chunks)
 
         return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=retrive_report, error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         """ Exception in retriving Settlement Report v2 """
         logger.error(
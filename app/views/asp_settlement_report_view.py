@@ -8,6 +8,8 @@ from app.helpers.constants import HttpStatusCode
 from app.helpers.constants import PAGE_LIMIT
 from app.helpers.constants import ResponseMessageKeys
 from app.helpers.decorators import api_time_logger
+from app.helpers.rate_limit_helper import SpApiThrottlingException
+from app.helpers.throttle_helper import send_throttled_response
 from app.helpers.utility import get_asp_market_place_ids
 from app.helpers.utility import get_created_since
 from app.helpers.utility import get_created_until
@@ -163,6 +165,9 @@ def get_report():
 
             return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=response, error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         logger.error(
             f'Exception occured while getting settlement report: {exception_error}')
@@ -1,7 +1,4 @@
 """Contains Amazon Seller Tax Report related API definitions."""
-import gzip
-import io
-
 from app import config_data
 from app import logger
 from app.helpers.constants import ASpReportType
@@ -9,13 +6,14 @@ from app.helpers.constants import HttpStatusCode
 from app.helpers.constants import ResponseMessageKeys
 from app.helpers.decorators import api_time_logger
 from app.helpers.decorators import asp_credentials_required
+from app.helpers.rate_limit_helper import SpApiThrottlingException
+from app.helpers.report_download_helper import iter_report_chunks
+from app.helpers.throttle_helper import send_throttled_response
 from app.helpers.utility import get_asp_data_start_time
 from app.helpers.utility import get_asp_market_place_ids
 from app.helpers.utility import send_json_response
 from app.models.az_report import AzReport
-import pandas as pd
 from providers.amazon_sp_client import AmazonReportEU
-import requests
 
 # On Demand GST Merchant Tax Report B2B
 
@@ -43,6 +41,9 @@ def create_gst_b2b_report(credentials):
 
         return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=response['reportId'], error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         """ Exception in creating Tax Report GST MTR B2B Custom"""
         logger.error(
@@ -78,6 +79,9 @@ def verify_gst_b2b_report(credentials, report_id: int):
 
         return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=report_status, error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         """ Exception in verifying GST MTR B2B report """
         logger.error(
@@ -106,21 +110,18 @@ def get_gst_b2b_report(credentials, report_id: int):
         report = AmazonReportEU(credentials=credentials)
 
         retrive_report = report.retrieve_report(document_id)
-        streamed_url_response = requests.get(retrive_report['url'])
 
-        # Decode the content as UTF-8
-        content = streamed_url_response.content.decode('utf-8')
+        file_path = config_data.get('UPLOAD_FOLDER') + ASpReportType.TAX_REPORT_GST_MTR_B2B.value.lower() + '/{}.csv'.format(document_id)
 
-        # Create a streaming pandas DataFrame
-        df_stream = pd.read_csv(io.StringIO(
-            content), delimiter='\t', header=None, skiprows=1, iterator=True, chunksize=1000)
-        data_frame = pd.concat(df_stream, ignore_index=True)
-
-        data_frame.to_csv(config_data.get('UPLOAD_FOLDER') + ASpReportType.TAX_REPORT_GST_MTR_B2B.value.lower()
-                          + '/{}.csv'.format(document_id), index=False)
+        # stream the report document into the csv chunk by chunk
+        for index, data_frame in enumerate(iter_report_chunks(report_document=retrive_report, delimiter='\t', header=None, skiprows=1)):
+            data_frame.to_csv(file_path, index=False, header=index == 0, mode='w' if index == 0 else 'a')
 
         return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=retrive_report, error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         """ Exception in getting GST MTR B2B report"""
         logger.error(
@@ -155,6 +156,9 @@ def create_gst_b2c_report(credentials):
 
         return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=response['reportId'], error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         """ Exception in creating Tax Report GST MTR B2C Custom"""
         logger.error(
@@ -196,6 +200,9 @@ def verify_gst_b2c_report(credentials, report_id: int):
 
         return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=report_status, error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         """ Exception in GST MTR B2C report """
         logger.error(
@@ -224,21 +231,18 @@ def get_gst_b2c_report(credentials, report_id: int):
         report = AmazonReportEU(credentials=credentials)
 
         retrive_report = report.retrieve_report(document_id)
-        streamed_url_response = requests.get(retrive_report['url'])
 
-        # Decode the content as UTF-8
-        content = streamed_url_response.content.decode('utf-8')
+        file_path = config_data.get('UPLOAD_FOLDER') + ASpReportType.TAX_REPORT_GST_MTR_B2C.value.lower() + '/{}.csv'.format(document_id)
 
-        # Create a streaming pandas DataFrame
-        df_stream = pd.read_csv(io.StringIO(
-            content), delimiter='\t', header=None, skiprows=0, iterator=True, chunksize=1000)
-        data_frame = pd.concat(df_stream, ignore_index=True)
-
-        data_frame.to_csv(config_data.get('UPLOAD_FOLDER') + ASpReportType.TAX_REPORT_GST_MTR_B2C.value.lower()
-                          + '/{}.csv'.format(document_id), index=False)
+        # stream the report document into the csv chunk by chunk
+        for index, data_frame in enumerate(iter_report_chunks(report_document=retrive_report, delimiter='\t', header=None, skiprows=0)):
+            data_frame.to_csv(file_path, index=False, header=index == 0, mode='w' if index == 0 else 'a')
 
         return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=retrive_report, error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         """ Exception in getting GST MTR B2C report """
         logger.error(
@@ -277,6 +281,9 @@ def create_stock_transfer_report(credentials):
 
         return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=response['reportId'], error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         """ Exception in creating stock transfer"""
         logger.error(
@@ -312,6 +319,9 @@ def verify_stock_transfer_report(credentials, report_id: int):
 
         return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=report_status, error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         """ Exception in verifying Stock Transfer Report Id """
         logger.error(
@@ -341,35 +351,17 @@ def get_stock_transfer_report(credentials, report_id: int):
 
         retrive_report = report.retrieve_report(document_id)
 
-        streamed_url_response = requests.get(retrive_report['url'])
-
-        if streamed_url_response.status_code != 200:
-            logger.error(
-                'Exception occured while retrieving stock transfer report')
-            return send_json_response(
-                http_status=500,
-                response_status=False,
-                message_key=ResponseMessageKeys.FAILED.value
-            )
-
-        # decompressing the data
-        content = streamed_url_response.content
+        file_path = config_data.get('UPLOAD_FOLDER') + ASpReportType.TAX_REPORT_B2B_STR_ADHOC.value.lower() + '/{}.csv'.format(document_id)
 
-        if retrive_report['compressionAlgorithm'] == 'GZIP':
-            content = gzip.decompress(content)
-
-        content = content.decode('utf-8')
-
-        # Create a streaming pandas DataFrame
-        df_stream = pd.read_csv(io.StringIO(
-            content), delimiter='\t', header=None, skiprows=0, iterator=True, chunksize=1000)
-        data_frame = pd.concat(df_stream, ignore_index=True)
-
-        data_frame.to_csv(config_data.get('UPLOAD_FOLDER') + ASpReportType.TAX_REPORT_B2B_STR_ADHOC.value.lower()
-                          + '/{}.csv'.format(document_id), index=False)
+        # stream the report document into the csv chunk by chunk
+        for index, data_frame in enumerate(iter_report_chunks(report_document=retrive_report, delimiter='\t', header=None, skiprows=0)):
+            data_frame.to_csv(file_path, index=False, header=index == 0, mode='w' if index == 0 else 'a')
 
         return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=retrive_report, error=None)
 
+    except SpApiThrottlingException as exception_error:
+        return send_throttled_response(exception=exception_error)
+
     except Exception as exception_error:
         """ Exception in retrieving stock transfer Report """
         logger.error(
@@ -3,7 +3,6 @@
 from datetime import date
 from datetime import datetime
 from datetime import timedelta
-import json
 from typing import Optional
 
 from app import db
@@ -13,10 +12,18 @@ from app.helpers.constants import PAGE_DEFAULT
 from app.helpers.constants import PAGE_LIMIT
 from app.helpers.constants import PRODUCT_RANK_LIMIT
 from app.helpers.constants import ResponseMessageKeys
+from app.helpers.constants import SALES_API_TIME_ZONE
 from app.helpers.constants import SortingOrder
 from app.helpers.decorators import api_time_logger
 from app.helpers.decorators import brand_filter
+from app.helpers.decorators import cached_response
 from app.helpers.decorators import token_required
+from app.helpers.pagination_helper import get_cursor_page
+from app.helpers.pagination_helper import get_cursor_pagination_meta
+from app.helpers.pagination_helper import get_request_cursor
+from app.helpers.profit_and_loss_helper import calculate_profit_and_loss
+from app.helpers.response_cache_helper import bump_data_version
+from app.helpers.sales_refresh_helper import get_stored_hourly_sales
 from app.helpers.utility import calculate_percentage_growth
 from app.helpers.utility import convert_to_numeric
 from app.helpers.utility import enum_validator
@@ -77,6 +84,7 @@ class DashboardView:
             if item:
                 AzItemMaster.update_cogs(account_id=account_id,
                                          sku=sku, selling_partner_id=selling_partner_id, cogs=cogs)
+                bump_data_version(account_id=account_id)
             else:
                 return send_json_response(
                     http_status=404,
@@ -142,6 +150,7 @@ class DashboardView:
             if item:
                 AzItemMaster.update_brand(account_id=account_id,
                                           sku=sku, selling_partner_id=selling_partner_id, brand=brand)
+                bump_data_version(account_id=account_id)
             else:
                 return send_json_response(
                     http_status=404,
@@ -164,6 +173,7 @@ class DashboardView:
     # function to get inventory by location
     @api_time_logger
     @token_required
+    @cached_response
     def get_inventory_by_location(user_object, account_object):
         """endpoint for getting ledger inventory by location"""
         try:
@@ -205,6 +215,7 @@ class DashboardView:
     @api_time_logger
     @token_required
     @brand_filter
+    @cached_response
     def get_sales_statistics(user_object, account_object, allowed_brands):                  # type: ignore  # noqa: C901
         """endpoint for getting various metrics for sales statistics dashboard section"""
         try:
@@ -333,6 +344,7 @@ class DashboardView:
     @api_time_logger
     @token_required
     @brand_filter
+    @cached_response
     def get_sales_statistics_bar_graph(user_object, account_object, allowed_brands):                  # type: ignore  # noqa: C901
         """endpoint for getting various metrics for sales statistics graph for sales and units section"""
         try:
@@ -478,6 +490,7 @@ class DashboardView:
     @api_time_logger
     @token_required
     @brand_filter
+    @cached_response
     def get_hourly_sales_stats(user_object, account_object, allowed_brands):
         """endpoint for getting various metrics for sales statistics hourly"""
         try:
@@ -521,11 +534,24 @@ class DashboardView:
 
                     brand = valid_brands
 
+            request_cursor = get_request_cursor(key_columns=('purchase_at', 'id'), sort_order=SortingOrder.DESC.value)
+
+            if request_cursor['is_error']:
+                return send_json_response(http_status=HttpStatusCode.BAD_REQUEST.value, response_status=False,
+                                          message_key=ResponseMessageKeys.INVALID_CURSOR.value, data=None,
+                                          error=ResponseMessageKeys.ENTER_CORRECT_INPUT.value)
+
+            cursor = request_cursor['cursor']
+
             sales_data = DashboardView.__get_sales_stats_by_hour(
                 account_id=account_object.uuid, asp_id=account_object.asp_id, from_date=from_date, to_date=to_date, category=tuple(category), brand=tuple(brand), product=tuple(product))
 
             orders_data, total_order_count = AzOrderReport.get_purchased_date_orders(
-                account_id=account_object.uuid, asp_id=account_object.asp_id, from_date=from_date, to_date=to_date, page=page, size=size, category=tuple(category), brand=tuple(brand), product=tuple(product))
+                account_id=account_object.uuid, asp_id=account_object.asp_id, from_date=from_date, to_date=to_date, page=page, size=size, category=tuple(category), brand=tuple(brand), product=tuple(product),
+                cursor=cursor, with_total=request_cursor['with_total'])
+
+            if cursor is not None:
+                orders_data, next_cursor = get_cursor_page(rows=orders_data, size=int(size), key_columns=('purchase_at', 'id'), sort_order=SortingOrder.DESC.value)
 
             top_selling_products = AzOrderReport.get_top_least_selling_orders(
                 account_id=account_object.uuid, asp_id=account_object.asp_id, from_date=from_date, to_date=to_date, sort_order=SortingOrder.DESC.value, size=PRODUCT_RANK_LIMIT, category=tuple(category), brand=tuple(brand), product=tuple(product))
@@ -535,27 +561,12 @@ class DashboardView:
             top_selling_product_data = []
 
             if sales_data:
-                for sales_entry in sales_data:
-                    if sales_entry is not None:
-                        parsed_data = json.loads(sales_entry)
-                        logger.info(f'Sales Data: {parsed_data}')
-                        for _sales in parsed_data:
-                            interval_range = _sales.get('interval_range', '')  # type: ignore  # noqa: FKA100
-                            total_sales = _sales.get('totalSales', {}).get('amount', 0.0)   # type: ignore  # noqa: FKA100
-                            units_ordered = _sales.get('unitCount', 0)   # type: ignore  # noqa: FKA100
-
-                            found_entry = next(
-                                (entry for entry in sales_graph_data if entry['time_interval'] == interval_range), None)
-
-                            if found_entry:
-                                found_entry['gross_sales'] += total_sales
-                                found_entry['units_ordered'] += units_ordered
-                            else:
-                                sales_graph_data.append({
-                                    'gross_sales': total_sales,
-                                    'time_interval': interval_range,
-                                    'units_ordered': units_ordered
-                                })
+                for sales_by_hour in sales_data:
+                    sales_graph_data.append({
+                        'gross_sales': float(sales_by_hour.total_sales_amount) if sales_by_hour.total_sales_amount is not None else 0.0,
+                        'time_interval': sales_by_hour.hour_range,
+                        'units_ordered': int(sales_by_hour.total_units_ordered) if sales_by_hour.total_units_ordered is not None else 0
+                    })
 
             if orders_data:
                 for get_order in orders_data:
@@ -590,7 +601,8 @@ class DashboardView:
                         'date': from_date,
                         'hourly_sales': sales_graph_data,
                         'top_selling_products': top_selling_product_data,
-                        'pagination_metadata': get_pagination_meta(current_page=1 if page is None else int(page), page_size=int(size), total_items=total_order_count)
+                        'pagination_metadata': get_pagination_meta(current_page=1 if page is None else int(page), page_size=int(size), total_items=total_order_count) if cursor is None
+                        else get_cursor_pagination_meta(page_size=int(size), next_cursor=next_cursor, total_items=total_order_count)
                     }
                 }
 
@@ -1009,8 +1021,6 @@ class DashboardView:
 
             account_id = account_object.uuid
             asp_id = account_object.asp_id
-            credentials = account_object.retrieve_asp_credentials(account_object)[
-                0]
 
             if brand:
                 if account_object.primary_user_id != user_object.id:
@@ -1022,103 +1032,100 @@ class DashboardView:
 
                     brand = valid_brands
 
-            try:
-                AZSalesView.call_sales_api(
-                    account_id=account_id, asp_id=asp_id, from_date=from_date, to_date=to_date, credentials=credentials, last_three_days=False)
+            request_cursor = get_request_cursor(key_columns=('purchase_at', 'id'), sort_order=SortingOrder.DESC.value)
 
-            except Exception as exception_error:
-                logger.error(
-                    f'Exception occured while getting sales api data : {exception_error}')
+            if request_cursor['is_error']:
+                return send_json_response(http_status=HttpStatusCode.BAD_REQUEST.value, response_status=False,
+                                          message_key=ResponseMessageKeys.INVALID_CURSOR.value, data=None,
+                                          error=ResponseMessageKeys.ENTER_CORRECT_INPUT.value)
 
-            finally:
+            cursor = request_cursor['cursor']
+
+            result = []
+            sales_graph_data = []
+            top_selling_product_data = []
 
-                result = []
-                sales_graph_data = []
-                top_selling_product_data = []
+            # stored sales are served right away, stale ones are refreshed from the sales api in the background
+            hourly_sales, refreshed_at, is_stale = get_stored_hourly_sales(account_id=account_id, asp_id=asp_id, from_date=from_date, to_date=to_date)
 
-                sales_data = AzSalesTrafficSummary.get_hourly_sales_by_single_date(
-                    account_id=account_id, asp_id=asp_id, from_date=from_date, to_date=to_date)
+            if hourly_sales is not None:
+                logger.info('Hourly Sales Endpoint using sales data')
+                sales_graph_data = hourly_sales
 
-                if sales_data:
-                    logger.info('Hourly Sales Endpoint using sales data')
-                    hourly_sales_dict = sales_data.hourly_sales.get(
-                        'result').get('payload')
-                    if hourly_sales_dict:
-                        for sales_by_hour in hourly_sales_dict:
-                            sales_object = {
-                                'time_interval': sales_by_hour.get('formatted_interval_range'),
-                                'gross_sales': float(sales_by_hour.get('totalSales').get('amount')) if sales_by_hour.get('totalSales').get('amount') is not None else 0.0,
-                                'units_ordered': int(sales_by_hour.get('unitCount')) if sales_by_hour.get('unitCount') is not None else 0,
-                            }
-                            sales_graph_data.append(sales_object)
+            else:
+                sales_data = DashboardView.__get_sales_stats_by_hour(
+                    account_id=account_id, asp_id=asp_id, from_date=from_date, to_date=to_date, category=tuple(category), brand=tuple(brand), product=tuple(product))
 
-                else:
-                    sales_data = DashboardView.__get_sales_stats_by_hour(
-                        account_id=account_id, asp_id=asp_id, from_date=from_date, to_date=to_date, category=tuple(category), brand=tuple(brand), product=tuple(product))
-
-                    if sales_data:
-                        logger.info(
-                            'Hourly Sales Endpoint using order report data')
-                        for sales_by_hour in sales_data:
-                            sales_object = {
-                                'time_interval': sales_by_hour.hour_range,
-                                'gross_sales': float(sales_by_hour.total_sales_amount) if sales_by_hour.total_sales_amount is not None else 0.0,
-                                'units_ordered': int(sales_by_hour.total_units_ordered) if sales_by_hour.total_units_ordered is not None else 0,
-                            }
-                            sales_graph_data.append(sales_object)
-
-                orders_data, total_order_count = AzOrderReport.get_purchased_date_orders(
-                    account_id=account_id, asp_id=asp_id, from_date=from_date, to_date=to_date, page=page, size=size, category=tuple(category), brand=tuple(brand), product=tuple(product))
-
-                if orders_data:
-                    for get_order in orders_data:
-                        order_object = {
-                            'timing': format_iso_to_12_hour_format(get_order.purchase_date),
-                            'price': get_order.item_price if get_order.item_price is not None else 0.0,
-                            'quantity': get_order.quantity if get_order.quantity is not None else 0,
-                            'sku': get_order.sku if get_order.sku is not None else '',
-                            'product_name': get_order.product_name if get_order.product_name is not None else '',
-                            'item_image': get_order.face_image if get_order.face_image is not None else '',
-                            'asin': get_order.asin if get_order.asin is not None else '',
-                        }
-                        result.append(order_object)
-
-                top_selling_products = AzOrderReport.get_top_least_selling_orders(
-                    account_id=account_id, asp_id=asp_id, from_date=from_date, to_date=to_date, sort_order=SortingOrder.DESC.value, size=PRODUCT_RANK_LIMIT, category=tuple(category), brand=tuple(brand), product=tuple(product))
-
-                if top_selling_products:
-                    for product in top_selling_products:
-                        product_object = {
-                            'product_name': product.product_name,
-                            'item_image': product.product_image,
-                            'sku': product.sku,
-                            'asin': product.asin,
-                            'gross_sales': product.gross_sales,
-                            'units_sold': product.units_sold,
+                if sales_data:
+                    logger.info(
+                        'Hourly Sales Endpoint using order report data')
+                    for sales_by_hour in sales_data:
+                        sales_object = {
+                            'time_interval': sales_by_hour.hour_range,
+                            'gross_sales': float(sales_by_hour.total_sales_amount) if sales_by_hour.total_sales_amount is not None else 0.0,
+                            'units_ordered': int(sales_by_hour.total_units_ordered) if sales_by_hour.total_units_ordered is not None else 0,
                         }
-                        top_selling_product_data.append(product_object)
+                        sales_graph_data.append(sales_object)
 
-                if result or sales_graph_data:
+            orders_data, total_order_count = AzOrderReport.get_purchased_date_orders(
+                account_id=account_id, asp_id=asp_id, from_date=from_date, to_date=to_date, page=page, size=size, category=tuple(category), brand=tuple(brand), product=tuple(product),
+                cursor=cursor, with_total=request_cursor['with_total'])
 
-                    data = {
-                        'result': result,
-                        'objects': {
-                            'date': from_date,
-                            'hourly_sales': sales_graph_data,
-                            'top_selling_products': top_selling_product_data,
-                            'pagination_metadata': get_pagination_meta(current_page=1 if page is None else int(page), page_size=int(size), total_items=total_order_count)
-                        }
+            if cursor is not None:
+                orders_data, next_cursor = get_cursor_page(rows=orders_data, size=int(size), key_columns=('purchase_at', 'id'), sort_order=SortingOrder.DESC.value)
+
+            if orders_data:
+                for get_order in orders_data:
+                    order_object = {
+                        'timing': format_iso_to_12_hour_format(get_order.purchase_date),
+                        'price': get_order.item_price if get_order.item_price is not None else 0.0,
+                        'quantity': get_order.quantity if get_order.quantity is not None else 0,
+                        'sku': get_order.sku if get_order.sku is not None else '',
+                        'product_name': get_order.product_name if get_order.product_name is not None else '',
+                        'item_image': get_order.face_image if get_order.face_image is not None else '',
+                        'asin': get_order.asin if get_order.asin is not None else '',
                     }
+                    result.append(order_object)
 
-                    return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=data, error=None)
+            top_selling_products = AzOrderReport.get_top_least_selling_orders(
+                account_id=account_id, asp_id=asp_id, from_date=from_date, to_date=to_date, sort_order=SortingOrder.DESC.value, size=PRODUCT_RANK_LIMIT, category=tuple(category), brand=tuple(brand), product=tuple(product))
 
-                return send_json_response(
-                    http_status=404,
-                    response_status=True,
-                    data=None,
-                    message_key=ResponseMessageKeys.NO_DATA_FOUND.value,
-                    error=None
-                )
+            if top_selling_products:
+                for product in top_selling_products:
+                    product_object = {
+                        'product_name': product.product_name,
+                        'item_image': product.product_image,
+                        'sku': product.sku,
+                        'asin': product.asin,
+                        'gross_sales': product.gross_sales,
+                        'units_sold': product.units_sold,
+                    }
+                    top_selling_product_data.append(product_object)
+
+            if result or sales_graph_data:
+
+                data = {
+                    'result': result,
+                    'objects': {
+                        'date': from_date,
+                        'hourly_sales': sales_graph_data,
+                        'top_selling_products': top_selling_product_data,
+                        'pagination_metadata': get_pagination_meta(current_page=1 if page is None else int(page), page_size=int(size), total_items=total_order_count) if cursor is None
+                        else get_cursor_pagination_meta(page_size=int(size), next_cursor=next_cursor, total_items=total_order_count),
+                        'refreshed_at': refreshed_at,
+                        'is_stale': is_stale
+                    }
+                }
+
+                return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=data, error=None)
+
+            return send_json_response(
+                http_status=404,
+                response_status=True,
+                data=None,
+                message_key=ResponseMessageKeys.NO_DATA_FOUND.value,
+                error=None
+            )
 
         except Exception as exception_error:
             logger.error(
@@ -1134,6 +1141,7 @@ class DashboardView:
     @api_time_logger
     @token_required
     @brand_filter
+    @cached_response
     def get_marketplace_breakdown(user_object, account_object, allowed_brands):                  # type: ignore  # noqa: C901
         """endpoint for getting various metrics for marketplace breakdown and graph dashboard section"""
         try:
@@ -1368,6 +1376,7 @@ class DashboardView:
     @api_time_logger
     @token_required
     @brand_filter
+    @cached_response
     def get_sales_and_trends(user_object, account_object, allowed_brands):                                  # type: ignore  # noqa: C901
         """endpoint for getting top/least 20 asins according to their gross sales"""
         try:
@@ -1493,6 +1502,7 @@ class DashboardView:
     @api_time_logger
     @token_required
     @brand_filter
+    @cached_response
     def get_gross_sales_comp(user_object, account_object, allowed_brands):                  # type: ignore  # noqa: C901
         """endpoint for getting various metrics for gross sales comp section"""
         try:
@@ -1595,6 +1605,7 @@ class DashboardView:
     @api_time_logger
     @token_required
     @brand_filter
+    @cached_response
     def get_profit_and_loss(user_object, account_object, allowed_brands):                  # type: ignore  # noqa: C901
         """endpoint for getting various metrics for profit and loss section"""
         try:
@@ -1663,31 +1674,11 @@ class DashboardView:
                                           message_key=ResponseMessageKeys.ENTER_CORRECT_INPUT.value, data=None,
                                           error=is_valid['data'])
 
-            profit_and_loss = DashboardView.__calculate_profit_and_loss(
-                account_id=account_id, selling_partner_id=selling_partner_id, from_date=from_date, to_date=to_date, category=tuple(category), brand=tuple(brand), product=tuple(product))
-
-            if profit_and_loss:
-                # graph data
-                profit_loss_graph = DashboardView.__get_profit_loss_graph_metrics(account_id=account_id, selling_partner_id=selling_partner_id,
-                                                                                  from_date=from_date, to_date=to_date, product=tuple(product), brand=tuple(brand), category=tuple(category))
+            profit_and_loss_result = calculate_profit_and_loss(account_id=account_id, selling_partner_id=selling_partner_id, from_date=from_date, to_date=to_date,
+                                                               category=tuple(category), brand=tuple(brand), product=tuple(product))
 
-                graph_metrics_list = []
-
-                if profit_loss_graph:
-                    for graph_metrics in profit_loss_graph:
-                        gross_sales = graph_metrics.gross_sales
-                        expense = float(
-                            graph_metrics.market_place_fee) + float(graph_metrics.total_cogs)
-                        net_profit = float(
-                            graph_metrics.gross_sales) - float(graph_metrics.refund) - float(expense)
-                        units_sold = graph_metrics.units_sold
-
-                        graph_metrics_list.append({'gross_sales': convert_to_numeric(gross_sales),
-                                                   'units_sold': convert_to_numeric(units_sold),
-                                                   'date': graph_metrics.shp_date.strftime('%Y-%m-%d'),
-                                                   'expense': -abs(expense),
-                                                   'net_profit': net_profit
-                                                   })
+            if profit_and_loss_result:
+                profit_and_loss, graph_metrics_list = profit_and_loss_result
 
                 result_dict = {'result':
                                {
@@ -1971,309 +1962,6 @@ class DashboardView:
 
         return None
 
-    @staticmethod
-    def __calculate_profit_and_loss(account_id: str, selling_partner_id: str, from_date: str, to_date: str, product: Optional[tuple], brand: Optional[tuple],               # type: ignore  # noqa: C901
-                                    category: Optional[tuple]):
-        """calculate current and previous metrics for profit and loss section"""
-
-        prior_from_date, prior_to_date = get_prior_to_from_date(
-            from_date=from_date, to_date=to_date)
-
-        current_metrics_list = DashboardView.__get_profit_and_loss_metrics(
-            account_id=account_id, selling_partner_id=selling_partner_id, from_date=from_date, to_date=to_date, product=tuple(product), brand=tuple(brand), category=tuple(category)).fetchall()
-        prior_metrics_list = DashboardView.__get_profit_and_loss_metrics(
-            account_id=account_id, selling_partner_id=selling_partner_id, from_date=prior_from_date, to_date=prior_to_date, product=tuple(product), brand=tuple(brand), category=tuple(category)).fetchall()
-
-        current_metrics_dict = {'gross_sales': 0, 'returns': 0, 'net_sales': 0, 'marketplace_fee_breakdown': {
-        }, 'total_cogs': 0, 'ads_spend': {}, 'net_profit': 0, 'market_place_fee': 0, 'gross_sales_breakdown': {}, 'other_fee_breakdown': {}, 'other_fee': 0}
-        prior_metrics_dict = {'gross_sales': 0, 'returns': 0, 'net_sales': 0, 'marketplace_fee_breakdown': {
-        }, 'total_cogs': 0, 'ads_spend': {}, 'net_profit': 0, 'market_place_fee': 0, 'gross_sales_breakdown': {}, 'other_fee_breakdown': {}, 'other_fee': 0}
-        if current_metrics_list:
-            for current_metrics in current_metrics_list:
-
-                # current_expense = float(
-                #     current_metrics.market_place_fee) + float(current_metrics.total_cogs)
-
-                # Net Profit = Net Sales - Marketplace Fee - Other fee - Cogs - Ad Spends + Reimbursements
-                current_net_profit = float(current_metrics.gross_sales) - float(
-                    current_metrics.refund) - float(abs(current_metrics.total_cogs))
-                # - float(abs(current_metrics.market_place_fee))
-                # - float(abs(current_metrics.other_fee)) - float(abs(current_metrics.total_cogs))
-
-                current_metrics_dict['gross_sales'] += current_metrics.gross_sales
-                current_metrics_dict['returns'] += current_metrics.refund
-                current_metrics_dict['net_sales'] += current_metrics.gross_sales - \
-                    current_metrics.refund
-                current_metrics_dict['net_profit'] += current_net_profit
-                current_metrics_dict['total_cogs'] += current_metrics.total_cogs
-                current_metrics_dict['market_place_fee'] += current_metrics.market_place_fee
-
-                # marketplace fee breakdown
-                if current_metrics.summary_analysis:
-                    json_dict = current_metrics.summary_analysis
-
-                    current_other_fee = json_dict.get('_other_fee')
-                    if current_other_fee:
-                        current_metrics_dict['other_fee'] += current_other_fee
-
-                    marketplace_fee_breakdown_dict = json_dict.get(
-                        '_market_place_fee_breakdown')
-                    if marketplace_fee_breakdown_dict:
-                        for current_marketplace_fee_key, current_marketplace_fee_value in marketplace_fee_breakdown_dict.items():
-                            current_metrics_dict['marketplace_fee_breakdown'][current_marketplace_fee_key] = current_metrics_dict['marketplace_fee_breakdown'].get(                 # type: ignore  # noqa: FKA100
-                                current_marketplace_fee_key, 0) + current_marketplace_fee_value
-
-                    gross_sales_breakdown_dict = json_dict.get(
-                        '_gross_sales_breakdown')
-                    if gross_sales_breakdown_dict:
-                        for current_gross_sales_key, current_gross_sales_value in gross_sales_breakdown_dict.items():
-                            current_metrics_dict['gross_sales_breakdown'][current_gross_sales_key] = current_metrics_dict['gross_sales_breakdown'].get(                 # type: ignore  # noqa: FKA100
-                                current_gross_sales_key, 0) + current_gross_sales_value
-
-                    other_fee_breakdown_dict = json_dict.get(
-                        '_other_fee_breakdown')
-                    if other_fee_breakdown_dict:
-                        for current_other_fee_key, current_other_fee_value in other_fee_breakdown_dict.items():
-                            current_metrics_dict['other_fee_breakdown'][current_other_fee_key] = current_metrics_dict['other_fee_breakdown'].get(                 # type: ignore  # noqa: FKA100
-                                current_other_fee_key, 0) + current_other_fee_value
-
-            for prior_metrics in prior_metrics_list:
-
-                # prior_expense = float(
-                #     prior_metrics.market_place_fee) + float(prior_metrics.total_cogs)
-                # prior_net_profit = float(
-                #     prior_metrics.gross_sales) - float(prior_metrics.refund) - float(prior_expense)
-                prior_net_profit = float(prior_metrics.gross_sales) - float(
-                    prior_metrics.refund) - float(abs(prior_metrics.total_cogs))
-
-                prior_metrics_dict['gross_sales'] += prior_metrics.gross_sales
-                prior_metrics_dict['returns'] += prior_metrics.refund
-                prior_metrics_dict['net_sales'] += prior_metrics.gross_sales - \
-                    prior_metrics.refund
-                prior_metrics_dict['net_profit'] += prior_net_profit
-                prior_metrics_dict['total_cogs'] += prior_metrics.total_cogs
-                prior_metrics_dict['market_place_fee'] += prior_metrics.market_place_fee
-
-                # marketplace fee breakdown
-                if prior_metrics.summary_analysis:
-                    json_dict = prior_metrics.summary_analysis
-
-                    prior_other_fee = json_dict.get('_other_fee')
-                    if prior_other_fee:
-                        prior_metrics_dict['other_fee'] += prior_other_fee
-
-                    marketplace_fee_breakdown_dict = json_dict.get(
-                        '_market_place_fee_breakdown')
-                    if marketplace_fee_breakdown_dict:
-                        for prior_marketplace_fee_key, prior_marketplace_fee_value in marketplace_fee_breakdown_dict.items():
-                            prior_metrics_dict['marketplace_fee_breakdown'][prior_marketplace_fee_key] = prior_metrics_dict['marketplace_fee_breakdown'].get(                 # type: ignore  # noqa: FKA100
-                                prior_marketplace_fee_key, 0) + prior_marketplace_fee_value
-
-                    gross_sales_breakdown_dict = json_dict.get(
-                        '_gross_sales_breakdown')
-
-                    if gross_sales_breakdown_dict:
-                        for prior_gross_sales_key, prior_gross_sales_value in gross_sales_breakdown_dict.items():
-                            prior_metrics_dict['gross_sales_breakdown'][prior_gross_sales_key] = prior_metrics_dict['gross_sales_breakdown'].get(                 # type: ignore  # noqa: FKA100
-                                prior_gross_sales_key, 0) + prior_gross_sales_value
-
-                    other_fee_breakdown_dict = json_dict.get(
-                        '_other_fee_breakdown')
-                    if other_fee_breakdown_dict:
-                        for prior_other_fee_key, prior_other_fee_value in other_fee_breakdown_dict.items():
-                            prior_metrics_dict['other_fee_breakdown'][prior_other_fee_key] = prior_metrics_dict['other_fee_breakdown'].get(                 # type: ignore  # noqa: FKA100
-                                prior_other_fee_key, 0) + prior_other_fee_value
-
-            # calculating gross sales
-            current_gross_sales = convert_to_numeric(
-                current_metrics_dict.get('gross_sales'))
-            prior_gross_sales = convert_to_numeric(
-                prior_metrics_dict.get('gross_sales'))
-
-            # gross_sales_difference = current_gross_sales - prior_gross_sales
-            gross_sales_percentage_growth = calculate_percentage_growth(
-                current_value=current_gross_sales, prior_value=prior_gross_sales)
-
-            # calculating returns
-            current_refund = convert_to_numeric(
-                current_metrics_dict.get('returns'))
-            prior_refund = convert_to_numeric(
-                prior_metrics_dict.get('returns'))
-
-            # refund_difference = current_refund - prior_refund
-            refund_percentage_growth = calculate_percentage_growth(
-                current_value=current_refund, prior_value=prior_refund)
-
-            #  calculating net sales
-            current_net_sales = convert_to_numeric(
-                current_metrics_dict.get('net_sales'))
-            prior_net_sales = convert_to_numeric(
-                prior_metrics_dict.get('net_sales'))
-
-            # net_sales_difference = current_net_sales - prior_net_sales
-            net_sales_percentage_growth = calculate_percentage_growth(
-                current_value=current_net_sales, prior_value=prior_net_sales)
-
-            # calculating total_cogs
-            current_total_cogs = convert_to_numeric(
-                value=current_metrics_dict.get('total_cogs'))
-            prior_total_cogs = convert_to_numeric(
-                value=prior_metrics_dict.get('total_cogs'))
-
-            # total_cogs_difference = current_total_cogs - prior_total_cogs
-            total_cogs_percentage_growth = calculate_percentage_growth(
-                current_value=current_total_cogs, prior_value=prior_total_cogs)
-
-            # calculating other fee
-            current_other_fee_breakdown, current_other_fee = DashboardView.get_other_fee_metrics(account_id=account_id, selling_partner_id=selling_partner_id, from_date=from_date,
-                                                                                                 to_date=to_date, product=tuple(product), brand=tuple(brand), category=tuple(category))
-            prior_other_fee_breakdown, prior_other_fee = DashboardView.get_other_fee_metrics(account_id=account_id, selling_partner_id=selling_partner_id, from_date=prior_from_date,
-                                                                                             to_date=prior_to_date, product=tuple(product), brand=tuple(brand), category=tuple(category))
-
-            # uncomment the two lines below >> if fba forward/reverse fee required to be added
-            # current_other_fee += current_metrics_dict.get('other_fee')
-            # prior_other_fee += prior_metrics_dict.get('other_fee')
-
-            other_fee_percentage_growth = calculate_percentage_growth(
-                current_value=current_other_fee, prior_value=prior_other_fee)
-
-            # calculating marketplace fee
-            current_market_place_fee = convert_to_numeric(
-                current_metrics_dict.get('market_place_fee'))
-            prior_market_place_fee = convert_to_numeric(
-                prior_metrics_dict.get('market_place_fee'))
-
-            market_place_fee_percentage_growth = calculate_percentage_growth(
-                current_value=current_market_place_fee, prior_value=prior_market_place_fee)
-
-            # calculating marketplace fee breakdown
-            marketplace_fee_breakdown_comp = {}
-
-            for key in current_metrics_dict['marketplace_fee_breakdown']:
-                marketplace_fee_breakdown_comp[key] = {}
-                current_metric = current_metrics_dict['marketplace_fee_breakdown'][key]
-                prior_metric = prior_metrics_dict['marketplace_fee_breakdown'].get(                         # type: ignore  # noqa: FKA100
-                    key, 0)
-                # marketplace_fee_breakdown_comp[key] = current_metric + prior_metric
-                marketplace_fee_breakdown_comp[key][f'current_{key}'] = current_metric
-                marketplace_fee_breakdown_comp[key][f'{key}_growth_percentage'] = calculate_percentage_growth(
-                    current_value=abs(current_metric), prior_value=abs(prior_metric))
-
-            # calculating gross sales breakdown
-            gross_sales_breakdown_comp = {}
-
-            for current_gross_sales_key in current_metrics_dict['gross_sales_breakdown']:
-                gross_sales_breakdown_comp[current_gross_sales_key] = {}
-                current_metric = current_metrics_dict['gross_sales_breakdown'][current_gross_sales_key]
-                prior_metric = prior_metrics_dict['gross_sales_breakdown'].get(                         # type: ignore  # noqa: FKA100
-                    current_gross_sales_key, 0)
-                gross_sales_breakdown_comp[current_gross_sales_key][
-                    f'current_{current_gross_sales_key}'] = current_metric
-                gross_sales_breakdown_comp[current_gross_sales_key][f'{current_gross_sales_key}_growth_percentage'] = calculate_percentage_growth(
-                    current_value=abs(current_metric), prior_value=abs(prior_metric))
-
-            # calculating reimbursement
-            current_reimbursement_breakdown, current_reimbursement_value = DashboardView.get_reimbursement_fee_metrics(account_id=account_id, selling_partner_id=selling_partner_id,
-                                                                                                                       from_date=from_date, to_date=to_date, category=tuple(category), brand=tuple(brand), product=tuple(product))
-            prior_reimbursement_breakdown, prior_reimbursement_value = DashboardView.get_reimbursement_fee_metrics(account_id=account_id, selling_partner_id=selling_partner_id,
-                                                                                                                   from_date=prior_from_date, to_date=prior_to_date, category=tuple(category), brand=tuple(brand), product=tuple(product))
-
-            reimbursement_percentage_growth = calculate_percentage_growth(
-                current_value=current_reimbursement_value, prior_value=prior_reimbursement_value)
-
-            # calculating ads data
-            current_sponsored_brand_cost, current_sponsored_display_cost, current_sponsored_product_cost = DashboardView.__get_ads_spend_metrics(
-                account_id=account_id, selling_partner_id=selling_partner_id, from_date=from_date, to_date=to_date, product=tuple(product), brand=tuple(brand), category=tuple(category))
-            prior_sponsored_brand_cost, prior_sponsored_display_cost, prior_sponsored_product_cost = DashboardView.__get_ads_spend_metrics(
-                account_id=account_id, selling_partner_id=selling_partner_id, from_date=prior_from_date, to_date=prior_to_date, product=tuple(product), brand=tuple(brand), category=tuple(category))
-
-            sponsored_brand_percentage_growth = calculate_percentage_growth(
-                current_value=current_sponsored_brand_cost, prior_value=prior_sponsored_brand_cost)
-            sponsored_display_percentage_growth = calculate_percentage_growth(
-                current_value=current_sponsored_display_cost, prior_value=prior_sponsored_display_cost)
-            sponsored_product_percentage_growth = calculate_percentage_growth(
-                current_value=current_sponsored_product_cost, prior_value=prior_sponsored_product_cost)
-
-            current_total_ads_spend = current_sponsored_brand_cost + \
-                current_sponsored_display_cost + current_sponsored_product_cost
-            prior_total_ads_spend = prior_sponsored_brand_cost + \
-                prior_sponsored_display_cost + prior_sponsored_product_cost
-
-            total_ads_spend_percentage_growth = calculate_percentage_growth(
-                current_value=current_total_ads_spend, prior_value=prior_total_ads_spend)
-
-            # calculating net profit
-            current_net_profit = convert_to_numeric(
-                current_metrics_dict.get('net_sales')) - abs(current_market_place_fee) - abs(convert_to_numeric(current_other_fee)) - abs(convert_to_numeric(current_metrics_dict.get('total_cogs'))) - abs(convert_to_numeric(current_total_ads_spend)) + convert_to_numeric(current_reimbursement_value)
-            prior_net_profit = convert_to_numeric(
-                prior_metrics_dict.get('net_sales')) - abs(prior_market_place_fee) - abs(convert_to_numeric(prior_other_fee)) - abs(convert_to_numeric(prior_metrics_dict.get('total_cogs'))) - abs(convert_to_numeric(prior_total_ads_spend)) + convert_to_numeric(prior_reimbursement_value)
-
-            # net_profit_difference = current_net_profit - prior_net_profit
-            net_profit_percentage_growth = calculate_percentage_growth(
-                current_value=current_net_profit, prior_value=prior_net_profit)
-
-            # creating result dict
-            result_dict = {
-                'gross_sales': {
-                    'current_gross_sales': current_gross_sales,
-                    'gross_sales_percentage_growth': gross_sales_percentage_growth
-                },
-                'gross_sales_breakdown': gross_sales_breakdown_comp,
-                'other_fee': {
-                    'current_other_fee': -abs(current_other_fee),
-                    'other_fee_percentage_growth': other_fee_percentage_growth
-                },
-                'other_fee_breakdown': current_other_fee_breakdown,
-                'refund': {
-                    'current_refund': -abs(current_refund),
-                    'refund_percentage_growth': refund_percentage_growth
-                },
-                'net_sales': {
-                    'current_net_sales': current_net_sales,
-                    'net_sales_percentage_growth': net_sales_percentage_growth
-                },
-                'marketplace_fee_breakdown': marketplace_fee_breakdown_comp,
-                'total_cogs': {
-                    'current_total_cogs': -abs(current_total_cogs),
-                    'total_cogs_percentage_growth': total_cogs_percentage_growth
-                },
-                'net_profit': {
-                    'current_net_profit': current_net_profit,
-                    'net_profit_percentage_growth': net_profit_percentage_growth
-                },
-                'market_place_fee': {
-                    'current_market_place_fee': -abs(current_market_place_fee),
-                    'market_place_fee_percentage_growth': market_place_fee_percentage_growth
-                },
-                'reimbursement': {
-                    'current_reimbursement': current_reimbursement_value,
-                    'reimbursement_percentage_growth': reimbursement_percentage_growth
-                },
-                'reimbursement_breakdown': current_reimbursement_breakdown,
-                'ads_spend': {
-                    'total_ads_spend': -abs(convert_to_numeric(current_total_ads_spend)),
-                    'total_ads_spend_percentage_growth': convert_to_numeric(total_ads_spend_percentage_growth)
-                },
-                'ads_spend_breakdown': {
-                    'sponsored_brand': {
-                        'current_sponsored_brand_cost': convert_to_numeric(current_sponsored_brand_cost),
-                        'sponsored_brand_percentage_growth': convert_to_numeric(sponsored_brand_percentage_growth)
-                    },
-                    'sponsored_display': {
-                        'current_sponsored_display_cost': convert_to_numeric(current_sponsored_display_cost),
-                        'sponsored_display_percentage_growth': convert_to_numeric(sponsored_display_percentage_growth)
-                    },
-                    'sponsored_product': {
-                        'sponsored_product_percentage_growth': convert_to_numeric(sponsored_product_percentage_growth),
-                        'current_sponsored_product_cost': convert_to_numeric(current_sponsored_product_cost)
-                    }
-                }
-            }
-
-            return result_dict
-
-        return None
-
     @staticmethod
     def __calculate_gross_sales_comp(account_id: str, selling_partner_id: str, from_date: str, to_date: str, prior_from_date: str, prior_to_date: str, product: Optional[tuple], brand: Optional[tuple],
                                      category: Optional[tuple]):
@@ -2495,51 +2183,51 @@ class DashboardView:
                             shipment_date,
                             refund_date,
                             case
-                                when TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :from_date and :to_date then coalesce(gross_sales,0)
+                                when shipment_on between :from_date and :to_date then coalesce(gross_sales,0)
                                 else 0 end current_gross_sales,
                             case
-                                when TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :prior_from_date and :prior_to_date then coalesce(gross_sales,0)
+                                when shipment_on between :prior_from_date and :prior_to_date then coalesce(gross_sales,0)
                                 else 0 end prior_gross_sales,
                             case
-                                when TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :previous_year_from_date and :previous_year_to_date then coalesce(gross_sales,0)
+                                when shipment_on between :previous_year_from_date and :previous_year_to_date then coalesce(gross_sales,0)
                                 else 0 end previous_year_gross_sales,
                             case
-                                when TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :from_date and :to_date and units_sold>0 then coalesce(units_sold,0)
+                                when shipment_on between :from_date and :to_date and units_sold>0 then coalesce(units_sold,0)
                                 else 0 end current_units_sold,
                             case
-                                when TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :prior_from_date and :prior_to_date and units_sold>0 then coalesce(units_sold,0)
+                                when shipment_on between :prior_from_date and :prior_to_date and units_sold>0 then coalesce(units_sold,0)
                                 else 0 end prior_units_sold,
                             case
-                                when TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :previous_year_from_date and :previous_year_to_date and units_sold>0 then coalesce(units_sold,0)
+                                when shipment_on between :previous_year_from_date and :previous_year_to_date and units_sold>0 then coalesce(units_sold,0)
                                 else 0 end previous_year_units_sold,
                             case
-                                when TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :from_date and :to_date and units_sold > 0 then coalesce(-market_place_fee,0)
+                                when shipment_on between :from_date and :to_date and units_sold > 0 then coalesce(-market_place_fee,0)
                                 else 0
                                 end current_market_place_fee,
                             case
-                                when TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :prior_from_date and :prior_to_date and units_sold > 0 then coalesce(-market_place_fee,0)
+                                when shipment_on between :prior_from_date and :prior_to_date and units_sold > 0 then coalesce(-market_place_fee,0)
                                 else 0
                                 end prior_market_place_fee,
                             case
-                                when TO_DATE(SUBSTRING(refund_date, 1, 10), :date_format) between :from_date and :to_date and
-                                    TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :from_date and :to_date and
+                                when refund_on between :from_date and :to_date and
+                                    shipment_on between :from_date and :to_date and
                                     units_returned > 0 then coalesce(-returns,0)
                                     else 0
                                     end current_refund,
                             case
-                                when TO_DATE(SUBSTRING(refund_date, 1, 10), :date_format) between :prior_from_date and :prior_to_date and
-                                    TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :prior_from_date and :prior_to_date and
+                                when refund_on between :prior_from_date and :prior_to_date and
+                                    shipment_on between :prior_from_date and :prior_to_date and
                                     units_returned > 0 then coalesce(-returns,0)
                                     else 0
                                     end prior_refund,
                             case
-                                when TO_DATE(SUBSTRING(refund_date, 1, 10), :date_format) between :from_date and :to_date and
-                                    TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :from_date and :to_date and
+                                when refund_on between :from_date and :to_date and
+                                    shipment_on between :from_date and :to_date and
                                     units_returned > 0 then coalesce(units_returned,0)
                                     else 0 end current_units_returned,
                             case
-                                when TO_DATE(SUBSTRING(refund_date, 1, 10), :date_format) between :prior_from_date and :prior_to_date and
-                                TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :prior_from_date and :prior_to_date and
+                                when refund_on between :prior_from_date and :prior_to_date and
+                                shipment_on between :prior_from_date and :prior_to_date and
                                 units_returned > 0 then coalesce(units_returned,0)
                                 else 0 end prior_units_returned
 
@@ -2550,10 +2238,10 @@ class DashboardView:
                             {f" AND az_product_performance.brand IN :brand" if brand else ""}
                             {f" AND im.asin IN :product" if product else ""}
                             AND shipment_date is not null and
-                            TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :prior_from_date and :to_date
+                            shipment_on between :prior_from_date and :to_date
                         )
                         select i.asin as asin,
-                                TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) as shp_date,
+                                shipment_on as shp_date,
                                 coalesce(sum(current_gross_sales),0) as current_gross_sales,
                                 coalesce(sum(prior_gross_sales),0) as prior_gross_sales,
                                 coalesce(sum(previous_year_gross_sales),0) as previous_year_gross_sales,
@@ -2690,26 +2378,26 @@ class DashboardView:
                             shipment_date,
                             refund_date,
                             case
-                                when TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :from_date and :to_date then coalesce(gross_sales,0)
+                                when shipment_on between :from_date and :to_date then coalesce(gross_sales,0)
                                 else 0 end gross_sales,
                             case
-                                when TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :from_date and :to_date and units_sold>0 then coalesce(units_sold,0)
+                                when shipment_on between :from_date and :to_date and units_sold>0 then coalesce(units_sold,0)
                                 else 0 end units_sold,
                             case
                                 when units_sold > 0 then coalesce(-market_place_fee,0)
                                 else 0
                                 end market_place_fee,
                             case
-                                when TO_DATE(SUBSTRING(refund_date, 1, 10), :date_format) between :from_date and :to_date and units_returned > 0 then coalesce(-returns,0)
+                                when refund_on between :from_date and :to_date and units_returned > 0 then coalesce(-returns,0)
                                 else 0
                                 end refund,
                             case
-                                when TO_DATE(SUBSTRING(refund_date, 1, 10), :date_format) between :from_date and :to_date and units_returned > 0 then coalesce(units_returned,0)
+                                when refund_on between :from_date and :to_date and units_returned > 0 then coalesce(units_returned,0)
                                 else 0 end units_returned
                             from az_product_performance
                             where account_id = :account_id and asp_id = :asp_id and
                             shipment_date is not null and
-                            TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :from_date and :to_date
+                            shipment_on between :from_date and :to_date
                         )
                         select coalesce(sum(gross_sales),0) as gross_sales, coalesce(sum(market_place_fee),0) as market_place_fee, coalesce(sum(refund),0) as refund, coalesce(sum(units_sold),0) as units_sold,
                         coalesce(sum(units_returned),0) as units_returned, coalesce(sum((units_sold - units_returned) * cogs),0) as total_cogs, max(page_views) as page_views ,
@@ -2783,11 +2471,11 @@ class DashboardView:
         #             max(i.face_image) as product_image,
         #             sum(
         #             case
-        #                 when TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :from_date and :to_date then coalesce(pp.gross_sales,0)
+        #                 when shipment_on between :from_date and :to_date then coalesce(pp.gross_sales,0)
         #                 else 0 end) as current_gross_sales,
         #             sum(
         #             case
-        #                 when TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between  :from_date and :to_date then coalesce(pp.units_sold,0)
+        #                 when shipment_on between  :from_date and :to_date then coalesce(pp.units_sold,0)
         #                 else 0 end) as current_units_sold,
         #             max(
         #             case
@@ -2811,7 +2499,7 @@ class DashboardView:
         #             on i.asin=sub_query_az_sales_traffic_asin.asin
         #             where pp.account_id = :account_id and pp.asp_id = :asp_id and
         #             shipment_date is not null and
-        #             TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :from_date and :to_date
+        #             shipment_on between :from_date and :to_date
         #             {condition_a}
         #             group by i.asin
         #             ) as subquery
@@ -2899,26 +2587,26 @@ class DashboardView:
         #                     shipment_date,
         #                     refund_date,
         #                     case
-        #                         when TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :from_date and :to_date then coalesce(gross_sales,0)
+        #                         when shipment_on between :from_date and :to_date then coalesce(gross_sales,0)
         #                         else 0 end gross_sales,
         #                     case
-        #                         when TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :from_date and :to_date and units_sold>0 then coalesce(units_sold,0)
+        #                         when shipment_on between :from_date and :to_date and units_sold>0 then coalesce(units_sold,0)
         #                         else 0 end units_sold,
         #                     case
         #                         when units_sold > 0 then coalesce(-market_place_fee,0)
         #                         else 0
         #                         end market_place_fee,
         #                     case
-        #                         when TO_DATE(SUBSTRING(refund_date, 1, 10), :date_format) between :from_date and :to_date and units_returned > 0 then coalesce(-returns,0)
+        #                         when refund_on between :from_date and :to_date and units_returned > 0 then coalesce(-returns,0)
         #                         else 0
         #                         end refund,
         #                     case
-        #                         when TO_DATE(SUBSTRING(refund_date, 1, 10), :date_format) between :from_date and :to_date and units_returned > 0 then coalesce(units_returned,0)
+        #                         when refund_on between :from_date and :to_date and units_returned > 0 then coalesce(units_returned,0)
         #                         else 0 end units_returned
         #                     from az_product_performance
         #                     where account_id =  :account_id and asp_id = :asp_id and
         #                     shipment_date is not null and
-        #                     TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :from_date and :to_date
+        #                     shipment_on between :from_date and :to_date
         #                 )
         #                 select i.asin as asin, max(f.seller_sku) as sku, max(i.item_name) as product_name, max(i.face_image) as product_image, coalesce(sum(gross_sales),0) as gross_sales, coalesce(sum(market_place_fee),0) as market_place_fee, coalesce(sum(refund),0) as refund, coalesce(sum(units_sold),0) as units_sold,
         #                 coalesce(sum(units_returned),0) as units_returned, coalesce(sum((units_sold - units_returned) * cogs),0) as total_cogs, coalesce(max(page_views),0) as page_views ,
@@ -2976,79 +2664,6 @@ class DashboardView:
 
         return sales_trend
 
-    @staticmethod
-    def __get_profit_and_loss_metrics(account_id: str, selling_partner_id: str, from_date: str, to_date: str, product: Optional[tuple], brand: Optional[tuple],
-                                      category: Optional[tuple]):
-        """get metrics for profit and loss section of dashboard"""
-
-        condition_list = []
-        condition_a = ''
-
-        if category:
-            condition_list.append('i.category IN :category')
-
-        if brand:
-            condition_list.append('i.brand IN :brand')
-
-        if product:
-            condition_list.append('i.asin IN :product')
-
-        if condition_list:
-            condition_a = 'where ' + ' and '.join(condition_list)
-
-        raw_query = f'''
-            with finance_summary as (
-                select az_order_id ,
-                seller_sku,
-                shipment_date,
-                refund_date,
-                forward_fba_fee,
-                reverse_fba_fee,
-                summary_analysis,
-                case
-                    when TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :from_date and :to_date then coalesce(gross_sales,0)
-                    else 0 end gross_sales,
-                case
-                    when TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :from_date and :to_date and units_sold>0 then coalesce(units_sold,0)
-                    else 0 end units_sold,
-                case
-                    when units_sold > 0 then coalesce(-market_place_fee,0)
-                    else 0
-                    end market_place_fee,
-                case
-                    when TO_DATE(SUBSTRING(refund_date, 1, 10), :date_format) between :from_date and :to_date and units_returned > 0 then coalesce(-returns,0)
-                    else 0
-                    end refund,
-                case
-                    when TO_DATE(SUBSTRING(refund_date, 1, 10), :date_format) between :from_date and :to_date and units_returned > 0 then coalesce(units_returned,0)
-                    else 0 end units_returned
-                from az_product_performance
-                where account_id = :account_id and asp_id = :asp_id and
-                shipment_date is not null and
-                TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :from_date and :to_date
-
-            )
-            select i.asin as asin, i.seller_sku as sku, coalesce((forward_fba_fee + reverse_fba_fee),0) as other_fee, coalesce(gross_sales,0) as gross_sales, coalesce(market_place_fee,0) as market_place_fee, coalesce(refund,0) as refund, coalesce(units_sold,0) as units_sold,
-            coalesce(units_returned,0) as units_returned, coalesce((units_sold - units_returned) * cogs,0) as total_cogs, summary_analysis
-            from finance_summary f
-            left join az_item_master i
-            on f.seller_sku = i.seller_sku and i.account_id = :account_id and i.selling_partner_id = :asp_id
-            {condition_a}
-        '''
-
-        profit_and_loss = db.session.execute(text(raw_query), {                 # type: ignore  # noqa: FKA100
-            'from_date': from_date,
-            'to_date': to_date,
-            'account_id': account_id,
-            'asp_id': selling_partner_id,
-            'date_format': 'YYYY-MM-DD',
-            'category': category,
-            'brand': brand,
-            'product': product
-        })
-
-        return profit_and_loss
-
     @staticmethod
     def __get_sales_statistics_graph_metrics(account_id: str, selling_partner_id: str, from_date: str, to_date: str):
         """function to get metrics for bar graph in sales statistics section"""
@@ -3064,9 +2679,9 @@ class DashboardView:
                         from az_product_performance
                         where account_id = :account_id and asp_id = :asp_id and
                         shipment_date is not null and
-                        TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :from_date and :to_date
+                        shipment_on between :from_date and :to_date
                     )
-                select coalesce(sum(gross_sales),0) as gross_sales, coalesce(sum(units_sold),0) as units_sold, TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) as shp_date
+                select coalesce(sum(gross_sales),0) as gross_sales, coalesce(sum(units_sold),0) as units_sold, shipment_on as shp_date
                 from finance_summary f
                 group by shp_date
         '''
@@ -3183,174 +2798,27 @@ class DashboardView:
         other_fee_dict = {'FBARemovalFee': 0, 'FBAInboundTransportationFee': 0, 'MFNPostageFee': 0,
                           'Storage Fee': 0, 'StorageRenewalBilling': 0, 'Order Cancellation Charge': 0}
 
-        for service_fee_dict in service_fee_list:
+        for service_fee in service_fee_list:
+
+            # event_json holds the service fee event wrapped in a list
+            for service_fee_dict in service_fee.other_fee_json or []:
 
-            fee_list = service_fee_dict.get('FeeList')
+                fee_list = service_fee_dict.get('FeeList')
 
-            if fee_list:
+                if fee_list:
 
-                for fee_type_dict in fee_list:
-                    fee_type = fee_type_dict.get('FeeType')
-                    amount = fee_type_dict.get(
-                        'FeeAmount').get('CurrencyAmount')
+                    for fee_type_dict in fee_list:
+                        fee_type = fee_type_dict.get('FeeType')
+                        amount = fee_type_dict.get(
+                            'FeeAmount').get('CurrencyAmount')
 
-                    if fee_type in other_fee_dict:
-                        other_fee_dict[fee_type] += abs(amount)
+                        if fee_type in other_fee_dict:
+                            other_fee_dict[fee_type] += abs(amount)
 
         other_fee = sum(other_fee_dict.values())
 
         return other_fee_dict, other_fee
 
-    @staticmethod
-    def __get_ads_spend_metrics(account_id: str, selling_partner_id: str, from_date: str, to_date: str, product: Optional[tuple], brand: Optional[tuple],
-                                category: Optional[tuple]):
-        """function to get ads spend metrics for profit and loss section"""
-
-        condition_a = ''
-        brand_query = ''
-
-        calculate_brand = True
-        if category or product:
-            calculate_brand = False
-
-        if category:
-            condition_a += ' AND im.category IN :category'
-        if brand:
-            condition_a += ' AND im.brand IN :brand'
-            brand_list = [f'%{brand_data}%' for brand_data in brand]
-            brand_query = f'and campaign_name ILIKE any(array{brand_list})'
-        if product:
-            condition_a += ' AND im.asin IN :product'
-
-        # display data
-        sponsored_display_raw_query = f'''
-                select coalesce(sum(ds.cost * ds.clicks),0) as cost
-                from az_sponsored_display ds
-                left join az_item_master im
-                on ds.sku = im.seller_sku
-                where ds.account_id=:account_id and ds.asp_id=:asp_id and ds.payload_date between :from_date and :to_date
-                {condition_a}
-        '''
-        sponsored_display_cost = db.session.execute(text(sponsored_display_raw_query), {                 # type: ignore  # noqa: FKA100
-            'from_date': from_date,
-            'to_date': to_date,
-            'account_id': account_id,
-            'asp_id': selling_partner_id,
-            'category': category,
-            'brand': brand,
-            'product': product
-        }).fetchone()
-
-        # product data
-        sponsored_product_raw_query = f'''
-                select coalesce(sum(spend),0) as cost
-                from az_sponsored_product pr
-                left join az_item_master im
-                ON im.seller_sku=pr.advertised_sku
-                where pr.account_id=:account_id and pr.asp_id=:asp_id and pr.payload_date between :from_date and :to_date
-                {condition_a}
-        '''
-        sponsored_product_cost = db.session.execute(text(sponsored_product_raw_query), {                 # type: ignore  # noqa: FKA100
-            'from_date': from_date,
-            'to_date': to_date,
-            'account_id': account_id,
-            'asp_id': selling_partner_id,
-            'category': category,
-            'brand': brand,
-            'product': product
-        }).fetchone()
-
-        if calculate_brand:
-            # brand data
-
-            sponsored_brand_raw_query = f'''
-                select coalesce(sum(cost * clicks),0) as cost
-                from az_sponsored_brand
-                where account_id=:account_id and asp_id=:asp_id and payload_date between :from_date and :to_date
-                {brand_query}
-            '''
-
-            sponsored_brand_cost = db.session.execute(text(sponsored_brand_raw_query), {                 # type: ignore  # noqa: FKA100
-                'from_date': from_date,
-                'to_date': to_date,
-                'account_id': account_id,
-                'asp_id': selling_partner_id
-            }).fetchone()
-
-            return sponsored_brand_cost.cost, sponsored_display_cost.cost, sponsored_product_cost.cost
-
-        return 0, sponsored_display_cost.cost, sponsored_product_cost.cost
-
-    @staticmethod
-    def __get_profit_loss_graph_metrics(account_id: str, selling_partner_id: str, from_date: str, to_date: str, product: Optional[tuple], brand: Optional[tuple],
-                                        category: Optional[tuple]):
-        """function to get metrics for graph in profit and loss section"""
-
-        condition_list = []
-        condition_a = ''
-
-        if category:
-            condition_list.append('i.category IN :category')
-
-        if brand:
-            condition_list.append('i.brand IN :brand')
-
-        if product:
-            condition_list.append('i.asin IN :product')
-
-        if condition_list:
-            condition_a = 'where ' + ' and '.join(condition_list)
-
-        raw_query = f'''
-                with finance_summary as (
-                select az_order_id ,
-                seller_sku,
-                shipment_date,
-                refund_date,
-                case
-                    when TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :from_date and :to_date then coalesce(gross_sales,0)
-                    else 0 end gross_sales,
-                case
-                    when TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :from_date and :to_date and units_sold>0 then coalesce(units_sold,0)
-                    else 0 end units_sold,
-                case
-                    when units_sold > 0 then coalesce(-market_place_fee,0)
-                    else 0
-                    end market_place_fee,
-                case
-                    when TO_DATE(SUBSTRING(refund_date, 1, 10), :date_format) between :from_date and :to_date and units_returned > 0 then coalesce(-returns,0)
-                    else 0
-                    end refund,
-                case
-                    when TO_DATE(SUBSTRING(refund_date, 1, 10), :date_format) between :from_date and :to_date and units_returned > 0 then coalesce(units_returned,0)
-                    else 0 end units_returned
-                from az_product_performance
-                where account_id = :account_id and asp_id = :asp_id and
-                shipment_date is not null and
-                TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) between :from_date and :to_date
-            )
-            select TO_DATE(SUBSTRING(shipment_date, 1, 10), :date_format) as shp_date, coalesce(sum(gross_sales),0) as gross_sales, coalesce(sum(market_place_fee),0) as market_place_fee, coalesce(sum(refund),0) as refund, coalesce(sum(units_sold),0) as units_sold,
-            coalesce(sum(units_returned),0) as units_returned, coalesce(sum((units_sold - units_returned) * cogs),0) as total_cogs
-            from finance_summary f
-            left join az_item_master i
-            on f.seller_sku = i.seller_sku and i.account_id = :account_id and i.selling_partner_id = :asp_id
-            {condition_a}
-            group by shp_date
-        '''
-
-        profit_loss_graph = db.session.execute(text(raw_query), {                 # type: ignore  # noqa: FKA100
-            'from_date': from_date,
-            'to_date': to_date,
-            'account_id': account_id,
-            'asp_id': selling_partner_id,
-            'date_format': 'YYYY-MM-DD',
-            'category': category,
-            'brand': brand,
-            'product': product
-        }).fetchall()
-
-        return profit_loss_graph
-
     @staticmethod
     def __get_sales_statistics_bar_graph_metrics(account_id: str, selling_partner_id: str, from_date: str, to_date: str, category: Optional[tuple] = None, brand: Optional[tuple] = None, product: Optional[tuple] = None):
         """method to calculate bar graph metrics"""
@@ -3436,28 +2904,40 @@ class DashboardView:
 
     @staticmethod
     def __get_sales_stats_by_hour(account_id: str, asp_id: str, from_date: str, to_date: str, category: Optional[tuple] = None, brand: Optional[tuple] = None, product: Optional[tuple] = None):
-        """Query to fetch sales per hour"""
+        """Query to fetch sales per hour of the day, hours and dates are in IST as on the sales api payload"""
 
         from_date = datetime.strptime(from_date, '%Y-%m-%d').date()     # type: ignore  # noqa: FKA100
-        to_date = datetime.strptime(to_date, '%Y-%m-%d').date()         # type: ignore  # noqa: FKA100
+        to_date = datetime.strptime(to_date, '%Y-%m-%d').date() + timedelta(days=1)     # type: ignore  # noqa: FKA100
+
+        # az_sales_hourly is keyed on asin only, category and brand come from the item master
+        item_master_query = 'SELECT 1 FROM az_item_master AS item WHERE item.account_id = hourly.account_id AND item.selling_partner_id = hourly.asp_id AND item.asin = hourly.asin'
 
         raw_query = f'''
                     SELECT
-                        hourly_sales->>'result' as sales_data
-                    FROM
-                        az_sales_traffic_asin
-                    WHERE account_id = :account_id and asp_id = :asp_id
-                    AND payload_date BETWEEN :from_date and :to_date
-                    {f" AND az_sales_traffic_asin.category IN :category" if category else ""}
-                    {f" AND az_sales_traffic_asin.brand IN :brand" if brand else ""}
-                    {f" AND az_sales_traffic_asin.child_asin IN :product" if product else ""}
-                    AND hourly_sales IS NOT NULL
-                    AND hourly_sales->'result' IS NOT NULL
+                        to_char(CURRENT_DATE + hour_of_day, 'HH12:MIAM') || ' - ' || to_char(CURRENT_DATE + hour_of_day + INTERVAL '1 hour', 'HH12:MIAM') AS hour_range,
+                        SUM(sales_amount) AS total_sales_amount,
+                        SUM(units_ordered) AS total_units_ordered
+                    FROM (
+                        SELECT
+                            CAST(date_trunc('hour', hourly.hour_ts AT TIME ZONE :time_zone) AS TIME) AS hour_of_day,
+                            hourly.sales_amount,
+                            hourly.units_ordered
+                        FROM az_sales_hourly AS hourly
+                        WHERE hourly.account_id = :account_id AND hourly.asp_id = :asp_id
+                        AND hourly.hour_ts >= CAST(:from_date AS TIMESTAMP) AT TIME ZONE :time_zone
+                        AND hourly.hour_ts < CAST(:to_date AS TIMESTAMP) AT TIME ZONE :time_zone
+                        {" AND hourly.asin IN :product" if product else ""}
+                        {f" AND EXISTS ({item_master_query} AND item.category IN :category)" if category else ""}
+                        {f" AND EXISTS ({item_master_query} AND item.brand IN :brand)" if brand else ""}
+                    ) AS sales_by_hour
+                    GROUP BY hour_of_day
+                    ORDER BY hour_of_day
                     '''
 
         sales_stat = db.session.execute(text(raw_query), {                 # type: ignore  # noqa: FKA100
             'from_date': from_date,
             'to_date': to_date,
+            'time_zone': SALES_API_TIME_ZONE,
             'account_id': account_id,
             'asp_id': asp_id,
             'category': category,
@@ -3465,7 +2945,6 @@ class DashboardView:
             'product': product
         }).fetchall()
 
-        sales_stat = [row[0] for row in sales_stat]
         return sales_stat
 
     @staticmethod
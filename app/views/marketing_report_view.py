@@ -16,6 +16,7 @@ from app.helpers.constants import QueueTaskStatus
 from app.helpers.constants import ResponseMessageKeys
 from app.helpers.decorators import api_time_logger
 from app.helpers.decorators import brand_filter
+from app.helpers.decorators import cached_response
 from app.helpers.decorators import token_required
 from app.helpers.queue_helper import add_queue_task_and_enqueue
 from app.helpers.utility import convert_string_to_datetime
@@ -72,7 +73,7 @@ class MarketingReportView:
                     SUM(CASE WHEN pp.summary_analysis->>'_other_fee' IS NOT NULL
                     THEN (pp.summary_analysis->>'_other_fee')::NUMERIC(10,2) ELSE 0 END) AS other_fees,
                     SUM(case
-                        WHEN CAST(pp.refund_date AS DATE) between :from_date and :to_date and pp.units_returned > 0 then coalesce(pp.returns,0)
+                        WHEN pp.refund_on between :from_date and :to_date and pp.units_returned > 0 then coalesce(pp.returns,0)
                         ELSE 0
                     END) as refund
                     from az_product_performance as pp
@@ -96,7 +97,7 @@ class MarketingReportView:
                     AND pp.asp_id = '{asp_id}'
                     AND
                     pp.units_sold!=0
-                    AND CAST(pp.shipment_date AS DATE) BETWEEN '{from_date}' AND '{to_date}'
+                    AND pp.shipment_on BETWEEN '{from_date}' AND '{to_date}'
         '''
 
         if category:
@@ -162,6 +163,7 @@ class MarketingReportView:
     @api_time_logger
     @token_required
     @brand_filter
+    @cached_response
     def get_ad_graph_data(user_object, account_object, allowed_brands):
         """endpoint for updating cog of one item"""
         try:
@@ -318,6 +320,7 @@ class MarketingReportView:
     @api_time_logger
     @token_required
     @brand_filter
+    @cached_response
     def get_sales_period(user_object, account_object, allowed_brands):
         """Endpoint for marketing report sales period"""
         try:
@@ -576,6 +579,7 @@ class MarketingReportView:
     @api_time_logger
     @token_required
     @brand_filter
+    @cached_response
     def get_costvs_metrics(user_object, account_object, allowed_brands):  # type: ignore  # noqa: C901
         """Endpoint for marketing report sales period"""
         try:
@@ -756,6 +760,7 @@ class MarketingReportView:
     @api_time_logger
     @token_required
     @brand_filter
+    @cached_response
     def get_performance(user_object, account_object, allowed_brands):
         """Endpoint for marketing report product performance"""
         try:
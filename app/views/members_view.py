@@ -7,6 +7,7 @@ from app import config_data
 from app import db
 from app import logger
 from app import ses_email_delivery_q
+from app.helpers.auth_context_helper import invalidate_auth_context
 from app.helpers.constants import APP_NAME
 from app.helpers.constants import ChangeUserStatus
 from app.helpers.constants import EntityType
@@ -681,6 +682,7 @@ class MembersView:
 
                     user_account.deactivated_at = None
                     db.session.commit()
+                    invalidate_auth_context(account_id=account_object.uuid)
 
                     # Send user access active mail"""
 
@@ -703,6 +705,7 @@ class MembersView:
 
                     user_account.deactivated_at = int(time.time())
                     db.session.commit()
+                    invalidate_auth_context(account_id=account_object.uuid)
 
                     # Send user access deactived mail"""
 
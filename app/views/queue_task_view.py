@@ -14,8 +14,12 @@ from app.helpers.constants import PAGE_LIMIT
 from app.helpers.constants import QueueName
 from app.helpers.constants import QueueTaskStatus
 from app.helpers.constants import ResponseMessageKeys
+from app.helpers.constants import SortingOrder
 from app.helpers.decorators import api_time_logger
 from app.helpers.decorators import token_required
+from app.helpers.pagination_helper import get_cursor_page
+from app.helpers.pagination_helper import get_cursor_pagination_meta
+from app.helpers.pagination_helper import get_request_cursor
 from app.helpers.utility import enum_validator
 from app.helpers.utility import field_type_validator
 from app.helpers.utility import get_date_and_time_from_timestamp
@@ -34,8 +38,8 @@ class QueueTaskView:
     """
 
     @staticmethod
-    def search(user_id: int, account_id: str, page=None, size=None, sort=None, q=None, status_list=None):
-        """Search for queue's according to filter's"""
+    def search(user_id: int, account_id: str, page=None, size=None, sort=None, q=None, status_list=None, cursor=None, with_total=True):
+        """Search for queue's according to filter's, with a cursor the page after it is read by keyset on id as size + 1 rows"""
         result_query = db.session.query(QueueTask).filter(
             QueueTask.owner_id == user_id, QueueTask.account_id == account_id)
         total_count = None
@@ -55,10 +59,12 @@ class QueueTaskView:
                     '%' + term + '%') for term in q]
                 result_query = result_query.filter(or_(*search_conditions))
 
+        if cursor is None or with_total:
             total_count = result_query.count()
 
-        if total_count is None:
-            total_count = result_query.count()
+        if cursor is not None:
+            result_query = result_query.filter(QueueTask.id < cursor[0] if cursor else True)
+            return result_query.order_by(QueueTask.id.desc()).limit(int(size) + 1).all(), total_count
 
         if sort is None:
             result_query = result_query.order_by(QueueTask.id.desc())
@@ -110,8 +116,20 @@ class QueueTaskView:
                 q = [QueueName.EXPORT_CSV, QueueName.EXPORT_EXCEL,
                      QueueName.ITEM_MASTER_COGS_IMPORT]
 
+            request_cursor = get_request_cursor(key_columns=('id',), sort_order=SortingOrder.DESC.value)
+
+            if request_cursor['is_error']:
+                return send_json_response(http_status=HttpStatusCode.BAD_REQUEST.value, response_status=False,
+                                          message_key=ResponseMessageKeys.INVALID_CURSOR.value, data=None,
+                                          error=ResponseMessageKeys.ENTER_CORRECT_INPUT.value)
+
+            cursor = request_cursor['cursor']
+
             queue_task_list, total_count = QueueTaskView.search(
-                user_id=logged_in_user, account_id=account_id, page=page, size=size, q=q, status_list=status_list)
+                user_id=logged_in_user, account_id=account_id, page=page, size=size, q=q, status_list=status_list, cursor=cursor, with_total=request_cursor['with_total'])
+
+            if cursor is not None:
+                queue_task_list, next_cursor = get_cursor_page(rows=queue_task_list, size=int(size), key_columns=('id',), sort_order=SortingOrder.DESC.value)
 
             if queue_task_list:
 
@@ -120,7 +138,8 @@ class QueueTaskView:
                 _queue_task_list = []
 
                 objects.update({
-                    'pagination_metadata': get_pagination_meta(current_page=1 if page is None else int(page), page_size=int(size), total_items=total_count)
+                    'pagination_metadata': get_pagination_meta(current_page=1 if page is None else int(page), page_size=int(size), total_items=total_count) if cursor is None
+                    else get_cursor_pagination_meta(page_size=int(size), next_cursor=next_cursor, total_items=total_count)
                 })
 
                 for queue_task in queue_task_list:
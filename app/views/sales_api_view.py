@@ -11,6 +11,8 @@ from app.helpers.constants import ResponseMessageKeys
 from app.helpers.constants import SalesAPIGranularity
 from app.helpers.decorators import api_time_logger
 from app.helpers.decorators import token_required
+from app.helpers.rate_limit_helper import SpApiThrottlingException
+from app.helpers.throttle_helper import send_throttled_response
 from app.helpers.utility import generate_uuid
 from app.helpers.utility import get_asp_market_place_ids
 from app.helpers.utility import get_previous_day_date
@@ -54,6 +56,9 @@ class AZSalesView:
 
             return send_json_response(http_status=HttpStatusCode.OK.value, response_status=True, message_key=ResponseMessageKeys.SUCCESS.value, data=response, error=None)
 
+        except SpApiThrottlingException as exception_error:
+            return send_throttled_response(exception=exception_error)
+
         except Exception as exception_error:
             logger.error(
                 f'Exception occured while getting sales api data : {exception_error}')
@@ -245,5 +245,33 @@ def create_test_report():
     AspReportWorker.create_reports()
 
 
+@manager.command
+def rebuild_product_performance_daily():
+    """Recompute the daily product performance rollup of every account from the raw tables"""
+
+    from app.models.account import Account
+    from app.models.az_product_performance_daily import AzProductPerformanceDaily
+
+    for account in Account.query.filter(Account.asp_id.isnot(None)).all():
+        written = AzProductPerformanceDaily.rebuild(account_id=account.uuid, asp_id=account.asp_id)
+        click.echo(f'{account.uuid}: {written} rows')
+
+
+@manager.option('-r', '--rows', dest='rows', type=int, default=200000, help='rows generated per table')  # type: ignore  # noqa: FKA100
+def benchmark_query_plans(rows):
+    """Print the plans of the dashboard queries on a generated dataset, without and with the dashboard indexes"""
+
+    from app.helpers.query_plan_benchmark_helper import run_query_plan_benchmark
+
+    for result in run_query_plan_benchmark(rows=rows):
+        click.echo(f"\n{result['query']}: {result['before_ms']:.2f} ms -> {result['after_ms']:.2f} ms")
+        click.echo('  before:')
+        for line in result['before_plan']:
+            click.echo(f'    {line}')
+        click.echo('  after:')
+        for line in result['after_plan']:
+            click.echo(f'    {line}')
+
+
 if __name__ == '__main__':
     manager.run()
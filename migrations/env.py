@@ -27,6 +27,8 @@ from app.models import az_sponsored_display  # noqa nosort
 from app.models import az_sponsored_product  # noqa nosort
 from app.models import az_financial_event  # noqa nosort
 from app.models import az_product_performance  # noqa nosort
+from app.models import az_product_performance_daily  # noqa nosort
+from app.models import az_sales_hourly  # noqa nosort
 from app.models import postal_code_master  # noqa nosort
 from app.models import az_fba_returns  # noqa nosort
 from app.models import az_fba_reimbursements  # noqa nosort
@@ -0,0 +1,32 @@
+"""Add unique key on account, amazon order id and sku to az_order_report table
+
+Revision ID: 0062
+Revises: 0061
+Create Date: 2024-01-08 11:32:40.218634
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0062'
+down_revision = '0061'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # keep the most recent row of every order item before adding the unique key
+    op.execute('''
+        DELETE FROM az_order_report AS older
+        USING az_order_report AS newer
+        WHERE older.account_id = newer.account_id
+        AND older.amazon_order_id = newer.amazon_order_id
+        AND older.sku = newer.sku
+        AND older.id < newer.id
+    ''')
+    op.create_unique_constraint('uq_az_order_report_account_id_amazon_order_id_sku', 'az_order_report', ['account_id', 'amazon_order_id', 'sku'])
+
+
+def downgrade():
+    op.drop_constraint('uq_az_order_report_account_id_amazon_order_id_sku', 'az_order_report', type_='unique')
@@ -0,0 +1,89 @@
+"""Add typed date and timestamp columns next to the report date strings
+
+Revision ID: 0063
+Revises: 0062
+Create Date: 2024-01-12 10:41:27.502318
+
+"""
+from alembic import op
+from app.helpers.utility import parse_report_date
+from app.helpers.utility import parse_report_timestamp
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0063'
+down_revision = '0062'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 10000
+
+# (table, source string column, typed column)
+DATE_COLUMNS = (
+    ('az_order_report', 'purchase_date', 'purchase_on'),
+    ('az_product_performance', 'shipment_date', 'shipment_on'),
+    ('az_product_performance', 'refund_date', 'refund_on'),
+    ('az_fba_customer_shipment_sales', 'shipment_date', 'shipment_on'),
+    ('az_fba_reimbursements', 'approval_date', 'approval_on'),
+    ('az_fba_returns', 'return_date', 'return_on'),
+)
+TIMESTAMP_COLUMNS = (
+    ('az_order_report', 'purchase_date', 'purchase_at'),
+    ('az_order_report', 'last_updated_date', 'last_updated_at'),
+)
+
+
+def backfill(connection, table, columns):
+    """Fill the typed columns of a table one id range at a time with the parsers used at ingest, committing each batch"""
+    sources = sorted({source for source, _, _ in columns})
+    min_id, max_id = connection.execute(sa.text(f'SELECT MIN(id), MAX(id) FROM {table}')).first()
+
+    if min_id is None:
+        return
+
+    select_query = sa.text(f'''
+        SELECT id, {", ".join(sources)} FROM {table}
+        WHERE id >= :start_id AND id < :end_id AND ({" OR ".join(f"{source} IS NOT NULL" for source in sources)})
+    ''')
+    update_query = sa.text(f'UPDATE {table} SET {", ".join(f"{column} = :{column}" for _, column, _ in columns)} WHERE id = :row_id')
+
+    for start_id in range(min_id, max_id + 1, BACKFILL_BATCH_SIZE):
+        rows = connection.execute(select_query, {'start_id': start_id, 'end_id': start_id + BACKFILL_BATCH_SIZE}).mappings().all()
+
+        values = [{'row_id': row['id'], **{column: parse(row[source]) for source, column, parse in columns}} for row in rows]
+        values = [value for value in values if any(value[column] is not None for _, column, _ in columns)]
+
+        if values:
+            connection.execute(update_query, values)
+
+
+def upgrade():
+    for table, _, column in DATE_COLUMNS:
+        op.add_column(table, sa.Column(column, sa.Date(), nullable=True))
+    for table, _, column in TIMESTAMP_COLUMNS:
+        op.add_column(table, sa.Column(column, sa.DateTime(timezone=True), nullable=True))
+
+    # unparseable values stay NULL instead of failing the migration, exactly as at ingest
+    columns = {}
+    for table, source, column in DATE_COLUMNS:
+        columns.setdefault(table, []).append((source, column, parse_report_date))
+    for table, source, column in TIMESTAMP_COLUMNS:
+        columns.setdefault(table, []).append((source, column, parse_report_timestamp))
+
+    # batches commit on their own so the tables are never locked for the whole backfill
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+
+        for table, table_columns in columns.items():
+            backfill(connection, table, table_columns)
+
+        for table, _, column in DATE_COLUMNS:
+            op.create_index(f'ix_{table}_account_id_{column}', table, ['account_id', column], unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    for table, _, column in DATE_COLUMNS:
+        op.drop_index(f'ix_{table}_account_id_{column}', table_name=table)
+    for table, _, column in TIMESTAMP_COLUMNS + DATE_COLUMNS:
+        op.drop_column(table, column)
@@ -0,0 +1,76 @@
+"""Add composite indexes for the dashboard, product performance and inventory queries
+
+Revision ID: 0064
+Revises: 0063
+Create Date: 2024-01-16 09:12:48.671035
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0064'
+down_revision = '0063'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, include, where)
+INDEXES = (
+    # get_performance, zonal and P&L sales: account, seller and shipment day range, aggregated per sku
+    ('ix_az_product_performance_account_id_asp_id_shipment_on', 'az_product_performance', ['account_id', 'asp_id', 'shipment_on'],
+     ['seller_sku', 'az_order_id', 'units_sold', 'gross_sales', 'market_place_fee', 'refund_on', 'units_returned', 'returns'], None),
+    # refund side of the same queries, only a fraction of the rows have a refund
+    ('ix_az_product_performance_account_id_asp_id_refund_on', 'az_product_performance', ['account_id', 'asp_id', 'refund_on'],
+     None, 'refund_on IS NOT NULL'),
+    # finance ingestion looks up the performance rows of an order page
+    ('ix_az_product_performance_account_id_asp_id_az_order_id', 'az_product_performance', ['account_id', 'asp_id', 'az_order_id'], None, None),
+    # orders by purchase day, priced lines only
+    ('ix_az_order_report_account_id_selling_partner_id_purchase_on', 'az_order_report', ['account_id', 'selling_partner_id', 'purchase_on'],
+     ['asin', 'sku', 'quantity', 'item_price'], 'item_price IS NOT NULL'),
+    # glance, sales and inventory velocity by payload day
+    ('ix_az_sales_traffic_asin_account_id_asp_id_payload_date', 'az_sales_traffic_asin', ['account_id', 'asp_id', 'payload_date'],
+     ['child_asin', 'units_ordered', 'page_views'], None),
+    # item level stock split by disposition over a date range
+    ('ix_az_ledger_summary_account_id_asp_id_disposition_date', 'az_ledger_summary', ['account_id', 'asp_id', 'disposition', 'date'],
+     ['msku', 'asin', 'ending_warehouse_balance'], None),
+    # finance ingestion looks up the stored events of an order page
+    ('ix_az_financial_event_account_id_asp_id_az_order_id', 'az_financial_event', ['account_id', 'asp_id', 'az_order_id'], None, None),
+    # P&L reimbursements are adjustment events without an order
+    ('ix_az_financial_event_account_id_asp_id_adjustment', 'az_financial_event', ['account_id', 'asp_id', 'finance_type'],
+     None, "event_type = 'AdjustmentEventList' AND az_order_id IS NULL"),
+    ('ix_az_sponsored_product_account_id_asp_id_payload_date', 'az_sponsored_product', ['account_id', 'asp_id', 'payload_date'], None, None),
+    ('ix_az_sponsored_display_account_id_asp_id_payload_date', 'az_sponsored_display', ['account_id', 'asp_id', 'payload_date'], None, None),
+    ('ix_az_sponsored_brand_account_id_asp_id_payload_date', 'az_sponsored_brand', ['account_id', 'asp_id', 'payload_date'], None, None),
+    # item level and catalog joins on asin
+    ('ix_az_item_master_account_id_selling_partner_id_asin', 'az_item_master', ['account_id', 'selling_partner_id', 'asin'], None, None),
+)
+
+# single column date indexes from 0063, superseded by the composite ones above
+REPLACED_INDEXES = (
+    ('ix_az_product_performance_account_id_shipment_on', 'az_product_performance', ['account_id', 'shipment_on']),
+    ('ix_az_product_performance_account_id_refund_on', 'az_product_performance', ['account_id', 'refund_on']),
+    ('ix_az_order_report_account_id_purchase_on', 'az_order_report', ['account_id', 'purchase_on']),
+)
+
+
+def upgrade():
+    # built concurrently so ingestion keeps writing while the indexes are created
+    with op.get_context().autocommit_block():
+        for name, table, columns, include, where in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True,
+                            postgresql_include=include or [], postgresql_where=sa.text(where) if where else None)
+
+        for name, table, _ in REPLACED_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+        op.execute('ANALYZE az_product_performance, az_order_report, az_sales_traffic_asin, az_ledger_summary, az_financial_event, '
+                   'az_sponsored_product, az_sponsored_display, az_sponsored_brand, az_item_master')
+
+
+def downgrade():
+    for name, table, columns in REPLACED_INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+    for name, table, _, _, _ in INDEXES:
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,51 @@
+"""create az_product_performance_daily rollup table
+
+Revision ID: 0065
+Revises: 0064
+Create Date: 2024-01-22 14:05:31.284519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0065'
+down_revision = '0064'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('az_product_performance_daily',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('account_id', sa.String(length=36), nullable=False),
+    sa.Column('asp_id', sa.String(length=255), nullable=False),
+    sa.Column('seller_sku', sa.String(length=255), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('gross_sales', sa.Numeric(), server_default='0', nullable=False),
+    sa.Column('units_sold', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('order_count', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('refunds', sa.Numeric(), server_default='0', nullable=False),
+    sa.Column('units_returned', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('market_place_fee', sa.Numeric(), server_default='0', nullable=False),
+    sa.Column('forward_fba_fee', sa.Numeric(), server_default='0', nullable=False),
+    sa.Column('reverse_fba_fee', sa.Numeric(), server_default='0', nullable=False),
+    sa.Column('sponsored_product_spend', sa.Numeric(), server_default='0', nullable=False),
+    sa.Column('sponsored_display_spend', sa.Numeric(), server_default='0', nullable=False),
+    sa.Column('market_place_fee_breakdown', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('gross_sales_breakdown', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('zone_sales', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('created_at', sa.BigInteger(), nullable=True),
+    sa.Column('updated_at', sa.BigInteger(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('account_id', 'asp_id', 'seller_sku', 'day', name='uq_az_product_performance_daily_account_id_asp_id_sku_day')
+    )
+    op.create_index('ix_az_product_performance_daily_account_id_asp_id_day', 'az_product_performance_daily', ['account_id', 'asp_id', 'day'], unique=False)
+    # the rollup is filled by `python manage.py rebuild_product_performance_daily` and kept current by the ingestion workers
+
+
+def downgrade():
+    op.drop_index('ix_az_product_performance_daily_account_id_asp_id_day', table_name='az_product_performance_daily')
+    op.drop_table('az_product_performance_daily')
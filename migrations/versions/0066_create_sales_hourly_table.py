@@ -0,0 +1,73 @@
+"""create az_sales_hourly fact table and convert the hourly sales blobs
+
+Revision ID: 0066
+Revises: 0065
+Create Date: 2024-01-29 11:42:08.531662
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0066'
+down_revision = '0065'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 10000
+
+# every interval of az_sales_traffic_asin.hourly_sales 'result' becomes one row, the interval start is the hour
+BACKFILL_QUERY = '''
+    INSERT INTO az_sales_hourly (account_id, asp_id, asin, hour_ts, units_ordered, order_count, sales_amount, currency_code, created_at)
+    SELECT a.account_id, a.asp_id, a.child_asin,
+           CAST(split_part(i.value->>'interval', '--', 1) AS TIMESTAMPTZ),
+           COALESCE(CAST(i.value->>'unitCount' AS INTEGER), 0),
+           COALESCE(CAST(i.value->>'orderCount' AS INTEGER), 0),
+           COALESCE(CAST(i.value->'totalSales'->>'amount' AS NUMERIC), 0),
+           i.value->'totalSales'->>'currencyCode',
+           CAST(EXTRACT(EPOCH FROM NOW()) AS BIGINT)
+    FROM az_sales_traffic_asin AS a
+    CROSS JOIN LATERAL json_array_elements(a.hourly_sales->'result') AS i
+    WHERE a.id >= :start_id AND a.id < :end_id
+    AND a.account_id IS NOT NULL AND a.asp_id IS NOT NULL AND a.child_asin IS NOT NULL
+    AND json_typeof(a.hourly_sales->'result') = 'array'
+    AND i.value->>'interval' LIKE '%--%'
+    ON CONFLICT ON CONSTRAINT uq_az_sales_hourly_account_id_asp_id_asin_hour_ts DO NOTHING
+'''
+
+
+def upgrade():
+    op.create_table('az_sales_hourly',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('account_id', sa.String(length=36), nullable=False),
+    sa.Column('asp_id', sa.String(length=255), nullable=False),
+    sa.Column('asin', sa.String(length=255), nullable=False),
+    sa.Column('hour_ts', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('units_ordered', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('order_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('sales_amount', sa.Numeric(), server_default='0', nullable=False),
+    sa.Column('currency_code', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.BigInteger(), nullable=True),
+    sa.Column('updated_at', sa.BigInteger(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('account_id', 'asp_id', 'asin', 'hour_ts', name='uq_az_sales_hourly_account_id_asp_id_asin_hour_ts')
+    )
+    op.create_index('ix_az_sales_hourly_account_id_asp_id_hour_ts', 'az_sales_hourly', ['account_id', 'asp_id', 'hour_ts'], unique=False,
+                    postgresql_include=['asin', 'units_ordered', 'sales_amount'])
+
+    # batches commit on their own so az_sales_traffic_asin is never locked for the whole conversion
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        min_id, max_id = connection.execute(sa.text('SELECT MIN(id), MAX(id) FROM az_sales_traffic_asin WHERE hourly_sales IS NOT NULL')).first()
+
+        if min_id is None:
+            return
+
+        for start_id in range(min_id, max_id + 1, BACKFILL_BATCH_SIZE):
+            connection.execute(sa.text(BACKFILL_QUERY), {'start_id': start_id, 'end_id': start_id + BACKFILL_BATCH_SIZE})
+
+
+def downgrade():
+    op.drop_index('ix_az_sales_hourly_account_id_asp_id_hour_ts', table_name='az_sales_hourly')
+    op.drop_table('az_sales_hourly')
@@ -0,0 +1,36 @@
+"""Add unique key on account, amazon seller, date, fnsku, disposition and location to az_ledger_summary table
+
+Revision ID: 0067
+Revises: 0066
+Create Date: 2024-02-02 10:14:27.640193
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0067'
+down_revision = '0066'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # keep the most recent row of every ledger entry before adding the unique key
+    op.execute('''
+        DELETE FROM az_ledger_summary AS older
+        USING az_ledger_summary AS newer
+        WHERE older.account_id = newer.account_id
+        AND older.asp_id = newer.asp_id
+        AND older.date = newer.date
+        AND older.fnsku = newer.fnsku
+        AND older.disposition = newer.disposition
+        AND older.location = newer.location
+        AND older.id < newer.id
+    ''')
+    op.create_unique_constraint('uq_az_ledger_summary_account_id_asp_id_date_fnsku_disp_loc', 'az_ledger_summary',
+                                ['account_id', 'asp_id', 'date', 'fnsku', 'disposition', 'location'])
+
+
+def downgrade():
+    op.drop_constraint('uq_az_ledger_summary_account_id_asp_id_date_fnsku_disp_loc', 'az_ledger_summary', type_='unique')
@@ -0,0 +1,45 @@
+"""Add unique keys on the report natural keys to az_sales_traffic_summary and az_sales_traffic_asin tables
+
+Revision ID: 0068
+Revises: 0067
+Create Date: 2024-02-05 12:08:51.377420
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0068'
+down_revision = '0067'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # keep the most recent row of every date and asin before adding the unique keys
+    op.execute('''
+        DELETE FROM az_sales_traffic_summary AS older
+        USING az_sales_traffic_summary AS newer
+        WHERE older.account_id = newer.account_id
+        AND older.asp_id = newer.asp_id
+        AND older.date = newer.date
+        AND older.id < newer.id
+    ''')
+    op.execute('''
+        DELETE FROM az_sales_traffic_asin AS older
+        USING az_sales_traffic_asin AS newer
+        WHERE older.account_id = newer.account_id
+        AND older.asp_id = newer.asp_id
+        AND older.parent_asin = newer.parent_asin
+        AND older.child_asin = newer.child_asin
+        AND older.payload_date = newer.payload_date
+        AND older.id < newer.id
+    ''')
+    op.create_unique_constraint('uq_az_sales_traffic_summary_account_id_asp_id_date', 'az_sales_traffic_summary', ['account_id', 'asp_id', 'date'])
+    op.create_unique_constraint('uq_az_sales_traffic_asin_account_id_asp_id_parent_child_date', 'az_sales_traffic_asin',
+                                ['account_id', 'asp_id', 'parent_asin', 'child_asin', 'payload_date'])
+
+
+def downgrade():
+    op.drop_constraint('uq_az_sales_traffic_asin_account_id_asp_id_parent_child_date', 'az_sales_traffic_asin', type_='unique')
+    op.drop_constraint('uq_az_sales_traffic_summary_account_id_asp_id_date', 'az_sales_traffic_summary', type_='unique')
@@ -0,0 +1,43 @@
+"""Add unique keys on the report natural keys to az_sponsored_product, az_sponsored_brand and az_sponsored_display tables
+
+Revision ID: 0069
+Revises: 0068
+Create Date: 2024-02-07 16:25:03.918274
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0069'
+down_revision = '0068'
+branch_labels = None
+depends_on = None
+
+# table, unique key name and the columns of the natural key add_update matched on
+UNIQUE_KEYS = (
+    ('az_sponsored_product', 'uq_az_sponsored_product_account_profile_date_ad_asin_sku',
+     ['account_id', 'asp_id', 'az_ads_profile_id', 'payload_date', 'ad_id', 'advertised_asin', 'advertised_sku']),
+    ('az_sponsored_brand', 'uq_az_sponsored_brand_account_profile_date_type_kw_campaign',
+     ['account_id', 'asp_id', 'az_ads_profile_id', 'payload_date', 'sb_type', 'keyword_id', 'campaign_id']),
+    ('az_sponsored_display', 'uq_az_sponsored_display_account_profile_date_ad_asin_campaign',
+     ['account_id', 'asp_id', 'az_ads_profile_id', 'payload_date', 'ad_id', 'asin', 'campaign_id'])
+)
+
+
+def upgrade():
+    for table_name, constraint_name, columns in UNIQUE_KEYS:
+        # keep the most recent row of every report record before adding the unique key
+        key_condition = ' AND '.join(f'older.{column} = newer.{column}' for column in columns)
+        op.execute(f'''
+            DELETE FROM {table_name} AS older
+            USING {table_name} AS newer
+            WHERE {key_condition}
+            AND older.id < newer.id
+        ''')
+        op.create_unique_constraint(constraint_name, table_name, columns)
+
+
+def downgrade():
+    for table_name, constraint_name, _ in reversed(UNIQUE_KEYS):
+        op.drop_constraint(constraint_name, table_name, type_='unique')
@@ -0,0 +1,27 @@
+"""Add line_key and a unique key on (settlement_id, line_key) to az_settlement_v2 table
+
+Revision ID: 0070
+Revises: 0069
+Create Date: 2024-02-09 11:42:17.605318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0070'
+down_revision = '0069'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # rows stored before line keys keep a NULL line_key and are replaced when their settlement is ingested again
+    op.add_column('az_settlement_v2', sa.Column('line_key', sa.String(length=32), nullable=True))
+    op.create_unique_constraint('uq_az_settlement_v2_settlement_id_line_key', 'az_settlement_v2', ['settlement_id', 'line_key'])
+
+
+def downgrade():
+    op.drop_constraint('uq_az_settlement_v2_settlement_id_line_key', 'az_settlement_v2', type_='unique')
+    op.drop_column('az_settlement_v2', 'line_key')
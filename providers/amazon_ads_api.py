@@ -3,8 +3,8 @@ from datetime import datetime
 
 from app import logger
 from app.helpers.constants import ASpApiBaseURL
+from app.helpers.http_session_helper import get_http_session
 from app.helpers.utility import generate_seller_api_awssigv4
-import requests
 # pytype: disable=ignored-abstractmethod
 
 
@@ -50,6 +50,10 @@ class AbstractAmazonAdsReport:
     def retrieve_report_download_v2(self, report_id):
         pass
 
+    @abstractmethod
+    def get_report_download_document_v2(self, document_id):
+        pass
+
 
 class AmazonAdsReportEU(AbstractAmazonAdsReport):
 
@@ -80,7 +84,7 @@ class AmazonAdsReportEU(AbstractAmazonAdsReport):
                 'client_secret': self.credentials['client_secret']
             }
 
-            response = requests.request('POST', url, data=payload)
+            response = get_http_session().request('POST', url, data=payload)
             result = response.json()
 
             # Add Seller partner object to result
@@ -102,7 +106,7 @@ class AmazonAdsReportEU(AbstractAmazonAdsReport):
             'Authorization': f'Bearer {self.access_token}',
         }
 
-        response = requests.post(url, headers=headers, json=payload)
+        response = get_http_session().post(url, headers=headers, json=payload)
         result = response.json()
 
         return result
@@ -118,7 +122,7 @@ class AmazonAdsReportEU(AbstractAmazonAdsReport):
             'Authorization': f'Bearer {self.access_token}',
         }
 
-        response = requests.request('GET', url, headers=headers)
+        response = get_http_session().request('GET', url, headers=headers)
         result = response.json()
 
         return result
@@ -136,7 +140,7 @@ class AmazonAdsReportEU(AbstractAmazonAdsReport):
             'user-agent': 'Mozilla/5.0 (NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.0.0 Safari/537.36',
         }
 
-        response = requests.request('GET', url, auth=aws_auth, headers=headers)
+        response = get_http_session().request('GET', url, auth=aws_auth, headers=headers)
         result = response.json()
 
         return result
@@ -152,7 +156,7 @@ class AmazonAdsReportEU(AbstractAmazonAdsReport):
             'Authorization': f'Bearer {self.access_token}',
         }
 
-        response = requests.request('GET', url, headers=headers)
+        response = get_http_session().request('GET', url, headers=headers)
 
         result = response.json()
 
@@ -168,7 +172,7 @@ class AmazonAdsReportEU(AbstractAmazonAdsReport):
             'Authorization': f'Bearer {self.access_token}',
         }
 
-        response = requests.post(url, headers=headers, json=payload)
+        response = get_http_session().post(url, headers=headers, json=payload)
         result = response.json()
 
         # Dump the response headers
@@ -198,7 +202,7 @@ class AmazonAdsReportEU(AbstractAmazonAdsReport):
             'Authorization': f'Bearer {self.access_token}',
         }
 
-        response = requests.request('GET', url, headers=headers)
+        response = get_http_session().request('GET', url, headers=headers)
         result = response.json()
 
         return result
@@ -216,7 +220,7 @@ class AmazonAdsReportEU(AbstractAmazonAdsReport):
             'user-agent': 'Mozilla/5.0 (NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.0.0 Safari/537.36',
         }
 
-        response = requests.request('GET', url, auth=aws_auth, headers=headers)
+        response = get_http_session().request('GET', url, auth=aws_auth, headers=headers)
         result = response.json()
 
         return result
@@ -233,6 +237,19 @@ class AmazonAdsReportEU(AbstractAmazonAdsReport):
             'Authorization': f'Bearer {self.access_token}',
         }
 
-        response = requests.request('GET', url, headers=headers)
+        response = get_http_session().request('GET', url, headers=headers)
 
         return response
+
+    def get_report_download_document_v2(self, document_id):
+        """Report document of a v2 report, for streaming its gzip download instead of reading it in one response."""
+
+        return {
+            'url': f'https://advertising-api-eu.amazon.com/v1/reports/{document_id}/download',
+            'headers': {
+                'Amazon-Advertising-API-ClientId': self.credentials['client_id'],
+                'Amazon-Advertising-API-Scope': self.credentials['az_ads_profile_id'],
+                'Authorization': f'Bearer {self.access_token}',
+            },
+            'compressionAlgorithm': 'GZIP'
+        }
@@ -1,16 +1,19 @@
 from abc import abstractmethod
 from datetime import datetime
 import pickle
-import time
 from urllib.parse import quote_plus
 
 from app import logger
 from app import r
 from app.helpers.constants import ASpApiBaseURL
+from app.helpers.constants import ASpApiOperation
 from app.helpers.constants import RedisCacheKeys
 from app.helpers.constants import TimeInSeconds
+from app.helpers.http_session_helper import get_http_session
+from app.helpers.rate_limit_helper import parse_rate_limit
+from app.helpers.rate_limit_helper import sp_api_rate_limiter
+from app.helpers.rate_limit_helper import SpApiThrottlingException
 from app.helpers.utility import generate_seller_api_awssigv4
-import requests
 # pytype: disable=ignored-abstractmethod
 class AbstractAmazonReport:
 
@@ -116,7 +119,7 @@ class AmazonReportEU(AbstractAmazonReport):
                     'client_secret': self.credentials['client_secret']
                 }
 
-                response = requests.request('POST', url, data=payload)
+                response = get_http_session().request('POST', url, data=payload)
                 result = response.json()
 
                 logger.info(f'Auth token Url: {url}')
@@ -131,6 +134,29 @@ class AmazonReportEU(AbstractAmazonReport):
 
                 r.set(name=cache_key, value=pickle.dumps(result), ex=TimeInSeconds.SIXTY_MIN.value)
 
+    def _request(self, operation, method, url, **kwargs):
+        """Sends an SP-API request once the seller's rate limit bucket for the operation allows it."""
+
+        seller_partner_id = self.credentials['seller_partner_id']
+
+        waited = sp_api_rate_limiter.acquire(selling_partner_id=seller_partner_id, operation=operation)
+
+        headers = kwargs.get('headers')
+        if waited and headers and 'x-amz-date' in headers:
+            headers['x-amz-date'] = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+
+        response = get_http_session().request(method, url, **kwargs)      # type: ignore  # noqa: FKA100
+
+        sp_api_rate_limiter.observe(selling_partner_id=seller_partner_id, operation=operation, response=response)
+
+        if response.status_code == 429:
+            rate_limit = parse_rate_limit(response.headers.get('x-amzn-RateLimit-Limit'))
+            logger.info(f'SP-API throttled {operation} for {seller_partner_id}, rate limit: {rate_limit}')
+            raise SpApiThrottlingException(selling_partner_id=seller_partner_id, operation=operation,
+                                           retry_after=1 / rate_limit if rate_limit else None)
+
+        return response
+
     def create_report(self, payload, _response_headers=False, _rate_limit=False):
         """Creates an order report."""
 
@@ -147,7 +173,7 @@ class AmazonReportEU(AbstractAmazonReport):
             'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.0.0 Safari/537.36',
         }
 
-        response = requests.request('POST', url, auth=aws_auth, headers=headers, json=payload)
+        response = self._request(ASpApiOperation.CREATE_REPORT.value, 'POST', url, auth=aws_auth, headers=headers, json=payload)      # type: ignore  # noqa: FKA100
         result = response.json()
 
         # Dump the response headers
@@ -159,19 +185,12 @@ class AmazonReportEU(AbstractAmazonReport):
             logger.info(f'{header}: {value}')
 
         # Dump the response status and response code
-        response_code = response.status_code
         logger.info(f'Response Status: {response.status_code}')
         logger.info(f'Response Code: {response.status_code}')
 
         rate_limit = response.headers.get('x-amzn-RateLimit-Limit', None)
         logger.info(rate_limit)
 
-        """A 429 is a retry-able status code, Read the x-amzn-RateLimit-Limit header, when available."""
-        if response_code == 429 and rate_limit is None:
-            logger.info('Rate limit is None. Retrying in 300 seconds...')
-            time.sleep(300)
-            return self.create_report(payload=payload)
-
         if _response_headers or _rate_limit:
             return result, response_headers, rate_limit
 
@@ -191,7 +210,7 @@ class AmazonReportEU(AbstractAmazonReport):
             'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.0.0 Safari/537.36',
         }
 
-        response = requests.request('GET', url, auth=aws_auth, headers=headers)
+        response = self._request(ASpApiOperation.GET_REPORT.value, 'GET', url, auth=aws_auth, headers=headers)      # type: ignore  # noqa: FKA100
         result = response.json()
 
         return result
@@ -209,7 +228,7 @@ class AmazonReportEU(AbstractAmazonReport):
             'user-agent': 'Mozilla/5.0 (NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.0.0 Safari/537.36',
         }
 
-        response = requests.request('GET', url, auth=aws_auth, headers=headers)
+        response = self._request(ASpApiOperation.GET_REPORT_DOCUMENT.value, 'GET', url, auth=aws_auth, headers=headers)      # type: ignore  # noqa: FKA100
         result = response.json()
 
         # Dump the response headers
@@ -221,19 +240,12 @@ class AmazonReportEU(AbstractAmazonReport):
             logger.info(f'{header}: {value}')
 
         # Dump the response status and response code
-        response_code = response.status_code
         logger.info(f'Response Status: {response.status_code}')
         logger.info(f'Response Code: {response.status_code}')
 
         rate_limit = response.headers.get('x-amzn-RateLimit-Limit', None)
         logger.info(rate_limit)
 
-        """A 429 is a retry-able status code, Read the x-amzn-RateLimit-Limit header, when available."""
-        if response_code == 429 and rate_limit is None:
-            logger.info('Rate limit is None. Retrying in 300 seconds...')
-            time.sleep(300)
-            return self.retrieve_report(document_id)
-
         return result
 
 
@@ -250,7 +262,7 @@ class AmazonReportEU(AbstractAmazonReport):
             'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.0.0 Safari/537.36',
         }
 
-        response = requests.request('GET', url, auth=aws_auth, headers=headers, params=params)
+        response = self._request(ASpApiOperation.GET_REPORTS.value, 'GET', url, auth=aws_auth, headers=headers, params=params)      # type: ignore  # noqa: FKA100
         result = response.json()
 
         return result
@@ -268,7 +280,7 @@ class AmazonReportEU(AbstractAmazonReport):
             'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.0.0 Safari/537.36',
         }
 
-        response = requests.request('POST', url, auth=aws_auth, headers=headers, json=payload)
+        response = self._request(ASpApiOperation.CREATE_RESTRICTED_DATA_TOKEN.value, 'POST', url, auth=aws_auth, headers=headers, json=payload)      # type: ignore  # noqa: FKA100
         result = response.json()
 
         return result
@@ -286,7 +298,7 @@ class AmazonReportEU(AbstractAmazonReport):
             'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.0.0 Safari/537.36',
         }
 
-        response = requests.request('GET', url, auth=aws_auth, headers=headers, params=params)
+        response = self._request(ASpApiOperation.GET_ORDERS.value, 'GET', url, auth=aws_auth, headers=headers, params=params)      # type: ignore  # noqa: FKA100
         result = response.json()
 
         return result
@@ -304,7 +316,7 @@ class AmazonReportEU(AbstractAmazonReport):
             'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.0.0 Safari/537.36',
         }
 
-        response = requests.request('GET', url, auth=aws_auth, headers=headers, params=params)
+        response = self._request(ASpApiOperation.GET_ORDER_METRICS.value, 'GET', url, auth=aws_auth, headers=headers, params=params)      # type: ignore  # noqa: FKA100
 
         if not web_call:
             result = response.json()
@@ -320,19 +332,12 @@ class AmazonReportEU(AbstractAmazonReport):
                 logger.info(f'{header}: {value}')
 
             # Dump the response status and response code
-            response_code = response.status_code
             logger.info(f'Response Status: {response.status_code}')
             logger.info(f'Response Code: {response.status_code}')
 
             rate_limit = response.headers.get('x-amzn-RateLimit-Limit', None)
             logger.info(rate_limit)
 
-            """A 429 is a retry-able status code, Read the x-amzn-RateLimit-Limit header, when available."""
-            if response_code == 429 and rate_limit is None:
-                logger.info('Rate limit is None. Retrying in 300 seconds...')
-                time.sleep(300)
-                return self.get_sales(params=params)
-
             return result
 
         return response
@@ -352,7 +357,7 @@ class AmazonReportEU(AbstractAmazonReport):
 
         logger.info(f'params {params}')
 
-        response = requests.request('GET', url, auth=aws_auth, headers=headers, params=params)
+        response = self._request(ASpApiOperation.GET_INVENTORY_SUMMARIES.value, 'GET', url, auth=aws_auth, headers=headers, params=params)      # type: ignore  # noqa: FKA100
 
         result = response.json()
 
@@ -367,19 +372,12 @@ class AmazonReportEU(AbstractAmazonReport):
             logger.info(f'{header}: {value}')
 
         # Dump the response status and response code
-        response_code = response.status_code
         logger.info(f'Response Status: {response.status_code}')
         logger.info(f'Response Code: {response.status_code}')
 
         rate_limit = response.headers.get('x-amzn-RateLimit-Limit', None)
         logger.info(rate_limit)
 
-        """A 429 is a retry-able status code, Read the x-amzn-RateLimit-Limit header, when available."""
-        if response_code == 429 and rate_limit is None:
-            logger.info('Rate limit is None. Retrying in 300 seconds...')
-            time.sleep(300)
-            return self.get_fba_inventory(params=params)
-
         return result
 
     def get_next_page_result(self, params):
@@ -395,7 +393,7 @@ class AmazonReportEU(AbstractAmazonReport):
             'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.0.0 Safari/537.36',
         }
 
-        response = requests.request('GET', url, auth=aws_auth, headers=headers, params=params)
+        response = self._request(ASpApiOperation.GET_ORDERS.value, 'GET', url, auth=aws_auth, headers=headers, params=params)      # type: ignore  # noqa: FKA100
 
         result = response.json()
         return result
@@ -413,7 +411,7 @@ class AmazonReportEU(AbstractAmazonReport):
             'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.0.0 Safari/537.36',
         }
 
-        response = requests.request('GET', url, auth=aws_auth, headers=headers)
+        response = self._request(ASpApiOperation.GET_ORDER_ITEMS.value, 'GET', url, auth=aws_auth, headers=headers)      # type: ignore  # noqa: FKA100
         result = response.json()
 
         return result
@@ -434,7 +432,7 @@ class AmazonReportEU(AbstractAmazonReport):
 
         aws_auth = generate_seller_api_awssigv4()
 
-        response = requests.request('POST', url, auth=aws_auth, headers=headers, data=payload)
+        response = self._request(ASpApiOperation.GET_MY_FEES_ESTIMATE_FOR_SKU.value, 'POST', url, auth=aws_auth, headers=headers, data=payload)      # type: ignore  # noqa: FKA100
 
         result = response.json()
 
@@ -455,7 +453,7 @@ class AmazonReportEU(AbstractAmazonReport):
 
         aws_auth = generate_seller_api_awssigv4()
 
-        response = requests.request('POST', url, auth=aws_auth, headers=headers, data=payload)
+        response = self._request(ASpApiOperation.GET_MY_FEES_ESTIMATE_FOR_ASIN.value, 'POST', url, auth=aws_auth, headers=headers, data=payload)      # type: ignore  # noqa: FKA100
 
         result = response.json()
 
@@ -479,7 +477,7 @@ class AmazonReportEU(AbstractAmazonReport):
         logger.info('Request Headers:')
         logger.info(headers)
 
-        response = requests.request('GET', url, headers=headers, params=params)
+        response = self._request(ASpApiOperation.LIST_FINANCIAL_EVENTS.value, 'GET', url, headers=headers, params=params)      # type: ignore  # noqa: FKA100
         result = response.json()
 
         # Dump the response headers
@@ -514,7 +512,7 @@ class AmazonReportEU(AbstractAmazonReport):
             'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.0.0 Safari/537.36',
         }
 
-        response = requests.request('GET', url, headers=headers, params=params)
+        response = self._request(ASpApiOperation.SEARCH_CATALOG_ITEMS.value, 'GET', url, headers=headers, params=params)      # type: ignore  # noqa: FKA100
 
         result = response.json()
 
@@ -527,17 +525,10 @@ class AmazonReportEU(AbstractAmazonReport):
             logger.info(f'{header}: {value}')
 
         # Dump the response status and response code
-        response_code = response.status_code
         logger.info(f'Response Status: {response.status_code}')
         logger.info(f'Response Code: {response.status_code}')
 
         rate_limit = response.headers.get('x-amzn-RateLimit-Limit', None)
         logger.info(rate_limit)
 
-        """A 429 is a retry-able status code, Read the x-amzn-RateLimit-Limit header, when available."""
-        if response_code == 429 and rate_limit is None:
-            logger.info('Rate limit is None. Retrying in 300 seconds...')
-            time.sleep(300)
-            return self.get_catalog_items(params=params)
-
         return result
@@ -16,6 +16,7 @@ from app.models.az_ledger_summary import AzLedgerSummary
 from app.models.az_order_report import AzOrderReport
 from app.models.az_performance_zone import AzPerformanceZone
 from app.models.az_product_performance import AzProductPerformance
+from app.models.az_product_performance_daily import AzProductPerformanceDaily
 from app.models.az_sales_traffic_asin import AzSalesTrafficAsin
 from app.models.az_sales_traffic_summary import AzSalesTrafficSummary
 from app.models.az_sponsored_brand import AzSponsoredBrand
@@ -280,6 +281,9 @@ def test_client(app):
 
     with open('tests/assets/az_sponsored_display.json', 'r') as sponsored_display_file:             # type: ignore  # noqa: FKA100
         sponsored_display = json.load(sponsored_display_file)
+        # every row is moved to today, so only one row per ad, asin and campaign fits the natural key
+        sponsored_display = list({(row.get('account_id'), row.get('asp_id'), row.get('az_ads_profile_id'), row.get('ad_id'), row.get('asin'), row.get('campaign_id')): row
+                                  for row in sponsored_display}.values())
         db.session.bulk_insert_mappings(AzSponsoredDisplay, sponsored_display)                          # type: ignore  # noqa: FKA100
 
         db.session.execute(update(AzSponsoredDisplay).values(
@@ -288,6 +292,9 @@ def test_client(app):
 
     with open('tests/assets/az_sponsored_product.json', 'r') as sponsored_product_file:             # type: ignore  # noqa: FKA100
         sponsored_product = json.load(sponsored_product_file)
+        # every row is moved to today, so only one row per ad, asin and sku fits the natural key
+        sponsored_product = list({(row.get('account_id'), row.get('asp_id'), row.get('az_ads_profile_id'), row.get('ad_id'), row.get('advertised_asin'), row.get('advertised_sku')): row
+                                  for row in sponsored_product}.values())
         db.session.bulk_insert_mappings(AzSponsoredProduct, sponsored_product)                          # type: ignore  # noqa: FKA100
 
         db.session.execute(update(AzSponsoredProduct).values(
@@ -301,6 +308,10 @@ def test_client(app):
             metrics_date=today_date_str))
         db.session.commit()
 
+    # the dashboard and product performance endpoints read the daily rollup of the rows seeded above
+    for account_id, asp_id in db.session.query(AzProductPerformance.account_id, AzProductPerformance.asp_id).distinct().all():     # type: ignore  # noqa: FKA100
+        AzProductPerformanceDaily.rebuild(account_id=account_id, asp_id=asp_id)
+
     # login
 
     body = {
@@ -348,6 +359,30 @@ def test_client(app):
     yield app.test_client()
 
 
+@pytest.fixture()
+def throwaway_account(app):
+    """
+        Factory of account ids no other test uses, e.g. throwaway_account(models=(AzItemMaster, AzOrderReport)).
+            - The rows of the given models stored for the account are deleted after the test.
+    """
+    accounts = []
+
+    def create_account(models: tuple):
+        account_id = str(uuid.uuid4())
+        accounts.append((account_id, models))
+        return account_id
+
+    yield create_account
+
+    # a failed test may leave the session inside a failed transaction
+    db.session.rollback()
+
+    for account_id, models in accounts:
+        for model in models:
+            model.query.filter(model.account_id == account_id).delete()
+    db.session.commit()
+
+
 def validate_status_code(expected, received):
     """
         This method is a generic method being used to validate the status_code.
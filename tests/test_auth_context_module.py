@@ -0,0 +1,55 @@
+"""test cases for the redis cache of the identity resolved by token_required"""
+import time
+import uuid
+
+from app import r
+from app.helpers.auth_context_helper import get_auth_context
+from app.helpers.auth_context_helper import get_auth_context_key
+from app.helpers.auth_context_helper import get_auth_context_version_key
+from app.helpers.auth_context_helper import invalidate_auth_context
+from app.helpers.auth_context_helper import set_auth_context
+import pytest
+
+
+@pytest.fixture()
+def auth_token():
+    """Throw-away token id and account uuid"""
+    jti = uuid.uuid4().hex
+    account_id = f'TEST{uuid.uuid4().hex}'
+
+    yield jti, account_id
+
+    r.delete(get_auth_context_key(jti=jti, account_id=account_id), get_auth_context_version_key(account_id))     # type: ignore  # noqa: FKA100
+
+
+def test_auth_context_is_cached_until_invalidated(auth_token):
+    """
+        TEST CASE: A cached identity is served until the membership or subscription of the account changes.
+    """
+    jti, account_id = auth_token
+    context = {'user_id': 1, 'account_id': 1, 'subscription_end_at': int(time.time()) + 3600}
+
+    cached_context, version = get_auth_context(jti=jti, account_id=account_id)
+    assert cached_context is None
+
+    set_auth_context(jti=jti, account_id=account_id, context=context, version=version, token_expires_at=int(time.time()) + 3600)
+
+    cached_context, _ = get_auth_context(jti=jti, account_id=account_id)
+    assert cached_context['user_id'] == 1
+    assert cached_context['subscription_end_at'] == context['subscription_end_at']
+
+    invalidate_auth_context(account_id=account_id)
+
+    assert get_auth_context(jti=jti, account_id=account_id)[0] is None
+
+
+def test_auth_context_not_cached_past_token_expiry(auth_token):
+    """
+        TEST CASE: The identity of an expired token is never cached.
+    """
+    jti, account_id = auth_token
+
+    set_auth_context(jti=jti, account_id=account_id, context={'user_id': 1, 'account_id': 1, 'subscription_end_at': None},
+                     version=0, token_expires_at=int(time.time()) - 1)
+
+    assert get_auth_context(jti=jti, account_id=account_id)[0] is None
@@ -0,0 +1,122 @@
+"""test cases for the bulk ingestion of finance event pages"""
+from datetime import date
+
+from app import db
+from app.models.az_financial_event import AzFinancialEvent
+from app.models.az_item_master import AzItemMaster
+from app.models.az_product_performance import AzProductPerformance
+from app.models.az_product_performance_daily import AzProductPerformanceDaily
+from app.views.asp_finance_view import AspFinanceView
+import pytest
+
+ASP_ID = 'FINANCETEST'
+POSTED_DATE = '2023-06-10T10:00:00Z'
+
+
+def get_finance_page(principal: float, adjustment: float, ads_payment: float) -> dict:
+    """Page of the finances api with a shipment, an adjustment of two skus and an ads payment"""
+    return {
+        'ShipmentEventList': [{
+            'AmazonOrderId': 'F-1', 'SellerOrderId': 'F-1', 'MarketplaceName': 'Amazon.in', 'PostedDate': POSTED_DATE,
+            'ShipmentItemList': [{
+                'SellerSKU': 'SKU-A', 'QuantityShipped': 1,
+                'ItemChargeList': [{'ChargeType': 'Principal', 'ChargeAmount': {'CurrencyCode': 'INR', 'CurrencyAmount': principal}}],
+                'ItemFeeList': [{'FeeType': 'Commission', 'FeeAmount': {'CurrencyCode': 'INR', 'CurrencyAmount': -50.0}}]
+            }]
+        }],
+        'AdjustmentEventList': [{
+            'AdjustmentType': 'WAREHOUSE_DAMAGE', 'PostedDate': POSTED_DATE,
+            'AdjustmentItemList': [
+                {'SellerSKU': 'SKU-A', 'Quantity': '1', 'TotalAmount': {'CurrencyCode': 'INR', 'CurrencyAmount': adjustment}},
+                {'SellerSKU': 'SKU-B', 'Quantity': '1', 'TotalAmount': {'CurrencyCode': 'INR', 'CurrencyAmount': 10.0}}
+            ]
+        }],
+        'ProductAdsPaymentEventList': [{
+            'transactionType': 'Charge', 'postedDate': POSTED_DATE, 'transactionValue': {'CurrencyCode': 'INR', 'CurrencyAmount': ads_payment}
+        }]
+    }
+
+
+@pytest.fixture()
+def finance_account(throwaway_account):
+    """Throw-away account with an item master row for one of the skus"""
+    account_id = throwaway_account(models=(AzFinancialEvent, AzItemMaster, AzProductPerformance, AzProductPerformanceDaily))
+
+    db.session.add(AzItemMaster(account_id=account_id, selling_partner_id=ASP_ID, seller_sku='SKU-A', asin='B0FINANCE1', brand='Financebrand',
+                                category='Beauty', created_at=1699350755))
+    db.session.commit()
+
+    return account_id
+
+
+def get_finance_events(account_id: str) -> dict:
+    """Stored finance events keyed like the bulk ingestion matches them"""
+    finance_events = AzFinancialEvent.query.populate_existing().filter(AzFinancialEvent.account_id == account_id).all()
+
+    return {(event.az_order_id, event.event_type, event.posted_date, event.seller_sku): event for event in finance_events}
+
+
+def test_finance_event_bulk_add_update(finance_account):
+    """
+        TEST CASE: Events are matched on order, event type, posted date and sku, including events without an order or a sku.
+    """
+    events = [
+        {'az_order_id': 'F-1', 'event_type': 'ShipmentEventList', 'posted_date': POSTED_DATE, 'event_json': {'AmazonOrderId': 'F-1'}},
+        {'az_order_id': None, 'event_type': 'AdjustmentEventList', 'posted_date': POSTED_DATE, 'seller_sku': 'SKU-A',
+         'finance_type': 'WAREHOUSE_DAMAGE', 'finance_value': 75.0, 'event_json': {}},
+        {'az_order_id': None, 'event_type': 'AdjustmentEventList', 'posted_date': POSTED_DATE, 'seller_sku': 'SKU-B',
+         'finance_type': 'WAREHOUSE_DAMAGE', 'finance_value': 10.0, 'event_json': {}},
+        {'az_order_id': None, 'event_type': 'ProductAdsPaymentEventList', 'posted_date': POSTED_DATE, 'seller_sku': None,
+         'finance_type': 'Charge', 'finance_value': -100.0, 'event_json': {}},
+    ]
+
+    AzFinancialEvent.bulk_add_update(account_id=finance_account, asp_id=ASP_ID, events=events)
+    first_ids = {key: event.id for key, event in get_finance_events(account_id=finance_account).items()}
+
+    events[1]['finance_value'] = 80.0
+    events[3]['finance_value'] = -120.0
+    AzFinancialEvent.bulk_add_update(account_id=finance_account, asp_id=ASP_ID, events=events)
+    stored = get_finance_events(account_id=finance_account)
+
+    assert len(first_ids) == 4
+    assert {key: event.id for key, event in stored.items()} == first_ids
+
+    assert float(stored[(None, 'AdjustmentEventList', POSTED_DATE, 'SKU-A')].finance_value) == 80
+    assert float(stored[(None, 'AdjustmentEventList', POSTED_DATE, 'SKU-B')].finance_value) == 10
+    assert float(stored[(None, 'ProductAdsPaymentEventList', POSTED_DATE, None)].finance_value) == -120
+    assert stored[(None, 'ProductAdsPaymentEventList', POSTED_DATE, None)].updated_at is not None
+    assert stored[('F-1', 'ShipmentEventList', POSTED_DATE, None)].event_json == [{'AmazonOrderId': 'F-1'}]
+
+
+def test_finance_event_page_is_idempotent(finance_account):
+    """
+        TEST CASE: Ingesting a page again updates its events, the product performance of its orders and the daily rollup in place.
+    """
+    AspFinanceView.add_finance_event_page(account_id=finance_account, asp_id=ASP_ID,
+                                          finance_data=get_finance_page(principal=499.0, adjustment=75.0, ads_payment=-100.0))
+    AspFinanceView.add_finance_event_page(account_id=finance_account, asp_id=ASP_ID,
+                                          finance_data=get_finance_page(principal=520.0, adjustment=80.0, ads_payment=-120.0))
+
+    stored = get_finance_events(account_id=finance_account)
+
+    assert set(stored) == {
+        ('F-1', 'ShipmentEventList', POSTED_DATE, None),
+        (None, 'AdjustmentEventList', POSTED_DATE, 'SKU-A'),
+        (None, 'AdjustmentEventList', POSTED_DATE, 'SKU-B'),
+        (None, 'ProductAdsPaymentEventList', POSTED_DATE, None),
+    }
+
+    adjustment = stored[(None, 'AdjustmentEventList', POSTED_DATE, 'SKU-A')]
+    assert (float(adjustment.finance_value), adjustment.category, adjustment.brand) == (80, 'Beauty', 'Financebrand')
+    assert float(stored[(None, 'ProductAdsPaymentEventList', POSTED_DATE, None)].finance_value) == -120
+
+    performances = AzProductPerformance.query.populate_existing().filter(AzProductPerformance.account_id == finance_account).all()
+
+    assert len(performances) == 1
+    performance = performances[0]
+    assert (performance.az_order_id, performance.seller_sku, performance.gross_sales, performance.market_place_fee, performance.units_sold) == ('F-1', 'SKU-A', 520, -50, 1)
+    assert (performance.shipment_on, performance.brand) == (date(year=2023, month=6, day=10), 'Financebrand')
+
+    rollup = AzProductPerformanceDaily.query.populate_existing().filter(AzProductPerformanceDaily.account_id == finance_account).all()
+
+    assert [(row.seller_sku, row.day, row.gross_sales) for row in rollup] == [('SKU-A', date(year=2023, month=6, day=10), 520)]
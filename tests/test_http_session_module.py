@@ -0,0 +1,88 @@
+"""test cases for the pooled SP-API http session"""
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+import threading
+
+from app.helpers.http_session_helper import close_http_session
+from app.helpers.http_session_helper import create_http_session
+from app.helpers.http_session_helper import get_http_session
+import pytest
+
+
+class StubSpApiHandler(BaseHTTPRequestHandler):
+    """Keep-alive stub that records the client port of every request it serves"""
+    protocol_version = 'HTTP/1.1'
+    client_ports: list = []
+
+    def do_GET(self):     # noqa: N802
+        """Respond with a small json body and keep the connection open"""
+        StubSpApiHandler.client_ports.append(self.client_address[1])
+        body = b'{"payload": []}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')   # type: ignore  # noqa: FKA100
+        self.send_header('Content-Length', str(len(body)))       # type: ignore  # noqa: FKA100
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Silence the default stderr access log"""
+        return None
+
+
+@pytest.fixture()
+def stub_server():
+    """Start a local keep-alive stub server for the duration of a test"""
+    StubSpApiHandler.client_ports = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubSpApiHandler)     # type: ignore  # noqa: FKA100
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+
+    server.shutdown()
+    server.server_close()
+    close_http_session()
+
+
+def test_http_session_reuses_connection(stub_server):
+    """
+        TEST CASE: Repeated calls through the shared session must go over one kept-alive connection.
+    """
+    for _ in range(20):
+        response = get_http_session().request('GET', f'{stub_server}/orders/v0/orders')    # type: ignore  # noqa: FKA100
+        assert response.status_code == 200
+        assert response.json() == {'payload': []}
+
+    assert len(StubSpApiHandler.client_ports) == 20
+    assert len(set(StubSpApiHandler.client_ports)) == 1
+
+
+def test_http_session_is_shared_per_process():
+    """
+        TEST CASE: Every caller in the same process gets the same session object.
+    """
+    assert get_http_session() is get_http_session()
+    close_http_session()
+
+
+def test_plain_requests_opens_new_connections(stub_server):
+    """
+        TEST CASE: Without the shared session every call opens a fresh connection (baseline for the reuse test).
+    """
+    for _ in range(5):
+        with create_http_session(pool_connections=1, pool_maxsize=1, max_retries=0, backoff_factor=0) as session:
+            session.get(f'{stub_server}/orders/v0/orders')
+
+    assert len(set(StubSpApiHandler.client_ports)) == 5
+
+
+def test_http_session_retries_connection_errors():
+    """
+        TEST CASE: Connection errors are retried the configured number of times before raising.
+    """
+    session = create_http_session(pool_connections=1, pool_maxsize=1, max_retries=2, backoff_factor=0)
+    adapter = session.get_adapter('https://sellingpartnerapi-eu.amazon.com')
+
+    assert adapter.max_retries.connect == 2
+    assert adapter.max_retries.read == 0
+    assert adapter.max_retries.status == 0
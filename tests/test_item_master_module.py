@@ -0,0 +1,69 @@
+"""test cases for the batched propagation of synced brands and categories"""
+from datetime import date
+
+from app import db
+from app.models.az_order_report import AzOrderReport
+from app.models.az_product_performance import AzProductPerformance
+from app.models.az_sales_traffic_asin import AzSalesTrafficAsin
+from app.models.base import report_transaction
+import pytest
+from workers.item_master_worker import ItemMasterWorker
+
+ASP_ID = 'ITEMMASTERTEST'
+SKU_BRAND_CATEGORIES = {'SKU-A': ('Newbrand', 'Beauty'), 'SKU-B': (None, 'Skincare')}
+ASIN_BRAND_CATEGORIES = {'B0ITEMTST1': ('Newbrand', 'Beauty')}
+
+
+@pytest.fixture()
+def item_master_account(throwaway_account):
+    """Throw-away account with report rows of two skus and an asin, one of the skus already has a brand"""
+    account_id = throwaway_account(models=(AzOrderReport, AzProductPerformance, AzSalesTrafficAsin))
+
+    db.session.add_all([
+        AzOrderReport(account_id=account_id, selling_partner_id=ASP_ID, amazon_order_id='403-1', sku='SKU-A'),
+        AzOrderReport(account_id=account_id, selling_partner_id=ASP_ID, amazon_order_id='403-1', sku='SKU-B', brand='Keptbrand', category='Kept'),
+        AzProductPerformance(account_id=account_id, asp_id=ASP_ID, az_order_id='403-1', seller_sku='SKU-A'),
+        AzSalesTrafficAsin(account_id=account_id, asp_id=ASP_ID, parent_asin='B0ITEMTST1', child_asin='B0ITEMTST1', payload_date=date(year=2023, month=6, day=10)),
+    ])
+    db.session.commit()
+
+    return account_id
+
+
+def get_brand_categories(account_id: str) -> dict:
+    """Stored brand and category of the report rows keyed by table and sku or asin"""
+    brand_categories = {('az_order_report', order.sku): (order.id, order.brand, order.category)
+                        for order in AzOrderReport.query.populate_existing().filter(AzOrderReport.account_id == account_id).all()}
+    brand_categories.update({('az_product_performance', performance.seller_sku): (performance.id, performance.brand, performance.category)
+                             for performance in AzProductPerformance.query.populate_existing().filter(AzProductPerformance.account_id == account_id).all()})
+    brand_categories.update({('az_sales_traffic_asin', traffic.child_asin): (traffic.id, traffic.brand, traffic.category)
+                             for traffic in AzSalesTrafficAsin.query.populate_existing().filter(AzSalesTrafficAsin.account_id == account_id).all()})
+
+    return brand_categories
+
+
+def test_brand_category_propagation_is_idempotent(item_master_account):
+    """
+        TEST CASE: Propagating the same brands twice updates every report row once, a None keeps the stored value.
+    """
+    ItemMasterWorker.propagate_brand_category(account_id=item_master_account, sku_brand_categories=SKU_BRAND_CATEGORIES,
+                                              asin_brand_categories=ASIN_BRAND_CATEGORIES)
+    first = get_brand_categories(account_id=item_master_account)
+
+    assert {key: value[1:] for key, value in first.items()} == {
+        ('az_order_report', 'SKU-A'): ('Newbrand', 'Beauty'),
+        ('az_order_report', 'SKU-B'): ('Keptbrand', 'Skincare'),
+        ('az_product_performance', 'SKU-A'): ('Newbrand', 'Beauty'),
+        ('az_sales_traffic_asin', 'B0ITEMTST1'): ('Newbrand', 'Beauty'),
+    }
+
+    ItemMasterWorker.propagate_brand_category(account_id=item_master_account, sku_brand_categories=SKU_BRAND_CATEGORIES,
+                                              asin_brand_categories=ASIN_BRAND_CATEGORIES)
+
+    assert get_brand_categories(account_id=item_master_account) == first
+
+    # rows that already match are not written again
+    with report_transaction() as connection:
+        assert AzOrderReport.store_brand_category_bulk(connection=connection, account_id=item_master_account, brand_categories=SKU_BRAND_CATEGORIES) == 0
+        assert AzSalesTrafficAsin.store_brand_category_bulk(connection=connection, account_id=item_master_account, brand_categories=ASIN_BRAND_CATEGORIES,
+                                                            by_asin=True) == 0
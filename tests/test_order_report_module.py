@@ -0,0 +1,118 @@
+"""test cases for the bulk ingestion of order report rows"""
+from datetime import date
+from datetime import datetime
+from datetime import timezone
+import importlib.util
+
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from app import db
+from app.models.az_item_master import AzItemMaster
+from app.models.az_order_report import AzOrderReport
+from app.models.az_order_report import ORDER_REPORT_FIELDS
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+ASP_ID = 'ORDERTEST'
+UNIQUE_KEY_MIGRATION = 'migrations/versions/0062_add_unique_key_to_az_order_report.py'
+
+
+def get_order(amazon_order_id: str, sku: str, **fields) -> dict:
+    """Order report line as read from the report, fields not given are empty"""
+    order = dict.fromkeys(ORDER_REPORT_FIELDS)
+    order.update(amazon_order_id=amazon_order_id, sku=sku, purchase_date='2023-06-10T20:15:00+00:00', last_updated_date='2023-06-11T08:00:00+00:00',
+                 order_status='Shipped', quantity=1, currency='INR')
+    order.update(fields)
+    return order
+
+
+@pytest.fixture()
+def order_account(throwaway_account):
+    """Throw-away account with an item master row for one of the skus"""
+    account_id = throwaway_account(models=(AzItemMaster, AzOrderReport))
+
+    db.session.add(AzItemMaster(account_id=account_id, selling_partner_id=ASP_ID, seller_sku='SKU-A', asin='B0ORDERTST', brand='Orderbrand',
+                                category='Beauty', created_at=1699350755))
+    db.session.commit()
+
+    return account_id
+
+
+def test_order_report_ingestion_is_idempotent(order_account):
+    """
+        TEST CASE: Ingesting the same page twice keeps one row per order item and the second page updates it in place.
+    """
+    orders = [
+        get_order(amazon_order_id='402-1', sku='SKU-A', item_price=499.0, ship_postal_code=400001),
+        get_order(amazon_order_id='402-1', sku='SKU-B', item_price=250.0),
+        # the last line of an order item in a page wins
+        get_order(amazon_order_id='402-2', sku='SKU-A', item_price=100.0),
+        get_order(amazon_order_id='402-2', sku='SKU-A', item_price=120.0),
+    ]
+
+    assert AzOrderReport.bulk_upsert_orders(account_id=order_account, selling_partner_id=ASP_ID, orders=orders) == 3
+
+    first_ids = {(order.amazon_order_id, order.sku): order.id for order in AzOrderReport.query.filter(AzOrderReport.account_id == order_account).all()}
+
+    orders[1] = get_order(amazon_order_id='402-1', sku='SKU-B', item_price=275.0, order_status='Cancelled')
+    assert AzOrderReport.bulk_upsert_orders(account_id=order_account, selling_partner_id=ASP_ID, orders=orders) == 3
+
+    stored = {(order.amazon_order_id, order.sku): order for order in
+              AzOrderReport.query.populate_existing().filter(AzOrderReport.account_id == order_account).all()}
+
+    assert {key: order.id for key, order in stored.items()} == first_ids
+
+    order = stored[('402-1', 'SKU-A')]
+    assert (order.category, order.brand, order.item_price, order.ship_postal_code) == ('Beauty', 'Orderbrand', 499, '400001')
+    assert order.purchase_on == date(year=2023, month=6, day=10)
+    assert order.purchase_at == datetime(year=2023, month=6, day=10, hour=20, minute=15, tzinfo=timezone.utc)
+    assert order.updated_at is not None
+
+    order = stored[('402-1', 'SKU-B')]
+    assert (order.category, order.brand, order.item_price, order.order_status) == (None, None, 275, 'Cancelled')
+
+    assert stored[('402-2', 'SKU-A')].item_price == 120
+    assert AzOrderReport.bulk_upsert_orders(account_id=order_account, selling_partner_id=ASP_ID, orders=[]) == 0
+
+
+def test_unique_key_migration_keeps_latest_row(order_account):
+    """
+        TEST CASE: The unique key migration drops all but the latest row of a duplicated order item before adding the key.
+    """
+    spec = importlib.util.spec_from_file_location(name='unique_key_migration', location=UNIQUE_KEY_MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+
+    insert_query = text('''
+        INSERT INTO az_order_report (account_id, selling_partner_id, amazon_order_id, sku, item_price)
+        VALUES (:account_id, :asp_id, :amazon_order_id, :sku, :item_price)
+    ''')
+
+    # the schema changes are rolled back with the rest of the test
+    with db.engine.connect() as connection:
+        connection.execution_options(isolation_level='READ COMMITTED')
+        transaction = connection.begin()
+
+        try:
+            with Operations.context(MigrationContext.configure(connection)):
+                migration.downgrade()
+
+                for amazon_order_id, sku, item_price in (('402-1', 'SKU-A', 100), ('402-1', 'SKU-A', 120), ('402-1', 'SKU-B', 250)):
+                    connection.execute(insert_query, {'account_id': order_account, 'asp_id': ASP_ID, 'amazon_order_id': amazon_order_id,  # type: ignore  # noqa: FKA100
+                                                      'sku': sku, 'item_price': item_price})
+
+                migration.upgrade()
+
+            rows = connection.execute(text('''
+                SELECT sku, item_price FROM az_order_report WHERE account_id = :account_id ORDER BY sku
+            '''), {'account_id': order_account}).all()  # type: ignore  # noqa: FKA100
+
+            assert [(sku, float(item_price)) for sku, item_price in rows] == [('SKU-A', 120.0), ('SKU-B', 250.0)]
+
+            with pytest.raises(IntegrityError):
+                with connection.begin_nested():
+                    connection.execute(insert_query, {'account_id': order_account, 'asp_id': ASP_ID, 'amazon_order_id': '402-1',  # type: ignore  # noqa: FKA100
+                                                      'sku': 'SKU-B', 'item_price': 1})
+        finally:
+            transaction.rollback()
@@ -0,0 +1,143 @@
+"""test cases for the keyset pagination cursors"""
+from datetime import datetime
+from decimal import Decimal
+import os
+from types import SimpleNamespace
+
+from app.helpers.pagination_helper import decode_cursor
+from app.helpers.pagination_helper import encode_cursor
+from app.helpers.pagination_helper import get_cursor_page
+from app.helpers.pagination_helper import get_keyset_query
+from tests.conftest import validate_response
+from tests.conftest import validate_status_code
+
+
+KEY_COLUMNS = ('total_gross_sales', 'seller_sku')
+
+
+def test_cursor_round_trip():
+    """
+        TEST CASE: A cursor decodes to the sort key values it was built from, a tampered one is rejected.
+    """
+    cursor = encode_cursor(values=[Decimal('1520.50'), 'SKU-1'], key_columns=KEY_COLUMNS, sort_order='desc')
+    null_cursor = encode_cursor(values=[None, 'SKU-7'], key_columns=KEY_COLUMNS, sort_order='desc')
+
+    assert decode_cursor(cursor=cursor, key_columns=KEY_COLUMNS, sort_order='desc') == ['1520.50', 'SKU-1']
+    assert decode_cursor(cursor=null_cursor, key_columns=KEY_COLUMNS, sort_order='desc') == [None, 'SKU-7']
+    assert decode_cursor(cursor='', key_columns=KEY_COLUMNS, sort_order='desc') == []
+    assert decode_cursor(cursor='not a cursor', key_columns=KEY_COLUMNS, sort_order='desc') is None
+
+
+def test_cursor_shape_is_validated():
+    """
+        TEST CASE: Tokens that decode to json but not to the sort key values of the listing are rejected.
+    """
+    def get_cursor(values):
+        return encode_cursor(values=values, key_columns=KEY_COLUMNS, sort_order='desc')
+
+    # WzFd is [1], a bare list without the sort
+    assert decode_cursor(cursor='WzFd', key_columns=('id',), sort_order='desc') is None
+    assert decode_cursor(cursor=get_cursor(values=['SKU-1']), key_columns=KEY_COLUMNS, sort_order='desc') is None
+    assert decode_cursor(cursor=get_cursor(values=[['SKU-1'], 7]), key_columns=KEY_COLUMNS, sort_order='desc') is None
+    assert decode_cursor(cursor=get_cursor(values=[{'id': 1}, 7]), key_columns=KEY_COLUMNS, sort_order='desc') is None
+    assert decode_cursor(cursor=get_cursor(values=[True, 7]), key_columns=KEY_COLUMNS, sort_order='desc') is None
+    assert decode_cursor(cursor=get_cursor(values=['2023-06-01', None]), key_columns=KEY_COLUMNS, sort_order='desc') is None
+
+
+def test_cursor_is_bound_to_sort():
+    """
+        TEST CASE: A cursor is rejected by a request sorted on other columns or in the other direction.
+    """
+    cursor = encode_cursor(values=['1520.50', 'SKU-1'], key_columns=KEY_COLUMNS, sort_order='desc')
+
+    assert decode_cursor(cursor=cursor, key_columns=KEY_COLUMNS, sort_order=None) == ['1520.50', 'SKU-1']
+    assert decode_cursor(cursor=cursor, key_columns=KEY_COLUMNS, sort_order='asc') is None
+    assert decode_cursor(cursor=cursor, key_columns=('total_units_sold', 'seller_sku'), sort_order='desc') is None
+
+
+def test_cursor_page_split():
+    """
+        TEST CASE: The extra row read in cursor mode only decides whether a next cursor is returned.
+    """
+    rows = [SimpleNamespace(id=row_id) for row_id in (9, 8, 7)]
+
+    page, next_cursor = get_cursor_page(rows=rows, size=2, key_columns=('id',), sort_order='desc')
+
+    assert [row.id for row in page] == [9, 8]
+    assert decode_cursor(cursor=next_cursor, key_columns=('id',), sort_order='desc') == [8]
+    assert get_cursor_page(rows=rows, size=3, key_columns=('id',), sort_order='desc') == (rows, None)
+
+
+def test_keyset_query_after_cursor():
+    """
+        TEST CASE: The page after a cursor is read by a range condition instead of an offset.
+    """
+    query, params = get_keyset_query(raw_query='SELECT 1', sort_column='total_gross_sales', tie_column='seller_sku', sort_order='desc',
+                                     cursor=['1520.50', 'SKU-1'], size=10)
+
+    assert 'OFFSET' not in query
+    assert 'LIMIT 11' in query
+    assert 'total_gross_sales < :cursor_sort_value' in query
+    assert params == {'cursor_sort_value': '1520.50', 'cursor_tie_value': 'SKU-1'}
+
+
+def test_listing_rejects_malformed_cursor(test_client):
+    """
+        TEST CASE: A listing answers a cursor of the wrong shape with a 400 instead of failing the query.
+    """
+    expected_response = {
+        'error': 'Enter correct input.',
+        'message': 'Cursor is invalid or expired, request the first page again',
+        'status': False
+    }
+
+    query_params = {
+        'from_date': datetime.now().date(),
+        'to_date': datetime.now().date(),
+        'marketplace': 'AMAZON',
+        'cursor': 'WzFd'
+    }
+
+    headers = {
+        'x_authorization': os.environ['x_authorization'], 'x_account': os.environ['x_account']}
+
+    api_response = test_client.get(
+        '/api/v1/dashboard/sales-statistics/hourly-graph',
+        query_string=query_params, headers=headers)
+
+    assert validate_status_code(
+        expected=400, received=api_response.status_code)
+    assert validate_response(
+        expected=expected_response, received=api_response.json)
+
+
+def test_listing_rejects_cursor_of_other_sort(test_client):
+    """
+        TEST CASE: A listing answers a cursor minted for another sort with a 400 instead of paging the new sort from the old position.
+    """
+    expected_response = {
+        'error': 'Enter correct input.',
+        'message': 'Cursor is invalid or expired, request the first page again',
+        'status': False
+    }
+
+    query_params = {
+        'from_date': datetime.now().date(),
+        'to_date': datetime.now().date(),
+        'marketplace': 'AMAZON',
+        'sort_by': 'GROSS_SALES',
+        'sort_order': 'asc',
+        'cursor': encode_cursor(values=['1520.50', 'SKU-1'], key_columns=KEY_COLUMNS, sort_order='desc')
+    }
+
+    headers = {
+        'x_authorization': os.environ['x_authorization'], 'x_account': os.environ['x_account']}
+
+    api_response = test_client.get(
+        '/api/v1/dashboard/product-performance',
+        query_string=query_params, headers=headers)
+
+    assert validate_status_code(
+        expected=400, received=api_response.status_code)
+    assert validate_response(
+        expected=expected_response, received=api_response.json)
@@ -0,0 +1,117 @@
+"""test cases for the daily product performance rollup"""
+from datetime import date
+
+from app import db
+from app.models.az_order_report import AzOrderReport
+from app.models.az_product_performance import AzProductPerformance
+from app.models.az_product_performance_daily import AzProductPerformanceDaily
+from app.models.az_sponsored_display import AzSponsoredDisplay
+from app.models.az_sponsored_product import AzSponsoredProduct
+from app.models.postal_code_master import PostalCodeMaster
+import pytest
+
+ASP_ID = 'ROLLUPTEST'
+PINCODE = 999001
+DAY = date(year=2023, month=6, day=10)
+PREVIOUS_DAY = date(year=2023, month=6, day=9)
+
+# product performance of three orders as built from the finance events, R-3 shipped the day before and was refunded on the day
+PERFORMANCES = (
+    {'az_order_id': 'R-1', 'seller_order_id': 'R-1', 'seller_sku': 'SKU-A', 'gross_sales': 1000, 'units_sold': 2, 'units_returned': 0,
+     'market_place_fee': -150, 'forward_fba_fee': -50, 'returns': 0, 'shipment_date': '2023-06-10T05:00:00Z',
+     'summary_analysis': {'_market_place_fee_breakdown': {'commission': -100, 'fba_fee': -50}, '_gross_sales_breakdown': {'principal': 1000}}},
+    {'az_order_id': 'R-2', 'seller_order_id': 'R-2', 'seller_sku': 'SKU-A', 'gross_sales': 500, 'units_sold': 1, 'units_returned': 0,
+     'market_place_fee': -60, 'forward_fba_fee': 0, 'returns': 0, 'shipment_date': '2023-06-10T18:30:00Z',
+     'summary_analysis': {'_market_place_fee_breakdown': {'commission': -60}, '_gross_sales_breakdown': {'principal': 500}}},
+    {'az_order_id': 'R-3', 'seller_order_id': 'R-3', 'seller_sku': 'SKU-B', 'gross_sales': 300, 'units_sold': 1, 'units_returned': 1,
+     'market_place_fee': -30, 'forward_fba_fee': 0, 'returns': -300, 'shipment_date': '2023-06-09T10:00:00Z', 'refund_date': '2023-06-10T12:00:00Z'},
+)
+
+
+@pytest.fixture()
+def rollup_account(throwaway_account):
+    """Seed the orders, product performance and sponsored ads spend of a throw-away account"""
+    account_id = throwaway_account(models=(AzOrderReport, AzProductPerformance, AzProductPerformanceDaily, AzSponsoredDisplay, AzSponsoredProduct))
+
+    db.session.add(PostalCodeMaster(pincode=PINCODE, district='Rollup', state_name='Rollup', zone='ROLLUP ZONE'))
+    db.session.add(AzOrderReport(account_id=account_id, selling_partner_id=ASP_ID, amazon_order_id='R-1', sku='SKU-A',
+                                 purchase_date='2023-06-09T20:00:00Z', ship_postal_code=str(PINCODE)))
+    db.session.add(AzSponsoredProduct(account_id=account_id, asp_id=ASP_ID, payload_date=DAY, advertised_sku='SKU-A', spend=40))
+    db.session.add(AzSponsoredDisplay(account_id=account_id, asp_id=ASP_ID, payload_date=DAY, sku='SKU-A', cost=2, clicks=5))
+    db.session.commit()
+
+    AzProductPerformance.bulk_add_update(account_id=account_id, asp_id=ASP_ID, performances=[dict(performance) for performance in PERFORMANCES])
+
+    yield account_id
+
+    PostalCodeMaster.query.filter(PostalCodeMaster.pincode == PINCODE).delete()
+    db.session.commit()
+
+
+def get_rollup(account_id: str) -> dict:
+    """Rollup rows of the account keyed on sku and day"""
+    # the rollup is written on its own connection, reload rows already in the session
+    rows = AzProductPerformanceDaily.query.populate_existing().filter(AzProductPerformanceDaily.account_id == account_id).all()
+
+    return {(row.seller_sku, row.day): row for row in rows}
+
+
+def test_refresh_days(rollup_account):
+    """
+        TEST CASE: A day is rolled up from the shipments, refunds and ads spend of that day and follows changes to them.
+    """
+    assert AzProductPerformanceDaily.refresh_days(account_id=rollup_account, asp_id=ASP_ID, days=[DAY]) == 2
+
+    rollup = get_rollup(account_id=rollup_account)
+
+    # the shipment of R-3 is on the previous day, which was not refreshed
+    assert set(rollup) == {('SKU-A', DAY), ('SKU-B', DAY)}
+
+    sku_a = rollup[('SKU-A', DAY)]
+    assert (sku_a.gross_sales, sku_a.units_sold, sku_a.order_count, sku_a.market_place_fee, sku_a.forward_fba_fee) == (1500, 3, 2, -210, -50)
+    assert (sku_a.sponsored_product_spend, sku_a.sponsored_display_spend) == (40, 10)
+    assert sku_a.market_place_fee_breakdown == {'commission': -160, 'fba_fee': -50}
+    assert sku_a.gross_sales_breakdown == {'principal': 1500}
+    # R-2 has no order report row, only R-1 is placed in a zone
+    assert sku_a.zone_sales == {'ROLLUP ZONE': {'gross_sales': 1000, 'refunds': 0}}
+
+    sku_b = rollup[('SKU-B', DAY)]
+    assert (sku_b.gross_sales, sku_b.units_sold, sku_b.order_count, sku_b.refunds, sku_b.units_returned) == (0, 0, 0, -300, 1)
+
+    days = AzProductPerformance.bulk_add_update(account_id=rollup_account, asp_id=ASP_ID, performances=[
+        {'az_order_id': 'R-2', 'seller_sku': 'SKU-A', 'gross_sales': 700}])
+    AzSponsoredDisplay.query.filter(AzSponsoredDisplay.account_id == rollup_account).delete()
+    AzProductPerformance.query.filter(AzProductPerformance.account_id == rollup_account, AzProductPerformance.az_order_id == 'R-3').delete()     # type: ignore  # noqa: FKA100
+    db.session.commit()
+
+    assert days == {DAY}
+    assert AzProductPerformanceDaily.refresh_days(account_id=rollup_account, asp_id=ASP_ID, days=days) == 1
+
+    rollup = get_rollup(account_id=rollup_account)
+
+    # the refund of R-3 is gone, so is the row of SKU-B
+    assert set(rollup) == {('SKU-A', DAY)}
+
+    sku_a = rollup[('SKU-A', DAY)]
+    assert (sku_a.gross_sales, sku_a.sponsored_product_spend, sku_a.sponsored_display_spend) == (1700, 40, 0)
+    assert sku_a.updated_at is not None
+
+
+def test_refresh_orders_and_rebuild(rollup_account):
+    """
+        TEST CASE: Refreshing an order recomputes its shipment and refund days, a rebuild recomputes every day of the account.
+    """
+    # shipment of R-3 on the previous day, its refund and R-1, R-2 on the day
+    assert AzProductPerformanceDaily.refresh_orders(account_id=rollup_account, asp_id=ASP_ID, az_order_ids=['R-3']) == 3
+
+    rollup = get_rollup(account_id=rollup_account)
+
+    assert set(rollup) == {('SKU-A', DAY), ('SKU-B', DAY), ('SKU-B', PREVIOUS_DAY)}
+    assert (rollup[('SKU-B', PREVIOUS_DAY)].gross_sales, rollup[('SKU-B', PREVIOUS_DAY)].units_sold) == (300, 1)
+
+    AzProductPerformanceDaily.query.filter(AzProductPerformanceDaily.account_id == rollup_account).delete()
+    db.session.commit()
+
+    assert AzProductPerformanceDaily.rebuild(account_id=rollup_account, asp_id=ASP_ID) == 3
+    assert set(get_rollup(account_id=rollup_account)) == set(rollup)
+    assert AzProductPerformanceDaily.refresh_orders(account_id=rollup_account, asp_id=ASP_ID, az_order_ids=[]) == 0
@@ -0,0 +1,172 @@
+"""test cases for the single pass profit and loss over the daily product performance rollup"""
+from datetime import date
+
+from app import db
+from app.helpers.profit_and_loss_helper import calculate_profit_and_loss
+from app.helpers.profit_and_loss_helper import OTHER_FEE_TYPES
+from app.models.az_financial_event import AzFinancialEvent
+from app.models.az_item_master import AzItemMaster
+from app.models.az_product_performance_daily import AzProductPerformanceDaily
+from app.models.az_sponsored_brand import AzSponsoredBrand
+from app.views.dashboard_view import DashboardView
+import pytest
+
+ASP_ID = 'PNLTEST'
+# current period, the prior period is 2023-06-08 to 2023-06-09
+FROM_DATE = '2023-06-10'
+TO_DATE = '2023-06-11'
+
+# seller sku, asin, brand, category, cogs
+ITEMS = (
+    ('PNL-1', 'B0PNLTEST1', 'Pnlbrand', 'Beauty', 100),
+    ('PNL-2', 'B0PNLTEST2', 'Otherbrand', 'Toys', 50),
+)
+
+# rollup rows, fees and refunds are negative as they come from the finances api
+PERFORMANCE_DAYS = (
+    {'seller_sku': 'PNL-1', 'day': date(year=2023, month=6, day=10), 'gross_sales': 1000, 'units_sold': 2, 'order_count': 2, 'refunds': -200, 'units_returned': 1,
+     'market_place_fee': -150, 'sponsored_product_spend': 30, 'sponsored_display_spend': 20,
+     'market_place_fee_breakdown': {'commission': -100, 'fba_fee': -50}, 'gross_sales_breakdown': {'principal': 900, 'shipping': 100}},
+    {'seller_sku': 'PNL-2', 'day': date(year=2023, month=6, day=11), 'gross_sales': 500, 'units_sold': 1, 'order_count': 1, 'market_place_fee': -60,
+     'sponsored_product_spend': 10, 'market_place_fee_breakdown': {'commission': -60}, 'gross_sales_breakdown': {'principal': 500}},
+    # ads spend without a sale counts towards ads spend only
+    {'seller_sku': 'PNL-1', 'day': date(year=2023, month=6, day=11), 'sponsored_product_spend': 5},
+    {'seller_sku': 'PNL-1', 'day': date(year=2023, month=6, day=9), 'gross_sales': 800, 'units_sold': 2, 'order_count': 2, 'market_place_fee': -100,
+     'sponsored_product_spend': 20, 'market_place_fee_breakdown': {'commission': -100}, 'gross_sales_breakdown': {'principal': 800}},
+)
+
+# finance events as passed to the bulk ingestion, which stores event_json wrapped in a list
+FINANCIAL_EVENTS = (
+    {'az_order_id': None, 'seller_sku': 'PNL-1', 'posted_date': '2023-06-10T10:00:00Z', 'event_type': 'AdjustmentEventList',
+     'finance_type': 'WAREHOUSE_DAMAGE', 'finance_value': '75', 'event_json': {}},
+    {'az_order_id': None, 'seller_sku': 'PNL-1', 'posted_date': '2023-06-08T10:00:00Z', 'event_type': 'AdjustmentEventList',
+     'finance_type': 'WAREHOUSE_DAMAGE', 'finance_value': '25', 'event_json': {}},
+    # fee types outside of the other fee types are not reported
+    {'az_order_id': None, 'seller_sku': 'PNL-1', 'posted_date': '2023-06-11T10:00:00Z', 'event_type': 'ServiceFeeEventList',
+     'finance_type': 'FeeList', 'finance_value': '-40', 'event_json': {'FeeList': [
+         {'FeeType': 'Storage Fee', 'FeeAmount': {'CurrencyCode': 'INR', 'CurrencyAmount': -40}},
+         {'FeeType': 'FBACustomerReturnPerUnitFee', 'FeeAmount': {'CurrencyCode': 'INR', 'CurrencyAmount': -5}}]}},
+)
+
+
+@pytest.fixture()
+def profit_and_loss_account(throwaway_account):
+    """Seed the rollup, item master, finance events and sponsored brand spend of a throw-away account"""
+    account_id = throwaway_account(models=(AzItemMaster, AzProductPerformanceDaily, AzFinancialEvent, AzSponsoredBrand))
+
+    for seller_sku, asin, brand, category, cogs in ITEMS:
+        db.session.add(AzItemMaster(account_id=account_id, selling_partner_id=ASP_ID, seller_sku=seller_sku, asin=asin, brand=brand, category=category,
+                                    cogs=cogs, created_at=1699350755))
+
+    for performance_day in PERFORMANCE_DAYS:
+        db.session.add(AzProductPerformanceDaily(account_id=account_id, asp_id=ASP_ID, created_at=1699350755, **performance_day))
+
+    db.session.add(AzSponsoredBrand(account_id=account_id, asp_id=ASP_ID, payload_date=date(year=2023, month=6, day=10), campaign_name='Pnlbrand - Headline',
+                                    cost=2, clicks=10, created_at=1699350755))
+    db.session.commit()
+
+    AzFinancialEvent.bulk_add_update(account_id=account_id, asp_id=ASP_ID, events=[dict(event) for event in FINANCIAL_EVENTS])
+
+    return account_id
+
+
+def test_profit_and_loss_section(profit_and_loss_account):
+    """
+        TEST CASE: Totals, growth, breakdowns and graph of both periods are computed from the seeded rows.
+    """
+    profit_and_loss, graph = calculate_profit_and_loss(account_id=profit_and_loss_account, selling_partner_id=ASP_ID, from_date=FROM_DATE,
+                                                       to_date=TO_DATE, product=(), brand=(), category=())
+
+    assert profit_and_loss['gross_sales'] == {'current_gross_sales': 1500, 'gross_sales_percentage_growth': 87.5}
+    assert profit_and_loss['refund'] == {'current_refund': -200, 'refund_percentage_growth': 200}
+    assert profit_and_loss['net_sales'] == {'current_net_sales': 1300, 'net_sales_percentage_growth': 62.5}
+    assert profit_and_loss['market_place_fee'] == {'current_market_place_fee': -210, 'market_place_fee_percentage_growth': 110.0}
+    # (units sold - units returned) * cogs of the sku
+    assert profit_and_loss['total_cogs'] == {'current_total_cogs': -150, 'total_cogs_percentage_growth': -25.0}
+
+    assert profit_and_loss['other_fee'] == {'current_other_fee': -40, 'other_fee_percentage_growth': 40}
+    assert profit_and_loss['other_fee_breakdown'] == {fee_type: 40 if fee_type == 'Storage Fee' else 0 for fee_type in OTHER_FEE_TYPES}
+    assert profit_and_loss['reimbursement'] == {'current_reimbursement': 75, 'reimbursement_percentage_growth': 200.0}
+    assert profit_and_loss['reimbursement_breakdown'] == {'WAREHOUSE_DAMAGE': 75}
+
+    # sponsored brand spend is cost * clicks of the campaigns
+    assert profit_and_loss['ads_spend'] == {'total_ads_spend': -85, 'total_ads_spend_percentage_growth': 325}
+    assert profit_and_loss['ads_spend_breakdown']['sponsored_brand'] == {'current_sponsored_brand_cost': 20, 'sponsored_brand_percentage_growth': 20}
+    assert profit_and_loss['ads_spend_breakdown']['sponsored_display'] == {'current_sponsored_display_cost': 20, 'sponsored_display_percentage_growth': 20}
+    assert profit_and_loss['ads_spend_breakdown']['sponsored_product'] == {'current_sponsored_product_cost': 45, 'sponsored_product_percentage_growth': 125}
+
+    # 1300 - 210 - 40 - 150 - 85 + 75 against 800 - 100 - 0 - 200 - 20 + 25
+    assert profit_and_loss['net_profit'] == {'current_net_profit': 890, 'net_profit_percentage_growth': 76.24}
+
+    assert profit_and_loss['marketplace_fee_breakdown'] == {
+        'commission': {'current_commission': -160, 'commission_growth_percentage': 60.0},
+        'fba_fee': {'current_fba_fee': -50, 'fba_fee_growth_percentage': 50},
+    }
+    assert profit_and_loss['gross_sales_breakdown'] == {
+        'principal': {'current_principal': 1400, 'principal_growth_percentage': 75.0},
+        'shipping': {'current_shipping': 100, 'shipping_growth_percentage': 100},
+    }
+
+    assert graph == [
+        {'gross_sales': 1000, 'units_sold': 2, 'date': '2023-06-10', 'expense': -250.0, 'net_profit': 550.0},
+        {'gross_sales': 500, 'units_sold': 1, 'date': '2023-06-11', 'expense': -110.0, 'net_profit': 390.0},
+    ]
+
+
+def test_profit_and_loss_filters(profit_and_loss_account):
+    """
+        TEST CASE: Brand filters keep the matching skus and sponsored brand campaigns, category filters drop sponsored brand spend.
+    """
+    profit_and_loss, graph = calculate_profit_and_loss(account_id=profit_and_loss_account, selling_partner_id=ASP_ID, from_date=FROM_DATE,
+                                                       to_date=TO_DATE, product=(), brand=('Pnlbrand',), category=())
+
+    assert profit_and_loss['gross_sales']['current_gross_sales'] == 1000
+    assert profit_and_loss['ads_spend']['total_ads_spend'] == -75
+    assert profit_and_loss['net_profit']['current_net_profit'] == 510
+    assert [graph_metrics['date'] for graph_metrics in graph] == ['2023-06-10']
+
+    profit_and_loss, graph = calculate_profit_and_loss(account_id=profit_and_loss_account, selling_partner_id=ASP_ID, from_date=FROM_DATE,
+                                                       to_date=TO_DATE, product=(), brand=(), category=('Toys',))
+
+    assert profit_and_loss['gross_sales'] == {'current_gross_sales': 500, 'gross_sales_percentage_growth': 500}
+    assert profit_and_loss['ads_spend']['total_ads_spend'] == -10
+    assert profit_and_loss['ads_spend_breakdown']['sponsored_brand']['current_sponsored_brand_cost'] == 0
+    assert profit_and_loss['reimbursement_breakdown'] == {}
+    assert profit_and_loss['net_profit']['current_net_profit'] == 380
+    assert [graph_metrics['date'] for graph_metrics in graph] == ['2023-06-11']
+
+
+def test_profit_and_loss_without_sales(profit_and_loss_account):
+    """
+        TEST CASE: A period without sales has no profit and loss section.
+    """
+    assert calculate_profit_and_loss(account_id=profit_and_loss_account, selling_partner_id=ASP_ID, from_date='2023-07-01',
+                                     to_date='2023-07-02', product=(), brand=(), category=()) is None
+
+
+@pytest.mark.parametrize(argnames='from_date, to_date, brand, category', argvalues=[
+    (FROM_DATE, TO_DATE, (), ()),
+    ('2023-06-08', '2023-06-09', (), ()),
+    ('2023-06-08', '2023-06-11', (), ()),
+    (FROM_DATE, TO_DATE, ('Pnlbrand',), ()),
+    (FROM_DATE, TO_DATE, (), ('Toys',)),
+])
+def test_fee_components_match_legacy_queries(profit_and_loss_account, from_date, to_date, brand, category):
+    """
+        TEST CASE: Other fees and reimbursements of the current period match the per metric queries still used by the marketing report.
+    """
+    profit_and_loss, _ = calculate_profit_and_loss(account_id=profit_and_loss_account, selling_partner_id=ASP_ID, from_date=from_date,
+                                                   to_date=to_date, product=(), brand=brand, category=category)
+
+    other_fee_breakdown, other_fee = DashboardView.get_other_fee_metrics(account_id=profit_and_loss_account, selling_partner_id=ASP_ID,
+                                                                         from_date=from_date, to_date=to_date, product=(), brand=brand,
+                                                                         category=category)
+    reimbursement_breakdown, reimbursement_value = DashboardView.get_reimbursement_fee_metrics(account_id=profit_and_loss_account,
+                                                                                               selling_partner_id=ASP_ID, from_date=from_date,
+                                                                                               to_date=to_date, product=(), brand=brand,
+                                                                                               category=category)
+
+    assert profit_and_loss['other_fee_breakdown'] == other_fee_breakdown
+    assert profit_and_loss['other_fee']['current_other_fee'] == -abs(other_fee)
+    assert profit_and_loss['reimbursement_breakdown'] == reimbursement_breakdown
+    assert profit_and_loss['reimbursement']['current_reimbursement'] == reimbursement_value
@@ -0,0 +1,111 @@
+"""test cases for the redis backed SP-API token bucket"""
+import uuid
+
+from app import r
+from app.helpers.rate_limit_helper import parse_rate_limit
+from app.helpers.rate_limit_helper import SpApiRateLimiter
+from app.helpers.rate_limit_helper import SpApiThrottlingException
+from app.helpers.throttle_helper import DEFAULT_RETRY_AFTER_SECONDS
+from app.helpers.throttle_helper import get_backoff_seconds
+from app.helpers.throttle_helper import send_throttled_response
+import pytest
+
+TEST_OPERATION = 'getInventorySummaries'
+
+
+class StubResponse:
+    """Minimal stand in for a requests response"""
+
+    def __init__(self, status_code: int, headers: dict):
+        self.status_code = status_code
+        self.headers = headers
+
+
+@pytest.fixture()
+def limiter():
+    """Rate limiter with a small plan and a throw-away selling partner id"""
+    rate_limiter = SpApiRateLimiter(usage_plans={TEST_OPERATION: (2.0, 2)})
+    selling_partner_id = f'TEST{uuid.uuid4().hex}'
+
+    yield rate_limiter, selling_partner_id
+
+    r.delete(rate_limiter.get_key(selling_partner_id, TEST_OPERATION))     # type: ignore  # noqa: FKA100
+
+
+def test_bucket_allows_burst_then_paces(limiter):
+    """
+        TEST CASE: Burst requests go out immediately, the next one waits for the refill.
+    """
+    rate_limiter, selling_partner_id = limiter
+
+    assert rate_limiter.reserve(selling_partner_id, TEST_OPERATION) == 0     # type: ignore  # noqa: FKA100
+    assert rate_limiter.reserve(selling_partner_id, TEST_OPERATION) == 0     # type: ignore  # noqa: FKA100
+
+    wait = rate_limiter.reserve(selling_partner_id, TEST_OPERATION)     # type: ignore  # noqa: FKA100
+    assert 0.4 < wait <= 0.5
+
+    # Each queued caller gets the next slot instead of the same one.
+    next_wait = rate_limiter.reserve(selling_partner_id, TEST_OPERATION)     # type: ignore  # noqa: FKA100
+    assert 0.9 < next_wait <= 1.0
+
+
+def test_bucket_adapts_to_rate_limit_header(limiter):
+    """
+        TEST CASE: The x-amzn-RateLimit-Limit header replaces the documented rate.
+    """
+    rate_limiter, selling_partner_id = limiter
+
+    rate_limiter.observe(selling_partner_id, TEST_OPERATION, StubResponse(status_code=200, headers={'x-amzn-RateLimit-Limit': '0.5'}))     # type: ignore  # noqa: FKA100
+
+    rate_limiter.reserve(selling_partner_id, TEST_OPERATION)     # type: ignore  # noqa: FKA100
+    rate_limiter.reserve(selling_partner_id, TEST_OPERATION)     # type: ignore  # noqa: FKA100
+    wait = rate_limiter.reserve(selling_partner_id, TEST_OPERATION)     # type: ignore  # noqa: FKA100
+
+    assert 1.9 < wait <= 2.0
+
+
+def test_bucket_drains_on_throttle(limiter):
+    """
+        TEST CASE: A 429 empties the bucket so the next caller waits.
+    """
+    rate_limiter, selling_partner_id = limiter
+
+    rate_limiter.observe(selling_partner_id, TEST_OPERATION, StubResponse(status_code=429, headers={}))     # type: ignore  # noqa: FKA100
+
+    assert rate_limiter.reserve(selling_partner_id, TEST_OPERATION) > 0     # type: ignore  # noqa: FKA100
+
+
+def test_parse_rate_limit():
+    """
+        TEST CASE: Missing or malformed rate limit headers are ignored.
+    """
+    assert parse_rate_limit('0.0167') == 0.0167
+    assert parse_rate_limit(None) is None
+    assert parse_rate_limit('n/a') is None
+
+
+def test_throttle_backoff_grows_with_jitter():
+    """
+        TEST CASE: Throttled jobs back off exponentially with jitter, capped and never below the rate limit hint.
+    """
+    for attempt, low, high in ((1, 30, 60), (2, 60, 120), (3, 120, 240), (10, 900, 1800)):
+        delays = {get_backoff_seconds(attempt=attempt, base=60, cap=1800) for _ in range(20)}
+        assert all(low <= delay <= high for delay in delays)
+        assert len(delays) > 1
+
+    assert get_backoff_seconds(attempt=1, base=1, cap=10, retry_after=60) == 60
+
+
+def test_throttled_request_gets_retry_after(app):
+    """
+        TEST CASE: A request throttled by the SP-API is answered with a 429 and a Retry-After instead of a 500.
+    """
+    response, http_status = send_throttled_response(exception=SpApiThrottlingException(selling_partner_id='TEST', operation=TEST_OPERATION, retry_after=2.5))
+
+    assert http_status == '429'
+    assert response.headers['Retry-After'] == '3'
+    assert response.get_json()['status'] is False
+
+    response, _ = send_throttled_response(exception=SpApiThrottlingException(selling_partner_id='TEST', operation=TEST_OPERATION))
+
+    assert response.headers['Retry-After'] == str(DEFAULT_RETRY_AFTER_SECONDS)
@@ -0,0 +1,149 @@
+"""test cases for the streaming report document downloader"""
+import gzip
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+import json
+import threading
+import tracemalloc
+import zlib
+
+from app.helpers.http_session_helper import close_http_session
+from app.helpers.ingestion_helper import iter_unique_batches
+from app.helpers.json_stream_helper import iter_json_array_items
+from app.helpers.json_stream_helper import iter_json_object_members
+from app.helpers.report_download_helper import gunzip_chunks
+from app.helpers.report_download_helper import iter_report_chunks
+import pytest
+
+REPORT_ROWS = 2500
+LARGE_REPORT_RECORDS = 50000
+REPORT_TSV = ('sku\tasin\tquantity\n' + ''.join(f'SKU{i}\tB0{i:08d}\t{i % 7}\n' for i in range(REPORT_ROWS))).encode('utf-8')
+
+
+class StubReportHandler(BaseHTTPRequestHandler):
+    """Serves the same report document plain and gzip compressed"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):     # noqa: N802
+        """Respond with the report document, compressed for the /gzip path"""
+        body = gzip.compress(REPORT_TSV) if self.path == '/gzip' else REPORT_TSV
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')   # type: ignore  # noqa: FKA100
+        self.send_header('Content-Length', str(len(body)))       # type: ignore  # noqa: FKA100
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Silence the default stderr access log"""
+        return None
+
+
+@pytest.fixture()
+def stub_server():
+    """Start a local report document server for the duration of a test"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubReportHandler)     # type: ignore  # noqa: FKA100
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+
+    server.shutdown()
+    server.server_close()
+    close_http_session()
+
+
+def test_gunzip_chunks_handles_split_and_multi_member_streams():
+    """
+        TEST CASE: Decompression works on arbitrary chunk boundaries and concatenated gzip members.
+    """
+    compressed = gzip.compress(b'first member\n') + gzip.compress(b'second member\n')
+    chunks = [compressed[i:i + 7] for i in range(0, len(compressed), 7)]
+
+    assert b''.join(gunzip_chunks(chunks)) == b'first member\nsecond member\n'
+
+
+@pytest.mark.parametrize(argnames='path,compression', argvalues=[('/plain', None), ('/gzip', 'GZIP')])
+def test_iter_report_chunks_streams_rows(stub_server, path, compression):
+    """
+        TEST CASE: Plain and gzip documents are parsed into bounded chunks holding every row.
+    """
+    report_document = {'url': f'{stub_server}{path}'}
+    if compression:
+        report_document['compressionAlgorithm'] = compression
+
+    chunks = list(iter_report_chunks(report_document=report_document, chunksize=1000, delimiter='\t', header=0))
+
+    assert [len(chunk) for chunk in chunks] == [1000, 1000, 500]
+    assert sum(int(chunk['quantity'].sum()) for chunk in chunks) == sum(i % 7 for i in range(REPORT_ROWS))
+    assert chunks[-1].iloc[-1]['sku'] == f'SKU{REPORT_ROWS - 1}'
+
+
+def iter_synthetic_ads_report(record_count: int):
+    """Gzip chunks of a JSON array report generated on the fly, the whole document never exists in memory"""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    yield compressor.compress(b'[')
+
+    for i in range(record_count):
+        record = {'adId': i, 'advertisedAsin': f'B0{i:08d}', 'advertisedSku': f'SKU{i}', 'campaignName': 'Campaign \u00e9 ' * 4,
+                  'impressions': i % 977, 'cost': round(i * 0.37, ndigits=2), 'sales7d': i * 1.5}
+        yield compressor.compress((',' if i else '').encode() + json.dumps(record).encode())
+
+    yield compressor.compress(b']') + compressor.flush()
+
+
+@pytest.mark.parametrize(argnames='chunk_size', argvalues=[1, 2, 3, 7, 64])
+def test_json_stream_handles_split_chunks(chunk_size):
+    """
+        TEST CASE: Records are decoded whole whatever the chunk boundaries, including numbers and multi byte characters.
+    """
+    document = {'reportSpecification': {'reportOptions': {'dateGranularity': 'DAY'}},
+                'salesAndTrafficByDate': [{'date': '2024-01-01', 'sales': 12.5}, {'date': '2024-01-02', 'sales': -3e2}],
+                'salesAndTrafficByAsin': [], 'note': 'caf\u00e9 \u20b9'}
+    content = json.dumps(document, ensure_ascii=False).encode('utf-8')
+    chunks = [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)]
+
+    members = list(iter_json_object_members(chunks=chunks, array_keys=('salesAndTrafficByDate', 'salesAndTrafficByAsin')))
+
+    assert members == [('reportSpecification', document['reportSpecification']),
+                       ('salesAndTrafficByDate', document['salesAndTrafficByDate'][0]),
+                       ('salesAndTrafficByDate', document['salesAndTrafficByDate'][1]),
+                       ('note', document['note'])]
+    assert list(iter_json_array_items(chunks=[b' [ 1', b'0 , 2.', b'5 ]'])) == [10, 2.5]
+
+    with pytest.raises(ValueError):
+        list(iter_json_array_items(chunks=[b'[{"a": 1}', b' {"a": 2}]']))
+
+
+def test_json_stream_memory_ceiling_on_large_report():
+    """
+        TEST CASE: Peak memory of parsing a large gzip JSON report stays flat, far below the size of the document.
+    """
+    tracemalloc.start()
+
+    try:
+        record_count, impressions = 0, 0
+        for batch in iter_unique_batches(rows=iter_json_array_items(chunks=gunzip_chunks(iter_synthetic_ads_report(LARGE_REPORT_RECORDS))),
+                                         key_columns=('adId',), batch_size=500):
+            record_count += len(batch)
+            impressions += sum(record['impressions'] for record in batch)
+
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert record_count == LARGE_REPORT_RECORDS
+    assert impressions == sum(i % 977 for i in range(LARGE_REPORT_RECORDS))
+    # the decompressed document is over 10MB
+    assert peak < 4 * 1024 * 1024
+
+
+def test_iter_unique_batches_keeps_last_record_of_a_key():
+    """
+        TEST CASE: Batches never repeat a key, a later record replaces the earlier one of the same batch.
+    """
+    rows = [{'id': 1, 'value': 'a'}, {'id': 1, 'value': 'b'}, {'id': 2, 'value': 'c'}, {'id': 3, 'value': 'd'}]
+
+    assert list(iter_unique_batches(rows=rows, key_columns=('id',), batch_size=2)) == [
+        [{'id': 1, 'value': 'b'}, {'id': 2, 'value': 'c'}],
+        [{'id': 3, 'value': 'd'}]
+    ]
@@ -0,0 +1,54 @@
+"""test cases for the redis backed dashboard response cache"""
+from types import SimpleNamespace
+import uuid
+
+from app import r
+from app.helpers.response_cache_helper import bump_data_version
+from app.helpers.response_cache_helper import get_data_version_key
+from app.helpers.response_cache_helper import get_response_cache_key
+from main import application
+import pytest
+
+
+@pytest.fixture()
+def cache_account():
+    """Throw-away account and primary user for the cache key"""
+    user_object = SimpleNamespace(id=1)
+    account_object = SimpleNamespace(uuid=f'TEST{uuid.uuid4().hex}', asp_id='TESTSELLER', primary_user_id=1)
+
+    yield user_object, account_object
+
+    r.delete(get_data_version_key(account_object.uuid))
+
+
+def get_key(user_object, account_object, path, allowed_brands=None):
+    """Cache key of a GET request on the given path"""
+    with application.test_request_context(path, method='GET'):
+        return get_response_cache_key(user_object=user_object, account_object=account_object, allowed_brands=allowed_brands)
+
+
+def test_cache_key_normalizes_params(cache_account):
+    """
+        TEST CASE: Query param order does not change the key, param values and brands do.
+    """
+    user_object, account_object = cache_account
+
+    key = get_key(user_object, account_object, '/api/v1/dashboard/profit-loss?from_date=2024-01-01&to_date=2024-01-31&brand=b&brand=a')     # type: ignore  # noqa: FKA100
+
+    assert key == get_key(user_object, account_object, '/api/v1/dashboard/profit-loss?brand=a&to_date=2024-01-31&brand=b&from_date=2024-01-01')     # type: ignore  # noqa: FKA100
+    assert key != get_key(user_object, account_object, '/api/v1/dashboard/profit-loss?from_date=2024-01-02&to_date=2024-01-31&brand=b&brand=a')     # type: ignore  # noqa: FKA100
+    assert key != get_key(user_object, account_object, '/api/v1/dashboard/profit-loss?from_date=2024-01-01&to_date=2024-01-31&brand=b&brand=a',     # type: ignore  # noqa: FKA100
+                          allowed_brands=['a'])
+
+
+def test_data_version_bump_invalidates_key(cache_account):
+    """
+        TEST CASE: Bumping the account data version moves every request to a new key.
+    """
+    user_object, account_object = cache_account
+    path = '/api/v1/dashboard/sales-statistics?from_date=2024-01-01&to_date=2024-01-31'
+
+    key = get_key(user_object, account_object, path)     # type: ignore  # noqa: FKA100
+    bump_data_version(account_id=account_object.uuid)
+
+    assert key != get_key(user_object, account_object, path)     # type: ignore  # noqa: FKA100
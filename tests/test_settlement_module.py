@@ -0,0 +1,77 @@
+"""test cases for the bulk ingestion of settlement v2 reports"""
+import io
+
+from app import db
+from app.models.az_settlement_v2 import AzSettlementV2
+from app.models.az_settlement_v2 import SETTLEMENT_REPORT_COLUMNS
+import pandas as pd
+import pytest
+
+SETTLEMENT_ID = '9876543210'
+# header, settlement totals and the amount lines of two order items and a storage fee
+SETTLEMENT_TSV = '\t'.join(column.replace('_', '-') for column in SETTLEMENT_REPORT_COLUMNS) + '\n' + '\n'.join('\t'.join(line) for line in (  # type: ignore  # noqa: FKA100
+    [SETTLEMENT_ID, '27.05.2023 10:43:48 UTC', '10.06.2023 10:43:48 UTC', '12.06.2023 10:43:48 UTC', '1520.50', 'INR'] + [''] * 18,
+    [SETTLEMENT_ID, '', '', '', '', 'INR', 'Order', '402-1', '402-1', '', 'S1', 'Amazon.in', 'ItemPrice', 'Principal', '499.00', 'AFN',
+     '01.06.2023', '01.06.2023 05:10:00 UTC', 'OIC1', '', '', '00123', '2', ''],
+    [SETTLEMENT_ID, '', '', '', '', 'INR', 'Order', '402-1', '402-1', '', 'S1', 'Amazon.in', 'ItemFees', 'Commission', '-42.50', 'AFN',
+     '01.06.2023', '01.06.2023 05:10:00 UTC', 'OIC1', '', '', '00123', '', ''],
+    [SETTLEMENT_ID, '', '', '', '', 'INR', 'Order', '402-1', '402-1', '', 'S1', 'Amazon.in', 'ItemPrice', 'Principal', '250.00', 'AFN',
+     '01.06.2023', '01.06.2023 05:10:00 UTC', 'OIC2', '', '', 'SKU-2', '1', ''],
+    [SETTLEMENT_ID, '', '', '', '', 'INR', 'other-transaction', '', '', '', '', '', 'other-transaction', 'Storage Fee', '-12.00', '',
+     '05.06.2023', '05.06.2023 00:00:00 UTC', '', '', '', '', '', ''],
+)) + '\n'
+
+
+def read_settlement_chunks(chunksize: int):
+    """Chunks of the sample report read the way the settlement ingestion reads a report document"""
+    return pd.read_csv(io.StringIO(SETTLEMENT_TSV), delimiter='\t', header=None, skiprows=2, names=list(SETTLEMENT_REPORT_COLUMNS),
+                       dtype=str, chunksize=chunksize)
+
+
+def test_staging_frame_coerces_report_lines():
+    """
+        TEST CASE: Report lines read as text are coerced once, identifiers keep their text and bad values become NULL.
+    """
+    settlement_df = next(iter(read_settlement_chunks(chunksize=10)))
+
+    staging_df = AzSettlementV2.get_staging_frame(settlement_df=settlement_df, first_line_number=5)
+
+    assert list(staging_df['line_number']) == [5, 6, 7, 8]
+    assert staging_df.loc[0, 'sku'] == '00123'
+    assert staging_df.loc[0, 'posted_date'] == '2023-06-01'
+    assert staging_df.loc[0, 'posted_date_time'] == '2023-06-01 05:10:00'
+    assert staging_df.loc[1, 'amount'] == -42.5
+    assert staging_df.loc[0, 'quantity_purchased'] == 2
+    assert pd.isna(staging_df.loc[1, 'quantity_purchased'])
+
+
+@pytest.fixture()
+def settlement_rows(app):
+    """Remove the rows of the sample settlement after the test"""
+    yield
+
+    AzSettlementV2.query.filter(AzSettlementV2.settlement_id == SETTLEMENT_ID).delete()
+    db.session.commit()
+
+
+def test_settlement_ingestion_is_idempotent(settlement_rows):
+    """
+        TEST CASE: Amount lines are merged into one row per settlement line, ingesting the report again rewrites the same rows
+        and keeps their account.
+    """
+    AzSettlementV2.bulk_upsert_report(account_id='ACCOUNTTEST', asp_id='ASPTEST', selling_partner_id='ASPTEST',
+                                      report_chunks=read_settlement_chunks(chunksize=2))
+    # the settlement view ingests without an account
+    AzSettlementV2.bulk_upsert_report(account_id=None, asp_id=None, selling_partner_id='ASPTEST',
+                                      report_chunks=read_settlement_chunks(chunksize=10))
+
+    settlements = AzSettlementV2.query.filter(AzSettlementV2.settlement_id == SETTLEMENT_ID).order_by(AzSettlementV2.id).all()
+
+    assert len(settlements) == 3
+    assert {(settlement.account_id, settlement.asp_id) for settlement in settlements} == {('ACCOUNTTEST', 'ASPTEST')}
+
+    item = next(settlement for settlement in settlements if settlement.order_item_code == 'OIC1')
+    assert item.sku == '00123'
+    assert item.quantity_purchased == 2
+    assert [detail['amount_description'] for detail in item.amount_details['amount_details']] == ['Principal', 'Commission']
+    assert sum(detail['amount'] for detail in item.amount_details['amount_details']) == 456.5
@@ -0,0 +1,92 @@
+"""test cases for the cached STS credentials of the SP-API"""
+import json
+import time
+import uuid
+
+from app import r
+from app.helpers.sts_credentials_helper import AssumedRoleCredentialProvider
+from app.helpers.sts_credentials_helper import STS_REFRESH_MARGIN_SECONDS
+import pytest
+
+
+def get_credentials(expires_in: int, access_key_id: str = 'ASIATEST') -> dict:
+    """Assumed role credentials expiring in expires_in seconds"""
+    return {
+        'access_key_id': access_key_id,
+        'secret_access_key': 'secret',
+        'session_token': 'token',
+        'expiration': time.time() + expires_in
+    }
+
+
+@pytest.fixture()
+def provider():
+    """Credential provider with a throw-away session name whose STS calls are recorded instead of sent"""
+    credential_provider = AssumedRoleCredentialProvider(role_arn='arn:aws:iam::000000000000:role/test', role_session_name=f'TEST{uuid.uuid4().hex}')
+    credential_provider.sts_calls = []
+
+    def assume_role():
+        credentials = get_credentials(expires_in=3600, access_key_id=f'ASIA{len(credential_provider.sts_calls)}')
+        credential_provider.sts_calls.append(credentials)
+        return credentials
+
+    credential_provider._assume_role = assume_role
+
+    yield credential_provider
+
+    r.delete(credential_provider.cache_key, credential_provider.lock_key)     # type: ignore  # noqa: FKA100
+
+
+def test_cached_credentials_are_reused(provider):
+    """
+        TEST CASE: Fresh credentials in redis are served without calling STS, then from the process.
+    """
+    cached = get_credentials(expires_in=3600)
+    r.set(name=provider.cache_key, value=json.dumps(cached), ex=3600)
+
+    assert provider.get_credentials() == cached
+    r.delete(provider.cache_key)
+    assert provider.get_credentials() == cached
+    assert provider.sts_calls == []
+
+
+def test_credentials_are_refreshed_before_expiry(provider):
+    """
+        TEST CASE: Credentials within the refresh margin are replaced by one STS call, stored in redis and the lock is released.
+    """
+    r.set(name=provider.cache_key, value=json.dumps(get_credentials(expires_in=STS_REFRESH_MARGIN_SECONDS - 10)), ex=3600)
+
+    credentials = provider.get_credentials()
+
+    assert provider.sts_calls == [credentials]
+    assert provider.get_credentials() == credentials
+    assert json.loads(r.get(provider.cache_key)) == credentials
+    assert r.get(provider.lock_key) is None
+
+
+def test_lock_contention_serves_usable_credentials(provider):
+    """
+        TEST CASE: While another caller holds the refresh lock, still usable credentials are served without calling STS.
+    """
+    expiring = get_credentials(expires_in=STS_REFRESH_MARGIN_SECONDS - 10)
+    r.set(name=provider.cache_key, value=json.dumps(expiring), ex=3600)
+    r.set(name=provider.lock_key, value='other caller', ex=30)
+
+    assert provider.get_credentials() == expiring
+    assert provider.sts_calls == []
+    assert r.get(provider.lock_key) in ('other caller', b'other caller')
+
+
+def test_lock_release_keeps_lock_of_other_caller(provider):
+    """
+        TEST CASE: A caller whose refresh lock expired and was taken over does not release the new holder's lock.
+    """
+    token = provider._acquire_refresh_lock()
+
+    assert token is not None
+    assert provider._acquire_refresh_lock() is None
+
+    r.set(name=provider.lock_key, value='other caller', ex=30)
+    provider._release_refresh_lock(token=token)
+
+    assert r.get(provider.lock_key) in ('other caller', b'other caller')
@@ -4,7 +4,6 @@
 """
 from datetime import datetime
 from datetime import timedelta
-import time
 import traceback
 
 
@@ -143,8 +142,6 @@ class AspReportWorker:
                                     add_queue_task_and_enqueue(queue_name=QueueName.FBA_CUSTOMER_SHIPMENT_SALES_REPORT, account_id=account_id,
                                                                logged_in_user=logged_in_user, entity_type=EntityType.FBA_CUSTOMER_SHIPMENT_SALES_REPORT.value, data=data)
 
-                            time.sleep(1 / 15)
-
             except Exception as e:
                 logger.error(
                     f'Error while creating {report_list} report in AspReportWorker.create_reports: ' + str(e))
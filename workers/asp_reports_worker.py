@@ -17,7 +17,6 @@ class AspReportsWorker:
             from app.helpers.utility import get_current_datetime
             from datetime import timedelta
             from app.helpers.constants import ASpReportType
-            import time
             import traceback
             from app.helpers.constants import EntityType
             from app.helpers.constants import QueueName
@@ -92,10 +91,6 @@ class AspReportsWorker:
                                     add_queue_task_and_enqueue(queue_name=QueueName.FINANCE_EVENT_LIST, account_id=account_id,
                                                                logged_in_user=logged_in_user, entity_type=EntityType.FINANCE_EVENT_LIST.value, data=data)
 
-                        # Add a delay after each request
-                        # Delay for 1/15th of a second (assuming 15 requests per second)
-                        time.sleep(1 / 15)
-
             except Exception as e:
                 logger.error(
                     'Error while creating report in AspReportsWorker.create_reports(): ' + str(e))
@@ -121,7 +116,7 @@ class AspReportsWorker:
             import traceback
             from providers.amazon_sp_client import AmazonReportEU
             from app.helpers.constants import ASpReportType
-            import time
+            from app.helpers.rate_limit_helper import SpApiThrottlingException
             from app.models.queue_task import QueueTask
             from app.helpers.constants import QueueTaskStatus
             from app.helpers.constants import QueueName
@@ -174,8 +169,13 @@ class AspReportsWorker:
                                     az_report = AmazonReportEU(
                                         credentials=credentials)
 
-                                    az_report_status = az_report.verify_report(
-                                        reference_id)
+                                    try:
+                                        az_report_status = az_report.verify_report(
+                                            reference_id)
+                                    except SpApiThrottlingException as exception_error:
+                                        # the pending reports of this seller are verified again on the next run
+                                        logger.warning(f'{exception_error}, skipping the reports of account {account_id} in this run')
+                                        break
 
                                     if az_report_status['processingStatus'] != 'DONE':
                                         _update_report = AzReport.update_by_id(
@@ -264,9 +264,6 @@ class AspReportsWorker:
                                             fba_customer_shipment_sales_q.enqueue(FbaSalesReportWorker.get_customer_shipment_sales_report, data=data, job_timeout=config_data.get('RQ_JOB_TIMEOUT'))  # type: ignore  # noqa: FKA100
 
                             delay += 3
-                            # Add a delay after each request
-                            # Delay, (assuming 2 requests per second)
-                            time.sleep(1 / 2)
 
             except Exception as e:
                 logger.error(
@@ -290,7 +287,6 @@ class AspReportsWorker:
             from app.helpers.utility import get_current_datetime
             from datetime import timedelta
             from app.helpers.constants import ASpReportType
-            import time
             import traceback
             from app.helpers.constants import EntityType
             from app.helpers.constants import QueueName
@@ -334,10 +330,6 @@ class AspReportsWorker:
                             add_queue_task_and_enqueue(queue_name=QueueName.ORDER_REPORT, account_id=account_id,
                                                        logged_in_user=logged_in_user, entity_type=EntityType.ORDER_REPORT.value, data=data)
 
-                        # Add a delay after each request
-                        # Delay for 1/15th of a second (assuming 15 requests per second)
-                        time.sleep(1 / 15)
-
             except Exception as e:
                 logger.error(
                     'Error while creating report in AspReportsWorker.create_order_report(): ' + str(e))
@@ -155,6 +155,9 @@ class FbaInventoryWorker:
         from app.models.account import Account
         from app.models.az_item_master import AzItemMaster
         from providers.amazon_sp_client import AmazonReportEU
+        from app.helpers.rate_limit_helper import SpApiThrottlingException
+        from app.helpers.response_cache_helper import bump_data_version
+        from app.helpers.throttle_helper import reschedule_throttled_job
         from app.helpers.utility import get_asp_market_place_ids
         from app.helpers.utility import get_asp_data_start_time
         # from app.helpers.utility import generate_date_ranges
@@ -241,9 +244,6 @@ class FbaInventoryWorker:
                     if not params['nextToken']:
                         break
 
-                    # Add sleep time to ensure 2 requests per second
-                    time.sleep(0.5)
-
                 prepare_fba_json = []
                 for inventory in all_inventory_summaries:
                     # fba_inventory_json = json.dumps(inventory)
@@ -264,12 +264,17 @@ class FbaInventoryWorker:
                     get_report_ref.status_updated_at = int(time.time())
                     db.session.commit()
 
+                bump_data_version(account_id=account_id)
+
                 if queue_task:
                     queue_task.status = QueueTaskStatus.COMPLETED.value
                     queue_task.save()
                 else:
                     raise Exception
 
+            except SpApiThrottlingException as e:
+                reschedule_throttled_job(data=data, exception=e, queue_task=queue_task)
+
             except Exception as e:
                 if get_report_ref:
                     get_report_ref.status = ASpReportProcessingStatus.ERROR.value
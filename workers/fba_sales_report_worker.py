@@ -1,5 +1,3 @@
-import gzip
-import io
 import time
 import traceback
 
@@ -7,10 +5,15 @@ from app import app
 from app import config_data
 from app import db
 from app import logger
+from app.helpers.brand_category_helper import BrandCategoryLookup
 from app.helpers.constants import ASpReportProcessingStatus
 from app.helpers.constants import ASpReportType
 from app.helpers.constants import QueueTaskStatus
 from app.helpers.constants import TimePeriod
+from app.helpers.rate_limit_helper import SpApiThrottlingException
+from app.helpers.report_download_helper import iter_report_chunks
+from app.helpers.response_cache_helper import bump_data_version
+from app.helpers.throttle_helper import reschedule_throttled_job
 from app.helpers.utility import get_asp_market_place_ids
 from app.helpers.utility import get_from_to_date_by_timestamp
 from app.models.account import Account
@@ -18,10 +21,8 @@ from app.models.az_fba_customer_shipment_sales import AzFbaCustomerShipmentSales
 from app.models.az_report import AzReport
 from app.models.queue_task import QueueTask
 import numpy as np
-import pandas as pd
 from providers.amazon_sp_client import AmazonReportEU
 from providers.mail import send_error_notification
-import requests
 
 
 class FbaSalesReportWorker:
@@ -121,6 +122,9 @@ class FbaSalesReportWorker:
                 # else:
                 #     raise Exception
 
+            except SpApiThrottlingException as e:
+                reschedule_throttled_job(data=data, exception=e, queue_task=queue_task)
+
             except Exception as e:
                 if queue_task:
                     queue_task.status = QueueTaskStatus.ERROR.value
@@ -184,88 +188,75 @@ class FbaSalesReportWorker:
                 get_report = report.retrieve_report(report_document_id)
 
                 # get url
-                if 'url' in get_report:
-                    file_url = get_report['url']
-                else:
+                if 'url' not in get_report:
                     logger.error(
                         'file url not found for Fba Sales customer shipment report')
                     raise Exception
 
-                # get file data by accessing the url
-                file_data = requests.get(file_url)
-
-                if file_data.status_code != 200:
-                    logger.error(
-                        'Exception occured while retrieving Fba Sales customer shipment report')
-                    raise Exception
-
-                if 'compressionAlgorithm' in get_report and get_report['compressionAlgorithm'] == 'GZIP':
-                    streamed_url_response = requests.get(get_report['url'])
-                    compressed_content = streamed_url_response.content
-                    decompressed_content = gzip.decompress(compressed_content)
-                    content = decompressed_content.decode('utf-8')
-                else:
-                    streamed_url_response = requests.get(get_report['url'])
-                    content = streamed_url_response.content.decode('utf-8')
-
-                df_stream = pd.read_csv(io.StringIO(
-                    content), delimiter='\t', header=0, iterator=True, chunksize=1000)
-
-                data_frame = pd.concat(df_stream, ignore_index=True)
-
-                # from app import config_data
-                # data_frame.to_csv(config_data.get('UPLOAD_FOLDER') + ASpReportType.FBA_CUSTOMER_SHIPMENT_SALES_REPORT.value.lower()
-                #               + '/{}.csv'.format(report_document_id), index=False)
-
-                # transforming data before db insertion
-                data_frame.columns = [
-                    'shipment_date',
-                    'sku',
-                    'fnsku',
-                    'asin',
-                    'fulfillment_center_id',
-                    'quantity',
-                    'amazon_order_id',
-                    'currency',
-                    'item_price_per_unit',
-                    'shipping_price',
-                    'gift_wrap_price',
-                    'ship_city',
-                    'ship_state',
-                    'ship_postal_code'
-                ]
-
-                fba_customer_shipment_df = data_frame.fillna(np.nan).replace([np.nan], [None])   # type: ignore  # noqa: FKA100
-                for row in fba_customer_shipment_df.itertuples(index=False):
-                    AzFbaCustomerShipmentSales.add_or_update(
-                        account_id=account_id,
-                        asp_id=asp_id,
-                        shipment_date=row.shipment_date,
-                        sku=row.sku,
-                        fnsku=row.fnsku,
-                        asin=row.asin,
-                        fulfillment_center_id=row.fulfillment_center_id,
-                        quantity=row.quantity,
-                        amazon_order_id=row.amazon_order_id,
-                        currency=row.currency,
-                        item_price_per_unit=row.item_price_per_unit,
-                        shipping_price=row.shipping_price,
-                        gift_wrap_price=row.gift_wrap_price,
-                        ship_city=row.ship_city,
-                        ship_state=row.ship_state,
-                        ship_postal_code=row.ship_postal_code
-                    )
+                # category and brand are read from the item master once for the whole report
+                brand_category_lookup = BrandCategoryLookup(account_id=account_id, asp_id=asp_id)
+
+                # stream the report document and ingest it chunk by chunk
+                for data_frame in iter_report_chunks(report_document=get_report, delimiter='\t', header=0):
+                    # from app import config_data
+                    # data_frame.to_csv(config_data.get('UPLOAD_FOLDER') + ASpReportType.FBA_CUSTOMER_SHIPMENT_SALES_REPORT.value.lower()
+                    #               + '/{}.csv'.format(report_document_id), index=False)
+
+                    # transforming data before db insertion
+                    data_frame.columns = [
+                        'shipment_date',
+                        'sku',
+                        'fnsku',
+                        'asin',
+                        'fulfillment_center_id',
+                        'quantity',
+                        'amazon_order_id',
+                        'currency',
+                        'item_price_per_unit',
+                        'shipping_price',
+                        'gift_wrap_price',
+                        'ship_city',
+                        'ship_state',
+                        'ship_postal_code'
+                    ]
+
+                    fba_customer_shipment_df = data_frame.fillna(np.nan).replace([np.nan], [None])   # type: ignore  # noqa: FKA100
+                    for row in fba_customer_shipment_df.itertuples(index=False):
+                        AzFbaCustomerShipmentSales.add_or_update(
+                            account_id=account_id,
+                            asp_id=asp_id,
+                            shipment_date=row.shipment_date,
+                            sku=row.sku,
+                            fnsku=row.fnsku,
+                            asin=row.asin,
+                            fulfillment_center_id=row.fulfillment_center_id,
+                            quantity=row.quantity,
+                            amazon_order_id=row.amazon_order_id,
+                            currency=row.currency,
+                            item_price_per_unit=row.item_price_per_unit,
+                            shipping_price=row.shipping_price,
+                            gift_wrap_price=row.gift_wrap_price,
+                            ship_city=row.ship_city,
+                            ship_state=row.ship_state,
+                            ship_postal_code=row.ship_postal_code,
+                            brand_category_lookup=brand_category_lookup
+                        )
 
                 get_report_document_id.status = ASpReportProcessingStatus.COMPLETED.value
                 get_report_document_id.status_updated_at = int(time.time())
                 db.session.commit()
 
+                bump_data_version(account_id=account_id)
+
                 if queue_task:
                     queue_task.status = QueueTaskStatus.COMPLETED.value
                     queue_task.save()
                 else:
                     raise Exception
 
+            except SpApiThrottlingException as e:
+                reschedule_throttled_job(data=data, exception=e, queue_task=queue_task)
+
             except Exception as e:
                 if queue_task:
                     queue_task.status = QueueTaskStatus.ERROR.value
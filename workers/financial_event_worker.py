@@ -5,12 +5,14 @@ import traceback
 from app import app
 from app import config_data
 from app import logger
-from app.helpers.constants import AspFinanceEventList
 from app.helpers.constants import ASpReportProcessingStatus
 from app.helpers.constants import ASpReportType
 from app.helpers.constants import FINANCIAL_EVENTS_MAX_RESULTS_PER_PAGE
 from app.helpers.constants import QueueTaskStatus
 from app.helpers.constants import TimePeriod
+from app.helpers.rate_limit_helper import SpApiThrottlingException
+from app.helpers.response_cache_helper import bump_data_version
+from app.helpers.throttle_helper import reschedule_throttled_job
 from app.helpers.utility import convert_string_to_datetime
 from app.helpers.utility import generate_uuid
 from app.helpers.utility import get_from_to_date_by_time_period
@@ -91,6 +93,11 @@ class FinanceEventWorker:
                         'MaxResultsPerPage': max_results_per_page
                     }
 
+                    # Resume from the page reached before the job was throttled.
+                    next_token = data.pop('next_token', None)  # type: ignore  # noqa: FKA100
+                    if next_token:
+                        params = {'NextToken': next_token}
+
                     count = 1
 
                     lower_max_results_per_page = 5
@@ -142,32 +149,9 @@ class FinanceEventWorker:
                             # with open(config_data.get('UPLOAD_FOLDER') + ASpReportType.LIST_FINANCIAL_EVENTS.value.lower() + '/finance_event_list_page_{}_{}_{}_{}.json'.format(count, ref_id, start_datetime, start_datetime+delta), 'w') as f:                           # type: ignore  # noqa: FKA100
                             #     json.dump(finance_data, f)
 
-                            shipment_event_list = finance_data.get(
-                                AspFinanceEventList.SHIPMENT.value)
-                            refund_event_list = finance_data.get(
-                                AspFinanceEventList.REFUND.value)
-                            service_event_list = finance_data.get(
-                                AspFinanceEventList.SERVICE_FEE.value)
-                            product_ads_payment_event_list = finance_data.get(
-                                AspFinanceEventList.PRODUCT_ADS_PAYMENT.value)
-                            adjustment_event_list = finance_data.get(
-                                AspFinanceEventList.ADJUSTMENT.value)
-
-                            # For Shipment event list
-                            AspFinanceView.add_finance_events(
-                                account_id=account_id, asp_id=asp_id, event_type=AspFinanceEventList.SHIPMENT.value, event_list=shipment_event_list)
-
-                            # For Refund and Service Fee event list
-                            AspFinanceView.add_finance_events(
-                                account_id=account_id, asp_id=asp_id, event_type=AspFinanceEventList.REFUND.value, event_list=refund_event_list, service_event_list=service_event_list)
-
-                            if product_ads_payment_event_list:
-                                AspFinanceView.add_finance_events(
-                                    account_id=account_id, asp_id=asp_id, event_type=AspFinanceEventList.PRODUCT_ADS_PAYMENT.value, event_list=product_ads_payment_event_list)
-
-                            if adjustment_event_list:
-                                AspFinanceView.add_finance_events(
-                                    account_id=account_id, asp_id=asp_id, event_type=AspFinanceEventList.ADJUSTMENT.value, event_list=adjustment_event_list)
+                            # Shipment, Refund, Service Fee, Product Ads Payment and Adjustment events of the page in one batch
+                            AspFinanceView.add_finance_event_page(
+                                account_id=account_id, asp_id=asp_id, finance_data=finance_data)
 
                             if get_report:
                                 # pytype: disable=not-writable
@@ -181,7 +165,16 @@ class FinanceEventWorker:
                             next_token = response['payload']['NextToken']
                             params = {'NextToken': next_token}
                             count += 1
-                            time.sleep(3)
+
+                        except SpApiThrottlingException:
+                            # Keep the day and page reached so the rescheduled job resumes from here.
+                            data.update({
+                                'default_sync': False,
+                                'start_datetime': start_datetime.strftime('%Y-%m-%d'),
+                                'end_datetime': end_datetime.strftime('%Y-%m-%d'),
+                                'next_token': params.get('NextToken')
+                            })
+                            raise
 
                         except Exception as e:
                             error_message = 'Error processing report with reference ID {}: {}'.format(
@@ -201,10 +194,15 @@ class FinanceEventWorker:
                         'max_results_per_page') is not None else FINANCIAL_EVENTS_MAX_RESULTS_PER_PAGE
                     start_datetime += delta
 
+                bump_data_version(account_id=account_id)
+
                 if queue_task:
                     queue_task.status = QueueTaskStatus.COMPLETED.value
                     queue_task.save()
 
+            except SpApiThrottlingException as e:
+                reschedule_throttled_job(data=data, exception=e, queue_task=queue_task)
+
             except Exception as e:
                 if queue_task:
                     queue_task.status = QueueTaskStatus.ERROR.value
@@ -1,4 +1,3 @@
-import io
 import json
 import os
 import shutil
@@ -19,6 +18,10 @@ from app.helpers.constants import ItemMasterStatus
 from app.helpers.constants import QueueName
 from app.helpers.constants import QueueTaskStatus
 from app.helpers.constants import TimePeriod
+from app.helpers.rate_limit_helper import SpApiThrottlingException
+from app.helpers.report_download_helper import iter_report_chunks
+from app.helpers.response_cache_helper import bump_data_version
+from app.helpers.throttle_helper import reschedule_throttled_job
 from app.helpers.utility import get_asp_market_place_ids
 from app.helpers.utility import get_from_to_date_by_timestamp
 from app.helpers.utility import is_valid_numeric
@@ -26,13 +29,12 @@ from app.models.account import Account
 from app.models.attachment import Attachment
 from app.models.az_item_master import AzItemMaster
 from app.models.az_report import AzReport
+from app.models.base import report_transaction
 from app.models.queue_task import QueueTask
 from excel2json import convert_from_file
 import numpy as np
-import pandas as pd
 from providers.amazon_sp_client import AmazonReportEU
 from providers.mail import send_error_notification
-import requests
 from werkzeug.datastructures import FileStorage
 from workers.s3_worker import upload_file_and_get_object_details
 import xlrd
@@ -139,6 +141,9 @@ class ItemMasterWorker:
                 # else:
                 #     raise Exception
 
+            except SpApiThrottlingException as e:
+                reschedule_throttled_job(data=data, exception=e, queue_task=queue_task)
+
             except Exception as e:
                 if queue_task:
                     queue_task.status = QueueTaskStatus.ERROR.value
@@ -241,6 +246,9 @@ class ItemMasterWorker:
                 else:
                     raise Exception
 
+            except SpApiThrottlingException as e:
+                reschedule_throttled_job(data=data, exception=e, queue_task=queue_task)
+
             except Exception as e:
                 if queue_task:
                     queue_task.status = QueueTaskStatus.ERROR.value
@@ -319,82 +327,76 @@ class ItemMasterWorker:
                 logger.info('Item master file url for {}, {}: {}'.format(
                     account_id, asp_id, file_url))
 
-                # making request to the report document url to get the file data
-                file_data = requests.get(file_url, stream=True)
-                # logger.info('file_data.text')
-                # logger.info(file_data.text)
-
-                data_frame = pd.read_csv(io.StringIO(
-                    file_data.text), sep='\t', index_col=False, skiprows=0)
-                data_frame = data_frame.fillna(np.nan).replace([np.nan], [None])   # type: ignore  # noqa: FKA100
-
-                # directory = config_data.get(
-                #     'UPLOAD_FOLDER') + ASpReportType.ITEM_MASTER_LIST_ALL_DATA.value.lower()
-                # if not os.path.exists(directory):
-                #     os.makedirs(directory)
-
-                # data_frame.to_csv(config_data.get('UPLOAD_FOLDER') + ASpReportType.ITEM_MASTER_LIST_ALL_DATA.value.lower()
-                #                   + '/{}.csv'.format(report_document_id), index=False)
-                # logger.info('Columns:')
-                # logger.info(data_frame.columns)
-
-                # # iterating dataframe rows and creating model object to save data into db
-                for index, row in data_frame.iterrows():
-
-                    seller_sku = row.get('seller-sku').strip(
-                    ) if row.get('seller-sku') is not None else None
-
-                    if seller_sku:
-                        logger.info('*' * 200)
-                        logger.info('Item master records insert/update')
-                        logger.info(f"***{row.get('seller-sku')}***")
-                        logger.info(f"***{row.get('asin1')}***")
-
-                        item = AzItemMaster.get_item_by_sku(
-                            sku=seller_sku, account_id=account_id, selling_partner_id=asp_id)
-
-                        _item_name = row.get(
-                            'item-name') if row.get('item-name') is not None else None
-                        _item_description = row.get(
-                            'item-description') if row.get('item-description') is not None else None
-                        _listing_id = row.get(
-                            'listing-id') if row.get('listing-id') is not None else None
-                        _price = row.get('price') if row.get(
-                            'price') is not None else 0
-                        _product_id = row.get(
-                            'product-id') if row.get('product-id') is not None else None
-                        _asin1 = row.get('asin1') if row.get(
-                            'asin1') is not None else None
-                        _fulfillment_channel = FulfillmentChannel.get_name(row.get(
-                            'fulfillment-channel')) if row.get('fulfillment-channel') is not None else None
-                        _status = ItemMasterStatus.get_name(
-                            row.get('status').upper()) if row.get('status') is not None else None
-                        _max_retail_price = row.get(
-                            'maximum-retail-price') if row.get('maximum-retail-price') is not None else 0
-
-                        if item:
-                            logger.info('Item master records updation')
-                            logger.info(f'Update Item for: {item.account_id}')
-                            AzItemMaster.update_items(account_id=account_id, selling_partner_id=asp_id, item_name=_item_name, item_description=_item_description, listing_id=_listing_id,
-                                                      price=_price, seller_sku=seller_sku, asin=_asin1, product_id=_product_id,
-                                                      fulfillment_channel=_fulfillment_channel, status=_status, max_retail_price=_max_retail_price)
-                        else:
-                            logger.info('Item master records insertion')
-                            logger.info(f'Update Item for: {account_id}')
-                            AzItemMaster.add(account_id=account_id, selling_partner_id=asp_id, item_name=_item_name, item_description=_item_description, listing_id=_listing_id,
-                                             seller_sku=seller_sku, price=_price, asin=_asin1, product_id=_product_id,
-                                             fulfillment_channel=_fulfillment_channel, status=_status, max_retail_price=_max_retail_price)
+                seller_skus = set()
+
+                # stream the report document and ingest it chunk by chunk, using the charset announced by the url
+                for data_frame in iter_report_chunks(report_document=get_report, encoding=None, sep='\t', index_col=False, skiprows=0):
+                    data_frame = data_frame.fillna(np.nan).replace([np.nan], [None])   # type: ignore  # noqa: FKA100
+
+                    # directory = config_data.get(
+                    #     'UPLOAD_FOLDER') + ASpReportType.ITEM_MASTER_LIST_ALL_DATA.value.lower()
+                    # if not os.path.exists(directory):
+                    #     os.makedirs(directory)
+
+                    # data_frame.to_csv(config_data.get('UPLOAD_FOLDER') + ASpReportType.ITEM_MASTER_LIST_ALL_DATA.value.lower()
+                    #                   + '/{}.csv'.format(report_document_id), index=False)
+                    # logger.info('Columns:')
+                    # logger.info(data_frame.columns)
+
+                    # building the listing records of the chunk, the last line of a sku wins
+                    items = {}
+                    for row in data_frame.to_dict('records'):
+
+                        seller_sku = str(row.get('seller-sku')).strip(
+                        ) if row.get('seller-sku') is not None else None
+
+                        if not seller_sku:
+                            continue
+
+                        items[seller_sku] = {
+                            'account_id': account_id,
+                            'selling_partner_id': asp_id,
+                            'seller_sku': seller_sku,
+                            'item_name': row.get('item-name'),
+                            'item_description': row.get('item-description'),
+                            'listing_id': row.get('listing-id'),
+                            'price': row.get('price') if row.get('price') is not None else 0,
+                            'product_id': row.get('product-id'),
+                            'asin': row.get('asin1'),
+                            'fulfillment_channel': FulfillmentChannel.get_name(row.get(
+                                'fulfillment-channel')) if row.get('fulfillment-channel') is not None else None,
+                            'status': ItemMasterStatus.get_name(
+                                row.get('status').upper()) if row.get('status') is not None else None,
+                            'max_retail_price': row.get(
+                                'maximum-retail-price') if row.get('maximum-retail-price') is not None else 0,
+                            'created_at': int(time.time())
+                        }
+
+                    # upserting the chunk in one statement
+                    AzItemMaster.upsert_items(records=list(items.values()))
+                    seller_skus.update(items)
+
+                # listings no longer present in the report are marked inactive
+                deactivated = AzItemMaster.deactivate_missing_items(account_id=account_id, selling_partner_id=asp_id, seller_skus=seller_skus)
+
+                logger.info('Item master records upserted for {}, {}: {}, marked inactive: {}'.format(
+                    account_id, asp_id, len(seller_skus), deactivated))
 
                 get_report_document_id.status = ASpReportProcessingStatus.COMPLETED.value
                 get_report_document_id.status_updated_at = int(time.time())
                 db.session.commit()
 
+                bump_data_version(account_id=account_id)
+
                 if queue_task:
                     queue_task.status = QueueTaskStatus.COMPLETED.value
                     queue_task.save()
                 else:
                     raise Exception
 
+            except SpApiThrottlingException as e:
+                reschedule_throttled_job(data=data, exception=e, queue_task=queue_task)
+
             except Exception as e:
                 if get_report_document_id:
                     get_report_document_id.status = ASpReportProcessingStatus.ERROR.value
@@ -545,6 +547,8 @@ class ItemMasterWorker:
                 # logger.warning('OUTPUT JSON')
                 # logger.warning(output_json)
 
+                bump_data_version(account_id=account_id)
+
                 if queue_task:
                     queue_task.status = QueueTaskStatus.COMPLETED.value
                     queue_task.output_attachment_id = output_attachment_id
@@ -737,17 +741,6 @@ class ItemMasterWorker:
         """Update Item Master catalog"""
         with app.app_context():
             from app.views.asp_item_master_report_view import AspItemMasterReport
-            from app.models.az_product_performance import AzProductPerformance
-            from app.models.az_sales_traffic_asin import AzSalesTrafficAsin
-            from app.models.az_fba_customer_shipment_sales import AzFbaCustomerShipmentSales
-            from app.models.az_fba_reimbursements import AzFbaReimbursements
-            from app.models.az_fba_replacement import AzFbaReplacement
-            from app.models.az_fba_returns import AzFbaReturns
-            from app.models.az_order_report import AzOrderReport
-            from app.models.az_ledger_summary import AzLedgerSummary
-            from app.models.az_financial_event import AzFinancialEvent
-            from app.models.az_sponsored_display import AzSponsoredDisplay
-            from app.models.az_sponsored_product import AzSponsoredProduct
 
             job_id = data.get('job_id')
 
@@ -789,6 +782,7 @@ class ItemMasterWorker:
 
                     # Fetch the ASINs from the items and create a list of ASINs
                     asin_list = [item.asin for item in items]
+                    sku_asins = [(item.seller_sku, item.asin) for item in items if item.seller_sku]
 
                     # Maximum count of identifiers allowed in one request
                     max_identifiers_count = 20
@@ -797,6 +791,9 @@ class ItemMasterWorker:
                     index = 0
                     counter = 0
 
+                    # Brand and category by asin, propagated to the report tables once the sync is done
+                    asin_brand_categories = {}
+
                     while index < len(asin_list):
                         # Get the next batch of ASINs
                         batch_asins = asin_list[index:index
@@ -830,38 +827,9 @@ class ItemMasterWorker:
                                                                                 subcategory_rank=_subcategory_rank, face_image=_face_image, other_images=_other_images)
 
                                 if updated_data:
-                                    logger.info('*' * 200)
-                                    if updated_data.seller_sku:
-                                        logger.info(
-                                            'seller_sku: %s', updated_data.seller_sku)
-
-                                        # update all table's with brand's
-                                        AzProductPerformance.store_brand_category_by_sku(
-                                            account_id=account_id, asp_id=asp_id, seller_sku=updated_data.seller_sku, category=_category, brand=_brand)
-                                        AzFbaCustomerShipmentSales.store_brand_category_by_sku(
-                                            account_id=account_id, asp_id=asp_id, seller_sku=updated_data.seller_sku, category=_category, brand=_brand)
-                                        AzFbaReimbursements.store_brand_category_by_sku(
-                                            account_id=account_id, asp_id=asp_id, seller_sku=updated_data.seller_sku, category=_category, brand=_brand)
-                                        AzFbaReplacement.store_brand_category_by_sku(
-                                            account_id=account_id, asp_id=asp_id, seller_sku=updated_data.seller_sku, category=_category, brand=_brand)
-                                        AzFbaReturns.store_brand_category_by_sku(
-                                            account_id=account_id, asp_id=asp_id, seller_sku=updated_data.seller_sku, category=_category, brand=_brand)
-                                        AzOrderReport.store_brand_category_by_sku(
-                                            account_id=account_id, asp_id=asp_id, seller_sku=updated_data.seller_sku, category=_category, brand=_brand)
-                                        AzLedgerSummary.store_brand_category_by_sku(
-                                            account_id=account_id, asp_id=asp_id, seller_sku=updated_data.seller_sku, category=_category, brand=_brand)
-                                        AzFinancialEvent.store_brand_category_by_sku(
-                                            account_id=account_id, asp_id=asp_id, seller_sku=updated_data.seller_sku, category=_category, brand=_brand)
-                                        AzSalesTrafficAsin.store_brand_category_by_asin(
-                                            account_id=account_id, asp_id=asp_id, asin=updated_data.asin, category=_category, brand=_brand)
-
-                                        # Update brand's for Ad's
-                                        AzSponsoredDisplay.store_brand_category_by_sku(
-                                            account_id=account_id, asp_id=asp_id, seller_sku=updated_data.seller_sku, category=_category, brand=_brand)
-                                        AzSponsoredProduct.store_brand_category_by_sku(
-                                            account_id=account_id, asp_id=asp_id, seller_sku=updated_data.seller_sku, category=_category, brand=_brand)
-
-                                    else:
+                                    if _brand is not None or _category is not None:
+                                        asin_brand_categories[_asin] = (_brand, _category)
+                                    if not updated_data.seller_sku:
                                         logger.info(
                                             'Empty Sku for Asin: %s', _asin)
 
@@ -878,16 +846,26 @@ class ItemMasterWorker:
                                 'pageToken': next_token
                             }
                             count += 1
-                            time.sleep(60)
 
                         # Increment the index and counter for the next batch
                         index += max_identifiers_count
                         counter += 1
 
+                    sku_brand_categories = {
+                        seller_sku: asin_brand_categories[asin] for seller_sku, asin in sku_asins if asin in asin_brand_categories}
+
+                    cls.propagate_brand_category(account_id=account_id, sku_brand_categories=sku_brand_categories,
+                                                 asin_brand_categories=asin_brand_categories)
+
+                bump_data_version(account_id=account_id)
+
                 if queue_task:
                     queue_task.status = QueueTaskStatus.COMPLETED.value
                     queue_task.save()
 
+            except SpApiThrottlingException as e:
+                reschedule_throttled_job(data=data, exception=e, queue_task=queue_task)
+
             except Exception as e:
                 if queue_task:
                     queue_task.status = QueueTaskStatus.ERROR.value
@@ -899,3 +877,36 @@ class ItemMasterWorker:
                 logger.error(traceback.format_exc())
                 send_error_notification(email_to=config_data.get('SLACK').get('NOTIFICATION_EMAIL'), subject='Error while Updating catalog items in ItemMasterWorker',
                                         template='emails/slack_email.html', data={}, error_message=error_message, traceback_info=traceback.format_exc())
+
+    @staticmethod
+    def propagate_brand_category(account_id: str, sku_brand_categories: dict, asin_brand_categories: dict):
+        """Apply the synced brand and category to every report table in a single transaction, one UPDATE per table"""
+        from app.models.az_product_performance import AzProductPerformance
+        from app.models.az_sales_traffic_asin import AzSalesTrafficAsin
+        from app.models.az_fba_customer_shipment_sales import AzFbaCustomerShipmentSales
+        from app.models.az_fba_reimbursements import AzFbaReimbursements
+        from app.models.az_fba_replacement import AzFbaReplacement
+        from app.models.az_fba_returns import AzFbaReturns
+        from app.models.az_order_report import AzOrderReport
+        from app.models.az_ledger_summary import AzLedgerSummary
+        from app.models.az_financial_event import AzFinancialEvent
+        from app.models.az_sponsored_display import AzSponsoredDisplay
+        from app.models.az_sponsored_product import AzSponsoredProduct
+
+        if not sku_brand_categories and not asin_brand_categories:
+            return
+
+        sku_models = [AzProductPerformance, AzFbaCustomerShipmentSales, AzFbaReimbursements, AzFbaReplacement, AzFbaReturns,
+                      AzOrderReport, AzLedgerSummary, AzFinancialEvent, AzSponsoredDisplay, AzSponsoredProduct]
+
+        updated_count = 0
+
+        with report_transaction() as connection:
+            for model in sku_models:
+                updated_count += model.store_brand_category_bulk(
+                    connection=connection, account_id=account_id, brand_categories=sku_brand_categories)
+
+            updated_count += AzSalesTrafficAsin.store_brand_category_bulk(
+                connection=connection, account_id=account_id, brand_categories=asin_brand_categories, by_asin=True)
+
+        logger.info('Propagated brand and category of %s skus to %s rows for account %s', len(sku_brand_categories), updated_count, account_id)     # type: ignore  # noqa: FKA100
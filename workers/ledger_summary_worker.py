@@ -1,5 +1,3 @@
-import gzip
-import io
 import time
 import traceback
 
@@ -7,23 +5,29 @@ from app import app
 from app import config_data
 from app import db
 from app import logger
+from app.helpers.brand_category_helper import BrandCategoryLookup
 from app.helpers.constants import AggregateByLocation
 from app.helpers.constants import AggregateByTimePeriod
 from app.helpers.constants import ASpReportProcessingStatus
 from app.helpers.constants import ASpReportType
 from app.helpers.constants import QueueTaskStatus
 from app.helpers.constants import TimePeriod
+from app.helpers.ingestion_helper import log_ingestion_throughput
+from app.helpers.rate_limit_helper import SpApiThrottlingException
+from app.helpers.report_download_helper import iter_report_chunks
+from app.helpers.response_cache_helper import bump_data_version
+from app.helpers.throttle_helper import reschedule_throttled_job
 from app.helpers.utility import get_asp_market_place_ids
 from app.helpers.utility import get_from_to_date_by_timestamp
 from app.models.account import Account
 from app.models.az_ledger_summary import AzLedgerSummary
+from app.models.az_ledger_summary import LEDGER_SUMMARY_REPORT_COLUMNS
 from app.models.az_report import AzReport
 from app.models.queue_task import QueueTask
 import numpy as np
 import pandas as pd
 from providers.amazon_sp_client import AmazonReportEU
 from providers.mail import send_error_notification
-import requests
 
 
 class LedgerSummaryWorker:
@@ -127,6 +131,9 @@ class LedgerSummaryWorker:
                 # else:
                 #     raise Exception
 
+            except SpApiThrottlingException as e:
+                reschedule_throttled_job(data=data, exception=e, queue_task=queue_task)
+
             except Exception as e:
                 if queue_task:
                     queue_task.status = QueueTaskStatus.ERROR.value
@@ -190,65 +197,50 @@ class LedgerSummaryWorker:
                 get_report = report.retrieve_report(report_document_id)
 
                 # get url
-                if 'url' in get_report:
-                    file_url = get_report['url']
-                else:
+                if 'url' not in get_report:
                     logger.error(
                         'file url not found for ledger summary report')
                     raise Exception
 
-                # get file data by accessing the url
-                file_data = requests.get(file_url)
+                # category and brand are read from the item master once for the whole report
+                brand_category_lookup = BrandCategoryLookup(account_id=account_id, asp_id=asp_id)
 
-                if file_data.status_code != 200:
-                    logger.error(
-                        'Exception occured while retrieving ledger summary report')
-                    raise Exception
+                started_at = time.perf_counter()
+                row_count = 0
 
-                if 'compressionAlgorithm' in get_report and get_report['compressionAlgorithm'] == 'GZIP':
-                    streamed_url_response = requests.get(get_report['url'])
-                    compressed_content = streamed_url_response.content
-                    decompressed_content = gzip.decompress(compressed_content)
-                    content = decompressed_content.decode('utf-8')
-                else:
-                    streamed_url_response = requests.get(get_report['url'])
-                    content = streamed_url_response.content.decode('utf-8')
+                # stream the report document and upsert it chunk by chunk, one transaction per chunk
+                for data_frame in iter_report_chunks(report_document=get_report, delimiter='\t', header=0):
+                    # transforming data before db insertion
+                    data_frame.columns = list(LEDGER_SUMMARY_REPORT_COLUMNS)
 
-                df_stream = pd.read_csv(io.StringIO(
-                    content), delimiter='\t', header=0, iterator=True, chunksize=1000)
+                    data_frame['date'] = pd.to_datetime(
+                        data_frame['date'], format='%m/%d/%Y').dt.date
 
-                data_frame = pd.concat(df_stream, ignore_index=True)
+                    # transformation
+                    data_frame = data_frame.fillna(np.nan).replace([np.nan], [None])   # type: ignore  # noqa: FKA100
 
-                # transforming data before db insertion
-                data_frame.columns = ['date', 'fnsku', 'asin', 'msku', 'title', 'disposition', 'starting_warehouse_balance',
-                                      'in_transit_btw_warehouse', 'receipts', 'customer_shipments', 'customer_returns', 'vendor_returns',
-                                      'warehouse_transfer', 'found', 'lost', 'damaged', 'disposed', 'other_events',
-                                      'ending_warehouse_balance', 'unknown_events', 'location']
+                    # inserting data into db
+                    row_count += AzLedgerSummary.bulk_upsert(account_id=account_id, asp_id=asp_id, ledger_rows=data_frame.to_dict('records'),
+                                                             brand_category_lookup=brand_category_lookup)
 
-                data_frame['date'] = pd.to_datetime(
-                    data_frame['date'], format='%m/%d/%Y').dt.date
-
-                # transformation
-                data_frame = data_frame.fillna(np.nan).replace([np.nan], [None])   # type: ignore  # noqa: FKA100
-
-                # inserting data into db
-                for row in data_frame.itertuples(index=False):
-                    AzLedgerSummary.add_update(account_id=account_id, asp_id=asp_id, date=row[0], fnsku=row[1], asin=row[2],
-                                               msku=row[3], title=row[4], disposition=row[5], starting_warehouse_balance=row[6],
-                                               in_transit_btw_warehouse=row[7], receipts=row[8], customer_shipments=row[
-                        9], customer_returns=row[10], vendor_returns=row[11], warehouse_transfer=row[12],
-                        found=row[13], lost=row[14], damaged=row[15], disposed=row[16], other_events=row[17], ending_warehouse_balance=row[18], unknown_events=row[19], location=row[20])
+                log_ingestion_throughput(job_name='LedgerSummaryWorker.get_ledger_summary_report', account_id=account_id,
+                                         row_count=row_count, started_at=started_at)
 
                 get_report_document_id.status = ASpReportProcessingStatus.COMPLETED.value
                 get_report_document_id.status_updated_at = int(time.time())
                 db.session.commit()
 
+                bump_data_version(account_id=account_id)
+
                 if queue_task:
                     queue_task.status = QueueTaskStatus.COMPLETED.value
                     queue_task.save()
                 else:
                     raise Exception
 
+            except SpApiThrottlingException as e:
+                reschedule_throttled_job(data=data, exception=e, queue_task=queue_task)
+
             except Exception as e:
                 if queue_task:
                     queue_task.status = QueueTaskStatus.ERROR.value
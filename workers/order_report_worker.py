@@ -1,6 +1,4 @@
 import csv
-import gzip
-import io
 import time
 import traceback
 
@@ -15,17 +13,20 @@ from app.helpers.constants import EntityType
 from app.helpers.constants import QueueName
 from app.helpers.constants import QueueTaskStatus
 from app.helpers.constants import TimePeriod
+from app.helpers.rate_limit_helper import SpApiThrottlingException
+from app.helpers.report_download_helper import iter_report_chunks
+from app.helpers.response_cache_helper import bump_data_version
+from app.helpers.throttle_helper import reschedule_throttled_job
 from app.helpers.utility import get_asp_market_place_ids
 from app.helpers.utility import get_from_to_date_by_timestamp
 from app.models.account import Account
 from app.models.az_order_report import AzOrderReport
+from app.models.az_product_performance_daily import AzProductPerformanceDaily
 from app.models.az_report import AzReport
 from app.models.queue_task import QueueTask
 import numpy as np
-import pandas as pd
 from providers.amazon_sp_client import AmazonReportEU
 from providers.mail import send_error_notification
-import requests
 
 
 class OrderReportWorker:
@@ -124,6 +125,9 @@ class OrderReportWorker:
                 # else:
                 #     raise Exception
 
+            except SpApiThrottlingException as e:
+                reschedule_throttled_job(data=data, exception=e, queue_task=queue_task)
+
             except Exception as e:
                 if queue_task:
                     queue_task.status = QueueTaskStatus.ERROR.value
@@ -218,6 +222,9 @@ class OrderReportWorker:
                 else:
                     raise Exception
 
+            except SpApiThrottlingException as e:
+                reschedule_throttled_job(data=data, exception=e, queue_task=queue_task)
+
             except Exception as e:
                 if queue_task:
                     queue_task.status = QueueTaskStatus.ERROR.value
@@ -279,86 +286,51 @@ class OrderReportWorker:
                 # using retrieve_report function of report object to get report
                 get_report = report.retrieve_report(report_document_id)
 
-                if 'compressionAlgorithm' in get_report and get_report['compressionAlgorithm'] == 'GZIP':
-                    streamed_url_response = requests.get(get_report['url'])
-                    compressed_content = streamed_url_response.content
-                    decompressed_content = gzip.decompress(compressed_content)
-                    content = decompressed_content.decode('utf-8')
-                else:
-                    streamed_url_response = requests.get(get_report['url'])
-                    content = streamed_url_response.content.decode('utf-8')
-
-                if content:
-                    # Create a streaming pandas DataFrame
-                    df_stream = pd.read_csv(io.StringIO(
-                        content), delimiter='\t', header=None, skiprows=1, iterator=True, chunksize=1000, quoting=csv.QUOTE_NONE)
-                    order_df = pd.concat(df_stream, ignore_index=True)
-
-                    # temp
-                    # order_df.to_csv(config_data.get('UPLOAD_FOLDER') + ASpReportType.ORDER_REPORT_ORDER_DATE_GENERAL.value.lower(
-                    #         ) + '/{}.csv'.format(report_document_id), index=False)
-
-                    # Rename the columns
-                    order_df.columns = ['amazon_order_id', 'merchant_order_id', 'purchase_date', 'last_updated_date', 'order_status', 'fulfillment_channel', 'sales_channel', 'order_channel', 'ship_service_level', 'product_name', 'sku', 'asin', 'item_status', 'quantity', 'currency', 'item_price', 'item_tax',
+                # column names of the order report, the header line is replaced by these
+                order_report_columns = ['amazon_order_id', 'merchant_order_id', 'purchase_date', 'last_updated_date', 'order_status', 'fulfillment_channel', 'sales_channel', 'order_channel', 'ship_service_level', 'product_name', 'sku', 'asin', 'item_status', 'quantity', 'currency', 'item_price', 'item_tax',
                                         'shipping_price', 'shipping_tax', 'gift_wrap_price', 'gift_wrap_tax', 'item_promotion_discount', 'ship_promotion_discount', 'ship_city', 'ship_state', 'ship_postal_code', 'ship_country', 'promotion_ids', 'is_business_order', 'purchase_order_number', 'price_designation', 'fulfilled_by', 'is_iba']
 
-                    desired_columns = ['amazon_order_id', 'merchant_order_id', 'purchase_date', 'last_updated_date', 'order_status', 'fulfillment_channel', 'sales_channel',
-                                       'ship_service_level', 'product_name', 'sku', 'asin', 'item_status', 'quantity', 'currency', 'item_price', 'item_tax',
-                                       'shipping_price', 'shipping_tax', 'gift_wrap_price', 'gift_wrap_tax', 'item_promotion_discount', 'ship_promotion_discount', 'ship_city', 'ship_state', 'ship_postal_code', 'ship_country']
+                desired_columns = ['amazon_order_id', 'merchant_order_id', 'purchase_date', 'last_updated_date', 'order_status', 'fulfillment_channel', 'sales_channel',
+                                   'ship_service_level', 'product_name', 'sku', 'asin', 'item_status', 'quantity', 'currency', 'item_price', 'item_tax',
+                                   'shipping_price', 'shipping_tax', 'gift_wrap_price', 'gift_wrap_tax', 'item_promotion_discount', 'ship_promotion_discount', 'ship_city', 'ship_state', 'ship_postal_code', 'ship_country']
 
+                count = 0
+                # stream the report document and ingest it chunk by chunk
+                for order_df in iter_report_chunks(report_document=get_report, delimiter='\t', header=None, skiprows=2, names=order_report_columns,
+                                                   quoting=csv.QUOTE_NONE):
                     # Drop columns not in the desired columns list
                     order_df_selected_columns = order_df[desired_columns]
 
                     # transformation
                     order_df_selected_columns = order_df_selected_columns.fillna(np.nan).replace([np.nan], [None])   # type: ignore  # noqa: FKA100
 
-                    count = 0
-                    for row in order_df_selected_columns.iloc[1:].itertuples(index=False):
-                        count += 1
-                        order = AzOrderReport.get_by_az_order_id_and_sku(
-                            selling_partner_id=asp_id, amazon_order_id=row.amazon_order_id, sku=row.sku)
-
-                        if order:
-
-                            # if order.order_status == row.order_status:
-                            #     quantity = order.quantity + row.quantity
-                            #     order.quantity = quantity
-                            #     db.session.commit()
-
-                            AzOrderReport.update_orders(
-                                account_id=account_id,
-                                selling_partner_id=asp_id,
-                                amazon_order_id=row.amazon_order_id,
-                                merchant_order_id=row.merchant_order_id, purchase_date=row.purchase_date,
-                                last_updated_date=row.last_updated_date, order_status=row.order_status, fulfillment_channel=row.fulfillment_channel, sales_channel=row.sales_channel, ship_service_level=row.ship_service_level,
-                                product_name=row.product_name, sku=row.sku, asin=row.asin, item_status=row.item_status, quantity=row.quantity, currency=row.currency,
-                                item_price=row.item_price, item_tax=row.item_tax, shipping_price=row.shipping_price, shipping_tax=row.shipping_tax,
-                                gift_wrap_price=row.gift_wrap_price, gift_wrap_tax=row.gift_wrap_tax, item_promotion_discount=row.item_promotion_discount,
-                                ship_promotion_discount=row.ship_promotion_discount, ship_city=row.ship_city, ship_state=row.ship_state, ship_postal_code=row.ship_postal_code,
-                                ship_country=row.ship_country)
-                        else:
-
-                            AzOrderReport.add(
-                                account_id=account_id, selling_partner_id=asp_id, amazon_order_id=row.amazon_order_id, merchant_order_id=row.merchant_order_id, purchase_date=row.purchase_date, last_updated_date=row.last_updated_date,
-                                order_status=row.order_status, fulfillment_channel=row.fulfillment_channel, sales_channel=row.sales_channel, ship_service_level=row.ship_service_level,
-                                product_name=row.product_name, sku=row.sku, asin=row.asin, item_status=row.item_status, quantity=row.quantity, currency=row.currency,
-                                item_price=row.item_price, item_tax=row.item_tax, shipping_price=row.shipping_price, shipping_tax=row.shipping_tax,
-                                gift_wrap_price=row.gift_wrap_price, gift_wrap_tax=row.gift_wrap_tax, item_promotion_discount=row.item_promotion_discount,
-                                ship_promotion_discount=row.ship_promotion_discount, ship_city=row.ship_city, ship_state=row.ship_state, ship_postal_code=row.ship_postal_code,
-                                ship_country=row.ship_country)
-                else:
+                    orders = order_df_selected_columns.to_dict('records')
+
+                    # merge the chunk into az_order_report in one statement
+                    count += AzOrderReport.bulk_upsert_orders(account_id=account_id, selling_partner_id=asp_id, orders=orders)
+
+                    # ship postal codes decide the zone of already ingested product performance
+                    AzProductPerformanceDaily.refresh_orders(account_id=account_id, asp_id=asp_id,
+                                                             az_order_ids=[order.get('amazon_order_id') for order in orders])
+
+                if not count:
                     logger.info('Empty content received from order report')
 
                 get_report_document_id.status = ASpReportProcessingStatus.COMPLETED.value
                 get_report_document_id.status_updated_at = int(time.time())
                 db.session.commit()
 
+                bump_data_version(account_id=account_id)
+
                 if queue_task:
                     queue_task.status = QueueTaskStatus.COMPLETED.value
                     queue_task.save()
                 else:
                     raise Exception
 
+            except SpApiThrottlingException as e:
+                reschedule_throttled_job(data=data, exception=e, queue_task=queue_task)
+
             except Exception as e:
                 if get_report_document_id:
                     AzReport.update_status(
@@ -468,6 +440,8 @@ class OrderReportWorker:
                 AzReport.update_status(
                     reference_id=reference_id, status=ASpReportProcessingStatus.COMPLETED.value)
 
+                bump_data_version(account_id=account_id)
+
                 if queue_task:
                     queue_task.status = QueueTaskStatus.COMPLETED.value
                     queue_task.save()
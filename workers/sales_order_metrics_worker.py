@@ -3,12 +3,16 @@
 # It defines a class, AspReportWorker, to handle report generation
 """
 from collections import defaultdict
+from concurrent.futures import as_completed
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from datetime import timedelta
 import time
 import traceback
 from typing import Any
 
+SALES_ORDER_METRICS_MAX_WORKERS = 4
+
 
 class SalesOrderMetricsWorker:
     """ A class for fetching sales order metrics """
@@ -181,8 +185,12 @@ class SalesOrderMetricsWorker:
         from app.models.account import Account
         from app.models.az_item_master import AzItemMaster
         from providers.amazon_sp_client import AmazonReportEU
+        from app.helpers.rate_limit_helper import SpApiThrottlingException
+        from app.helpers.response_cache_helper import bump_data_version
+        from app.helpers.throttle_helper import reschedule_throttled_job
         from app.helpers.utility import get_asp_market_place_ids
         # from app.helpers.utility import generate_date_ranges
+        from app.models.az_sales_hourly import AzSalesHourly
         from app.models.az_sales_traffic_asin import AzSalesTrafficAsin
         from app.models.az_sales_traffic_summary import AzSalesTrafficSummary
         from app.models.az_report import AzReport
@@ -264,36 +272,29 @@ class SalesOrderMetricsWorker:
 
                 asin_payload_dict = defaultdict(lambda: {'payload_list': [], 'seller_sku': None, 'brand': None, 'category': None})   # noqa: FKA100
 
-                for _i, item in enumerate(items, 1):   # noqa: FKA100
-                    start_time = time.time()
-                    logger.info(
-                        f"Iteration {_i} - Start Time: {datetime.fromtimestamp(start_time).strftime('%Y-%m-%d %H:%M:%S')}")
-                    logger.info(
-                        f'Iteration {_i} - Seller Sku: ***{item.seller_sku}***')
-                    logger.info(f'Iteration {_i} - Asin: ***{item.asin}***')
-                    logger.info(
-                        f'Iteration {_i} - Status: ***{item.status}***')
+                for item in items:
+                    asin_payload_dict[item.asin]['brand'] = item.brand
+                    asin_payload_dict[item.asin]['category'] = item.category
+                    asin_payload_dict[item.asin]['seller_sku'] = item.seller_sku
 
-                    params['asin'] = item.asin
+                # One client for the seller, shared by the fetcher threads.
+                report = AmazonReportEU(credentials=credentials)
 
-                    report = AmazonReportEU(
-                        credentials=credentials)
-                    response = report.get_sales(params=params)
+                start_time = time.time()
 
-                    payload = response.get('payload')
+                asin_payloads = SalesOrderMetricsWorker.fetch_sales_by_asin(
+                    report=report, params=params, asins=list(asin_payload_dict.keys()),
+                    max_workers=int(config_data.get('SALES_ORDER_METRICS_MAX_WORKERS', SALES_ORDER_METRICS_MAX_WORKERS)))  # type: ignore  # noqa: FKA100
 
-                    asin_payload_dict[item.asin]['payload_list'].extend(
-                        payload)
-                    asin_payload_dict[item.asin]['brand'] = item.brand
-                    asin_payload_dict[item.asin]['category'] = item.category
-                    asin_payload_dict[item.asin]['seller_sku'] = item.seller_sku
+                logger.info(
+                    f'Fetched sales for {len(asin_payloads)} asins in {time.time() - start_time:.2f}s')
 
-                    end_time = time.time()
-                    logger.info(
-                        f"Iteration {_i} - End Time: {datetime.fromtimestamp(end_time).strftime('%Y-%m-%d %H:%M:%S')}")
-                    time.sleep(0.5)
+                for _asin, payload in asin_payloads.items():
+                    asin_payload_dict[_asin]['payload_list'].extend(payload)
 
                 _sales_summary_dict = {}
+                sales_traffic_asin_data = []
+                hourly_sales_data = []
 
                 for _asin, data_dict in asin_payload_dict.items():
                     payload_list = data_dict['payload_list']
@@ -316,12 +317,26 @@ class SalesOrderMetricsWorker:
                                 'total_unit_count': value.get('objects').get('unit_count')
                             }
 
-                        AzSalesTrafficAsin.insert_or_update_sales_data(account_id=account_id, asp_id=asp_id, date=key,
-                                                                       total_sales=value.get('objects').get('total_sales'), unit_count=value.get('objects').get('unit_count'), hourly_sales=value, asin=_asin, category=category, brand=brand)
+                        sales_traffic_asin_data.append({
+                            'date': key,
+                            'asin': _asin,
+                            'total_sales': value.get('objects').get('total_sales'),
+                            'unit_count': value.get('objects').get('unit_count'),
+                            'hourly_sales': value,
+                            'category': category,
+                            'brand': brand
+                        })
+
+                        hourly_sales_data.extend(SalesOrderMetricsWorker.get_hourly_sales_rows(
+                            cls, asin=_asin, hourly_payload=value.get('result')))
+
+                AzSalesTrafficAsin.bulk_insert_or_update_sales_data(
+                    account_id=account_id, asp_id=asp_id, sales_data=sales_traffic_asin_data)
+
+                AzSalesHourly.bulk_upsert(account_id=account_id, asp_id=asp_id, hourly_sales=hourly_sales_data)
 
-                for _key, _value in _sales_summary_dict.items():
-                    AzSalesTrafficSummary.insert_or_update_sales_data(account_id=account_id, asp_id=asp_id, date=_key, total_sales=_value.get(
-                        'total_sales'), unit_count=_value.get('total_unit_count'))
+                AzSalesTrafficSummary.bulk_insert_or_update_sales_data(account_id=account_id, asp_id=asp_id, sales_data=[
+                    {'date': _key, 'total_sales': _value.get('total_sales'), 'unit_count': _value.get('total_unit_count')} for _key, _value in _sales_summary_dict.items()])
 
                 # for loop:
                 if get_report_ref:
@@ -329,6 +344,8 @@ class SalesOrderMetricsWorker:
                     get_report_ref.status_updated_at = int(time.time())
                     db.session.commit()
 
+                bump_data_version(account_id=account_id)
+
                 if queue_task:
                     queue_task.status = QueueTaskStatus.COMPLETED.value
                     queue_task.save()
@@ -386,6 +403,9 @@ class SalesOrderMetricsWorker:
                 #         AzReport.update_status(
                 #             reference_id=sales_report.reference_id, status=ASpReportProcessingStatus.COMPLETED.value)
 
+            except SpApiThrottlingException as e:
+                reschedule_throttled_job(data=data, exception=e, queue_task=queue_task)
+
             except Exception as e:
                 if get_report_ref:
                     get_report_ref.status = ASpReportProcessingStatus.ERROR.value
@@ -402,6 +422,78 @@ class SalesOrderMetricsWorker:
                 send_error_notification(email_to=config_data.get('SLACK').get('NOTIFICATION_EMAIL'), subject='SalesOrderMetricsWorker Get sales order metrics Failure',
                                         template='emails/slack_email.html', data=None, error_message=str(e), traceback_info=traceback.format_exc())
 
+    @classmethod
+    def refresh_sales_api(cls, data):
+        """ Refresh the stored hourly sales of a date range from the sales api, enqueued by the hourly sales endpoint"""
+        from app import app, logger
+        from app.models.account import Account
+        from app.helpers.rate_limit_helper import SpApiThrottlingException
+        from app.helpers.response_cache_helper import bump_data_version
+        from app.views.sales_api_view import AZSalesView
+
+        with app.app_context():
+            account_id = data.get('account_id')
+
+            account = Account.get_by_uuid(uuid=account_id)
+
+            if not account or account.asp_id != data.get('asp_id'):
+                logger.error(f'Sales api refresh skipped. Account : {account_id} not found')
+                return
+
+            try:
+                credentials = account.retrieve_asp_credentials(account)[0]
+
+                AZSalesView.call_sales_api(account_id=account_id, asp_id=account.asp_id, from_date=data.get('from_date'), to_date=data.get('to_date'),
+                                           credentials=credentials, last_three_days=False)
+
+                bump_data_version(account_id=account_id)
+
+            except SpApiThrottlingException as e:
+                # the endpoint keeps serving the stored data and enqueues again once its refresh lock expires
+                logger.warning(f'Sales api refresh throttled for account {account_id}: {e}')
+
+            except Exception as e:
+                logger.error(f'Error while refreshing sales api data in SalesOrderMetricsWorker.refresh_sales_api: {e}')
+                logger.error(traceback.format_exc())
+
+    @classmethod
+    def fetch_sales_by_asin(cls, report: Any, params: dict, asins: list, max_workers: int) -> dict:
+        """Fetch hourly sales of many asins concurrently through one client.
+
+        Pacing is left to the SP-API rate limiter, so the pool only bounds how many
+        requests are in flight. A throttled or failed request cancels the pending ones.
+        """
+        from app import logger
+
+        def fetch(asin: str):
+            response = report.get_sales(params=dict(params, asin=asin))
+            payload = response.get('payload')
+
+            if payload is None:
+                raise Exception(f"Sales api failed for asin {asin}: {response.get('errors')}")
+
+            return asin, payload
+
+        asin_payloads = {}
+        futures: list = []
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+        try:
+            for asin in asins:
+                futures.append(executor.submit(fetch, asin))     # type: ignore  # noqa: FKA100
+
+            for _i, future in enumerate(as_completed(futures), 1):     # type: ignore  # noqa: FKA100
+                asin, payload = future.result()
+                asin_payloads[asin] = payload
+                logger.info(f'Sales fetched for asin {asin} ({_i}/{len(futures)})')
+        finally:
+            # shutdown(cancel_futures=True) needs python 3.9, the requests not started yet are cancelled one by one
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+        return asin_payloads
+
     def prepare_params(cls, start_date: str, end_date: str, market_place_ids: Any, granularity: str):
         """Prepare params for sales api"""
         payload_interval = f'{start_date}T18:00:00-00:30--{end_date}T18:00:00-00:30'
@@ -463,3 +555,15 @@ class SalesOrderMetricsWorker:
             result_dict[payload_date]['objects']['orderCount'] += data['orderCount']
 
         return result_dict
+
+    def get_hourly_sales_rows(cls, asin: str, hourly_payload: Any):
+        """az_sales_hourly rows of an asin, one per sales api interval keyed on the interval start"""
+
+        return [{
+            'asin': asin,
+            'hour_ts': datetime.fromisoformat(data.get('interval').split('--')[0]),
+            'units_ordered': data.get('unitCount'),
+            'order_count': data.get('orderCount'),
+            'sales_amount': data.get('totalSales', {}).get('amount'),   # type: ignore  # noqa: FKA100
+            'currency_code': data.get('totalSales', {}).get('currencyCode')   # type: ignore  # noqa: FKA100
+        } for data in hourly_payload]
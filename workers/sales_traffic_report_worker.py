@@ -1,6 +1,4 @@
 import datetime
-import gzip
-import json
 import time
 import traceback
 
@@ -9,6 +7,7 @@ from app import config_data
 from app import db
 from app import logger
 from app import sales_traffic_report_q
+from app.helpers.brand_category_helper import BrandCategoryLookup
 from app.helpers.constants import AsinGranularity
 from app.helpers.constants import ASpReportProcessingStatus
 from app.helpers.constants import ASpReportType
@@ -17,10 +16,15 @@ from app.helpers.constants import EntityType
 from app.helpers.constants import QueueName
 from app.helpers.constants import QueueTaskStatus
 from app.helpers.constants import TimePeriod
+from app.helpers.ingestion_helper import log_ingestion_throughput
+from app.helpers.rate_limit_helper import SpApiThrottlingException
+from app.helpers.report_download_helper import get_report_download_config
+from app.helpers.report_download_helper import iter_report_json_members
+from app.helpers.response_cache_helper import bump_data_version
+from app.helpers.throttle_helper import reschedule_throttled_job
 from app.helpers.utility import convert_string_to_datetime
 from app.helpers.utility import flatten_json
 from app.helpers.utility import get_asp_market_place_ids
-from app.helpers.utility import get_date_from_string
 from app.helpers.utility import get_from_to_date_by_time_period
 from app.models.account import Account
 from app.models.az_report import AzReport
@@ -29,7 +33,9 @@ from app.models.az_sales_traffic_summary import AzSalesTrafficSummary
 from app.models.queue_task import QueueTask
 from providers.amazon_sp_client import AmazonReportEU
 from providers.mail import send_error_notification
-import requests
+
+# arrays of the report document read record by record, sales and traffic by date then by asin
+SALES_TRAFFIC_REPORT_ARRAYS = ('salesAndTrafficByDate', 'salesAndTrafficByAsin')
 
 
 class SalesTrafficReportWorker:
@@ -143,6 +149,9 @@ class SalesTrafficReportWorker:
                 # else:
                 #     raise Exception
 
+            except SpApiThrottlingException as e:
+                reschedule_throttled_job(data=data, exception=e, queue_task=queue_task)
+
             except Exception as e:
                 if queue_task:
                     queue_task.status = QueueTaskStatus.ERROR.value
@@ -237,6 +246,9 @@ class SalesTrafficReportWorker:
                 else:
                     raise Exception
 
+            except SpApiThrottlingException as e:
+                reschedule_throttled_job(data=data, exception=e, queue_task=queue_task)
+
             except Exception as e:
                 if queue_task:
                     queue_task.status = QueueTaskStatus.ERROR.value
@@ -314,261 +326,35 @@ class SalesTrafficReportWorker:
                         f'Error while retrieving report in SalesTrafficReportWorker.get_sales_traffic_report(), Url not found for Ref Id: {get_report_document_id.reference_id}')
                     return None
 
-                if 'compressionAlgorithm' in get_report and get_report['compressionAlgorithm'] == 'GZIP':
-                    streamed_url_response = requests.get(get_report['url'])
-                    compressed_content = streamed_url_response.content
-                    decompressed_content = gzip.decompress(compressed_content)
-                    content = decompressed_content.decode('utf-8')
-                else:
-                    streamed_url_response = requests.get(get_report['url'])
-                    content = streamed_url_response.content.decode('utf-8')
-
                 # with open(config_data.get('UPLOAD_FOLDER') + ASpReportType.SALES_TRAFFIC_REPORT.value.lower()   # type: ignore  # noqa: FKA100
                 #         + '/{}.txt'.format(report_document_id), 'w') as f:
                 #     f.write(content)
                 # f.close()
 
-                payload_date = get_report_document_id.request_start_time
-
-                json_dict = json.loads(content)
-
-                date_granularity = json_dict['reportSpecification']['reportOptions']['dateGranularity']
-                asin_granularity = json_dict['reportSpecification']['reportOptions']['asinGranularity']
-
-                # sales and traffic summary (by date)
-                sales_traffic_summary = json_dict.get('salesAndTrafficByDate')
-                for item in sales_traffic_summary:
-                    item_flat = flatten_json(item)
-                    date = get_date_from_string(
-                        date_string=item_flat.get('date'))
-                    ordered_product_sales_amount = item_flat.get(
-                        'salesByDate_orderedProductSales_amount')
-                    ordered_product_sales_currency_code = item_flat.get(
-                        'salesByDate_orderedProductSales_currencyCode')
-                    ordered_product_sales_amount_b2b = item_flat.get(
-                        'salesByDate_orderedProductSalesB2B_amount')
-                    ordered_product_sales_currency_code_b2b = item_flat.get(
-                        'salesByDate_orderedProductSalesB2B_currencyCode')
-                    units_ordered = item_flat.get('salesByDate_unitsOrdered')
-                    units_ordered_b2b = item_flat.get(
-                        'salesByDate_unitsOrderedB2B')
-                    total_order_items = item_flat.get(
-                        'salesByDate_totalOrderItems')
-                    total_order_items_b2b = item_flat.get(
-                        'salesByDate_totalOrderItemsB2B')
-                    average_sales_per_order_item_amount = item_flat.get(
-                        'salesByDate_averageSalesPerOrderItem_amount')
-                    average_sales_per_order_item_currency_code = item_flat.get(
-                        'salesByDate_averageSalesPerOrderItem_currencyCode')
-                    average_sales_per_order_item_amount_b2b = item_flat.get(
-                        'salesByDate_averageSalesPerOrderItemB2B_amount')
-                    average_sales_per_order_item_currency_code_b2b = item_flat.get(
-                        'salesByDate_averageSalesPerOrderItemB2B_currencyCode')
-                    average_units_per_order_item = item_flat.get(
-                        'salesByDate_averageUnitsPerOrderItem')
-                    average_units_per_order_item_b2b = item_flat.get(
-                        'salesByDate_averageUnitsPerOrderItemB2B')
-                    average_selling_price_amount = item_flat.get(
-                        'salesByDate_averageSellingPrice_amount')
-                    average_selling_price_currency_code = item_flat.get(
-                        'salesByDate_averageSellingPrice_currencyCode')
-                    average_selling_price_amount_b2b = item_flat.get(
-                        'salesByDate_averageSellingPriceB2B_amount')
-                    average_selling_price_currency_code_b2b = item_flat.get(
-                        'salesByDate_averageSellingPriceB2B_currencyCode')
-                    units_refunded = item_flat.get('salesByDate_unitsRefunded')
-                    refund_rate = item_flat.get('salesByDate_refundRate')
-                    claims_granted = item_flat.get('salesByDate_claimsGranted')
-                    claims_amount_amount = item_flat.get(
-                        'salesByDate_claimsAmount_amount')
-                    claims_amount_currency_code = item_flat.get(
-                        'salesByDate_claimsAmount_currencyCode')
-                    shipped_product_sales_amount = item_flat.get(
-                        'salesByDate_shippedProductSales_amount')
-                    shipped_product_sales_currency_code = item_flat.get(
-                        'salesByDate_shippedProductSales_currencyCode')
-                    units_shipped = item_flat.get('salesByDate_unitsShipped')
-                    orders_shipped = item_flat.get('salesByDate_ordersShipped')
-                    browser_page_views = item_flat.get(
-                        'trafficByDate_browserPageViews')
-                    browser_page_views_b2b = item_flat.get(
-                        'trafficByDate_browserPageViewsB2B')
-                    mobile_app_page_views = item_flat.get(
-                        'trafficByDate_mobileAppPageViews')
-                    mobile_app_page_views_b2b = item_flat.get(
-                        'trafficByDate_mobileAppPageViewsB2B')
-                    page_views = item_flat.get('trafficByDate_pageViews')
-                    page_views_b2b = item_flat.get(
-                        'trafficByDate_pageViewsB2B')
-                    browser_sessions = item_flat.get(
-                        'trafficByDate_browserSessions')
-                    browser_sessions_b2b = item_flat.get(
-                        'trafficByDate_browserSessionsB2B')
-                    mobile_app_sessions = item_flat.get(
-                        'trafficByDate_mobileAppSessions')
-                    mobile_app_sessions_b2b = item_flat.get(
-                        'trafficByDate_mobileAppSessionsB2B')
-                    sessions = item_flat.get('trafficByDate_sessions')
-                    sessions_b2b = item_flat.get('trafficByDate_sessionsB2B')
-                    buy_box_percentage = item_flat.get(
-                        'trafficByDate_buyBoxPercentage')
-                    buy_box_percentage_b2b = item_flat.get(
-                        'trafficByDate_buyBoxPercentageB2B')
-                    order_item_session_percentage = item_flat.get(
-                        'trafficByDate_orderItemSessionPercentage')
-                    order_item_session_percentage_b2b = item_flat.get(
-                        'trafficByDate_orderItemSessionPercentageB2B')
-                    unit_session_percentage = item_flat.get(
-                        'trafficByDate_unitSessionPercentage')
-                    unit_session_percentage_b2b = item_flat.get(
-                        'trafficByDate_unitSessionPercentageB2B')
-                    average_offer_count = item_flat.get(
-                        'trafficByDate_averageOfferCount')
-                    average_parent_items = item_flat.get(
-                        'trafficByDate_averageParentItems')
-                    feedback_received = item_flat.get(
-                        'trafficByDate_feedbackReceived')
-                    negative_feedback_received = item_flat.get(
-                        'trafficByDate_negativeFeedbackReceived')
-                    received_negative_feedback_rate = item_flat.get(
-                        'trafficByDate_receivedNegativeFeedbackRate')
-                    date_granularity = date_granularity
-
-                    AzSalesTrafficSummary.insert_or_update(account_id=account_id, asp_id=asp_id, date=date, ordered_product_sales_amount=ordered_product_sales_amount,
-                                                           ordered_product_sales_currency_code=ordered_product_sales_currency_code, units_ordered=units_ordered,
-                                                           ordered_product_sales_amount_b2b=ordered_product_sales_amount_b2b, ordered_product_sales_currency_code_b2b=ordered_product_sales_currency_code_b2b,
-                                                           units_ordered_b2b=units_ordered_b2b, total_order_items=total_order_items, total_order_items_b2b=total_order_items_b2b,
-                                                           average_sales_per_order_item_amount=average_sales_per_order_item_amount, average_sales_per_order_item_currency_code=average_sales_per_order_item_currency_code,
-                                                           average_sales_per_order_item_amount_b2b=average_sales_per_order_item_amount_b2b, average_sales_per_order_item_currency_code_b2b=average_sales_per_order_item_currency_code_b2b,
-                                                           average_units_per_order_item=average_units_per_order_item, average_units_per_order_item_b2b=average_units_per_order_item_b2b,
-                                                           average_selling_price_amount=average_selling_price_amount, average_selling_price_currency_code=average_selling_price_currency_code,
-                                                           average_selling_price_amount_b2b=average_selling_price_amount_b2b, average_selling_price_currency_code_b2b=average_selling_price_currency_code_b2b,
-                                                           units_refunded=units_refunded, refund_rate=refund_rate, claims_granted=claims_granted, claims_amount_amount=claims_amount_amount,
-                                                           claims_amount_currency_code=claims_amount_currency_code, shipped_product_sales_amount=shipped_product_sales_amount,
-                                                           shipped_product_sales_currency_code=shipped_product_sales_currency_code, units_shipped=units_shipped, orders_shipped=orders_shipped,
-                                                           browser_page_views=browser_page_views, browser_page_views_b2b=browser_page_views_b2b, mobile_app_page_views=mobile_app_page_views,
-                                                           mobile_app_page_views_b2b=mobile_app_page_views_b2b, page_views=page_views, page_views_b2b=page_views_b2b,
-                                                           browser_sessions=browser_sessions, browser_sessions_b2b=browser_sessions_b2b, mobile_app_sessions=mobile_app_sessions,
-                                                           mobile_app_sessions_b2b=mobile_app_sessions_b2b, sessions=sessions, sessions_b2b=sessions_b2b,
-                                                           buy_box_percentage=buy_box_percentage, buy_box_percentage_b2b=buy_box_percentage_b2b, order_item_session_percentage=order_item_session_percentage,
-                                                           order_item_session_percentage_b2b=order_item_session_percentage_b2b, unit_session_percentage=unit_session_percentage,
-                                                           unit_session_percentage_b2b=unit_session_percentage_b2b, average_offer_count=average_offer_count, average_parent_items=average_parent_items,
-                                                           feedback_received=feedback_received, negative_feedback_received=negative_feedback_received,
-                                                           received_negative_feedback_rate=received_negative_feedback_rate, date_granularity=date_granularity)
-                # sales and traffic by asin
-                sales_traffic_asin = json_dict.get('salesAndTrafficByAsin')
-                for item in sales_traffic_asin:
-                    item_flat = flatten_json(item)
-                    parent_asin = item_flat.get('parentAsin')
-                    child_asin = item_flat.get('childAsin')
-                    units_ordered = item_flat.get('salesByAsin_unitsOrdered')
-                    units_ordered_b2b = item_flat.get(
-                        'salesByAsin_unitsOrderedB2B')
-                    ordered_product_sales_amount = item_flat.get(
-                        'salesByAsin_orderedProductSales_amount')
-                    ordered_product_sales_amount_b2b = item_flat.get(
-                        'salesByAsin_orderedProductSalesB2B_amount')
-                    ordered_product_sales_currency_code = item_flat.get(
-                        'salesByAsin_orderedProductSales_currencyCode')
-                    ordered_product_sales_currency_code_b2b = item_flat.get(
-                        'salesByAsin_orderedProductSalesB2B_currencyCode')
-                    total_order_items = item_flat.get(
-                        'salesByAsin_totalOrderItems')
-                    total_order_items_b2b = item_flat.get(
-                        'salesByAsin_totalOrderItemsB2B')
-                    browser_sessions = item_flat.get(
-                        'trafficByAsin_browserSessions')
-                    browser_sessions_b2b = item_flat.get(
-                        'trafficByAsin_browserSessionsB2B')
-                    mobile_app_sessions = item_flat.get(
-                        'trafficByAsin_mobileAppSessions')
-                    mobile_app_sessions_b2b = item_flat.get(
-                        'trafficByAsin_mobileAppSessionsB2B')
-                    sessions = item_flat.get(
-                        'trafficByAsin_sessions')
-                    sessions_b2b = item_flat.get(
-                        'trafficByAsin_sessionsB2B')
-                    browser_session_percentage = item_flat.get(
-                        'trafficByAsin_browserSessionPercentage')
-                    browser_session_percentage_b2b = item_flat.get(
-                        'trafficByAsin_browserSessionPercentageB2B')
-                    mobile_app_session_percentage = item_flat.get(
-                        'trafficByAsin_mobileAppSessionPercentage')
-                    mobile_app_session_percentage_b2b = item_flat.get(
-                        'trafficByAsin_mobileAppSessionPercentageB2B')
-                    session_percentage = item_flat.get(
-                        'trafficByAsin_sessionPercentage')
-                    session_percentage_b2b = item_flat.get(
-                        'trafficByAsin_sessionPercentageB2B')
-                    browser_page_views = item_flat.get(
-                        'trafficByAsin_browserPageViews')
-                    browser_page_views_b2b = item_flat.get(
-                        'trafficByAsin_browserPageViewsB2B')
-                    mobile_app_page_views = item_flat.get(
-                        'trafficByAsin_mobileAppPageViews')
-                    mobile_app_page_views_b2b = item_flat.get(
-                        'trafficByAsin_mobileAppPageViewsB2B')
-                    page_views = item_flat.get('trafficByAsin_pageViews')
-                    page_views_b2b = item_flat.get(
-                        'trafficByAsin_pageViewsB2B')
-                    browser_page_views_percentage = item_flat.get(
-                        'trafficByAsin_browserPageViewsPercentage')
-                    browser_page_views_percentage_b2b = item_flat.get(
-                        'trafficByAsin_browserPageViewsPercentageB2B')
-                    mobile_app_page_views_percentage = item_flat.get(
-                        'trafficByAsin_mobileAppPageViewsPercentage')
-                    mobile_app_page_views_percentage_b2b = item_flat.get(
-                        'trafficByAsin_mobileAppPageViewsPercentageB2B')
-                    page_views_percentage = item_flat.get(
-                        'trafficByAsin_pageViewsPercentage')
-                    page_views_percentage_b2b = item_flat.get(
-                        'trafficByAsin_pageViewsPercentageB2B')
-                    buy_box_percentage = item_flat.get(
-                        'trafficByAsin_buyBoxPercentage')
-                    buy_box_percentage_b2b = item_flat.get(
-                        'trafficByAsin_buyBoxPercentageB2B')
-                    unit_session_percentage = item_flat.get(
-                        'trafficByAsin_unitSessionPercentage')
-                    unit_session_percentage_b2b = item_flat.get(
-                        'trafficByAsin_unitSessionPercentageB2B')
-                    asin_granularity = asin_granularity
-
-                    AzSalesTrafficAsin.insert_or_update(account_id=account_id, asp_id=asp_id, parent_asin=parent_asin, child_asin=child_asin,
-                                                        payload_date=payload_date, units_ordered=units_ordered, units_ordered_b2b=units_ordered_b2b,
-                                                        ordered_product_sales_amount=ordered_product_sales_amount, ordered_product_sales_amount_b2b=ordered_product_sales_amount_b2b,
-                                                        ordered_product_sales_currency_code=ordered_product_sales_currency_code,
-                                                        ordered_product_sales_currency_code_b2b=ordered_product_sales_currency_code_b2b,
-                                                        total_order_items=total_order_items, total_order_items_b2b=total_order_items_b2b,
-                                                        browser_sessions=browser_sessions, browser_sessions_b2b=browser_sessions_b2b,
-                                                        mobile_app_sessions=mobile_app_sessions, mobile_app_sessions_b2b=mobile_app_sessions_b2b,
-                                                        sessions=sessions, sessions_b2b=sessions_b2b,
-                                                        browser_session_percentage=browser_session_percentage,
-                                                        browser_session_percentage_b2b=browser_session_percentage_b2b,
-                                                        mobile_app_session_percentage=mobile_app_session_percentage,
-                                                        mobile_app_session_percentage_b2b=mobile_app_session_percentage_b2b,
-                                                        session_percentage=session_percentage, session_percentage_b2b=session_percentage_b2b,
-                                                        browser_page_views=browser_page_views, browser_page_views_b2b=browser_page_views_b2b,
-                                                        mobile_app_page_views=mobile_app_page_views, mobile_app_page_views_b2b=mobile_app_page_views_b2b,
-                                                        page_views=page_views, page_views_b2b=page_views_b2b,
-                                                        browser_page_views_percentage=browser_page_views_percentage,
-                                                        browser_page_views_percentage_b2b=browser_page_views_percentage_b2b,
-                                                        mobile_app_page_views_percentage=mobile_app_page_views_percentage,
-                                                        mobile_app_page_views_percentage_b2b=mobile_app_page_views_percentage_b2b,
-                                                        page_views_percentage=page_views_percentage, page_views_percentage_b2b=page_views_percentage_b2b,
-                                                        buy_box_percentage=buy_box_percentage, buy_box_percentage_b2b=buy_box_percentage_b2b,
-                                                        unit_session_percentage=unit_session_percentage, unit_session_percentage_b2b=unit_session_percentage_b2b,
-                                                        asin_granularity=asin_granularity)
+                started_at = time.perf_counter()
+
+                row_count = cls.ingest_report_stream(account_id=account_id, asp_id=asp_id, payload_date=get_report_document_id.request_start_time,
+                                                     report_document=get_report)
+
+                log_ingestion_throughput(job_name='SalesTrafficReportWorker.get_sales_traffic_report', account_id=account_id,
+                                         row_count=row_count, started_at=started_at)
+
                 if get_report_document_id:
                     get_report_document_id.status = ASpReportProcessingStatus.COMPLETED.value
                     get_report_document_id.status_updated_at = int(time.time())
                     db.session.commit()
 
+                bump_data_version(account_id=account_id)
+
                 if queue_task:
                     queue_task.status = QueueTaskStatus.COMPLETED.value
                     queue_task.save()
                 else:
                     raise Exception
 
+            except SpApiThrottlingException as e:
+                reschedule_throttled_job(data=data, exception=e, queue_task=queue_task)
+
             except Exception as e:
                 if get_report_document_id:
                     get_report_document_id.status = ASpReportProcessingStatus.ERROR.value
@@ -585,3 +371,53 @@ class SalesTrafficReportWorker:
                 logger.error(traceback.format_exc())
                 send_error_notification(email_to=config_data.get('SLACK').get('NOTIFICATION_EMAIL'), subject='SalesTrafficReportWorker (Business Report) Download Report Failure',
                                         template='emails/slack_email.html', data={}, error_message=error_message, traceback_info=traceback.format_exc())
+
+    @classmethod
+    def ingest_report_stream(cls, account_id: str, asp_id: str, payload_date, report_document: dict) -> int:
+        """Parse the records of the report document as it downloads and write them in batches, returns the number of rows written"""
+
+        # category and brand are read from the item master once for the whole report
+        brand_category_lookup = BrandCategoryLookup(account_id=account_id, asp_id=asp_id)
+
+        report_members = iter_report_json_members(report_document=report_document, array_keys=SALES_TRAFFIC_REPORT_ARRAYS)
+        batch_size = get_report_download_config()['chunk_rows']
+        batches: dict = {report_key: [] for report_key in SALES_TRAFFIC_REPORT_ARRAYS}
+        report_options: dict = {}
+        row_count = 0
+
+        for report_key, value in report_members:
+            if report_key == 'reportSpecification':
+                report_options = value['reportOptions']
+                continue
+
+            if report_key not in batches or value is None:
+                continue
+
+            batches[report_key].append(flatten_json(value))
+
+            # records read before the report specification are held until its options are known
+            if report_options and len(batches[report_key]) >= batch_size:
+                row_count += cls.upsert_report_batch(account_id=account_id, asp_id=asp_id, payload_date=payload_date, report_key=report_key,
+                                                     report_items=batches[report_key], report_options=report_options,
+                                                     brand_category_lookup=brand_category_lookup)
+                batches[report_key] = []
+
+        for report_key, report_items in batches.items():
+            if report_items:
+                row_count += cls.upsert_report_batch(account_id=account_id, asp_id=asp_id, payload_date=payload_date, report_key=report_key,
+                                                     report_items=report_items, report_options=report_options,
+                                                     brand_category_lookup=brand_category_lookup)
+
+        return row_count
+
+    @classmethod
+    def upsert_report_batch(cls, account_id: str, asp_id: str, payload_date, report_key: str, report_items: list, report_options: dict,
+                            brand_category_lookup: BrandCategoryLookup) -> int:
+        """Write a batch of flattened records of one of the report arrays, returns the number of rows written"""
+
+        if report_key == 'salesAndTrafficByDate':
+            return AzSalesTrafficSummary.bulk_upsert_report(account_id=account_id, asp_id=asp_id, report_items=report_items,
+                                                            date_granularity=report_options['dateGranularity'])
+
+        return AzSalesTrafficAsin.bulk_upsert_report(account_id=account_id, asp_id=asp_id, payload_date=payload_date, report_items=report_items,
+                                                     asin_granularity=report_options['asinGranularity'], brand_category_lookup=brand_category_lookup)
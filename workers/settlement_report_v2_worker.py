@@ -1,4 +1,3 @@
-import io
 import os
 import time
 import traceback
@@ -13,18 +12,21 @@ from app.helpers.constants import EntityType
 from app.helpers.constants import QueueTaskStatus
 from app.helpers.constants import SubEntityType
 from app.helpers.constants import TimePeriod
-from app.helpers.utility import amount_details_to_json
+from app.helpers.ingestion_helper import log_ingestion_throughput
+from app.helpers.rate_limit_helper import SpApiThrottlingException
+from app.helpers.report_download_helper import iter_report_chunks
+from app.helpers.response_cache_helper import bump_data_version
+from app.helpers.throttle_helper import reschedule_throttled_job
 from app.helpers.utility import get_asp_market_place_ids
 from app.helpers.utility import get_from_to_date_by_timestamp
 from app.models.account import Account
 from app.models.attachment import Attachment
 from app.models.az_report import AzReport
 from app.models.az_settlement_v2 import AzSettlementV2
+from app.models.az_settlement_v2 import SETTLEMENT_REPORT_COLUMNS
 from app.models.queue_task import QueueTask
-import numpy as np
 import pandas as pd
 from providers.amazon_sp_client import AmazonReportEU
-import requests
 from werkzeug.datastructures import FileStorage
 from workers.s3_worker import upload_file_and_get_object_details
 
@@ -104,6 +106,9 @@ class SettlementReportV2Worker:
                     queue_task.status = QueueTaskStatus.COMPLETED.value
                     queue_task.save()
 
+            except SpApiThrottlingException as e:
+                reschedule_throttled_job(data=data, exception=e, queue_task=queue_task)
+
             except Exception as e:
                 if queue_task:
                     queue_task.status = QueueTaskStatus.ERROR.value
@@ -168,185 +173,42 @@ class SettlementReportV2Worker:
                 get_report = get_settlement_report.retrieve_report(
                     report_document_id)
 
-                if 'url' in get_report:
-                    file_url = get_report['url']
-                else:
+                if 'url' not in get_report:
                     logger.error(
                         'File url not found for settlement report')
                     raise Exception
 
-                file_url = get_report['url']
-                # Making request to the report document URL to get the file data
-                streamed_url_response = requests.get(file_url)
-
-                if streamed_url_response.status_code != 200:
-                    logger.error('Error occurred while retrieving Settlement Report: Report ID: {}, Reference ID: {}'.format(
-                        get_report_document_id.id, get_report_document_id.reference_id))
-
-                content = streamed_url_response.content.decode('utf-8')
-
                 # directory = config_data.get(
                 #     'UPLOAD_FOLDER') + ASpReportType.SETTLEMENT_REPORT_FLAT_FILE_V2.value.lower()
                 # os.makedirs(directory, exist_ok=True)
 
-                # Read the content into a streaming pandas DataFrame
-                df_stream = pd.read_csv(io.StringIO(
-                    content), delimiter='\t', header=None, skiprows=1, iterator=True, chunksize=1000)
-                settlement_df = pd.concat(df_stream, ignore_index=True)
-
-                settlement_df.columns = [
-                    'settlement_id', 'settlement_start_date', 'settlement_end_date', 'deposit_date', 'total_amount', 'currency',
-                    'transaction_type', 'order_id', 'merchant_order_id', 'adjustment_id', 'shipment_id', 'marketplace_name',
-                    'amount_type', 'amount_description', 'amount', 'fulfillment_id', 'posted_date', 'posted_date_time',
-                    'order_item_code', 'merchant_order_item_id', 'merchant_adjustment_item_id', 'sku', 'quantity_purchased',
-                    'promotion_id'
-                ]
-
-                settlement_df['posted_date'] = pd.to_datetime(
-                    settlement_df['posted_date'], format='%d.%m.%Y').dt.date
-                settlement_df['posted_date_time'] = pd.to_datetime(
-                    settlement_df['posted_date_time'], format='%d.%m.%Y %H:%M:%S UTC')
-
-                # Save the DataFrame to a CSV file
-                # start_date = re.search(r'\d{4}-\d{2}-\d{2}', get_report_document_id.request_start_time).group(0)  # type: ignore  # noqa: FKA100
-                # end_date = re.search(r'\d{4}-\d{2}-\d{2}', get_report_document_id.request_end_time).group(0)  # type: ignore  # noqa: FKA100
-                # file_path = os.path.join(directory, '{}-{}-{}.csv'.format(reference_id, start_date, end_date))  # type: ignore  # noqa: FKA100
-                # settlement_df.to_csv(file_path, index=False, header=True)
-
-                # Perform additional transformations and save to the database
-                settlement_df = settlement_df.fillna(np.nan).replace([np.nan], [None])  # type: ignore  # noqa: FKA100
-
-                # store amount details as json
-                previous_order_id = None
-                first_row = True
-                amount_details_dict = {'amount_details': []}
-                for row in settlement_df.iloc[1:].itertuples(index=False):
-                    current_order_id = row.order_id
-
-                    if current_order_id == previous_order_id or first_row is True:
-                        amount_details_dict = amount_details_to_json(
-                            amount_details_dict=amount_details_dict, row=row)
-
-                        selling_partner_id = asp_id
-                        settlement_id = row.settlement_id
-                        settlement_start_date = row.settlement_start_date
-                        settlement_end_date = row.settlement_end_date
-                        deposit_date = row.deposit_date
-                        total_amount = row.total_amount
-                        currency = row.currency
-                        transaction_type = row.transaction_type
-                        order_id = current_order_id
-                        merchant_order_id = row.merchant_order_id
-                        adjustment_id = row.adjustment_id
-                        shipment_id = row.shipment_id
-                        marketplace_name = row.marketplace_name
-                        fulfillment_id = row.fulfillment_id
-                        posted_date = row.posted_date
-                        posted_date_time = row.posted_date_time
-                        order_item_code = row.order_item_code
-                        merchant_order_item_id = row.merchant_order_item_id
-                        merchant_adjustment_item_id = row.merchant_adjustment_item_id
-                        sku = row.sku
-                        quantity_purchased = row.quantity_purchased
-                        promotion_id = row.promotion_id
-
-                        first_row = False
-                    else:
-                        if not first_row:
-                            cls.store_settlement_data(
-                                selling_partner_id=selling_partner_id,
-                                settlement_id=settlement_id,
-                                settlement_start_date=settlement_start_date,
-                                settlement_end_date=settlement_end_date,
-                                deposit_date=deposit_date,
-                                total_amount=total_amount,
-                                currency=currency,
-                                transaction_type=transaction_type,
-                                order_id=order_id,
-                                merchant_order_id=merchant_order_id,
-                                adjustment_id=adjustment_id,
-                                shipment_id=shipment_id,
-                                marketplace_name=marketplace_name,
-                                fulfillment_id=fulfillment_id,
-                                posted_date=posted_date,
-                                posted_date_time=posted_date_time,
-                                order_item_code=order_item_code,
-                                merchant_order_item_id=merchant_order_item_id,
-                                merchant_adjustment_item_id=merchant_adjustment_item_id,
-                                sku=sku,
-                                quantity_purchased=quantity_purchased,
-                                promotion_id=promotion_id,
-                                amount_details=amount_details_dict
-                            )
-
-                            first_row = True
-
-                            amount_details_dict = {'amount_details': []}
-
-                            amount_details_dict = amount_details_to_json(
-                                amount_details_dict=amount_details_dict, row=row)
-
-                            selling_partner_id = asp_id
-                            settlement_id = row.settlement_id
-                            settlement_start_date = row.settlement_start_date
-                            settlement_end_date = row.settlement_end_date
-                            deposit_date = row.deposit_date
-                            total_amount = row.total_amount
-                            currency = row.currency
-                            transaction_type = row.transaction_type
-                            order_id = current_order_id
-                            merchant_order_id = row.merchant_order_id
-                            adjustment_id = row.adjustment_id
-                            shipment_id = row.shipment_id
-                            marketplace_name = row.marketplace_name
-                            fulfillment_id = row.fulfillment_id
-                            posted_date = row.posted_date
-                            posted_date_time = row.posted_date_time
-                            order_item_code = row.order_item_code
-                            merchant_order_item_id = row.merchant_order_item_id
-                            merchant_adjustment_item_id = row.merchant_adjustment_item_id
-                            sku = row.sku
-                            quantity_purchased = row.quantity_purchased
-                            promotion_id = row.promotion_id
-
-                    previous_order_id = current_order_id
-
-                cls.store_settlement_data(
-                    selling_partner_id=selling_partner_id,
-                    settlement_id=settlement_id,
-                    settlement_start_date=settlement_start_date,
-                    settlement_end_date=settlement_end_date,
-                    deposit_date=deposit_date,
-                    total_amount=total_amount,
-                    currency=currency,
-                    transaction_type=transaction_type,
-                    order_id=order_id,
-                    merchant_order_id=merchant_order_id,
-                    adjustment_id=adjustment_id,
-                    shipment_id=shipment_id,
-                    marketplace_name=marketplace_name,
-                    fulfillment_id=fulfillment_id,
-                    posted_date=posted_date,
-                    posted_date_time=posted_date_time,
-                    order_item_code=order_item_code,
-                    merchant_order_item_id=merchant_order_item_id,
-                    merchant_adjustment_item_id=merchant_adjustment_item_id,
-                    sku=sku,
-                    quantity_purchased=quantity_purchased,
-                    promotion_id=promotion_id,
-                    amount_details=amount_details_dict
-                )
+                started_at = time.perf_counter()
+
+                # stream the report document chunk by chunk as text, the second line holds the settlement totals and is skipped
+                report_chunks = iter_report_chunks(report_document=get_report, delimiter='\t', header=None, skiprows=2,
+                                                   names=list(SETTLEMENT_REPORT_COLUMNS), dtype=str)
+
+                row_count = AzSettlementV2.bulk_upsert_report(account_id=account_id, asp_id=asp_id, selling_partner_id=asp_id,
+                                                              report_chunks=report_chunks)
+
+                log_ingestion_throughput(job_name='SettlementReportV2Worker.process_csv_reports', account_id=account_id,
+                                         row_count=row_count, started_at=started_at)
 
                 get_report_document_id.status = ASpReportProcessingStatus.COMPLETED.value
                 get_report_document_id.status_updated_at = int(time.time())
                 get_report_document_id.save()
 
+                bump_data_version(account_id=account_id)
+
                 if queue_task:
                     queue_task.status = QueueTaskStatus.COMPLETED.value
                     queue_task.save()
                 else:
                     raise Exception
 
+            except SpApiThrottlingException as e:
+                reschedule_throttled_job(data=data, exception=e, queue_task=queue_task)
+
             except Exception as e:
                 if queue_task:
                     queue_task.status = QueueTaskStatus.ERROR.value
@@ -660,160 +522,3 @@ class SettlementReportV2Worker:
                 logger.error("Queue Task with job_id '{}' failed. Exception: {}".format(
                     data.get('job_id'), str(e)))
                 logger.error(traceback.format_exc())
-
-    @classmethod
-    def store_settlement_data(cls, selling_partner_id, settlement_id, settlement_start_date, settlement_end_date, deposit_date, total_amount,
-                              currency, transaction_type, order_id, merchant_order_id, adjustment_id, shipment_id, marketplace_name,
-                              fulfillment_id, posted_date, posted_date_time, order_item_code, merchant_order_item_id, merchant_adjustment_item_id,
-                              sku, quantity_purchased, promotion_id, amount_details):
-
-        selling_partner_id = selling_partner_id
-        settlement_id = settlement_id
-        settlement_start_date = settlement_start_date
-        settlement_end_date = settlement_end_date
-        deposit_date = deposit_date
-        total_amount = total_amount
-        currency = currency
-        transaction_type = transaction_type
-        order_id = order_id
-        merchant_order_id = merchant_order_id
-        adjustment_id = adjustment_id
-        shipment_id = shipment_id
-        marketplace_name = marketplace_name
-        fulfillment_id = fulfillment_id
-        posted_date = posted_date
-        posted_date_time = posted_date_time
-        order_item_code = order_item_code
-        merchant_order_item_id = merchant_order_item_id
-        merchant_adjustment_item_id = merchant_adjustment_item_id
-        sku = sku
-        quantity_purchased = quantity_purchased
-        promotion_id = promotion_id
-        amount_details = amount_details
-
-        settlement_data_exists = AzSettlementV2.get_by_order_id(
-            selling_partner_id=selling_partner_id, order_id=order_id)
-
-        # if order id already exists
-        if settlement_data_exists:
-
-            # same transaction type - same sku
-            if settlement_data_exists.transaction_type == transaction_type and settlement_data_exists.sku == sku:
-
-                # summing up quantity and amount details acccording to quantity
-                # quantity_purchased = sum(
-                #     filter(None, [int(settlement_data_exists.quantity_purchased), int(quantity_purchased)]))
-                values = [int(value) for value in [
-                    settlement_data_exists.quantity_purchased, quantity_purchased] if value is not None]
-                quantity_purchased = sum(values)
-
-                previous_amount_details = settlement_data_exists.amount_details
-
-                # fetching amount details from json column
-                if previous_amount_details and isinstance(previous_amount_details, list):
-                    for amount_detail in previous_amount_details:
-                        previous_amount_details_list = amount_detail.get('amount_details', [])       # type: ignore  # noqa: FKA100
-                elif previous_amount_details and isinstance(previous_amount_details, dict):
-                    previous_amount_details_list = previous_amount_details.get(
-                        'amount_details')
-
-                new_amount_details = {'amount_details': []}
-                already_traversed = {}
-
-                # summing up amount details on update
-                for detail in previous_amount_details_list + amount_details.get('amount_details'):
-                    amount_description = detail.get('amount_description')
-                    if amount_description not in already_traversed:
-                        already_traversed[amount_description] = detail.get(
-                            'amount')
-                    else:
-                        already_traversed[amount_description] += detail.get(
-                            'amount')
-                        detail['amount'] = already_traversed[amount_description]
-
-                        new_amount_details['amount_details'].append(detail)
-
-                AzSettlementV2.update_by_order_id(selling_partner_id=selling_partner_id,
-                                                  settlement_id=settlement_id,
-                                                  settlement_start_date=settlement_start_date,
-                                                  settlement_end_date=settlement_end_date,
-                                                  deposit_date=deposit_date,
-                                                  total_amount=total_amount,
-                                                  currency=currency,
-                                                  transaction_type=transaction_type,
-                                                  order_id=order_id,
-                                                  merchant_order_id=merchant_order_id,
-                                                  adjustment_id=adjustment_id,
-                                                  shipment_id=shipment_id,
-                                                  marketplace_name=marketplace_name,
-                                                  fulfillment_id=fulfillment_id,
-                                                  posted_date=posted_date,
-                                                  posted_date_time=posted_date_time,
-                                                  order_item_code=order_item_code,
-                                                  merchant_order_item_id=merchant_order_item_id,
-                                                  merchant_adjustment_item_id=merchant_adjustment_item_id,
-                                                  sku=sku,
-                                                  quantity_purchased=quantity_purchased,
-                                                  promotion_id=promotion_id,
-                                                  amount_details=new_amount_details)
-
-            else:
-                AzSettlementV2.add(selling_partner_id=selling_partner_id,
-                                   settlement_id=settlement_id,
-                                   settlement_start_date=settlement_start_date,
-                                   settlement_end_date=settlement_end_date,
-                                   deposit_date=deposit_date,
-                                   total_amount=total_amount,
-                                   currency=currency,
-                                   transaction_type=transaction_type,
-                                   order_id=order_id,
-                                   merchant_order_id=merchant_order_id,
-                                   adjustment_id=adjustment_id,
-                                   shipment_id=shipment_id,
-                                   marketplace_name=marketplace_name,
-                                   fulfillment_id=fulfillment_id,
-                                   posted_date=posted_date,
-                                   posted_date_time=posted_date_time,
-                                   order_item_code=order_item_code,
-                                   merchant_order_item_id=merchant_order_item_id,
-                                   merchant_adjustment_item_id=merchant_adjustment_item_id,
-                                   sku=sku,
-                                   quantity_purchased=quantity_purchased,
-                                   promotion_id=promotion_id,
-                                   amount_details=amount_details)
-
-            # #same transaction type - different skus
-            # elif settlement_data_exists.transaction_type == data.get('transaction_type') and settlement_data_exists.sku != data.get('sku'):
-            #     AzSettlementV2.add(data) #
-
-            # #different transaction type
-            # elif settlement_data_exists.transaction_type != data.get('transaction_type'):
-            #     AzSettlementV2.add(data) #
-
-            # else:
-            #     AzSettlementV2.add(data) #
-
-        else:
-            AzSettlementV2.add(selling_partner_id=selling_partner_id,
-                               settlement_id=settlement_id,
-                               settlement_start_date=settlement_start_date,
-                               settlement_end_date=settlement_end_date,
-                               deposit_date=deposit_date,
-                               total_amount=total_amount,
-                               currency=currency,
-                               transaction_type=transaction_type,
-                               order_id=order_id,
-                               merchant_order_id=merchant_order_id,
-                               adjustment_id=adjustment_id,
-                               shipment_id=shipment_id,
-                               marketplace_name=marketplace_name,
-                               fulfillment_id=fulfillment_id,
-                               posted_date=posted_date,
-                               posted_date_time=posted_date_time,
-                               order_item_code=order_item_code,
-                               merchant_order_item_id=merchant_order_item_id,
-                               merchant_adjustment_item_id=merchant_adjustment_item_id,
-                               sku=sku,
-                               quantity_purchased=quantity_purchased,
-                               promotion_id=promotion_id,
-                               amount_details=amount_details)
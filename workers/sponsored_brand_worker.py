@@ -1,7 +1,5 @@
 from datetime import datetime
 from datetime import timedelta
-import gzip
-import json
 import time
 import traceback
 
@@ -19,6 +17,9 @@ from app.helpers.constants import QueueName
 from app.helpers.constants import QueueTaskStatus
 from app.helpers.constants import SponsoredBrandCreativeType
 from app.helpers.constants import TimePeriod
+from app.helpers.ingestion_helper import log_ingestion_throughput
+from app.helpers.report_download_helper import iter_report_json_items
+from app.helpers.response_cache_helper import bump_data_version
 from app.helpers.utility import get_from_to_date_by_timestamp
 from app.models.account import Account
 from app.models.az_report import AzReport
@@ -301,13 +302,9 @@ class SponsoredBrandWorker():
 
                 # creating AmazonAdsReportEU object and passing the credentials
                 report = AmazonAdsReportEU(credentials=credentials)
-                response = report.retrieve_report_download_v2(
-                    document_id=report_document_id)
 
-                content = gzip.decompress(response.content)
-                content = content.decode('utf-8')
-
-                json_dict = json.loads(content)
+                # records are parsed from the gzip stream as it downloads
+                report_items = iter_report_json_items(report_document=report.get_report_download_document_v2(document_id=report_document_id))
 
                 payload_date = get_report_document_id.request_start_time
                 formatted_payload_date = payload_date.strftime(
@@ -315,92 +312,22 @@ class SponsoredBrandWorker():
                 sb_type = SponsoredBrandCreativeType.ALL.value
                 if queue_task.entity_type == EntityType.AZ_SPONSORED_BRAND_VIDEO.value:
                     sb_type = SponsoredBrandCreativeType.VIDEO.value
-                for brand in json_dict:                                                # type: ignore  # noqa: FKA100
-                    payload_date = formatted_payload_date
-                    sb_type = sb_type
-                    ad_group_name = brand.get('adGroupName')
-                    attributed_conversions_14d = brand.get(
-                        'attributedConversions14d')
-                    attributed_conversions_14d_same_sku = brand.get(
-                        'attributedConversions14dSameSKU')
-                    attributed_sales_14d = brand.get('attributedSales14d')
-                    attributed_sales_14d_same_sku = brand.get(
-                        'attributedSales14dSameSKU')
-                    campaign_budget = brand.get('campaignBudget')
-                    campaign_budget_type = brand.get('campaignBudgetType')
-                    campaign_id = brand.get('campaignId')
-                    campaign_name = brand.get('campaignName')
-                    campaign_status = brand.get('campaignStatus')
-                    clicks = brand.get('clicks')
-                    cost = brand.get('cost')
-                    impressions = brand.get('impressions')
-                    keyword_bid = brand.get('keywordBid')
-                    keyword_id = brand.get('keywordId')
-                    keyword_status = brand.get('keywordStatus')
-                    keyword_text = brand.get('keywordText')
-                    match_type = brand.get('matchType')
-                    sbv_vctr = brand.get('vctr')
-                    sbv_video_5_second_view_rate = brand.get(
-                        'video5SecondViewRate')
-                    sbv_video_5_second_views = brand.get('video5SecondViews')
-                    sbv_video_complete_views = brand.get('videoCompleteViews')
-                    sbv_video_first_quartile_views = brand.get(
-                        'videoFirstQuartileViews')
-                    sbv_video_midpoint_views = brand.get('videoMidpointViews')
-                    sbv_video_third_quartile_views = brand.get(
-                        'videoThirdQuartileViews')
-                    sbv_video_unmutes = brand.get('videoUnmutes')
-                    sbv_viewable_impressions = brand.get('viewableImpressions')
-                    sbv_vtr = brand.get('vtr')
-                    dpv_14d = brand.get('dpv14d')
-                    attributed_detail_page_views_clicks_14d = brand.get(
-                        'attributedDetailPageViewsClicks14d')
-                    attributed_order_rate_new_to_brand_14d = brand.get(
-                        'attributedOrderRateNewToBrand14d')
-                    attributed_orders_new_to_brand_14d = brand.get(
-                        'attributedOrdersNewToBrand14d')
-                    attributed_orders_new_to_brand_percentage_14d = brand.get(
-                        'attributedOrdersNewToBrandPercentage14d')
-                    attributed_sales_new_to_brand_14d = brand.get(
-                        'attributedSalesNewToBrand14d')
-                    attributed_sales_new_to_brand_percentage_14d = brand.get(
-                        'attributedSalesNewToBrandPercentage14d')
-                    attributed_units_ordered_new_to_brand_14d = brand.get(
-                        'attributedUnitsOrderedNewToBrand14d')
-                    attributed_units_ordered_new_to_brand_percentage_14d = brand.get(
-                        'attributedUnitsOrderedNewToBrandPercentage14d')
-                    attributed_branded_searches_14d = brand.get(
-                        'attributedBrandedSearches14d')
-                    sbv_currency = brand.get('currency')
-                    top_of_search_impression_share = brand.get(
-                        'topOfSearchImpressionShare')
-                    sbb_applicable_budget_rule_id = brand.get(
-                        'applicableBudgetRuleId')
-                    sbb_applicable_budget_rule_name = brand.get(
-                        'applicableBudgetRuleName')
-                    sbb_campaign_rule_based_budget = brand.get(
-                        'campaignRuleBasedBudget')
-                    sbb_search_term_impression_rank = brand.get(
-                        'searchTermImpressionRank')
-                    sbb_search_term_impression_share = brand.get(
-                        'searchTermImpressionShare')
-                    sbb_units_sold_14d = brand.get('unitsSold14d')
-
-                    AzSponsoredBrand.add_update(asp_id=asp_id, az_ads_profile_id=str(az_ads_profile_id), account_id=account_id, payload_date=payload_date, sb_type=sb_type, ad_group_name=ad_group_name, attributed_conversions_14d=attributed_conversions_14d, attributed_conversions_14d_same_sku=attributed_conversions_14d_same_sku, attributed_sales_14d=attributed_sales_14d,
-                                                attributed_sales_14d_same_sku=attributed_sales_14d_same_sku, campaign_budget=campaign_budget, campaign_budget_type=campaign_budget_type, campaign_id=campaign_id, campaign_name=campaign_name, campaign_status=campaign_status,
-                                                clicks=clicks, cost=cost, impressions=impressions, keyword_bid=keyword_bid, keyword_id=keyword_id, keyword_status=keyword_status, keyword_text=keyword_text, match_type=match_type,
-                                                sbv_vctr=sbv_vctr, sbv_video_5_second_view_rate=sbv_video_5_second_view_rate, sbv_video_5_second_views=sbv_video_5_second_views, sbv_video_complete_views=sbv_video_complete_views, sbv_video_first_quartile_views=sbv_video_first_quartile_views,
-                                                sbv_video_midpoint_views=sbv_video_midpoint_views, sbv_video_third_quartile_views=sbv_video_third_quartile_views, sbv_video_unmutes=sbv_video_unmutes, sbv_viewable_impressions=sbv_viewable_impressions, sbv_vtr=sbv_vtr,
-                                                dpv_14d=dpv_14d, attributed_detail_page_views_clicks_14d=attributed_detail_page_views_clicks_14d, attributed_order_rate_new_to_brand_14d=attributed_order_rate_new_to_brand_14d, attributed_orders_new_to_brand_14d=attributed_orders_new_to_brand_14d,
-                                                attributed_orders_new_to_brand_percentage_14d=attributed_orders_new_to_brand_percentage_14d, attributed_sales_new_to_brand_14d=attributed_sales_new_to_brand_14d, attributed_sales_new_to_brand_percentage_14d=attributed_sales_new_to_brand_percentage_14d, attributed_units_ordered_new_to_brand_14d=attributed_units_ordered_new_to_brand_14d,
-                                                attributed_units_ordered_new_to_brand_percentage_14d=attributed_units_ordered_new_to_brand_percentage_14d, attributed_branded_searches_14d=attributed_branded_searches_14d, sbv_currency=sbv_currency, top_of_search_impression_share=top_of_search_impression_share, sbb_applicable_budget_rule_id=sbb_applicable_budget_rule_id,
-                                                sbb_applicable_budget_rule_name=sbb_applicable_budget_rule_name, sbb_campaign_rule_based_budget=sbb_campaign_rule_based_budget, sbb_search_term_impression_rank=sbb_search_term_impression_rank, sbb_search_term_impression_share=sbb_search_term_impression_share, sbb_units_sold_14d=sbb_units_sold_14d)
+
+                started_at = time.perf_counter()
+
+                row_count = AzSponsoredBrand.bulk_upsert_report(account_id=account_id, asp_id=asp_id, az_ads_profile_id=str(az_ads_profile_id),
+                                                                payload_date=formatted_payload_date, sb_type=sb_type, report_items=report_items)
+
+                log_ingestion_throughput(job_name='SponsoredBrandWorker.get_sponsored_brand_report', account_id=account_id,
+                                         row_count=row_count, started_at=started_at)
 
                 if get_report_document_id:
                     get_report_document_id.status = ASpReportProcessingStatus.COMPLETED.value
                     get_report_document_id.status_updated_at = int(time.time())
                     db.session.commit()
 
+                bump_data_version(account_id=account_id)
+
                 if queue_task:
                     queue_task.status = QueueTaskStatus.COMPLETED.value
                     queue_task.save()
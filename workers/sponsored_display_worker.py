@@ -1,7 +1,5 @@
 from datetime import datetime
 from datetime import timedelta
-import gzip
-import json
 import time
 import traceback
 
@@ -10,6 +8,7 @@ from app import az_sponsored_display_q
 from app import config_data
 from app import db
 from app import logger
+from app.helpers.brand_category_helper import BrandCategoryLookup
 from app.helpers.constants import AdsApiURL
 from app.helpers.constants import ASpReportProcessingStatus
 from app.helpers.constants import ASpReportType
@@ -19,8 +18,12 @@ from app.helpers.constants import EntityType
 from app.helpers.constants import QueueName
 from app.helpers.constants import QueueTaskStatus
 from app.helpers.constants import TimePeriod
+from app.helpers.ingestion_helper import log_ingestion_throughput
+from app.helpers.report_download_helper import iter_report_json_items
+from app.helpers.response_cache_helper import bump_data_version
 from app.helpers.utility import get_from_to_date_by_timestamp
 from app.models.account import Account
+from app.models.az_product_performance_daily import AzProductPerformanceDaily
 from app.models.az_report import AzReport
 from app.models.az_sponsored_display import AzSponsoredDisplay
 from app.models.queue_task import QueueTask
@@ -290,124 +293,35 @@ class SponsoredDisplayWorker():
                 # creating AmazonAdsReportEU object and passing the credentials
                 report = AmazonAdsReportEU(credentials=credentials)
 
-                response = report.retrieve_report_download_v2(
-                    document_id=report_document_id)
-                content = gzip.decompress(response.content)
-                content = content.decode('utf-8')
+                # records are parsed from the gzip stream as it downloads
+                report_items = iter_report_json_items(report_document=report.get_report_download_document_v2(document_id=report_document_id))
 
-                json_dict = json.loads(content)
                 payload_date = get_report_document_id.request_start_time
 
                 formatted_payload_date = payload_date.strftime(
                     '%Y-%m-%d')
 
-                for display in json_dict:
-                    payload_date = formatted_payload_date
-                    ad_group_id = display.get('adGroupId')
-                    ad_group_name = display.get('adGroupName')
-                    ad_id = display.get('adId')
-                    asin = display.get('asin')
-                    attributed_conversions_14d = display.get(
-                        'attributedConversions14d')
-                    attributed_conversions_14d_same_sku = display.get(
-                        'attributedConversions14dSameSKU')
-                    attributed_conversions_1d = display.get(
-                        'attributedConversions1d')
-                    attributed_conversions_1d_same_sku = display.get(
-                        'attributedConversions1dSameSKU')
-                    attributed_conversions_30d = display.get(
-                        'attributedConversions30d')
-                    attributed_conversions_30d_same_sku = display.get(
-                        'attributedConversions30dSameSKU')
-                    attributed_conversions_7d = display.get(
-                        'attributedConversions7d')
-                    attributed_conversions_7d_same_sku = display.get(
-                        'attributedConversions7dSameSKU')
-                    attributed_detail_page_view_14d = display.get(
-                        'attributedDetailPageView14d')
-                    attributed_orders_new_to_brand_14d = display.get(
-                        'attributedOrdersNewToBrand14d')
-                    attributed_sales_14d = display.get('attributedSales14d')
-                    attributed_sales_14d_same_sku = display.get(
-                        'attributedSales14dSameSKU')
-                    attributed_sales_1d = display.get('attributedSales1d')
-                    attributed_sales_1d_same_sku = display.get(
-                        'attributedSales1dSameSKU')
-                    attributed_sales_30d = display.get('attributedSales30d')
-                    attributed_sales_30d_same_sku = display.get(
-                        'attributedSales30dSameSKU')
-                    attributed_sales_7d = display.get('attributedSales7d')
-                    attributed_sales_7d_same_sku = display.get(
-                        'attributedSales7dSameSKU')
-                    attributed_sales_new_to_brand_14d = display.get(
-                        'attributedSalesNewToBrand14d')
-                    attributed_units_ordered_14d = display.get(
-                        'attributedUnitsOrdered14d')
-                    attributed_units_ordered_1d = display.get(
-                        'attributedUnitsOrdered1d')
-                    attributed_units_ordered_30d = display.get(
-                        'attributedUnitsOrdered30d')
-                    attributed_units_ordered_7d = display.get(
-                        'attributedUnitsOrdered7d')
-                    attributed_units_ordered_new_to_brand_14d = display.get(
-                        'attributedUnitsOrderedNewToBrand14d')
-                    campaign_id = display.get('campaignId')
-                    campaign_name = display.get('campaignName')
-                    clicks = display.get('clicks')
-                    cost = display.get('cost')
-                    currency = display.get('currency')
-                    impressions = display.get('impressions')
-                    sku = display.get('sku')
-                    view_attributed_conversions_14d = display.get(
-                        'viewAttributedConversions14d')
-                    view_impressions = display.get('viewImpressions')
-                    view_attributed_detail_page_view_14d = display.get(
-                        'viewAttributedDetailPageView14d')
-                    view_attributed_sales_14d = display.get(
-                        'viewAttributedSales14d')
-                    view_attributed_units_ordered_14d = display.get(
-                        'viewAttributedUnitsOrdered14d')
-                    view_attributed_orders_new_to_brand_14d = display.get(
-                        'viewAttributedOrdersNewToBrand14d')
-                    view_attributed_sales_new_to_brand_14d = display.get(
-                        'viewAttributedSalesNewToBrand14d')
-                    view_attributed_units_ordered_new_to_brand_14d = display.get(
-                        'viewAttributedUnitsOrderedNewToBrand14d')
-                    attributed_branded_searches_14d = display.get(
-                        'attributedBrandedSearches14d')
-                    view_attributed_branded_searches_14d = display.get(
-                        'viewAttributedBrandedSearches14d')
-                    video_complete_views = display.get('videoCompleteViews')
-                    video_first_quartile_views = display.get(
-                        'videoFirstQuartileViews')
-                    video_midpoint_views = display.get('videoMidpointViews')
-                    video_third_quartile_views = display.get(
-                        'videoThirdQuartileViews')
-                    video_unmutes = display.get('videoUnmutes')
-                    vtr = display.get('vtr')
-                    vctr = display.get('vctr')
-                    avg_impressions_frequency = display.get(
-                        'avgImpressionsFrequency')
-                    cumulative_reach = display.get('cumulativeReach')
-
-                    AzSponsoredDisplay.add_update(asp_id=asp_id, az_ads_profile_id=str(az_ads_profile_id), account_id=account_id, payload_date=payload_date, ad_group_id=ad_group_id, ad_group_name=ad_group_name, ad_id=ad_id, asin=asin, attributed_conversions_14d=attributed_conversions_14d,
-                                                  attributed_conversions_14d_same_sku=attributed_conversions_14d_same_sku, attributed_conversions_1d=attributed_conversions_1d, attributed_conversions_1d_same_sku=attributed_conversions_1d_same_sku, attributed_conversions_30d=attributed_conversions_30d,
-                                                  attributed_conversions_30d_same_sku=attributed_conversions_30d_same_sku, attributed_conversions_7d=attributed_conversions_7d, attributed_conversions_7d_same_sku=attributed_conversions_7d_same_sku,
-                                                  attributed_detail_page_view_14d=attributed_detail_page_view_14d, attributed_orders_new_to_brand_14d=attributed_orders_new_to_brand_14d, attributed_sales_14d=attributed_sales_14d,
-                                                  attributed_sales_14d_same_sku=attributed_sales_14d_same_sku, attributed_sales_1d=attributed_sales_1d, attributed_sales_1d_same_sku=attributed_sales_1d_same_sku, attributed_sales_30d=attributed_sales_30d,
-                                                  attributed_sales_30d_same_sku=attributed_sales_30d_same_sku, attributed_sales_7d=attributed_sales_7d, attributed_sales_7d_same_sku=attributed_sales_7d_same_sku, attributed_sales_new_to_brand_14d=attributed_sales_new_to_brand_14d,
-                                                  attributed_units_ordered_14d=attributed_units_ordered_14d, attributed_units_ordered_1d=attributed_units_ordered_1d, attributed_units_ordered_30d=attributed_units_ordered_30d, attributed_units_ordered_7d=attributed_units_ordered_7d,
-                                                  attributed_units_ordered_new_to_brand_14d=attributed_units_ordered_new_to_brand_14d, campaign_id=campaign_id, campaign_name=campaign_name, clicks=clicks, cost=cost, currency=currency, impressions=impressions, sku=sku,
-                                                  view_attributed_conversions_14d=view_attributed_conversions_14d, view_impressions=view_impressions, view_attributed_detail_page_view_14d=view_attributed_detail_page_view_14d, view_attributed_sales_14d=view_attributed_sales_14d,
-                                                  view_attributed_units_ordered_14d=view_attributed_units_ordered_14d, view_attributed_orders_new_to_brand_14d=view_attributed_orders_new_to_brand_14d, view_attributed_sales_new_to_brand_14d=view_attributed_sales_new_to_brand_14d,
-                                                  view_attributed_units_ordered_new_to_brand_14d=view_attributed_units_ordered_new_to_brand_14d, attributed_branded_searches_14d=attributed_branded_searches_14d, view_attributed_branded_searches_14d=view_attributed_branded_searches_14d, video_complete_views=video_complete_views,
-                                                  video_first_quartile_views=video_first_quartile_views, video_midpoint_views=video_midpoint_views, video_third_quartile_views=video_third_quartile_views, video_unmutes=video_unmutes, vtr=vtr, vctr=vctr,
-                                                  avg_impressions_frequency=avg_impressions_frequency, cumulative_reach=cumulative_reach)
+                # category and brand are read from the item master once for the whole report
+                brand_category_lookup = BrandCategoryLookup(account_id=account_id, asp_id=asp_id)
+
+                started_at = time.perf_counter()
+
+                row_count = AzSponsoredDisplay.bulk_upsert_report(account_id=account_id, asp_id=asp_id, az_ads_profile_id=str(az_ads_profile_id),
+                                                                  payload_date=formatted_payload_date, report_items=report_items, brand_category_lookup=brand_category_lookup)
+
+                log_ingestion_throughput(job_name='SponsoredDisplayWorker.get_sponsored_display_report', account_id=account_id,
+                                         row_count=row_count, started_at=started_at)
+
+                # ads spend of the report day is rolled up per sku
+                AzProductPerformanceDaily.refresh_days(account_id=account_id, asp_id=asp_id, days=[get_report_document_id.request_start_time.date()])
+
                 if get_report_document_id:
                     get_report_document_id.status = ASpReportProcessingStatus.COMPLETED.value
                     get_report_document_id.status_updated_at = int(time.time())
                     db.session.commit()
 
+                bump_data_version(account_id=account_id)
+
                 if queue_task:
                     queue_task.status = QueueTaskStatus.COMPLETED.value
                     queue_task.save()
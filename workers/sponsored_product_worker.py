@@ -1,7 +1,5 @@
 from datetime import datetime
 from datetime import timedelta
-import gzip
-import json
 import time
 import traceback
 
@@ -10,6 +8,7 @@ from app import az_sponsored_product_q
 from app import config_data
 from app import db
 from app import logger
+from app.helpers.brand_category_helper import BrandCategoryLookup
 from app.helpers.constants import ASpReportProcessingStatus
 from app.helpers.constants import ASpReportType
 from app.helpers.constants import AzSponsoredAdMetrics
@@ -18,8 +17,12 @@ from app.helpers.constants import EntityType
 from app.helpers.constants import QueueName
 from app.helpers.constants import QueueTaskStatus
 from app.helpers.constants import TimePeriod
+from app.helpers.ingestion_helper import log_ingestion_throughput
+from app.helpers.report_download_helper import iter_report_json_items
+from app.helpers.response_cache_helper import bump_data_version
 from app.helpers.utility import get_from_to_date_by_timestamp
 from app.models.account import Account
+from app.models.az_product_performance_daily import AzProductPerformanceDaily
 from app.models.az_report import AzReport
 from app.models.az_sponsored_product import AzSponsoredProduct
 from app.models.queue_task import QueueTask
@@ -27,7 +30,6 @@ import numpy as np
 import pandas as pd
 from providers.amazon_ads_api import AmazonAdsReportEU
 from providers.mail import send_error_notification
-import requests
 
 
 class SponsoredProductWorker():
@@ -306,116 +308,35 @@ class SponsoredProductWorker():
                 else:
                     raise Exception
 
-                # get file data by accessing the url
-                file_data = requests.get(file_url)
+                # records are parsed from the gzip stream as it downloads
+                report_items = iter_report_json_items(report_document={'url': file_url, 'compressionAlgorithm': 'GZIP'})
 
-                # decompressing the data
-                content = file_data.content
-
-                content = gzip.decompress(content)
-                content = content.decode('utf-8')
-
-                json_dict = json.loads(content)
                 payload_date = get_report_document_id.request_start_time
 
                 formatted_payload_date = payload_date.strftime(
                     '%Y-%m-%d')
 
-                for product in json_dict:
-                    asp_id = asp_id
-                    account_id = account_id
-                    payload_date = formatted_payload_date
-                    attributed_sales_same_sku_1d = product.get(
-                        'attributedSalesSameSku1d')
-                    roas_clicks_14d = product.get('roasClicks14d')
-                    end_date = product.get('endDate')
-                    units_sold_clicks_1d = product.get('unitsSoldClicks1d')
-                    attributed_sales_same_sku_14d = product.get(
-                        'attributedSalesSameSku14d')
-                    sales_7d = product.get('sales7d')
-                    attributed_sales_same_sku_30d = product.get(
-                        'attributedSalesSameSku30d')
-                    kindle_edition_normalized_pages_royalties_14d = product.get(
-                        'kindleEditionNormalizedPagesRoyalties14d')
-                    units_sold_same_sku_1d = product.get('unitsSoldSameSku1d')
-                    campaign_status = product.get('campaignStatus')
-                    advertised_sku = product.get('advertisedSku')
-                    sales_other_sku_7d = product.get('salesOtherSku7d')
-                    purchases_same_sku_7d = product.get('purchasesSameSku7d')
-                    campaign_budget_amount = product.get(
-                        'campaignBudgetAmount')
-                    purchases_7d = product.get('purchases7d')
-                    units_sold_same_sku_30d = product.get(
-                        'unitsSoldSameSku30d')
-                    cost_per_click = product.get('costPerClick')
-                    units_sold_clicks_14d = product.get('unitsSoldClicks14d')
-                    ad_group_name = product.get('adGroupName')
-                    campaign_id = product.get('campaignId')
-                    click_through_rate = product.get('clickThroughRate')
-                    kindle_edition_normalized_pages_read_14d = product.get(
-                        'kindleEditionNormalizedPagesRead14d')
-                    acos_clicks_14d = product.get('acosClicks14d')
-                    units_sold_clicks_30d = product.get('unitsSoldClicks30d')
-                    portfolio_id = product.get('portfolioId')
-                    ad_id = product.get('adId')
-                    campaign_budget_currency_code = product.get(
-                        'campaignBudgetCurrencyCode')
-                    start_date = product.get('startDate')
-                    roas_clicks_7d = product.get('roasClicks7d')
-                    units_sold_same_sku_14d = product.get(
-                        'unitsSoldSameSku14d')
-                    units_sold_clicks_7d = product.get('unitsSoldClicks7d')
-                    attributed_sales_same_sku_7d = product.get(
-                        'attributedSalesSameSku7d')
-                    sales_1d = product.get('sales1d')
-                    ad_group_id = product.get('adGroupId')
-                    purchases_same_sku_14d = product.get('purchasesSameSku14d')
-                    units_sold_other_sku_7d = product.get(
-                        'unitsSoldOtherSku7d')
-                    spend = product.get('spend')
-                    purchases_same_sku_1d = product.get('purchasesSameSku1d')
-                    campaign_budget_type = product.get('campaignBudgetType')
-                    advertised_asin = product.get('advertisedAsin')
-                    purchases_1d = product.get('purchases1d')
-                    units_sold_same_sku_7d = product.get('unitsSoldSameSku7d')
-                    cost = product.get('cost')
-                    sales_14d = product.get('sales14d')
-                    acos_clicks_7d = product.get('acosClicks7d')
-                    sales_30d = product.get('sales30d')
-                    impressions = product.get('impressions')
-                    purchases_same_sku_30d = product.get('purchasesSameSku30d')
-                    purchases_14d = product.get('purchases14d')
-                    purchases_30d = product.get('purchases30d')
-                    clicks = product.get('clicks')
-                    campaign_name = product.get('campaignName')
-
-                    AzSponsoredProduct.add_update(asp_id=asp_id, account_id=account_id, az_ads_profile_id=str(az_ads_profile_id), payload_date=payload_date, clicks=clicks, campaign_name=campaign_name, attributed_sales_same_sku_1d=attributed_sales_same_sku_1d,
-                                                  roas_clicks_14d=roas_clicks_14d, end_date=end_date, units_sold_clicks_1d=units_sold_clicks_1d,
-                                                  attributed_sales_same_sku_14d=attributed_sales_same_sku_14d, sales_7d=sales_7d,
-                                                  attributed_sales_same_sku_30d=attributed_sales_same_sku_30d,
-                                                  kindle_edition_normalized_pages_royalties_14d=kindle_edition_normalized_pages_royalties_14d,
-                                                  units_sold_same_sku_1d=units_sold_same_sku_1d, campaign_status=campaign_status,
-                                                  advertised_sku=advertised_sku, sales_other_sku_7d=sales_other_sku_7d,
-                                                  purchases_same_sku_7d=purchases_same_sku_7d, campaign_budget_amount=campaign_budget_amount,
-                                                  purchases_7d=purchases_7d, units_sold_same_sku_30d=units_sold_same_sku_30d,
-                                                  cost_per_click=cost_per_click, units_sold_clicks_14d=units_sold_clicks_14d,
-                                                  ad_group_name=ad_group_name, campaign_id=campaign_id, click_through_rate=click_through_rate,
-                                                  kindle_edition_normalized_pages_read_14d=kindle_edition_normalized_pages_read_14d,
-                                                  acos_clicks_14d=acos_clicks_14d, units_sold_clicks_30d=units_sold_clicks_30d,
-                                                  portfolio_id=portfolio_id, ad_id=ad_id, campaign_budget_currency_code=campaign_budget_currency_code,
-                                                  start_date=start_date, roas_clicks_7d=roas_clicks_7d, units_sold_same_sku_14d=units_sold_same_sku_14d,
-                                                  units_sold_clicks_7d=units_sold_clicks_7d, attributed_sales_same_sku_7d=attributed_sales_same_sku_7d,
-                                                  sales_1d=sales_1d, ad_group_id=ad_group_id, purchases_same_sku_14d=purchases_same_sku_14d,
-                                                  units_sold_other_sku_7d=units_sold_other_sku_7d, spend=spend, purchases_same_sku_1d=purchases_same_sku_1d,
-                                                  campaign_budget_type=campaign_budget_type, advertised_asin=advertised_asin,
-                                                  purchases_1d=purchases_1d, units_sold_same_sku_7d=units_sold_same_sku_7d, cost=cost, sales_14d=sales_14d,
-                                                  acos_clicks_7d=acos_clicks_7d, sales_30d=sales_30d, impressions=impressions,
-                                                  purchases_same_sku_30d=purchases_same_sku_30d, purchases_14d=purchases_14d, purchases_30d=purchases_30d)
+                # category and brand are read from the item master once for the whole report
+                brand_category_lookup = BrandCategoryLookup(account_id=account_id, asp_id=asp_id)
+
+                started_at = time.perf_counter()
+
+                row_count = AzSponsoredProduct.bulk_upsert_report(account_id=account_id, asp_id=asp_id, az_ads_profile_id=str(az_ads_profile_id),
+                                                                  payload_date=formatted_payload_date, report_items=report_items, brand_category_lookup=brand_category_lookup)
+
+                log_ingestion_throughput(job_name='SponsoredProductWorker.get_sponsored_product_report', account_id=account_id,
+                                         row_count=row_count, started_at=started_at)
+
+                # ads spend of the report day is rolled up per sku
+                AzProductPerformanceDaily.refresh_days(account_id=account_id, asp_id=asp_id, days=[get_report_document_id.request_start_time.date()])
+
                 if get_report_document_id:
                     get_report_document_id.status = ASpReportProcessingStatus.COMPLETED.value
                     get_report_document_id.status_updated_at = int(time.time())
                     db.session.commit()
 
+                bump_data_version(account_id=account_id)
+
                 if queue_task:
                     queue_task.status = QueueTaskStatus.COMPLETED.value
                     queue_task.save()
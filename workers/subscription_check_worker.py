@@ -13,6 +13,7 @@ class SubscriptionCheckWorker:
             import time
             from app import db
 
+            from app.helpers.auth_context_helper import invalidate_auth_context
             from app.helpers.constants import SubscriptionStates
             from app.models.subscription import Subscription
             from app.models.account import Account
@@ -52,6 +53,7 @@ class SubscriptionCheckWorker:
                         subscription.deactivated_at = current_time
 
                         db.session.commit()
+                        invalidate_auth_context(account_id=account_id)
 
                         logger.info(
                             '---------------------------expired--------------------------')